@@ -132,11 +132,7 @@ class AddressFacilityMatcher:
             siret = facility.identifiers[0].value if facility.identifiers else "N/A"
 
             # Find address by SIRET reference instead of index
-            matching_address = None
-            for address in result.addresses:
-                if address.facility_siret == siret:
-                    matching_address = address
-                    break
+            matching_address = result.addresses_by_siret.get(siret)
 
             has_address = "Yes" if matching_address else "No"
 
@@ -185,17 +181,13 @@ class AddressFacilityMatcher:
         for address in addresses_with_coords:
             # Find corresponding facility by SIRET reference
             facility_name = "Unknown"
-            for facility in result.facilities:
-                if (
-                    facility.identifiers
-                    and facility.identifiers[0].value == address.facility_siret
-                ):
-                    facility_name = (
-                        facility.name[:23] + ".."
-                        if len(facility.name) > 25
-                        else facility.name
-                    )
-                    break
+            facility = result.facilities_by_siret.get(address.facility_siret)
+            if facility is not None:
+                facility_name = (
+                    facility.name[:23] + ".."
+                    if len(facility.name) > 25
+                    else facility.name
+                )
 
             street = (
                 address.street_address[:23] + ".."
@@ -246,12 +238,10 @@ class AddressFacilityMatcher:
             facility_siret = (
                 facility.identifiers[0].value if facility.identifiers else None
             )
-            if facility_siret:
-                for address in result.addresses:
-                    if address.facility_siret == facility_siret:
-                        pair["address"] = address.model_dump()
-                        pair["has_address"] = True
-                        break
+            address = result.addresses_by_siret.get(facility_siret)
+            if address is not None:
+                pair["address"] = address.model_dump()
+                pair["has_address"] = True
 
             matched_data["facility_address_pairs"].append(pair)
 
@@ -273,16 +263,11 @@ class AddressFacilityMatcher:
         total_addresses = len(result.addresses)
 
         # Count facilities with addresses using SIRET-based matching
-        facilities_with_addresses = 0
-        for facility in result.facilities:
-            facility_siret = (
-                facility.identifiers[0].value if facility.identifiers else None
-            )
-            if facility_siret:
-                for address in result.addresses:
-                    if address.facility_siret == facility_siret:
-                        facilities_with_addresses += 1
-                        break
+        facilities_with_addresses = sum(
+            1
+            for siret in result.facilities_by_siret
+            if siret in result.addresses_by_siret
+        )
 
         facilities_without_addresses = total_facilities - facilities_with_addresses
 
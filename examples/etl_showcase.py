@@ -38,9 +38,11 @@ from typing import Any, Callable, Optional
 from dataclasses import dataclass
 
 from sirene_api_client import AuthenticatedClient, ETLConfig, ValidationMode
+from sirene_api_client.etl.bulk import BulkLoadWriter
 from sirene_api_client.etl.extractor import SIRENExtractor
 from sirene_api_client.etl.transformer import SIRENTransformer
 from sirene_api_client.etl.models import SIRENExtractResult
+from sirene_api_client.etl.validation import is_valid_siren
 from sirene_api_client.api.etablissement.find_by_get_etablissement import (
     asyncio as find_by_get_etablissement,
 )
@@ -191,19 +193,18 @@ class NameToSIRENResolver:
 
     def validate_siren_format(self, siren: str) -> bool:
         """
-        Validate SIREN format.
+        Validate SIREN format and check digit.
 
         Args:
             siren: SIREN string to validate
 
         Returns:
-            True if valid SIREN format, False otherwise
+            True if valid SIREN, False otherwise
         """
         if not siren or not isinstance(siren, str):
             return False
 
-        siren = siren.strip()
-        return len(siren) == 9 and siren.isdigit()
+        return is_valid_siren(siren.strip())
 
 
 class CacheSimulator:
@@ -486,6 +487,10 @@ def generate_django_load_script(data: dict[str, Any]) -> str:
     """
     Generate Django load script for the extracted data.
 
+    The script issues get_or_create() calls row by row, which is fine for a
+    demo but takes thousands of queries per SIREN. For real loads, write
+    COPY-ready files with BulkLoadWriter and load them with load_bulk_files().
+
     Args:
         data: Extracted data dictionary
 
@@ -887,6 +892,14 @@ async def extract_and_display_results(
                     f.write(django_script)
                 print(f"Django load script saved to: {script_path}")
 
+        save_bulk = input("\nWrite COPY-ready bulk load files? [y/N]: ").strip().lower()
+        if save_bulk == "y":
+            bulk_dir = output_dir / f"{base_filename}_bulk"
+            with BulkLoadWriter(bulk_dir) as writer:
+                writer.write_result(result)
+            print(f"Bulk load files written to: {bulk_dir}")
+            print(f"  - Load with: cd {bulk_dir} && psql -f load.sql")
+
     except Exception as e:
         print(f"ERROR: Extraction failed: {e}")
         logger.exception("Extraction failed")
@@ -7,7 +7,8 @@ complete SIREN data from the SIRENE API.
 
 from __future__ import annotations
 
-from datetime import date, datetime
+import asyncio
+from datetime import datetime
 import logging
 from typing import TYPE_CHECKING, Any
 
@@ -18,27 +19,118 @@ from sirene_api_client.models.etablissement_post_multi_criteres import (
     EtablissementPostMultiCriteres,
 )
 
+from .archive import ArchiveEntry, PayloadArchive
+from .bulk import BulkLoadWriter, load_bulk_files
 from .config import ETLConfig, ValidationMode
-from .extractor import SIRENExtractor
-from .models import CompanyData, SIRENExtractResult
+from .crawler import FacetPartitionCrawler, PartitionDimension
+from .exceptions import NotFoundError
+from .existence import BloomFilter, NegativeCache
+from .export import NDJSONWriter, read_records, read_results
+from .extractor import SIRENExtractor, SnapshotCache
+from .facets import FacetClient, FacetResult, IntervalFacet
+from .identifier_index import IdentifierIndex
+from .mirror import MirroredSireneClient, SQLiteMirror
+from .models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    CompanyData,
+    FacilityBundle,
+    SIRENExtractResult,
+)
+from .naf import NAFRegistry, get_naf_registry
+from .parallel import ProcessPoolTransformer
+from .pipeline import (
+    PipelineRunner,
+    PipelineStage,
+    StageConfig,
+    StageMetrics,
+    run_siren_pipeline,
+)
+from .query import Query, QueryExecutor
+from .rehydrate import RegistryRehydrator
+from .stock import StockIngestor
+from .succession import SuccessionGraph, SuccessionIndex, SuccessionWalker
+from .sync import (
+    InMemoryStore,
+    LocalStore,
+    SyncEngine,
+    SyncStats,
+    shared_payload_hash,
+)
+from .temporal import IntervalIndex, PeriodIndex
 from .transformer import SIRENTransformer
+from .validation import (
+    is_valid_siren,
+    is_valid_siret,
+    validate_sirens,
+    validate_sirets,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import AsyncIterator, Callable, Iterable
 
     from sirene_api_client.client import AuthenticatedClient
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    "ActivityClassificationBundle",
+    "ArchiveEntry",
+    "BloomFilter",
+    "BulkLoadWriter",
+    "CompanyBundle",
     "ETLConfig",
+    "FacetClient",
+    "FacetPartitionCrawler",
+    "FacetResult",
+    "FacilityBundle",
+    "IdentifierIndex",
+    "InMemoryStore",
+    "IntervalFacet",
+    "IntervalIndex",
+    "LocalStore",
+    "MirroredSireneClient",
+    "NAFRegistry",
+    "NDJSONWriter",
+    "NegativeCache",
+    "PartitionDimension",
+    "PayloadArchive",
+    "PeriodIndex",
+    "PipelineRunner",
+    "PipelineStage",
+    "ProcessPoolTransformer",
+    "Query",
+    "QueryExecutor",
+    "RegistryRehydrator",
     "SIRENExtractResult",
     "SIRENExtractor",
     "SIRENTransformer",
+    "SQLiteMirror",
+    "SnapshotCache",
+    "StageConfig",
+    "StageMetrics",
+    "StockIngestor",
+    "SuccessionGraph",
+    "SuccessionIndex",
+    "SuccessionWalker",
+    "SyncEngine",
+    "SyncStats",
     "ValidationMode",
     "extract_and_transform_siren",
+    "extract_and_transform_siren_streaming",
     "extract_and_transform_siren_with_progress",
+    "extract_and_transform_sirens",
     "extract_company_only",
+    "get_naf_registry",
+    "is_valid_siren",
+    "is_valid_siret",
+    "load_bulk_files",
+    "read_records",
+    "read_results",
+    "run_siren_pipeline",
+    "shared_payload_hash",
+    "validate_sirens",
+    "validate_sirets",
 ]
 
 
@@ -92,8 +184,10 @@ async def extract_and_transform_siren(
         logger.debug("Using default ETL configuration")
 
     # Validate SIREN format
-    if not siren or not siren.isdigit() or len(siren) != 9:
-        raise ValueError(f"Invalid SIREN format: {siren}. Must be 9 digits.")
+    if not is_valid_siren(siren):
+        raise ValueError(
+            f"Invalid SIREN format: {siren}. Must be 9 digits with a valid check digit."
+        )
 
     try:
         # Initialize extractor and transformer
@@ -123,6 +217,101 @@ async def extract_and_transform_siren(
         raise
 
 
+async def extract_and_transform_sirens(
+    sirens: Iterable[str],
+    client: AuthenticatedClient,
+    config: ETLConfig | None = None,
+    *,
+    max_concurrency: int = 4,
+    snapshot_cache: SnapshotCache | None = None,
+    known_sirens: BloomFilter | None = None,
+    negative_cache: NegativeCache | None = None,
+) -> dict[str, SIRENExtractResult]:
+    """
+    Extract and transform many SIRENs concurrently.
+
+    Duplicate SIRENs are processed once. When config.as_of is set, every SIREN
+    is extracted as of that date and API results are shared through a single
+    SnapshotCache, which can also be passed in to reuse it across batches.
+    SIRENs absent from known_sirens cannot exist and are left out of the
+    result without any request. SIRENs the API reports missing are left out
+    too, instead of failing the batch; with a negative_cache they are
+    remembered, so later batches skip them without any request.
+
+    Args:
+        sirens: SIREN numbers to extract (9-digit strings)
+        client: SIRENE API client instance
+        config: Optional ETL configuration (defaults to lenient validation)
+        max_concurrency: Maximum number of SIRENs extracted at the same time
+        snapshot_cache: Optional cache shared with other extractions
+        known_sirens: Optional Bloom filter of every existing SIREN
+        negative_cache: Optional cache of SIRENs reported missing, shared
+            across batches
+
+    Returns:
+        SIRENExtractResult per extracted SIREN, in input order
+
+    Raises:
+        ValueError: If a SIREN format is invalid
+        ExtractionError: If an extraction fails; pending extractions are cancelled
+
+    Example:
+        ```python
+        config = ETLConfig(as_of=date(2020, 1, 1))
+        results = await extract_and_transform_sirens(sirens, client, config)
+        print(results["123456782"].company.name)
+        ```
+    """
+    if config is None:
+        config = ETLConfig()
+        logger.debug("Using default ETL configuration")
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    unique_sirens = list(dict.fromkeys(sirens))
+    for siren, valid in zip(unique_sirens, validate_sirens(unique_sirens), strict=True):
+        if not valid:
+            raise ValueError(
+                f"Invalid SIREN format: {siren}. Must be 9 digits with a valid check digit."
+            )
+    if known_sirens is not None:
+        unknown = [siren for siren in unique_sirens if siren not in known_sirens]
+        if unknown:
+            logger.info(f"Skipping {len(unknown)} SIRENs absent from known_sirens")
+            unique_sirens = [siren for siren in unique_sirens if siren in known_sirens]
+
+    extractor = SIRENExtractor(client, config, snapshot_cache, negative_cache)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def extract_one(siren: str) -> SIRENExtractResult | None:
+        try:
+            async with semaphore:
+                raw_data = await extractor.extract_siren_complete(siren)
+        except NotFoundError:
+            logger.info(f"SIREN {siren} not found, leaving it out of the batch")
+            return None
+        return SIRENTransformer(config).transform_complete(raw_data)
+
+    logger.info(
+        f"Starting batch ETL for {len(unique_sirens)} SIRENs"
+        + (f" as of {config.as_of.isoformat()}" if config.as_of else "")
+    )
+    tasks = [asyncio.create_task(extract_one(siren)) for siren in unique_sirens]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other extractions instead of letting them run detached
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return {
+        siren: result
+        for siren, result in zip(unique_sirens, results, strict=True)
+        if result is not None
+    }
+
+
 async def extract_and_transform_siren_with_progress(
     siren: str,
     client: AuthenticatedClient,
@@ -173,8 +362,10 @@ async def extract_and_transform_siren_with_progress(
         logger.debug("Using default ETL configuration")
 
     # Validate SIREN format
-    if not siren or not siren.isdigit() or len(siren) != 9:
-        raise ValueError(f"Invalid SIREN format: {siren}. Must be 9 digits.")
+    if not is_valid_siren(siren):
+        raise ValueError(
+            f"Invalid SIREN format: {siren}. Must be 9 digits with a valid check digit."
+        )
 
     try:
         # Initialize extractor and transformer
@@ -183,7 +374,9 @@ async def extract_and_transform_siren_with_progress(
 
         # Phase 1: Extract company data immediately
         logger.info(f"Extracting company data for SIREN: {siren}")
-        company_data = await extractor._extract_company(siren)
+        company_data, company_document = await extractor.extract_company_with_document(
+            siren
+        )
         company_transformed = transformer.transform_unite_legale(company_data)
 
         # Notify progress callback with company data
@@ -202,19 +395,25 @@ async def extract_and_transform_siren_with_progress(
         logger.info(f"Extracting facilities for SIREN: {siren}")
         facilities_data = []
         original_facilities = []  # Store original facility objects for registry records
+        facility_documents: list[dict[str, Any] | None] = []
         establishment_periods = []
         addresses = []
+        address_links = []
+        seen_address_keys: set[str] = set()
         facility_ownerships = []
         processed_count = 0
         total_facilities = 0  # Will be set from first API response
 
-        async for facility_batch, total_count in extractor.extract_facilities_streaming(
-            siren
-        ):
+        async for (
+            facility_batch,
+            documents,
+            total_count,
+        ) in extractor.extract_facilities_with_documents_streaming(siren):
             # Update total facilities count from API response
             if total_count > 0:
                 total_facilities = total_count
 
+            facility_documents.extend(documents)
             for facility in facility_batch:
                 # Store original facility object
                 original_facilities.append(facility)
@@ -231,13 +430,16 @@ async def extract_and_transform_siren_with_progress(
                         establishment_periods.append(period_data)
 
                 # Transform addresses
-                if facility.adresse_etablissement:
-                    address_data = transformer.transform_address(
-                        facility.adresse_etablissement,
-                        facility,  # NEW: Pass facility for reference
-                        facility.date_creation_etablissement or date.today(),
-                    )
-                    addresses.append(address_data)
+                facility_address = transformer.transform_facility_address(facility)
+                if facility_address is not None:
+                    address_data, address_link = facility_address
+                    if address_link is None:
+                        addresses.append(address_data)
+                    else:
+                        address_links.append(address_link)
+                        if address_link.address_key not in seen_address_keys:
+                            seen_address_keys.add(address_link.address_key)
+                            addresses.append(address_data)
 
                 # Create facility ownership relationship
                 ownership_data = transformer.transform_facility_ownership(facility)
@@ -277,6 +479,9 @@ async def extract_and_transform_siren_with_progress(
                 "facility_count": len(facilities_data),
             },
         }
+        if config.raw_registry_payloads:
+            raw_data["raw_company"] = company_document
+            raw_data["raw_facilities"] = facility_documents
         registry_records = transformer._create_registry_records(raw_data)
 
         # Ensure extraction_metadata is a dict
@@ -291,7 +496,8 @@ async def extract_and_transform_siren_with_progress(
             legal_unit_periods=legal_unit_periods,
             establishment_periods=establishment_periods,
             addresses=addresses,
-            activity_classifications=list(transformer._activity_cache.values()),
+            address_links=address_links,
+            activity_classifications=transformer.activity_classifications(),
             facility_ownerships=facility_ownerships,
             registry_records=registry_records,
             extraction_metadata=extraction_metadata,
@@ -329,6 +535,81 @@ async def extract_and_transform_siren_with_progress(
         raise
 
 
+async def extract_and_transform_siren_streaming(
+    siren: str, client: AuthenticatedClient, config: ETLConfig | None = None
+) -> AsyncIterator[CompanyBundle | FacilityBundle | ActivityClassificationBundle]:
+    """
+    Extract and transform SIREN data as a stream of per-entity bundles.
+
+    Unlike extract_and_transform_siren, no SIRENExtractResult is ever built:
+    each facility page is transformed and yielded as soon as it is fetched, so
+    memory use is bounded by the API page size rather than by the number of
+    facilities of the SIREN.
+
+    Items are yielded in a fixed order:
+    1. One CompanyBundle (company, legal unit periods, legal unit registry record)
+    2. One FacilityBundle per facility (facility, periods, address, ownership,
+       establishment registry record)
+    3. One ActivityClassificationBundle with every activity classification seen
+       and the extraction metadata
+
+    Args:
+        siren: SIREN number to extract (9-digit string)
+        client: SIRENE API client instance
+        config: Optional ETL configuration (defaults to lenient validation)
+
+    Yields:
+        CompanyBundle, then FacilityBundle items, then ActivityClassificationBundle
+
+    Example:
+        ```python
+        async for item in extract_and_transform_siren_streaming("123456782", client):
+            if isinstance(item, FacilityBundle):
+                save_facility(item)
+        ```
+    """
+    logger.info(f"Starting streaming ETL process for SIREN: {siren}")
+
+    # Use default config if none provided
+    if config is None:
+        config = ETLConfig()
+        logger.debug("Using default ETL configuration")
+
+    # Validate SIREN format
+    if not is_valid_siren(siren):
+        raise ValueError(
+            f"Invalid SIREN format: {siren}. Must be 9 digits with a valid check digit."
+        )
+
+    extractor = SIRENExtractor(client, config)
+    transformer = SIRENTransformer(config)
+
+    company_data, company_document = await extractor.extract_company_with_document(
+        siren
+    )
+    yield transformer.transform_company_bundle(company_data, company_document)
+
+    facility_count = 0
+    async for (
+        facility_batch,
+        documents,
+        _total,
+    ) in extractor.extract_facilities_with_documents_streaming(siren):
+        for facility, document in zip(facility_batch, documents, strict=True):
+            yield transformer.transform_facility_bundle(facility, document)
+            facility_count += 1
+
+    yield transformer.closing_bundle(
+        {
+            "siren": siren,
+            "extracted_at": datetime.now().isoformat(),
+            "facility_count": facility_count,
+        }
+    )
+
+    logger.info(f"Successfully streamed SIREN {siren}: {facility_count} facilities")
+
+
 async def extract_company_only(
     siren: str, client: AuthenticatedClient, config: ETLConfig | None = None
 ) -> tuple[CompanyData, int]:
@@ -367,8 +648,10 @@ async def extract_company_only(
         logger.debug("Using default ETL configuration")
 
     # Validate SIREN format
-    if not siren or not siren.isdigit() or len(siren) != 9:
-        raise ValueError(f"Invalid SIREN format: {siren}. Must be 9 digits.")
+    if not is_valid_siren(siren):
+        raise ValueError(
+            f"Invalid SIREN format: {siren}. Must be 9 digits with a valid check digit."
+        )
 
     try:
         # Initialize extractor and transformer
@@ -388,6 +671,7 @@ async def extract_company_only(
                 nombre=1,  # Only need 1 to get the count
                 debut=0,
                 masquer_valeurs_nulles=True,
+                **extractor._date_kwargs(),
             )
 
             response = await find_by_post_etablissement(
@@ -0,0 +1,483 @@
+"""
+Content-addressed, compressed archive of raw API payloads.
+
+Every legal unit and establishment document is stored once per payload hash,
+in chunks of JSON lines compressed with gzip (or zstd when the zstandard
+package is installed) and appended to segment files. A SQLite index maps each
+hash to its chunk and records when each SIREN/SIRET was fetched with which
+payload. When the transformer's mapping changes, retransform() replays the
+archived documents through from_dict and the transformer at disk speed,
+without any API call.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import gzip
+import importlib
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+from .config import ETLConfig
+from .models import CompanyBundle, FacilityBundle, hash_payload
+from .transformer import SIRENTransformer
+
+# Optional dependency, imported dynamically as it ships no type information
+try:
+    zstandard: Any = importlib.import_module("zstandard")
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from .models import (
+        ActivityClassificationBundle,
+        ExternalRegistryRecordData,
+        SIRENExtractResult,
+    )
+
+logger = logging.getLogger(__name__)
+
+LEGAL_UNIT = "legal_unit"
+ESTABLISHMENT = "establishment"
+
+_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    compression TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    payload_hash TEXT PRIMARY KEY,
+    chunk INTEGER NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    entity_type TEXT NOT NULL,
+    external_id TEXT NOT NULL,
+    siren TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (external_id, fetched_at, payload_hash)
+);
+CREATE INDEX IF NOT EXISTS entries_siren ON entries (siren);
+CREATE INDEX IF NOT EXISTS entries_fetched_at ON entries (fetched_at);
+"""
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """One fetch of an entity, pointing at its archived payload."""
+
+    entity_type: str
+    """Either "legal_unit" or "establishment"."""
+    external_id: str
+    """SIREN of a legal unit or SIRET of an establishment."""
+    payload_hash: str
+    fetched_at: float
+    """Fetch time, in seconds since the epoch."""
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return bytes(zstandard.ZstdCompressor().compress(data))
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return bytes(zstandard.ZstdDecompressor().decompress(data))
+    return gzip.decompress(data)
+
+
+class PayloadArchive:
+    """
+    Deduplicated, compressed store of raw legal unit and establishment payloads.
+
+    Each chunk is an independent gzip member (or zstd frame), so a segment
+    file is itself a valid .jsonl.gz (or .jsonl.zst) stream and single
+    payloads can be read back without decompressing a whole segment. Added
+    payloads are buffered until the current chunk reaches chunk_size bytes;
+    flush() or close() writes the rest.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        compression: str = "gzip",
+        chunk_size: int = 1024 * 1024,
+        segment_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        if compression not in _SUFFIXES:
+            raise ValueError(f"compression must be one of {sorted(_SUFFIXES)}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if segment_size < 1:
+            raise ValueError("segment_size must be at least 1")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self.segment_size = segment_size
+        self._connection = sqlite3.connect(
+            self.directory / "index.sqlite3", check_same_thread=False
+        )
+        self._connection.executescript(_SCHEMA)
+        self._pending: dict[str, bytes] = {}
+        self._pending_size = 0
+        self._entries: list[tuple[str, str, str, str, float]] = []
+        # Last decompressed chunk, since replays read chunks line by line
+        self._chunk_cache: tuple[int, list[bytes]] | None = None
+
+    def close(self) -> None:
+        """Write buffered payloads and close the index."""
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> PayloadArchive:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of distinct payloads, including buffered ones."""
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM payloads").fetchone()
+        return int(count) + len(self._pending)
+
+    def __contains__(self, payload_hash: object) -> bool:
+        if not isinstance(payload_hash, str):
+            return False
+        return payload_hash in self._pending or self._chunk_of(payload_hash) is not None
+
+    def add(
+        self,
+        entity_type: str,
+        external_id: str,
+        payload: dict[str, Any],
+        *,
+        payload_hash: str | None = None,
+        fetched_at: float | None = None,
+    ) -> str:
+        """
+        Archive one fetch of an entity.
+
+        The payload itself is only stored if no payload with the same hash was
+        archived before; the fetch is recorded either way.
+
+        Args:
+            entity_type: "legal_unit" or "establishment"
+            external_id: SIREN or SIRET
+            payload: Decoded API document
+            payload_hash: Hash of the payload, computed if not given
+            fetched_at: Fetch time in seconds since the epoch (defaults to now)
+
+        Returns:
+            The payload hash
+        """
+        if entity_type not in (LEGAL_UNIT, ESTABLISHMENT):
+            raise ValueError(f"Unknown entity type: {entity_type}")
+        if payload_hash is None:
+            payload_hash = hash_payload(payload)
+        if payload_hash not in self:
+            line = json.dumps(payload, separators=(",", ":"), default=str).encode()
+            self._pending[payload_hash] = line
+            self._pending_size += len(line) + 1
+        self._entries.append(
+            (
+                entity_type,
+                external_id,
+                external_id[:9],
+                payload_hash,
+                time.time() if fetched_at is None else fetched_at,
+            )
+        )
+        if self._pending_size >= self.chunk_size:
+            self.flush()
+        return payload_hash
+
+    def add_record(self, record: ExternalRegistryRecordData) -> str:
+        """
+        Archive the payload of a registry record.
+
+        Args:
+            record: Registry record of a legal unit or establishment
+
+        Returns:
+            The payload hash
+        """
+        return self.add(
+            record.entity_type,
+            record.external_id,
+            record.payload,
+            payload_hash=record.payload_hash,
+            fetched_at=record.ingested_at.timestamp(),
+        )
+
+    def add_bundle(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        """
+        Archive the registry record of a bundle.
+
+        Accepts every bundle of the streaming ETL, the pipeline and the stock
+        ingestor, so it can be used as (part of) their sink.
+
+        Args:
+            bundle: Bundle to archive; activity classification bundles are ignored
+        """
+        if (
+            isinstance(bundle, CompanyBundle | FacilityBundle)
+            and bundle.registry_record is not None
+        ):
+            self.add_record(bundle.registry_record)
+
+    def add_result(self, result: SIRENExtractResult) -> None:
+        """
+        Archive the registry records of a complete extraction.
+
+        Args:
+            result: Result of extract_and_transform_siren
+        """
+        for record in result.registry_records:
+            self.add_record(record)
+
+    def flush(self) -> None:
+        """Compress and write buffered payloads and commit the index."""
+        if self._pending:
+            data = b"\n".join(self._pending.values()) + b"\n"
+            compressed = _compress(data, self.compression)
+            segment = self._current_segment()
+            path = self.directory / segment
+            offset = path.stat().st_size if path.exists() else 0
+            with path.open("ab") as f:
+                f.write(compressed)
+            cursor = self._connection.execute(
+                "INSERT INTO chunks (segment, offset, length, compression)"
+                " VALUES (?, ?, ?, ?)",
+                (segment, offset, len(compressed), self.compression),
+            )
+            self._connection.executemany(
+                "INSERT INTO payloads (payload_hash, chunk, line) VALUES (?, ?, ?)",
+                (
+                    (payload_hash, cursor.lastrowid, line)
+                    for line, payload_hash in enumerate(self._pending)
+                ),
+            )
+            logger.debug(
+                f"Archived {len(self._pending)} payloads "
+                f"({len(data)} -> {len(compressed)} bytes) in {segment}"
+            )
+            self._pending.clear()
+            self._pending_size = 0
+        if self._entries:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO entries"
+                " (entity_type, external_id, siren, payload_hash, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                self._entries,
+            )
+            self._entries.clear()
+        self._connection.commit()
+
+    def _current_segment(self) -> str:
+        """Segment file the next chunk is appended to."""
+        row = self._connection.execute(
+            "SELECT segment, SUM(length) FROM chunks"
+            " GROUP BY segment ORDER BY MAX(id) DESC LIMIT 1"
+        ).fetchone()
+        suffix = _SUFFIXES[self.compression]
+        if row is None:
+            return f"segment-00000{suffix}"
+        segment, size = row
+        if size < self.segment_size and segment.endswith(suffix):
+            return str(segment)
+        number = int(segment.split("-")[1].split(".")[0]) + 1
+        return f"segment-{number:05d}{suffix}"
+
+    def _chunk_of(self, payload_hash: str) -> tuple[int, int] | None:
+        row = self._connection.execute(
+            "SELECT chunk, line FROM payloads WHERE payload_hash = ?", (payload_hash,)
+        ).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def _chunk_lines(self, chunk: int) -> list[bytes]:
+        """Decompressed lines of a chunk."""
+        if self._chunk_cache is not None and self._chunk_cache[0] == chunk:
+            return self._chunk_cache[1]
+        segment, offset, length, compression = self._connection.execute(
+            "SELECT segment, offset, length, compression FROM chunks WHERE id = ?",
+            (chunk,),
+        ).fetchone()
+        with (self.directory / segment).open("rb") as f:
+            f.seek(offset)
+            data = _decompress(f.read(length), compression)
+        lines = data.split(b"\n")
+        self._chunk_cache = (chunk, lines)
+        return lines
+
+    def get(self, payload_hash: str) -> dict[str, Any] | None:
+        """
+        Archived payload with a given hash.
+
+        Args:
+            payload_hash: Registry payload hash
+
+        Returns:
+            The decoded payload, or None if it was never archived
+        """
+        if payload_hash in self._pending:
+            payload: dict[str, Any] = json.loads(self._pending[payload_hash])
+            return payload
+        location = self._chunk_of(payload_hash)
+        if location is None:
+            return None
+        chunk, line = location
+        payload = json.loads(self._chunk_lines(chunk)[line])
+        return payload
+
+    def history(
+        self, identifier: str, *, since: float | None = None, until: float | None = None
+    ) -> list[ArchiveEntry]:
+        """
+        Archived fetches of a SIREN or SIRET, oldest first.
+
+        A SIREN matches its legal unit and all of its establishments.
+
+        Args:
+            identifier: SIREN or SIRET
+            since: Only fetches at or after this time
+            until: Only fetches at or before this time
+
+        Returns:
+            Matching archive entries
+        """
+        self.flush()
+        column = "siren" if len(identifier) == 9 else "external_id"
+        rows = self._connection.execute(
+            "SELECT entity_type, external_id, payload_hash, fetched_at FROM entries"
+            f" WHERE {column} = ? AND fetched_at >= ? AND fetched_at <= ?"
+            " ORDER BY fetched_at, external_id",
+            (
+                identifier,
+                float("-inf") if since is None else since,
+                float("inf") if until is None else until,
+            ),
+        ).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+
+    def latest(
+        self, identifier: str, *, as_of: float | None = None
+    ) -> dict[str, Any] | None:
+        """
+        Most recently fetched payload of a SIREN's legal unit or of a SIRET.
+
+        Args:
+            identifier: SIREN or SIRET
+            as_of: Ignore fetches after this time
+
+        Returns:
+            The decoded payload, or None if the entity was never archived
+        """
+        entries = [
+            entry
+            for entry in self.history(identifier, until=as_of)
+            if entry.external_id == identifier
+        ]
+        return self.get(entries[-1].payload_hash) if entries else None
+
+    def iter_latest(
+        self, *, as_of: float | None = None, entity_type: str | None = None
+    ) -> Iterator[tuple[str, str, dict[str, Any]]]:
+        """
+        Stream the latest archived payload of every entity.
+
+        Payloads are read in storage order, one chunk at a time, so a full
+        pass reads each segment sequentially.
+
+        Args:
+            as_of: Ignore fetches after this time
+            entity_type: Only "legal_unit" or "establishment" payloads
+
+        Yields:
+            Tuples of (entity_type, external_id, payload)
+        """
+        self.flush()
+        # SQLite returns the columns of the row holding MAX(fetched_at)
+        rows = self._connection.execute(
+            "SELECT e.entity_type, e.external_id, p.chunk, p.line FROM ("
+            "  SELECT entity_type, external_id, payload_hash, MAX(fetched_at)"
+            "  FROM entries WHERE fetched_at <= ? AND (? IS NULL OR entity_type = ?)"
+            "  GROUP BY external_id"
+            ") AS e JOIN payloads AS p ON p.payload_hash = e.payload_hash"
+            " ORDER BY p.chunk, p.line",
+            (
+                float("inf") if as_of is None else as_of,
+                entity_type,
+                entity_type,
+            ),
+        )
+        for found_type, external_id, chunk, line in rows:
+            yield found_type, external_id, json.loads(self._chunk_lines(chunk)[line])
+
+    def retransform(
+        self,
+        sink: Callable[
+            [CompanyBundle | FacilityBundle | ActivityClassificationBundle], Any
+        ],
+        config: ETLConfig | None = None,
+        *,
+        as_of: float | None = None,
+    ) -> int:
+        """
+        Replay the latest payload of every archived entity through the transformer.
+
+        No API call is made: documents are rebuilt with from_dict and
+        transformed with the current SIRENTransformer. The sink finally
+        receives one ActivityClassificationBundle.
+
+        Args:
+            sink: Callable receiving each bundle
+            config: ETL configuration (defaults to ETLConfig())
+            as_of: Replay the state archived at this time
+
+        Returns:
+            Number of entities transformed
+        """
+        if config is None:
+            config = ETLConfig()
+        transformer = SIRENTransformer(config)
+        count = 0
+        for entity_type, _external_id, payload in self.iter_latest(as_of=as_of):
+            raw = payload if config.raw_registry_payloads else None
+            if entity_type == LEGAL_UNIT:
+                sink(
+                    transformer.transform_company_bundle(
+                        UniteLegale.from_dict(payload), raw
+                    )
+                )
+            else:
+                sink(
+                    transformer.transform_facility_bundle(
+                        Etablissement.from_dict(payload), raw
+                    )
+                )
+            count += 1
+        sink(transformer.closing_bundle({"retransformed": count}))
+        logger.info(f"Re-transformed {count} archived payloads from {self.directory}")
+        return count
@@ -0,0 +1,691 @@
+"""
+COPY-ready bulk load files for the Django models.
+
+Loading results through the ORM issues a few queries per row, which does not
+scale past a few thousand facilities. BulkLoadWriter instead writes one CSV
+file per table of examples/django_models (Company, Facility, Address,
+CompanyLegalUnitPeriod, FacilityEstablishmentPeriod, ActivityClassification,
+FacilityOwnership and ExternalRegistryRecord), in PostgreSQL's COPY CSV
+format. The files are copied into temporary staging tables, then merged into
+the Django tables with one set-based statement per table.
+
+Rows carry natural keys instead of database ids, so that loading the same
+data twice updates rows instead of duplicating them:
+
+- Company and Facility: UUIDs derived from the SIREN and SIRET, stored in
+  their unique uuid column
+- ActivityClassification: scheme and code
+- ExternalRegistryRecord: entity type, external id and payload hash
+- FacilityOwnership: company, facility, start and role
+- Periods and addresses: their facility or company and start date
+
+The merge bypasses model save() methods and django-simple-history, like
+bulk_create().
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import csv
+from dataclasses import dataclass
+import json
+import logging
+from operator import attrgetter
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Self
+import uuid
+
+from .models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+    SIRENExtractResult,
+    company_siren,
+    facility_siret,
+)
+from .naf import normalize_scheme
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from pydantic import BaseModel
+
+    from .models import AddressData, FacilityAddressLinkData
+
+logger = logging.getLogger(__name__)
+
+# Namespace of the Company and Facility UUIDs derived from SIRENs and SIRETs
+SIRENE_NAMESPACE = uuid.UUID("6f1c4b0e-2a57-5d0b-9c1e-5e0a1b7c3d21")
+
+REGISTRY_SOURCE = {
+    "key": "sirene",
+    "name": "SIRENE API",
+    "country": "FR",
+    "version": "3.11",
+    "base_url": "https://api.insee.fr/api-sirene/3.11",
+}
+
+STAGING_PREFIX = "sirene_staging_"
+COPY_OPTIONS = "FORMAT csv, HEADER true"
+
+# Column value of a model
+Getter = Callable[[Any], Any]
+
+
+def company_uuid(siren: str) -> uuid.UUID:
+    """Stable Company.uuid of a SIREN."""
+    return uuid.uuid5(SIRENE_NAMESPACE, f"siren:{siren}")
+
+
+def facility_uuid(siret: str) -> uuid.UUID:
+    """Stable Facility.uuid of a SIRET."""
+    return uuid.uuid5(SIRENE_NAMESPACE, f"siret:{siret}")
+
+
+def _classification_scheme(period: Any) -> str:
+    # Classifications are stored under the normalized scheme ("naf_rev2"),
+    # periods keep the raw one ("NAFRev2")
+    return normalize_scheme(period.activity_scheme)
+
+
+def _registry_uuid(entity_type: str, make: Callable[[str], uuid.UUID]) -> Getter:
+    return lambda record: (
+        make(record.external_id) if record.entity_type == entity_type else None
+    )
+
+
+_field = attrgetter
+
+# Tables whose rows belong to the company or facility they are written for:
+# owner column, column of the owner's UUID and UUID function. These columns
+# come first in the staging table.
+OWNERS: dict[str, tuple[str, str, Callable[[str], uuid.UUID]]] = {
+    "company": ("siren", "uuid", company_uuid),
+    "facility": ("siret", "uuid", facility_uuid),
+    "legal_unit_period": ("siren", "company_uuid", company_uuid),
+    "establishment_period": ("siret", "facility_uuid", facility_uuid),
+    "address": ("siret", "facility_uuid", facility_uuid),
+}
+
+# Model columns of each staging table: name, PostgreSQL type and getter
+STAGING_TABLES: dict[str, tuple[tuple[str, str, Getter], ...]] = {
+    "company": (("name", "text", _field("name")),),
+    "facility": (("name", "text", _field("name")),),
+    "activity_classification": (
+        ("scheme", "text", _field("scheme")),
+        ("code", "text", _field("code")),
+        ("label", "text", _field("label")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+    "legal_unit_period": (
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+        ("legal_name", "text", _field("legal_name")),
+        ("legal_form_code", "text", _field("legal_form_code")),
+        ("legal_form_scheme", "text", _field("legal_form_scheme")),
+        ("activity_code", "text", _field("activity_code")),
+        ("activity_scheme", "text", _field("activity_scheme")),
+        ("classification_scheme", "text", _classification_scheme),
+        ("status", "text", _field("status")),
+        ("employee_band", "text", _field("employee_band")),
+        ("employee_band_year", "integer", _field("employee_band_year")),
+        ("ess_flag", "boolean", _field("ess_flag")),
+        ("mission_company_flag", "boolean", _field("mission_company_flag")),
+    ),
+    "establishment_period": (
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+        ("status", "text", _field("status")),
+        ("activity_code", "text", _field("activity_code")),
+        ("activity_scheme", "text", _field("activity_scheme")),
+        ("classification_scheme", "text", _classification_scheme),
+        ("is_hq", "boolean", _field("is_hq")),
+        ("opening_date", "date", _field("opening_date")),
+    ),
+    "address": (
+        ("country", "text", _field("country")),
+        ("administrative_area", "text", _field("administrative_area")),
+        ("locality", "text", _field("locality")),
+        ("postal_code", "text", _field("postal_code")),
+        ("street_address", "text", _field("street_address")),
+        ("longitude", "double precision", _field("longitude")),
+        ("latitude", "double precision", _field("latitude")),
+        ("provider", "text", _field("provider")),
+        ("geocode_precision", "text", _field("geocode_precision")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+    "facility_ownership": (
+        ("siren", "text", _field("company_siren")),
+        (
+            "company_uuid",
+            "uuid",
+            lambda ownership: company_uuid(ownership.company_siren),
+        ),
+        ("siret", "text", _field("facility_siret")),
+        (
+            "facility_uuid",
+            "uuid",
+            lambda ownership: facility_uuid(ownership.facility_siret),
+        ),
+        ("role", "text", _field("role")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+    "registry_record": (
+        ("entity_type", "text", _field("entity_type")),
+        ("external_id", "text", _field("external_id")),
+        ("payload", "jsonb", _field("payload")),
+        ("payload_hash", "text", _field("payload_hash")),
+        ("registry_updated_at", "timestamptz", _field("registry_updated_at")),
+        ("ingested_at", "timestamptz", _field("ingested_at")),
+        ("company_uuid", "uuid", _registry_uuid("legal_unit", company_uuid)),
+        ("facility_uuid", "uuid", _registry_uuid("establishment", facility_uuid)),
+    ),
+}
+
+
+def staging_columns(table: str) -> list[tuple[str, str]]:
+    """Columns of a staging table and of its CSV file: name and type."""
+    columns = [(name, sql_type) for name, sql_type, _ in STAGING_TABLES[table]]
+    if table in OWNERS:
+        owner_column, uuid_column, _ = OWNERS[table]
+        columns[:0] = [(owner_column, "text"), (uuid_column, "uuid")]
+    return columns
+
+
+@dataclass(frozen=True)
+class _Target:
+    """Django table a staging table is merged into."""
+
+    db_table: str
+    # Target column and SQL expression over the staging row "s" and the joins
+    columns: tuple[tuple[str, str], ...]
+    keys: tuple[str, ...]
+    joins: str = ""
+    # ON CONFLICT target of the unique constraint on keys, if there is one
+    conflict: str | None = None
+    # Columns set on insert only
+    insert_only: tuple[str, ...] = ()
+
+
+_ACTIVITY_JOIN = (
+    "JOIN company_activity_classification AS a"
+    " ON a.scheme = s.classification_scheme AND a.code = s.activity_code"
+    " AND NOT a.is_removed"
+)
+_COMPANY_JOIN = "JOIN company_company AS c ON c.uuid = s.company_uuid"
+_FACILITY_JOIN = "JOIN company_facility AS f ON f.uuid = s.facility_uuid"
+
+# Merge targets, in dependency order
+TARGETS: dict[str, _Target] = {
+    "company": _Target(
+        "company_company",
+        (("uuid", "s.uuid"), ("name", "s.name")),
+        keys=("uuid",),
+        conflict="(uuid)",
+    ),
+    "facility": _Target(
+        "company_facility",
+        (("uuid", "s.uuid"), ("name", "s.name")),
+        keys=("uuid",),
+        conflict="(uuid)",
+    ),
+    "activity_classification": _Target(
+        "company_activity_classification",
+        (
+            ("scheme", "s.scheme"),
+            ("code", "s.code"),
+            ("label", "s.label"),
+            ("start", "s.start"),
+            ("end", 's."end"'),
+        ),
+        keys=("scheme", "code"),
+        conflict="(scheme, code) WHERE NOT is_removed",
+    ),
+    "legal_unit_period": _Target(
+        "company_legal_unit_period",
+        (
+            ("company_id", "c.id"),
+            ("start", "s.start"),
+            ("end", 's."end"'),
+            ("legal_name", "s.legal_name"),
+            ("legal_form_code", "s.legal_form_code"),
+            ("legal_form_scheme", "s.legal_form_scheme"),
+            ("activity_code_id", "a.id"),
+            ("activity_scheme", "s.activity_scheme"),
+            ("status", "s.status"),
+            ("employee_band", "coalesce(s.employee_band, '')"),
+            ("employee_band_year", "s.employee_band_year"),
+            ("ess_flag", "s.ess_flag"),
+            ("mission_company_flag", "s.mission_company_flag"),
+        ),
+        keys=("company_id", "start"),
+        joins=f"{_COMPANY_JOIN} {_ACTIVITY_JOIN}",
+    ),
+    "establishment_period": _Target(
+        "company_facility_establishment_period",
+        (
+            ("facility_id", "f.id"),
+            ("start", "s.start"),
+            ("end", 's."end"'),
+            ("status", "s.status"),
+            ("activity_code_id", "a.id"),
+            ("activity_scheme", "s.activity_scheme"),
+            ("is_hq", "s.is_hq"),
+            ("opening_date", "s.opening_date"),
+        ),
+        keys=("facility_id", "start"),
+        joins=f"{_FACILITY_JOIN} {_ACTIVITY_JOIN}",
+    ),
+    "address": _Target(
+        "company_address",
+        (
+            ("facility_id", "f.id"),
+            ("start", "s.start"),
+            ("end", 's."end"'),
+            ("country", "s.country"),
+            ("administrative_area", "coalesce(s.administrative_area, '')"),
+            ("locality", "coalesce(s.locality, '')"),
+            ("postal_code", "coalesce(s.postal_code, '')"),
+            ("street_address", "coalesce(s.street_address, '')"),
+            (
+                "geom",
+                "ST_SetSRID(ST_MakePoint(s.longitude, s.latitude), 4326)::geography",
+            ),
+            ("provider", "coalesce(s.provider, '')"),
+            ("geocode_precision", "s.geocode_precision"),
+        ),
+        keys=("facility_id", "start"),
+        joins=_FACILITY_JOIN,
+    ),
+    "facility_ownership": _Target(
+        "company_facility_ownership",
+        (
+            ("company_id", "c.id"),
+            ("facility_id", "f.id"),
+            ("role", "s.role"),
+            ("start", "s.start"),
+            ("end", 's."end"'),
+        ),
+        keys=("company_id", "facility_id", "start", "role"),
+        joins=f"{_COMPANY_JOIN} {_FACILITY_JOIN}",
+        conflict="(company_id, facility_id, start, role) WHERE NOT is_removed",
+    ),
+    "registry_record": _Target(
+        "company_external_registry_record",
+        (
+            ("source_id", "src.id"),
+            ("entity_type", "s.entity_type"),
+            ("external_id", "s.external_id"),
+            ("payload", "s.payload"),
+            ("payload_hash", "s.payload_hash"),
+            ("registry_updated_at", "s.registry_updated_at"),
+            ("ingested_at", "s.ingested_at"),
+            ("company_id", "c.id"),
+            ("facility_id", "f.id"),
+        ),
+        keys=("source_id", "entity_type", "external_id", "payload_hash"),
+        joins=(
+            "JOIN company_external_registry_source AS src"
+            f" ON src.key = '{REGISTRY_SOURCE['key']}' AND NOT src.is_removed"
+            " LEFT JOIN company_company AS c ON c.uuid = s.company_uuid"
+            " LEFT JOIN company_facility AS f ON f.uuid = s.facility_uuid"
+        ),
+        conflict=(
+            "(source_id, entity_type, external_id, payload_hash) WHERE NOT is_removed"
+        ),
+        insert_only=("ingested_at",),
+    ),
+}
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def staging_table(table: str) -> str:
+    """Name of the staging table of a table of STAGING_TABLES."""
+    return f"{STAGING_PREFIX}{table}"
+
+
+def staging_sql() -> list[str]:
+    """
+    Statements (re)creating the temporary staging tables.
+
+    Each staging table has a row_id column numbering rows in file order, so
+    that the last row written wins when a key appears several times.
+    """
+    statements = []
+    for table in STAGING_TABLES:
+        definitions = ", ".join(
+            f"{_quote(name)} {sql_type}" for name, sql_type in staging_columns(table)
+        )
+        statements.append(f"DROP TABLE IF EXISTS {staging_table(table)}")
+        statements.append(
+            f"CREATE TEMPORARY TABLE {staging_table(table)}"
+            f" (row_id bigserial, {definitions})"
+        )
+    return statements
+
+
+def copy_sql(table: str) -> str:
+    """COPY ... FROM STDIN statement loading the CSV file of a table."""
+    columns = ", ".join(_quote(name) for name, _ in staging_columns(table))
+    return f"COPY {staging_table(table)} ({columns}) FROM STDIN WITH ({COPY_OPTIONS})"
+
+
+def _source_sql(table: str, target: _Target) -> str:
+    """Deduplicated staging rows, with the target's columns."""
+    expressions = dict(target.columns)
+    keys = ", ".join(expressions[key] for key in target.keys)
+    columns = ", ".join(
+        f"{expression} AS {_quote(column)}" for column, expression in target.columns
+    )
+    joins = f" {target.joins}" if target.joins else ""
+    return (
+        f"SELECT DISTINCT ON ({keys}) {columns}"
+        f" FROM {staging_table(table)} AS s{joins}"
+        f" ORDER BY {keys}, s.row_id DESC"
+    )
+
+
+def _merge_sql(table: str, target: _Target) -> list[str]:
+    """Upsert of a staging table into its target."""
+    source = _source_sql(table, target)
+    columns = [column for column, _ in target.columns]
+    updated = [
+        column
+        for column in columns
+        if column not in target.keys and column not in target.insert_only
+    ]
+    insert_columns = ", ".join(
+        [_quote(column) for column in columns] + ["is_removed", "created", "modified"]
+    )
+    values = ", ".join(
+        [f"s.{_quote(column)}" for column in columns] + ["false", "now()", "now()"]
+    )
+    insert = f"INSERT INTO {target.db_table} ({insert_columns}) SELECT {values}"
+    if target.conflict is not None:
+        assignments = ", ".join(
+            f"{_quote(column)} = EXCLUDED.{_quote(column)}"
+            for column in [*updated, "modified"]
+        )
+        return [
+            f"{insert} FROM ({source}) AS s"
+            f" ON CONFLICT {target.conflict} DO UPDATE SET {assignments}"
+        ]
+    # Without a unique constraint to infer, update the rows matching a key
+    # and insert the others
+    matches = " AND ".join(
+        f"t.{_quote(key)} IS NOT DISTINCT FROM s.{_quote(key)}" for key in target.keys
+    )
+    assignments = ", ".join(
+        [f"{_quote(column)} = s.{_quote(column)}" for column in updated]
+        + ["modified = now()"]
+    )
+    return [
+        f"UPDATE {target.db_table} AS t SET {assignments} FROM ({source}) AS s"
+        f" WHERE {matches} AND NOT t.is_removed",
+        f"{insert} FROM ({source}) AS s WHERE NOT EXISTS"
+        f" (SELECT 1 FROM {target.db_table} AS t WHERE {matches}"
+        " AND NOT t.is_removed)",
+    ]
+
+
+def merge_sql() -> list[str]:
+    """
+    Statements merging the staging tables into the Django tables.
+
+    The SIRENE ExternalRegistrySource is created first if missing. Periods
+    whose activity code has no ActivityClassification row, and rows whose
+    company or facility is unknown, are skipped.
+    """
+    source_columns = ", ".join(REGISTRY_SOURCE)
+    source_values = ", ".join(f"'{value}'" for value in REGISTRY_SOURCE.values())
+    statements = [
+        "INSERT INTO company_external_registry_source"
+        f" ({source_columns}, is_removed, created, modified)"
+        f" SELECT {source_values}, false, now(), now()"
+        " WHERE NOT EXISTS (SELECT 1 FROM company_external_registry_source"
+        f" WHERE key = '{REGISTRY_SOURCE['key']}')"
+    ]
+    for table, target in TARGETS.items():
+        statements.extend(_merge_sql(table, target))
+    return statements
+
+
+def psql_script() -> str:
+    """psql script loading the files of a BulkLoadWriter directory."""
+    lines = ["\\set ON_ERROR_STOP on", "BEGIN;"]
+    lines.extend(f"{statement};" for statement in staging_sql())
+    for table in STAGING_TABLES:
+        names = ", ".join(_quote(name) for name, _ in staging_columns(table))
+        lines.append(
+            f"\\copy {staging_table(table)} ({names})"
+            f" FROM '{table}.csv' WITH ({COPY_OPTIONS})"
+        )
+    lines.extend(f"{statement};" for statement in merge_sql())
+    lines.append("COMMIT;")
+    return "\n".join(lines) + "\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+class BulkLoadWriter:
+    """
+    Write ETL output as one COPY-ready CSV file per Django table.
+
+    Files use PostgreSQL's CSV format: NULLs are unquoted empty fields and
+    every other value is quoted. Activity classifications are written once
+    per scheme and code. Interned addresses are written once per facility
+    that links to them, with the start and end of the link, as the Django
+    Address belongs to a single facility. close() also writes load.sql, a
+    psql script to run from the directory.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._files: dict[str, IO[str]] = {}
+        self._writers: dict[str, Any] = {}
+        for table in STAGING_TABLES:
+            file = (self.directory / f"{table}.csv").open(
+                "w", encoding="utf-8", newline=""
+            )
+            writer = csv.writer(file, quoting=csv.QUOTE_NOTNULL)
+            writer.writerow([name for name, _ in staging_columns(table)])
+            self._files[table] = file
+            self._writers[table] = writer
+        self._classifications: set[tuple[str, str]] = set()
+        self.rows_written = dict.fromkeys(STAGING_TABLES, 0)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __call__(
+        self,
+        item: SIRENExtractResult
+        | CompanyBundle
+        | FacilityBundle
+        | ActivityClassificationBundle,
+    ) -> None:
+        """Write a result or a bundle, so that the writer can serve as a sink."""
+        if isinstance(item, SIRENExtractResult):
+            self.write_result(item)
+        else:
+            self.write_bundle(item)
+
+    def write_row(self, table: str, model: BaseModel, owner: str | None = None) -> None:
+        """
+        Write one model to a table.
+
+        Args:
+            table: Table name, one of STAGING_TABLES
+            model: Model the columns are taken from
+            owner: SIREN or SIRET of the company or facility owning the row,
+                for the tables of OWNERS
+
+        Raises:
+            ValueError: If the owner of a table of OWNERS is missing
+        """
+        row = [_csv_value(getter(model)) for _, _, getter in STAGING_TABLES[table]]
+        if table in OWNERS:
+            if not owner:
+                raise ValueError(f"{table} rows need the SIREN or SIRET of their owner")
+            row[:0] = [owner, OWNERS[table][2](owner)]
+        self._writers[table].writerow(row)
+        self.rows_written[table] += 1
+
+    def write_result(self, result: SIRENExtractResult) -> None:
+        """
+        Write every row of a result.
+
+        Raises:
+            ValueError: If an address link refers to an address not in the result
+        """
+        siren = company_siren(result.company)
+        self.write_row("company", result.company, siren)
+        for period in result.legal_unit_periods:
+            self.write_row("legal_unit_period", period, siren)
+        for siret, facility in result.facilities_by_siret.items():
+            self.write_row("facility", facility, siret)
+        for establishment_period in result.establishment_periods:
+            self.write_row(
+                "establishment_period",
+                establishment_period,
+                establishment_period.facility_siret,
+            )
+        interned: dict[str, AddressData] = {}
+        for address in result.addresses:
+            if address.facility_siret is not None:
+                self.write_row("address", address, address.facility_siret)
+            elif address.address_key is not None:
+                interned[address.address_key] = address
+        for link in result.address_links:
+            self._write_linked_address(interned.get(link.address_key), link)
+        for ownership in result.facility_ownerships:
+            self.write_row("facility_ownership", ownership)
+        self._write_classifications(result.activity_classifications)
+        for record in result.registry_records:
+            self.write_row("registry_record", record)
+
+    def write_bundle(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        """
+        Write the rows of a streaming ETL bundle.
+
+        Raises:
+            TypeError: If the bundle type is not supported
+            ValueError: If a facility bundle has an address link but not the
+                linked address
+        """
+        if isinstance(bundle, CompanyBundle):
+            siren = company_siren(bundle.company)
+            self.write_row("company", bundle.company, siren)
+            for period in bundle.legal_unit_periods:
+                self.write_row("legal_unit_period", period, siren)
+        elif isinstance(bundle, FacilityBundle):
+            siret = facility_siret(bundle.facility)
+            self.write_row("facility", bundle.facility, siret)
+            for establishment_period in bundle.establishment_periods:
+                self.write_row("establishment_period", establishment_period, siret)
+            if bundle.address_link is not None:
+                self._write_linked_address(bundle.address, bundle.address_link)
+            elif bundle.address is not None:
+                self.write_row("address", bundle.address, siret)
+            self.write_row("facility_ownership", bundle.ownership)
+        elif isinstance(bundle, ActivityClassificationBundle):
+            self._write_classifications(bundle.activity_classifications)
+        else:
+            raise TypeError(f"Unsupported bundle type: {type(bundle).__name__}")
+        registry_record = getattr(bundle, "registry_record", None)
+        if registry_record is not None:
+            self.write_row("registry_record", registry_record)
+
+    def close(self) -> None:
+        """Close the CSV files and write the psql load script."""
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        (self.directory / "load.sql").write_text(psql_script(), encoding="utf-8")
+        logger.info(
+            f"Wrote bulk load files to {self.directory}: "
+            + ", ".join(f"{rows} {table}" for table, rows in self.rows_written.items())
+        )
+
+    def _write_linked_address(
+        self, address: AddressData | None, link: FacilityAddressLinkData
+    ) -> None:
+        """Write an interned address for a facility linking to it."""
+        if address is None or address.address_key != link.address_key:
+            raise ValueError(
+                f"Address {link.address_key} linked to facility "
+                f"{link.facility_siret} is missing"
+            )
+        self.write_row(
+            "address",
+            address.model_copy(update={"start": link.start, "end": link.end}),
+            link.facility_siret,
+        )
+
+    def _write_classifications(self, classifications: list[Any]) -> None:
+        for classification in classifications:
+            key = (classification.scheme, classification.code)
+            if key not in self._classifications:
+                self._classifications.add(key)
+                self.write_row("activity_classification", classification)
+
+
+def load_bulk_files(cursor: Any, directory: str | Path) -> dict[str, int]:
+    """
+    Load the files of a BulkLoadWriter directory through a database cursor.
+
+    Works with psycopg 2 and 3 cursors, including Django's cursor wrapper.
+    The statements are not wrapped in a transaction; run it inside
+    transaction.atomic() for an all-or-nothing load.
+
+    Args:
+        cursor: PostgreSQL DB-API cursor
+        directory: Directory written by BulkLoadWriter
+
+    Returns:
+        Number of bytes copied per table
+
+    Raises:
+        FileNotFoundError: If a table file is missing
+    """
+    directory = Path(directory)
+    for statement in staging_sql():
+        cursor.execute(statement)
+    copied = {}
+    for table in STAGING_TABLES:
+        path = directory / f"{table}.csv"
+        if not path.exists():
+            raise FileNotFoundError(f"No {table} file in {directory}")
+        with path.open("rb") as file:
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(copy_sql(table), file)
+            else:
+                with cursor.copy(copy_sql(table)) as copy:
+                    while data := file.read(1 << 20):
+                        copy.write(data)
+        copied[table] = path.stat().st_size
+    for statement in merge_sql():
+        cursor.execute(statement)
+    logger.info(f"Loaded bulk files from {directory}")
+    return copied
@@ -0,0 +1,398 @@
+"""
+Columnar (Arrow/Parquet) export of ETL outputs.
+
+Analytics code loading SIRENExtractResults into pandas by iterating the
+pydantic objects is slow and memory-hungry. ColumnarWriter writes companies'
+facilities, addresses, periods and ownerships as typed Arrow record batches,
+one file per table, appending across any number of SIRENs. Codes (activity,
+status, legal form, postcode, ...) are dictionary-encoded with one dictionary
+per column that only grows, so batches can be written as Arrow IPC dictionary
+deltas; coordinates are float64 columns. Arrow IPC files are read back
+zero-copy through a memory map; Parquet files are smaller but decoded on
+read.
+
+Requires the optional pyarrow package.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import importlib
+import logging
+from operator import attrgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+
+from .models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+    SIRENExtractResult,
+    company_siren,
+    facility_siret,
+)
+
+# Optional dependency, imported dynamically as it ships no type information
+try:
+    pyarrow: Any = importlib.import_module("pyarrow")
+    parquet: Any = importlib.import_module("pyarrow.parquet")
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pyarrow = None
+    parquet = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+    from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+# Column value of a model; None stands for the SIREN of the owning company
+Getter = Callable[[Any], Any] | None
+
+
+def _field(name: str) -> Getter:
+    return attrgetter(name)
+
+
+# Columns of each table: name, type and getter. Types are "string", "code"
+# (dictionary-encoded string), "date", "timestamp", "float64", "int32", "bool".
+TABLES: dict[str, tuple[tuple[str, str, Getter], ...]] = {
+    "facilities": (
+        ("siret", "string", facility_siret),
+        ("siren", "string", _field("parent_siren")),
+        ("nic", "string", _field("nic")),
+        ("name", "string", _field("name")),
+        ("creation_date", "date", _field("creation_date")),
+        ("is_headquarters", "bool", _field("is_headquarters")),
+        ("employee_band", "code", _field("employee_band")),
+        ("employee_band_year", "int32", _field("employee_band_year")),
+        ("diffusion_status", "code", _field("diffusion_status")),
+        ("crafts_activity", "code", _field("crafts_activity")),
+        ("last_update", "timestamp", _field("last_update")),
+        ("period_count", "int32", _field("period_count")),
+    ),
+    "addresses": (
+        ("facility_siret", "string", _field("facility_siret")),
+        ("address_key", "string", _field("address_key")),
+        ("country", "code", _field("country")),
+        ("locality", "code", _field("locality")),
+        ("postal_code", "code", _field("postal_code")),
+        ("street_address", "string", _field("street_address")),
+        ("longitude", "float64", _field("longitude")),
+        ("latitude", "float64", _field("latitude")),
+        ("provider", "code", _field("provider")),
+        ("geocode_precision", "code", _field("geocode_precision")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+    "address_links": (
+        ("facility_siret", "string", _field("facility_siret")),
+        ("address_key", "string", _field("address_key")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+    "legal_unit_periods": (
+        ("siren", "string", None),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+        ("legal_name", "string", _field("legal_name")),
+        ("legal_form_code", "code", _field("legal_form_code")),
+        ("activity_code", "code", _field("activity_code")),
+        ("activity_scheme", "code", _field("activity_scheme")),
+        ("status", "code", _field("status")),
+        ("employee_band", "code", _field("employee_band")),
+        ("employee_band_year", "int32", _field("employee_band_year")),
+        ("ess_flag", "bool", _field("ess_flag")),
+        ("mission_company_flag", "bool", _field("mission_company_flag")),
+    ),
+    "establishment_periods": (
+        ("facility_siret", "string", _field("facility_siret")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+        ("status", "code", _field("status")),
+        ("activity_code", "code", _field("activity_code")),
+        ("activity_scheme", "code", _field("activity_scheme")),
+        ("is_hq", "bool", _field("is_hq")),
+        ("opening_date", "date", _field("opening_date")),
+    ),
+    "facility_ownerships": (
+        ("company_siren", "string", _field("company_siren")),
+        ("facility_siret", "string", _field("facility_siret")),
+        ("role", "code", _field("role")),
+        ("start", "date", _field("start")),
+        ("end", "date", _field("end")),
+    ),
+}
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise ImportError("Columnar export requires the pyarrow package")
+
+
+def _arrow_type(kind: str) -> Any:
+    return {
+        "string": pyarrow.string(),
+        "code": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        "date": pyarrow.date32(),
+        "timestamp": pyarrow.timestamp("us"),
+        "float64": pyarrow.float64(),
+        "int32": pyarrow.int32(),
+        "bool": pyarrow.bool_(),
+    }[kind]
+
+
+def table_schema(table: str) -> Any:
+    """Arrow schema of a table."""
+    _require_pyarrow()
+    return pyarrow.schema(
+        [(name, _arrow_type(kind)) for name, kind, _ in TABLES[table]]
+    )
+
+
+class _TableBuilder:
+    """Row buffer of one table, turned into record batches."""
+
+    def __init__(self, table: str) -> None:
+        self.columns = TABLES[table]
+        self.schema = table_schema(table)
+        self.values: list[list[Any]] = [[] for _ in self.columns]
+        # Dictionary of each code column, grown across batches
+        self.dictionaries: dict[int, dict[str, int]] = {
+            i: {} for i, (_, kind, _) in enumerate(self.columns) if kind == "code"
+        }
+
+    def __len__(self) -> int:
+        return len(self.values[0])
+
+    def append(self, model: BaseModel, siren: str) -> None:
+        for values, (_, _, getter) in zip(self.values, self.columns, strict=True):
+            values.append(siren if getter is None else getter(model))
+
+    def batch(self) -> Any:
+        """Record batch of the buffered rows, emptying the buffer."""
+        arrays = []
+        for i, (values, field) in enumerate(zip(self.values, self.schema, strict=True)):
+            dictionary = self.dictionaries.get(i)
+            if dictionary is None:
+                arrays.append(pyarrow.array(values, type=field.type))
+                continue
+            indices = [
+                None if value is None else dictionary.setdefault(value, len(dictionary))
+                for value in values
+            ]
+            arrays.append(
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(indices, type=pyarrow.int32()),
+                    pyarrow.array(list(dictionary), type=pyarrow.string()),
+                )
+            )
+        self.values = [[] for _ in self.columns]
+        return pyarrow.record_batch(arrays, schema=self.schema)
+
+
+class _Rows:
+    """Routes the models of results and bundles to table builders."""
+
+    def __init__(self) -> None:
+        _require_pyarrow()
+        self.builders = {table: _TableBuilder(table) for table in TABLES}
+        self.siren = ""
+
+    def add_result(self, result: SIRENExtractResult) -> None:
+        siren = company_siren(result.company)
+        for table, models in (
+            ("facilities", result.facilities),
+            ("addresses", result.addresses),
+            ("address_links", result.address_links),
+            ("legal_unit_periods", result.legal_unit_periods),
+            ("establishment_periods", result.establishment_periods),
+            ("facility_ownerships", result.facility_ownerships),
+        ):
+            builder = self.builders[table]
+            for model in models:
+                builder.append(model, siren)
+
+    def add_bundle(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        if isinstance(bundle, CompanyBundle):
+            siren = company_siren(bundle.company)
+            for period in bundle.legal_unit_periods:
+                self.builders["legal_unit_periods"].append(period, siren)
+        elif isinstance(bundle, FacilityBundle):
+            siren = bundle.facility.parent_siren
+            self.builders["facilities"].append(bundle.facility, siren)
+            for establishment_period in bundle.establishment_periods:
+                self.builders["establishment_periods"].append(
+                    establishment_period, siren
+                )
+            if bundle.address is not None:
+                self.builders["addresses"].append(bundle.address, siren)
+            if bundle.address_link is not None:
+                self.builders["address_links"].append(bundle.address_link, siren)
+            self.builders["facility_ownerships"].append(bundle.ownership, siren)
+        elif not isinstance(bundle, ActivityClassificationBundle):
+            raise TypeError(f"Unsupported bundle type: {type(bundle).__name__}")
+
+
+def to_tables(results: Iterable[SIRENExtractResult]) -> dict[str, Any]:
+    """
+    Convert results to in-memory Arrow tables.
+
+    Args:
+        results: Extraction results
+
+    Returns:
+        pyarrow.Table per table name of TABLES
+    """
+    rows = _Rows()
+    for result in results:
+        rows.add_result(result)
+    return {
+        table: pyarrow.Table.from_batches([builder.batch()])
+        for table, builder in rows.builders.items()
+    }
+
+
+class ColumnarWriter:
+    """
+    Append ETL output to one Arrow IPC or Parquet file per table.
+
+    Rows are buffered per table and written as a record batch (a Parquet row
+    group) every batch_size rows; close() writes the rest, and creates empty
+    files for tables without rows. The writer accepts results and streaming
+    bundles, so it can serve as a pipeline sink.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        file_format: str = "arrow",
+        batch_size: int = 65_536,
+    ) -> None:
+        if file_format not in FORMATS:
+            raise ValueError(f"file_format must be one of {', '.join(FORMATS)}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self._rows = _Rows()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self._writers: dict[str, Any] = {}
+        self.rows_written = dict.fromkeys(TABLES, 0)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __call__(
+        self,
+        item: SIRENExtractResult
+        | CompanyBundle
+        | FacilityBundle
+        | ActivityClassificationBundle,
+    ) -> None:
+        """Write a result or a bundle, so that the writer can serve as a sink."""
+        if isinstance(item, SIRENExtractResult):
+            self.write_result(item)
+        else:
+            self.write_bundle(item)
+
+    def write_result(self, result: SIRENExtractResult) -> None:
+        """Append the rows of a result."""
+        self._rows.add_result(result)
+        self._flush_full()
+
+    def write_bundle(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        """Append the rows of a streaming ETL bundle."""
+        self._rows.add_bundle(bundle)
+        self._flush_full()
+
+    def flush(self) -> None:
+        """Write the buffered rows of every table."""
+        for table, builder in self._rows.builders.items():
+            if len(builder):
+                self._write(table, builder)
+
+    def close(self) -> None:
+        """Flush and close every table file."""
+        self.flush()
+        for table in TABLES:
+            self._writer(table).close()
+        self._writers.clear()
+
+    def _flush_full(self) -> None:
+        for table, builder in self._rows.builders.items():
+            if len(builder) >= self.batch_size:
+                self._write(table, builder)
+
+    def _write(self, table: str, builder: _TableBuilder) -> None:
+        rows = len(builder)
+        self._writer(table).write_batch(builder.batch())
+        self.rows_written[table] += rows
+        logger.debug(f"Wrote {rows} rows to {table}")
+
+    def _writer(self, table: str) -> Any:
+        writer = self._writers.get(table)
+        if writer is None:
+            path = self.directory / f"{table}{FORMATS[self.file_format]}"
+            schema = self._rows.builders[table].schema
+            if self.file_format == "parquet":
+                writer = parquet.ParquetWriter(path, schema)
+            else:
+                writer = pyarrow.ipc.new_file(
+                    path,
+                    schema,
+                    options=pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True),
+                )
+            self._writers[table] = writer
+        return writer
+
+
+def read_table(directory: str | Path, table: str) -> Any:
+    """
+    Read one table written by ColumnarWriter.
+
+    Arrow IPC files are memory-mapped, so their columns are not copied.
+
+    Args:
+        directory: Export directory
+        table: Table name, one of TABLES
+
+    Returns:
+        pyarrow.Table
+
+    Raises:
+        FileNotFoundError: If the table was not exported there
+    """
+    _require_pyarrow()
+    directory = Path(directory)
+    arrow_path = directory / f"{table}.arrow"
+    if arrow_path.exists():
+        with pyarrow.memory_map(str(arrow_path)) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+    parquet_path = directory / f"{table}.parquet"
+    if parquet_path.exists():
+        return parquet.read_table(parquet_path)
+    raise FileNotFoundError(f"No {table} table in {directory}")
+
+
+def load_dataset(directory: str | Path) -> dict[str, Any]:
+    """Read every table written by ColumnarWriter, as pyarrow.Tables by name."""
+    return {table: read_table(directory, table) for table in TABLES}
@@ -8,6 +8,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from datetime import date
 
 
 class ValidationMode(Enum):
@@ -42,9 +46,23 @@ class ETLConfig:
     timeout_seconds: int = 30
     """Timeout for API calls in seconds."""
 
+    as_of: date | None = None
+    """Extract the state as of this date (API date parameter) instead of full history."""
+
+    raw_registry_payloads: bool = False
+    """Use the decoded API documents as registry payloads instead of to_dict() round-trips (changes hashes)."""
+
+    intern_addresses: bool = False
+    """Emit one AddressData per canonical address, linked to its facilities by FacilityAddressLinkData."""
+
+    address_cache_size: int = 10_000
+    """Maximum number of addresses and converted coordinates kept by a transformer."""
+
     def __post_init__(self) -> None:
         """Validate configuration after initialization."""
         if self.max_retries < 0:
             raise ValueError("max_retries must be non-negative")
         if self.timeout_seconds <= 0:
             raise ValueError("timeout_seconds must be positive")
+        if self.address_cache_size < 0:
+            raise ValueError("address_cache_size must be non-negative")
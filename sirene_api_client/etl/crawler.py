@@ -0,0 +1,269 @@
+"""
+Facet-partitioned crawler for the /siret endpoint.
+
+Exporting every establishment matching a broad query (a whole NAF section, a
+region) with a single paginated query is slow and serial. This module uses
+facette.champ counts to split the query recursively into partitions that fit
+a target size, then crawls the partitions concurrently with cursor pagination,
+deduplicating establishments by SIRET.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.api.etablissement.find_by_post_etablissement import (
+    _get_kwargs as find_by_post_etablissement_kwargs,
+)
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.etablissement_post_multi_criteres import (
+    EtablissementPostMultiCriteres,
+)
+
+from .extractor import _request_json
+from .facets import FacetResult, parse_facette
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+    from sirene_api_client.client import AuthenticatedClient
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling the consumer that every partition has been crawled
+_DONE = object()
+
+
+def _department_of(commune_code: str) -> str:
+    """Department code of a commune code (3 characters overseas, 2 otherwise)."""
+    return commune_code[:3] if commune_code.startswith("97") else commune_code[:2]
+
+
+@dataclass(frozen=True)
+class PartitionDimension:
+    """A field used to split a query, with optional grouping of its values."""
+
+    field: str
+    """SIRENE field name used for facet counts."""
+
+    group: Callable[[str], str] = str
+    """Maps a facet value to its partition key."""
+
+    wildcard: bool = False
+    """Whether partition keys are prefixes matched with a trailing '*'."""
+
+    def clause(self, key: str) -> str:
+        """Query clause selecting one partition of this dimension."""
+        return f"{self.field}:{key}*" if self.wildcard else f"{self.field}:{key}"
+
+
+DEPARTMENT = PartitionDimension(
+    "codeCommuneEtablissement", group=_department_of, wildcard=True
+)
+"""Split by department, derived from commune codes."""
+
+COMMUNE = PartitionDimension("codeCommuneEtablissement")
+"""Split by commune code."""
+
+NAF_CODE = PartitionDimension("activitePrincipaleEtablissement")
+"""Split by establishment NAF code."""
+
+
+@dataclass
+class Partition:
+    """A query whose result count fits the crawler partition size."""
+
+    q: str
+    count: int
+
+
+@dataclass
+class CrawlStats:
+    """Counters of a crawl."""
+
+    requests: int = 0
+    partitions: list[Partition] = field(default_factory=list)
+    establishments: int = 0
+    duplicates: int = 0
+
+
+class FacetPartitionCrawler:
+    """Crawl every establishment matching a query through facet partitions."""
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        *,
+        dimensions: list[PartitionDimension] | None = None,
+        max_partition_size: int = 20000,
+        max_concurrency: int = 4,
+        page_size: int = 1000,
+    ) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if max_partition_size < 1:
+            raise ValueError("max_partition_size must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if not 1 <= page_size <= 1000:
+            raise ValueError("page_size must be between 1 and 1000")
+        self.client = client
+        self.dimensions = (
+            dimensions if dimensions is not None else [DEPARTMENT, COMMUNE, NAF_CODE]
+        )
+        self.max_partition_size = max_partition_size
+        self.page_size = page_size
+        self.stats = CrawlStats()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def plan(self, q: str) -> list[Partition]:
+        """
+        Split a query into partitions no larger than max_partition_size.
+
+        Partitions are split along the configured dimensions in order. Values
+        missing from a dimension get their own residual partition; a partition
+        that is still too large once every dimension is used is kept as is and
+        simply crawled longer.
+
+        Args:
+            q: SIRENE multi-criteria query
+
+        Returns:
+            Partitions covering every establishment matching the query
+        """
+        total, _facets = await self._count(q, None)
+        partitions = await self._split(q, total, 0)
+        self.stats.partitions = partitions
+        logger.info(
+            f"Planned {len(partitions)} partitions for {total} establishments: {q}"
+        )
+        return partitions
+
+    async def crawl(self, q: str) -> AsyncIterator[Etablissement]:
+        """
+        Stream every establishment matching a query, each SIRET once.
+
+        Args:
+            q: SIRENE multi-criteria query
+
+        Yields:
+            Etablissement objects as partitions are crawled
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        partitions = await self.plan(q)
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.page_size)
+
+        async def produce() -> None:
+            try:
+                await asyncio.gather(
+                    *(self._crawl_partition(p, queue) for p in partitions)
+                )
+            finally:
+                await queue.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        seen: set[str] = set()
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                siret = str(item.siret)
+                if siret in seen:
+                    self.stats.duplicates += 1
+                    continue
+                seen.add(siret)
+                self.stats.establishments += 1
+                yield item
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _split(self, q: str, count: int, depth: int) -> list[Partition]:
+        """Recursively split a query along the dimensions from depth onwards."""
+        if count <= self.max_partition_size:
+            return [Partition(q, count)] if count else []
+        if depth >= len(self.dimensions):
+            logger.warning(
+                f"Partition still holds {count} establishments after every split: {q}"
+            )
+            return [Partition(q, count)]
+
+        dimension = self.dimensions[depth]
+        total, facet = await self._count(q, dimension.field)
+        groups: dict[str, int] = {}
+        for value, value_count in facet.counts.items():
+            key = dimension.group(value)
+            groups[key] = groups.get(key, 0) + value_count
+
+        if sum(groups.values()) + facet.missing < total:
+            # Truncated facet: splitting would lose establishments
+            logger.warning(
+                f"Facet on {dimension.field} does not cover {q}, trying next dimension"
+            )
+            return await self._split(q, count, depth + 1)
+
+        children = [
+            self._split(f"({q}) AND {dimension.clause(key)}", group_count, depth + 1)
+            for key, group_count in sorted(groups.items())
+        ]
+        if facet.missing:
+            children.append(
+                self._split(f"({q}) AND -{dimension.field}:*", facet.missing, depth + 1)
+            )
+        partitions: list[Partition] = []
+        for child in await asyncio.gather(*children):
+            partitions.extend(child)
+        return partitions
+
+    async def _count(self, q: str, facet_field: str | None) -> tuple[int, FacetResult]:
+        """Count results of a query, with facet counts on one field."""
+        body = EtablissementPostMultiCriteres(
+            q=q, nombre=0, facette_champ=facet_field or ""
+        )
+        document = await self._post(body)
+        total = int((document.get("header") or {}).get("total") or 0)
+        for facette in document.get("facettes") or []:
+            if facette.get("nom") == facet_field:
+                return total, parse_facette(facette)
+        return total, FacetResult(name=facet_field or "")
+
+    async def _crawl_partition(
+        self, partition: Partition, queue: asyncio.Queue[Any]
+    ) -> None:
+        """Crawl one partition with cursor pagination."""
+        cursor = "*"
+        while True:
+            body = EtablissementPostMultiCriteres(
+                q=partition.q,
+                nombre=self.page_size,
+                curseur=cursor,
+                tri="siret",
+                masquer_valeurs_nulles=True,
+            )
+            document = await self._post(body)
+            facilities = document.get("etablissements") or []
+            for facility in facilities:
+                await queue.put(Etablissement.from_dict(facility))
+
+            next_cursor = (document.get("header") or {}).get("curseurSuivant")
+            if not facilities or not next_cursor or next_cursor == cursor:
+                return
+            cursor = next_cursor
+
+    async def _post(self, body: EtablissementPostMultiCriteres) -> dict[str, Any]:
+        """Send a /siret multi-criteria request under the concurrency limit."""
+        async with self._semaphore:
+            self.stats.requests += 1
+            return await _request_json(
+                self.client,
+                find_by_post_etablissement_kwargs(body=body),
+                f"Crawler request for {body.q}",
+                "etablissement/find_by_post",
+            )
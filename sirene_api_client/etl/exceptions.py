@@ -59,6 +59,10 @@ class ExtractionError(ETLError):
         self.endpoint = endpoint
 
 
+class NotFoundError(ExtractionError):
+    """Raised when the API reports that a SIREN does not exist."""
+
+
 class TransformationError(ETLError):
     """Raised when data transformation fails."""
 
@@ -71,3 +75,14 @@ class TransformationError(ETLError):
         if entity_id:
             details["entity_id"] = entity_id
         super().__init__(message, details)
+
+
+class PipelineError(ETLError):
+    """Raised when a pipeline stage fails."""
+
+    def __init__(self, message: str, stage: str | None = None) -> None:
+        details = {}
+        if stage:
+            details["stage"] = stage
+        super().__init__(message, details)
+        self.stage = stage
@@ -0,0 +1,219 @@
+"""
+Short-circuiting lookups of identifiers that do not exist.
+
+Typos and purged units make up a sizeable share of lookups, and each one
+costs an API round trip ending in a 404. NegativeCache remembers identifiers
+the API reported missing for a while; BloomFilter holds every known SIREN
+(built from the stock files or the mirror) in a few bits each, so callers can
+skip identifiers that certainly do not exist without any request.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import itertools
+import json
+import logging
+import math
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING
+
+from .stock import read_stock_rows
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .mirror import SQLiteMirror
+
+logger = logging.getLogger(__name__)
+
+_BLOOM_MAGIC = b"SIRENE-BLOOM-FILTER 1\n"
+
+
+class NegativeCache:
+    """
+    Remember identifiers the API reported missing, for ttl seconds.
+
+    A ttl of None keeps entries until they are evicted; a ttl of 0 disables
+    the cache. The least recently added entries are evicted first.
+    """
+
+    def __init__(self, ttl: float | None = 3600.0, max_entries: int = 100000) -> None:
+        if ttl is not None and ttl < 0:
+            raise ValueError("ttl cannot be negative")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, identifier: object) -> bool:
+        if not isinstance(identifier, str):
+            return False
+        added = self._entries.get(identifier)
+        if added is None:
+            return False
+        if self.ttl is not None and time.monotonic() - added >= self.ttl:
+            del self._entries[identifier]
+            return False
+        return True
+
+    def add(self, identifier: str) -> None:
+        """Record that an identifier was not found."""
+        if self.ttl == 0:
+            return
+        self._entries.pop(identifier, None)
+        self._entries[identifier] = time.monotonic()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, identifier: str) -> None:
+        """Forget an identifier, e.g. once it has been found."""
+        self._entries.pop(identifier, None)
+
+    def clear(self) -> None:
+        """Forget every identifier."""
+        self._entries.clear()
+
+
+class BloomFilter:
+    """
+    Probabilistic set of identifiers with no false negatives.
+
+    An identifier that was added is always reported present; one that was not
+    is reported present with probability about error_rate. The filter only
+    knows the identifiers it was built from: units created since must be
+    added, or the filter rebuilt from the next stock file.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._bits = bytearray((bits + 7) // 8)
+        self.size = len(self._bits) * 8
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+
+    @classmethod
+    def from_identifiers(
+        cls, identifiers: Iterable[str], capacity: int, error_rate: float = 0.01
+    ) -> BloomFilter:
+        """Build a filter holding the given identifiers."""
+        bloom = cls(capacity, error_rate)
+        bloom.update(identifiers)
+        return bloom
+
+    @classmethod
+    def from_stock(
+        cls, stock_path: str | Path, error_rate: float = 0.01
+    ) -> BloomFilter:
+        """
+        Build a filter of the SIRENs of a StockUniteLegale or StockEtablissement file.
+
+        Args:
+            stock_path: Stock CSV file
+            error_rate: Target false-positive rate
+
+        Returns:
+            The filter
+        """
+        # Row count bounds the number of distinct SIRENs
+        with Path(stock_path).open("rb") as f:
+            lines = sum(
+                chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")
+            )
+        rows = itertools.chain.from_iterable(read_stock_rows(stock_path))
+        return cls.from_identifiers(
+            (row["siren"] for row in rows), max(lines - 1, 1), error_rate
+        )
+
+    @classmethod
+    def from_mirror(cls, mirror: SQLiteMirror, error_rate: float = 0.01) -> BloomFilter:
+        """
+        Build a filter of the SIRENs stored in a SQLiteMirror.
+
+        Args:
+            mirror: Mirror holding legal units and establishments
+            error_rate: Target false-positive rate
+
+        Returns:
+            The filter
+        """
+        return cls.from_identifiers(
+            mirror.sirens(), max(mirror.siren_count(), 1), error_rate
+        )
+
+    def _positions(self, identifier: str) -> list[int]:
+        """Bit positions of an identifier (double hashing)."""
+        digest = hashlib.blake2b(identifier.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, identifier: str) -> None:
+        """Add an identifier."""
+        for position in self._positions(identifier):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, identifiers: Iterable[str]) -> None:
+        """Add several identifiers."""
+        for identifier in identifiers:
+            self.add(identifier)
+
+    def __contains__(self, identifier: object) -> bool:
+        if not isinstance(identifier, str):
+            return False
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(identifier)
+        )
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the filter to a binary file.
+
+        Args:
+            path: Destination file
+        """
+        header = {"size": self.size, "hash_count": self.hash_count, "count": self.count}
+        with Path(path).open("wb") as f:
+            f.write(_BLOOM_MAGIC)
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(self._bits)
+        logger.debug(f"Saved Bloom filter of {self.count} identifiers to {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> BloomFilter:
+        """
+        Read a filter written by save().
+
+        Args:
+            path: Filter file
+
+        Returns:
+            The loaded filter
+
+        Raises:
+            ValueError: If the file is not a Bloom filter
+        """
+        bloom = cls.__new__(cls)
+        with Path(path).open("rb") as f:
+            if f.readline() != _BLOOM_MAGIC:
+                raise ValueError(f"Not a Bloom filter file: {path}")
+            header = json.loads(f.readline())
+            bloom._bits = bytearray(f.read())
+        if len(bloom._bits) * 8 != header["size"]:
+            raise ValueError(f"Truncated Bloom filter file: {path}")
+        bloom.size = header["size"]
+        bloom.hash_count = header["hash_count"]
+        bloom.count = header["count"]
+        return bloom
@@ -0,0 +1,326 @@
+"""
+Streaming NDJSON export and import of ETL output.
+
+SIRENExtractResult.export_to_json() dumps a whole result as one indented JSON
+tree. NDJSONWriter instead writes one typed record per line and per entity,
+{"kind": "facility", "data": {...}}, serialized straight from the models, to
+a file or any binary stream, optionally compressed with gzip or zstd (when
+the zstandard package is installed). It accepts complete results as well as
+the bundles of the streaming ETL, so it can be used as a pipeline sink.
+read_records() and read_results() rebuild the models lazily, one line at a
+time.
+"""
+
+from __future__ import annotations
+
+import gzip
+import importlib
+import io
+import json
+import logging
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Self
+
+from .models import (
+    ActivityClassificationBundle,
+    ActivityClassificationData,
+    AddressData,
+    CompanyBundle,
+    CompanyData,
+    CompanyLegalUnitPeriodData,
+    ExternalRegistryRecordData,
+    FacilityAddressLinkData,
+    FacilityBundle,
+    FacilityData,
+    FacilityEstablishmentPeriodData,
+    FacilityOwnershipData,
+    SIRENExtractResult,
+)
+
+# Optional dependency, imported dynamically as it ships no type information
+try:
+    zstandard: Any = importlib.import_module("zstandard")
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
+
+    from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("gzip", "zstd")
+
+# Record kind of each model
+KINDS: dict[str, type[BaseModel]] = {
+    "company": CompanyData,
+    "legal_unit_period": CompanyLegalUnitPeriodData,
+    "facility": FacilityData,
+    "establishment_period": FacilityEstablishmentPeriodData,
+    "address": AddressData,
+    "address_link": FacilityAddressLinkData,
+    "facility_ownership": FacilityOwnershipData,
+    "activity_classification": ActivityClassificationData,
+    "registry_record": ExternalRegistryRecordData,
+}
+EXTRACTION_METADATA = "extraction_metadata"
+
+# SIRENExtractResult list fields and the kind of their items, in output order
+_RESULT_FIELDS = (
+    ("legal_unit_periods", "legal_unit_period"),
+    ("facilities", "facility"),
+    ("establishment_periods", "establishment_period"),
+    ("addresses", "address"),
+    ("address_links", "address_link"),
+    ("facility_ownerships", "facility_ownership"),
+    ("activity_classifications", "activity_classification"),
+    ("registry_records", "registry_record"),
+)
+
+_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+
+def _check_compression(compression: str | None) -> None:
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {', '.join(COMPRESSIONS)}")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("zstd compression requires the zstandard package")
+
+
+def _suffix_compression(path: Path) -> str | None:
+    """Compression implied by a file name, e.g. "gzip" for results.ndjson.gz."""
+    return {".gz": "gzip", ".zst": "zstd"}.get(path.suffix)
+
+
+class NDJSONWriter:
+    """
+    Write ETL output as newline-delimited JSON records.
+
+    Records are written through the compressor as they come, so memory use
+    does not grow with the size of the export. A file object destination is
+    left open on close(), e.g. to hand it to an object storage upload.
+    """
+
+    def __init__(
+        self, destination: str | Path | IO[bytes], *, compression: str | None = None
+    ) -> None:
+        if isinstance(destination, (str, Path)):
+            path = Path(destination)
+            if compression is None:
+                compression = _suffix_compression(path)
+            _check_compression(compression)
+            self._raw: IO[bytes] = path.open("wb")
+            self._owns_raw = True
+        else:
+            _check_compression(compression)
+            self._raw = destination
+            self._owns_raw = False
+        self.compression = compression
+        self._stream: IO[bytes] | io.BufferedIOBase
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        elif compression == "zstd":
+            self._stream = zstandard.ZstdCompressor().stream_writer(
+                self._raw, closefd=False
+            )
+        else:
+            self._stream = self._raw
+        self.records_written = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __call__(
+        self,
+        item: SIRENExtractResult
+        | CompanyBundle
+        | FacilityBundle
+        | ActivityClassificationBundle,
+    ) -> int:
+        """Write a result or a bundle, so that the writer can serve as a sink."""
+        if isinstance(item, SIRENExtractResult):
+            return self.write_result(item)
+        return self.write_bundle(item)
+
+    def write_record(self, kind: str, model: BaseModel) -> None:
+        """Write one model as a record of the given kind."""
+        self._stream.write(
+            b'{"kind":"%s","data":%s}\n'
+            % (kind.encode(), model.model_dump_json().encode())
+        )
+        self.records_written += 1
+
+    def write_metadata(self, metadata: dict[str, Any]) -> None:
+        """Write an extraction metadata record."""
+        data = json.dumps(metadata, ensure_ascii=False, default=str)
+        self._stream.write(
+            b'{"kind":"%s","data":%s}\n' % (EXTRACTION_METADATA.encode(), data.encode())
+        )
+        self.records_written += 1
+
+    def write_result(self, result: SIRENExtractResult) -> int:
+        """
+        Write every entity of a result, starting with its company.
+
+        Returns:
+            Number of records written
+        """
+        written = self.records_written
+        self.write_record("company", result.company)
+        for field, kind in _RESULT_FIELDS:
+            for model in getattr(result, field):
+                self.write_record(kind, model)
+        self.write_metadata(result.extraction_metadata)
+        return self.records_written - written
+
+    def write_bundle(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> int:
+        """
+        Write the entities of a streaming ETL bundle.
+
+        Returns:
+            Number of records written
+        """
+        written = self.records_written
+        if isinstance(bundle, CompanyBundle):
+            self.write_record("company", bundle.company)
+            for period in bundle.legal_unit_periods:
+                self.write_record("legal_unit_period", period)
+        elif isinstance(bundle, FacilityBundle):
+            self.write_record("facility", bundle.facility)
+            for establishment_period in bundle.establishment_periods:
+                self.write_record("establishment_period", establishment_period)
+            if bundle.address is not None:
+                self.write_record("address", bundle.address)
+            if bundle.address_link is not None:
+                self.write_record("address_link", bundle.address_link)
+            self.write_record("facility_ownership", bundle.ownership)
+        elif isinstance(bundle, ActivityClassificationBundle):
+            for classification in bundle.activity_classifications:
+                self.write_record("activity_classification", classification)
+            self.write_metadata(bundle.extraction_metadata)
+        else:
+            raise TypeError(f"Unsupported bundle type: {type(bundle).__name__}")
+        registry_record = getattr(bundle, "registry_record", None)
+        if registry_record is not None:
+            self.write_record("registry_record", registry_record)
+        return self.records_written - written
+
+    def close(self) -> None:
+        """Finish the compressed stream and close the file it was opened on."""
+        if self._stream is not self._raw:
+            self._stream.close()
+        if self._owns_raw:
+            self._raw.close()
+        else:
+            self._raw.flush()
+
+
+def _decompressed(
+    raw: IO[bytes], compression: str | None
+) -> IO[bytes] | io.BufferedIOBase:
+    """Decompressed binary stream over a raw stream."""
+    _check_compression(compression)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if compression == "zstd":
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        return io.BufferedReader(reader)
+    return raw
+
+
+def read_records(
+    source: str | Path | IO[bytes], *, compression: str | None = None
+) -> Iterator[tuple[str, BaseModel | dict[str, Any]]]:
+    """
+    Read records written by NDJSONWriter, one line at a time.
+
+    The compression of files is detected from their first bytes; for file
+    objects it must be given.
+
+    Args:
+        source: NDJSON file or binary stream
+        compression: "gzip", "zstd" or None for plain NDJSON
+
+    Yields:
+        Record kind and rebuilt model (a dict for extraction metadata)
+
+    Raises:
+        ValueError: If a record has an unknown kind
+    """
+    if not isinstance(source, (str, Path)):
+        yield from _read_stream(_decompressed(source, compression))
+        return
+    with Path(source).open("rb") as raw:
+        if compression is None:
+            head = raw.read(4)
+            raw.seek(0)
+            compression = _MAGIC.get(head) or _MAGIC.get(head[:2])
+        yield from _read_stream(_decompressed(raw, compression))
+
+
+def _read_stream(
+    stream: IO[bytes] | io.BufferedIOBase,
+) -> Iterator[tuple[str, BaseModel | dict[str, Any]]]:
+    """Parse the records of a decompressed stream."""
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record["kind"]
+        if kind == EXTRACTION_METADATA:
+            yield kind, record["data"]
+            continue
+        model_class = KINDS.get(kind)
+        if model_class is None:
+            raise ValueError(f"Unknown record kind: {kind}")
+        yield kind, model_class.model_validate(record["data"])
+
+
+def read_results(
+    source: str | Path | IO[bytes], *, compression: str | None = None
+) -> Iterator[SIRENExtractResult]:
+    """
+    Rebuild SIRENExtractResults from records written by write_result().
+
+    Each company record starts a new result, so only one result is held in
+    memory at a time. Exports of streaming bundles, whose SIRENs may be
+    interleaved, should be read with read_records() instead.
+
+    Args:
+        source: NDJSON file or binary stream
+        compression: "gzip", "zstd" or None for plain NDJSON
+
+    Yields:
+        One SIRENExtractResult per company record
+
+    Raises:
+        ValueError: If records come before the first company record
+    """
+    fields = {kind: field for field, kind in _RESULT_FIELDS}
+    current: dict[str, Any] | None = None
+    for kind, item in read_records(source, compression=compression):
+        if kind == "company":
+            if current is not None:
+                yield SIRENExtractResult(**current)
+            current = {"company": item}
+            continue
+        if current is None:
+            raise ValueError(f"Record of kind {kind} before any company record")
+        if kind == EXTRACTION_METADATA:
+            current[EXTRACTION_METADATA] = item
+        else:
+            current.setdefault(fields[kind], []).append(item)
+    if current is not None:
+        yield SIRENExtractResult(**current)
@@ -7,45 +7,224 @@ including all associated establishments and their historical data.
 
 from __future__ import annotations
 
+import asyncio
+from collections import OrderedDict
 from datetime import datetime
-import hashlib
 import json
 import logging
 from typing import TYPE_CHECKING, Any
 
+from sirene_api_client.api.etablissement.find_by_post_etablissement import (
+    _get_kwargs as find_by_post_etablissement_kwargs,
+)
 from sirene_api_client.api.etablissement.find_by_post_etablissement import (
     asyncio as find_by_post_etablissement,
 )
+from sirene_api_client.api.unite_legale.find_by_siren import (
+    _get_kwargs as find_by_siren_kwargs,
+)
 from sirene_api_client.api.unite_legale.find_by_siren import asyncio as find_by_siren
 from sirene_api_client.api_types import UNSET
+from sirene_api_client.models.etablissement import Etablissement
 from sirene_api_client.models.etablissement_post_multi_criteres import (
     EtablissementPostMultiCriteres,
 )
+from sirene_api_client.models.reponse_erreur import ReponseErreur
+from sirene_api_client.models.unite_legale import UniteLegale
 
-from .exceptions import ExtractionError
+from .exceptions import ExtractionError, NotFoundError
+from .models import hash_payload
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator
+    from collections.abc import AsyncIterator, Awaitable, Callable
 
     from sirene_api_client.client import AuthenticatedClient
-    from sirene_api_client.models.etablissement import Etablissement
-    from sirene_api_client.models.unite_legale import UniteLegale
 
     from .config import ETLConfig
+    from .existence import NegativeCache
 
 logger = logging.getLogger(__name__)
 
 
-class SIRENExtractor:
-    """Extract complete SIREN history from SIRENE API."""
+class SnapshotCache:
+    """
+    Share point-in-time API results between extractors.
+
+    Data as of a past date does not change, so results fetched with the date
+    parameter are cached by (kind, identifier, date). Concurrent requests for
+    the same key share a single API call. Failed calls are not cached: fetch
+    callables raise on any error response, so that a later call retries.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, ...], Any] = OrderedDict()
+        self._pending: dict[tuple[str, ...], asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(
+        self, key: tuple[str, ...], fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached result for a key, fetching it at most once.
+
+        Args:
+            key: Cache key, e.g. ("company", siren, date)
+            fetch: Coroutine function performing the API call
+
+        Returns:
+            The cached or freshly fetched result
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = asyncio.ensure_future(fetch())
+            self._pending[key] = pending
+            pending.add_done_callback(lambda future: self._settle(key, future))
+        else:
+            self.hits += 1
+        return await asyncio.shield(pending)
+
+    def _settle(self, key: tuple[str, ...], future: asyncio.Future[Any]) -> None:
+        """Store a finished fetch, evicting the least recently used entries."""
+        self._pending.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._entries[key] = future.result()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _page_counts(content: bytes) -> tuple[int, int]:
+    """
+    Number of establishments and total of a raw /siret result page.
+
+    SIRENE writes the header, with the page size in "nombre", before the
+    establishments, so only the header is decoded. Pages without one are
+    decoded in full.
+    """
+    start = content.find(b'"header"')
+    if start != -1:
+        head = content[start + 8 : start + 4104].decode(errors="ignore").lstrip()
+        if head.startswith(":"):
+            try:
+                header, _ = json.JSONDecoder().raw_decode(head[1:].lstrip())
+            except ValueError:
+                header = None
+            if isinstance(header, dict) and "nombre" in header:
+                return int(header["nombre"]), int(header.get("total") or 0)
+    document = json.loads(content)
+    header = document.get("header") or {}
+    return len(document.get("etablissements") or []), int(header.get("total") or 0)
+
+
+async def _request_json(
+    client: AuthenticatedClient,
+    kwargs: dict[str, Any],
+    description: str,
+    endpoint: str,
+    fallback: Callable[[], dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """
+    Send a raw SIRENE request built from generated _get_kwargs and decode it.
+
+    SIRENE answers 404 when nothing matches, which yields an empty document.
+    When fallback is given, a 414 (URL too long) answer is retried once with
+    the request kwargs it returns.
+
+    Args:
+        client: Authenticated SIRENE API client
+        kwargs: httpx request arguments
+        description: Request description used in errors, e.g. "Search request for q"
+        endpoint: Endpoint name recorded on ExtractionError
+
+    Raises:
+        ExtractionError: If the request fails or returns an unexpected status
+    """
+    httpx_client = client.get_async_httpx_client()
+    try:
+        response = await httpx_client.request(**kwargs)
+        if fallback is not None and response.status_code == 414:
+            logger.debug(f"URL too long for {endpoint}, retrying as POST")
+            response = await httpx_client.request(**fallback())
+    except Exception as e:
+        logger.error(f"{description} failed: {e}")
+        raise ExtractionError(f"{description} failed: {e}", endpoint=endpoint) from e
+
+    if response.status_code == 404:
+        return {}
+    if response.status_code != 200:
+        raise ExtractionError(
+            f"{description} returned HTTP {response.status_code}", endpoint=endpoint
+        )
+    document = response.json()
+    return document if isinstance(document, dict) else {}
+
 
-    def __init__(self, client: AuthenticatedClient, config: ETLConfig) -> None:
+class SIRENExtractor:
+    """
+    Extract complete SIREN history from SIRENE API.
+
+    With a negative_cache, SIRENs the API reported missing are remembered and
+    later extractions of them raise NotFoundError without any request.
+    Point-in-time extractions (config.as_of) bypass it, since a unit missing
+    today may have existed at that date and the other way round.
+    """
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        config: ETLConfig,
+        snapshot_cache: SnapshotCache | None = None,
+        negative_cache: NegativeCache | None = None,
+    ) -> None:
         if client is None:
             raise TypeError("client cannot be None")
         if config is None:
             raise TypeError("config cannot be None")
         self.client = client
         self.config = config
+        self.snapshot_cache = (
+            snapshot_cache if snapshot_cache is not None else SnapshotCache()
+        )
+        self.negative_cache = negative_cache
+
+    def _date_kwargs(self) -> dict[str, Any]:
+        """API date parameter for point-in-time extraction, if configured."""
+        if self.config.as_of is None:
+            return {}
+        return {"date": self.config.as_of.isoformat()}
+
+    def _not_found(self, siren: str) -> NotFoundError:
+        """Record a SIREN the API reported missing and build its error."""
+        if self.negative_cache is not None and self.config.as_of is None:
+            self.negative_cache.add(siren)
+        return NotFoundError(
+            f"No company data found for SIREN: {siren}",
+            siren=siren,
+            endpoint="unite_legale/find_by_siren",
+        )
+
+    async def _snapshot(
+        self, kind: str, siren: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Fetch through the snapshot cache when extracting as of a date."""
+        if self.config.as_of is None:
+            return await fetch()
+        return await self.snapshot_cache.get_or_fetch(
+            (kind, siren, self.config.as_of.isoformat()), fetch
+        )
 
     async def extract_siren_complete(self, siren: str) -> dict[str, Any]:
         """
@@ -55,6 +234,9 @@ class SIRENExtractor:
         3. All establishment periods
         4. Related succession links
 
+        With config.raw_registry_payloads, the decoded documents the models were
+        built from are kept under "raw_company" and "raw_facilities".
+
         Args:
             siren: SIREN number to extract
 
@@ -62,19 +244,41 @@ class SIRENExtractor:
             Dictionary containing all extracted data
 
         Raises:
+            NotFoundError: If the SIREN does not exist
             ExtractionError: If extraction fails
         """
+        if (
+            self.negative_cache is not None
+            and self.config.as_of is None
+            and siren in self.negative_cache
+        ):
+            logger.debug(f"SIREN {siren} recently reported missing, skipping the API")
+            raise NotFoundError(
+                f"No company data found for SIREN: {siren}",
+                siren=siren,
+                endpoint="unite_legale/find_by_siren",
+            )
+
         logger.info(f"Starting complete extraction for SIREN: {siren}")
 
         try:
-            # Extract company (UniteLegale) data
-            company_data = await self._extract_company(siren)
+            if self.config.raw_registry_payloads:
+                company_document, facility_documents = await self._extract_documents(
+                    siren
+                )
+                company_data = UniteLegale.from_dict(company_document)
+                facilities_data = [
+                    Etablissement.from_dict(document) for document in facility_documents
+                ]
+            else:
+                # Extract company (UniteLegale) data
+                company_data = await self._extract_company(siren)
 
-            # Extract all facilities (Etablissements) for this SIREN
-            facilities_data = await self._extract_facilities(siren)
+                # Extract all facilities (Etablissements) for this SIREN
+                facilities_data = await self._extract_facilities(siren)
 
             # Combine all data
-            result = {
+            result: dict[str, Any] = {
                 "company": company_data,
                 "facilities": facilities_data,
                 "extraction_metadata": {
@@ -83,12 +287,19 @@ class SIRENExtractor:
                     "facility_count": len(facilities_data),
                 },
             }
+            if self.config.as_of is not None:
+                result["extraction_metadata"]["as_of"] = self.config.as_of.isoformat()
+            if self.config.raw_registry_payloads:
+                result["raw_company"] = company_document
+                result["raw_facilities"] = facility_documents
 
             logger.info(
                 f"Successfully extracted SIREN {siren} with {len(facilities_data)} facilities"
             )
             return result
 
+        except NotFoundError:
+            raise
         except Exception as e:
             logger.error(f"Failed to extract SIREN {siren}: {e}")
             raise ExtractionError(
@@ -99,12 +310,14 @@ class SIRENExtractor:
         """Extract company (UniteLegale) data."""
         logger.debug(f"Extracting company data for SIREN: {siren}")
 
-        try:
+        async def fetch() -> UniteLegale:
             response = await find_by_siren(
-                siren=siren,
-                client=self.client,
+                siren=siren, client=self.client, **self._date_kwargs()
             )
-
+            if isinstance(response, ReponseErreur) and (
+                getattr(response.header, "statut", None) == 404
+            ):
+                raise self._not_found(siren)
             if (
                 not response
                 or not hasattr(response, "unite_legale")
@@ -113,10 +326,16 @@ class SIRENExtractor:
                 raise ExtractionError(
                     f"No company data found for SIREN: {siren}", siren=siren
                 )
+            unite_legale: UniteLegale = response.unite_legale
+            return unite_legale
 
+        try:
+            unite_legale: UniteLegale = await self._snapshot("company", siren, fetch)
             logger.debug(f"Successfully extracted company data for SIREN: {siren}")
-            return response.unite_legale
+            return unite_legale
 
+        except NotFoundError:
+            raise
         except Exception as e:
             logger.error(f"Failed to extract company data for SIREN {siren}: {e}")
             raise ExtractionError(
@@ -125,8 +344,33 @@ class SIRENExtractor:
                 endpoint="unite_legale/find_by_siren",
             ) from e
 
+    async def _extract_documents(
+        self, siren: str
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+        """Fetch the decoded legal unit and establishment documents of a SIREN."""
+        company_payload = await self.fetch_company_payload(siren)
+
+        async def collect() -> list[dict[str, Any]]:
+            return [
+                facility
+                async for page in self.fetch_facility_pages(siren)
+                for facility in page.get("etablissements") or []
+            ]
+
+        facilities: list[dict[str, Any]] = await self._snapshot(
+            "facility_documents", siren, collect
+        )
+        return company_payload["uniteLegale"], facilities
+
     async def _extract_facilities(self, siren: str) -> list[Etablissement]:
         """Extract all facilities (Etablissements) for a SIREN."""
+        facilities: list[Etablissement] = await self._snapshot(
+            "facilities", siren, lambda: self._paginate_facilities(siren)
+        )
+        return facilities
+
+    async def _paginate_facilities(self, siren: str) -> list[Etablissement]:
+        """Fetch every page of facilities for a SIREN."""
         logger.debug(f"Extracting facilities for SIREN: {siren}")
 
         try:
@@ -143,6 +387,7 @@ class SIRENExtractor:
                     nombre=page_size,
                     debut=current_page * page_size,
                     masquer_valeurs_nulles=True,  # Hide null values in response
+                    **self._date_kwargs(),
                 )
 
                 response = await find_by_post_etablissement(
@@ -179,11 +424,18 @@ class SIRENExtractor:
                         break
 
                     current_page += 1
-                else:
+                elif isinstance(response, ReponseErreur):
                     logger.warning(
                         f"No response or establishments for SIREN {siren} on page {current_page + 1}"
                     )
                     break
+                else:
+                    raise ExtractionError(
+                        f"Facility request for SIREN {siren} failed on page "
+                        f"{current_page + 1}",
+                        siren=siren,
+                        endpoint="etablissement/find_by_post",
+                    )
 
             logger.debug(
                 f"Found {len(all_facilities)} facilities for SIREN: {siren} (across {current_page + 1} pages)"
@@ -238,6 +490,7 @@ class SIRENExtractor:
                     nombre=page_size,
                     debut=current_page * page_size,
                     masquer_valeurs_nulles=True,  # Hide null values in response
+                    **self._date_kwargs(),
                 )
 
                 response = await find_by_post_etablissement(
@@ -294,7 +547,204 @@ class SIRENExtractor:
                 endpoint="etablissement/find_by_post",
             ) from e
 
+    async def extract_company_with_document(
+        self, siren: str
+    ) -> tuple[UniteLegale, dict[str, Any] | None]:
+        """
+        Extract a legal unit with the decoded document it was built from.
+
+        The document is only fetched with config.raw_registry_payloads; it is
+        None otherwise.
+
+        Args:
+            siren: SIREN number to extract
+
+        Returns:
+            Tuple of (legal unit, document or None)
+
+        Raises:
+            ExtractionError: If extraction fails
+        """
+        if not self.config.raw_registry_payloads:
+            return await self._extract_company(siren), None
+        document: dict[str, Any] = (await self.fetch_company_payload(siren))[
+            "uniteLegale"
+        ]
+        return UniteLegale.from_dict(document), document
+
+    async def extract_facilities_with_documents_streaming(
+        self, siren: str
+    ) -> AsyncIterator[tuple[list[Etablissement], list[dict[str, Any] | None], int]]:
+        """
+        Stream facility batches with the decoded documents they were built from.
+
+        Like extract_facilities_streaming, but each batch comes with one
+        document per facility: the decoded API document with
+        config.raw_registry_payloads, None otherwise.
+
+        Args:
+            siren: SIREN number to extract facilities for
+
+        Yields:
+            Tuple of (facilities_batch, documents, total_facilities_count)
+
+        Raises:
+            ExtractionError: If extraction fails
+        """
+        if not self.config.raw_registry_payloads:
+            async for facilities, total in self.extract_facilities_streaming(siren):
+                yield facilities, [None] * len(facilities), total
+            return
+        async for page in self.fetch_facility_pages(siren):
+            documents: list[dict[str, Any]] = page.get("etablissements") or []
+            total = int((page.get("header") or {}).get("total") or 0)
+            yield (
+                [Etablissement.from_dict(document) for document in documents],
+                list(documents),
+                total,
+            )
+
+    async def fetch_company_payload(self, siren: str) -> dict[str, Any]:
+        """
+        Fetch the raw decoded /siren document of a legal unit.
+
+        Unlike _extract_company, the response is only JSON-decoded: building the
+        UniteLegale model is left to the caller so it can run as a separate stage.
+
+        Args:
+            siren: SIREN number to fetch
+
+        Returns:
+            Decoded ReponseUniteLegale document
+
+        Raises:
+            NotFoundError: If the SIREN does not exist
+            ExtractionError: If the request fails or returns no legal unit
+        """
+        logger.debug(f"Fetching raw company payload for SIREN: {siren}")
+
+        async def fetch() -> dict[str, Any]:
+            response = await self.client.get_async_httpx_client().request(
+                **find_by_siren_kwargs(siren=siren, **self._date_kwargs())
+            )
+            if response.status_code == 404:
+                raise self._not_found(siren)
+            if response.status_code != 200:
+                raise ExtractionError(
+                    f"Company request for SIREN {siren} failed with status "
+                    f"{response.status_code}",
+                    siren=siren,
+                    endpoint="unite_legale/find_by_siren",
+                )
+            payload = response.json()
+            if not isinstance(payload, dict) or not payload.get("uniteLegale"):
+                raise ExtractionError(
+                    f"No company data found for SIREN: {siren}",
+                    siren=siren,
+                    endpoint="unite_legale/find_by_siren",
+                )
+            return payload
+
+        try:
+            payload: dict[str, Any] = await self._snapshot(
+                "company_payload", siren, fetch
+            )
+        except ExtractionError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to fetch company payload for SIREN {siren}: {e}")
+            raise ExtractionError(
+                f"Failed to fetch company payload for SIREN {siren}: {e}",
+                siren=siren,
+                endpoint="unite_legale/find_by_siren",
+            ) from e
+        return payload
+
+    async def fetch_facility_pages(self, siren: str) -> AsyncIterator[dict[str, Any]]:
+        """
+        Stream the raw decoded /siret result pages of a SIREN.
+
+        Pagination follows extract_facilities_streaming, but pages are yielded as
+        decoded JSON documents without building Etablissement models.
+
+        Args:
+            siren: SIREN number to fetch facilities for
+
+        Yields:
+            Decoded ReponseEtablissements documents, one per page
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        async for content in self.fetch_facility_page_contents(siren):
+            yield json.loads(content)
+
+    async def fetch_facility_page_contents(self, siren: str) -> AsyncIterator[bytes]:
+        """
+        Stream the undecoded /siret result pages of a SIREN.
+
+        Only the header of each page is decoded to paginate, so that decoding
+        the rest can be left to a worker process.
+
+        Args:
+            siren: SIREN number to fetch facilities for
+
+        Yields:
+            Raw JSON bytes of ReponseEtablissements documents, one per page
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        logger.debug(f"Fetching raw facility pages for SIREN: {siren}")
+
+        page_size = 1000  # Maximum per request
+        current_page = 0
+        fetched = 0
+
+        while True:
+            search_criteria = EtablissementPostMultiCriteres(
+                q=f"siren:{siren}",
+                nombre=page_size,
+                debut=current_page * page_size,
+                masquer_valeurs_nulles=True,
+                **self._date_kwargs(),
+            )
+
+            try:
+                response = await self.client.get_async_httpx_client().request(
+                    **find_by_post_etablissement_kwargs(body=search_criteria)
+                )
+            except Exception as e:
+                logger.error(f"Failed to fetch facility pages for SIREN {siren}: {e}")
+                raise ExtractionError(
+                    f"Failed to fetch facility pages for SIREN {siren}: {e}",
+                    siren=siren,
+                    endpoint="etablissement/find_by_post",
+                ) from e
+
+            if response.status_code == 404:
+                logger.warning(
+                    f"No response or establishments for SIREN {siren} on page {current_page + 1}"
+                )
+                break
+            if response.status_code != 200:
+                raise ExtractionError(
+                    f"Facility request for SIREN {siren} failed with status "
+                    f"{response.status_code} on page {current_page + 1}",
+                    siren=siren,
+                    endpoint="etablissement/find_by_post",
+                )
+
+            content = response.content
+            count, total_facilities = _page_counts(content)
+            fetched += count
+
+            yield content
+
+            if count < page_size or fetched >= total_facilities:
+                break
+            current_page += 1
+
     def _create_payload_hash(self, payload: dict[str, Any]) -> str:
         """Create SHA-256 hash of payload for deduplication."""
-        payload_str = json.dumps(payload, sort_keys=True, default=str)
-        return hashlib.sha256(payload_str.encode()).hexdigest()
+        return hash_payload(payload)
@@ -0,0 +1,343 @@
+"""
+Facet aggregation for the SIRENE multi-criteria endpoints.
+
+Dashboards only need counts by workforce band, NAF code or commune. Instead of
+downloading every establishment to aggregate locally, this module asks
+/siret and /siren for facette counts with nombre=0, so one request returns the
+whole distribution, and caches the parsed results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.api.etablissement.find_by_post_etablissement import (
+    _get_kwargs as find_by_post_etablissement_kwargs,
+)
+from sirene_api_client.api.unite_legale.find_by_post_unite_legale import (
+    _get_kwargs as find_by_post_unite_legale_kwargs,
+)
+from sirene_api_client.api_types import UNSET, Unset
+from sirene_api_client.models.comptage_valeur import ComptageValeur
+from sirene_api_client.models.etablissement_post_multi_criteres import (
+    EtablissementPostMultiCriteres,
+)
+from sirene_api_client.models.unite_legale_post_multi_criteres import (
+    UniteLegalePostMultiCriteres,
+)
+
+from .extractor import _request_json
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from sirene_api_client.client import AuthenticatedClient
+    from sirene_api_client.models.facette import Facette
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IntervalFacet:
+    """Counts of a numeric or date field over regular intervals."""
+
+    field: str
+    """SIRENE field name, e.g. dateCreationEtablissement."""
+
+    start: str
+    """Lower bound of the first interval."""
+
+    end: str
+    """Upper bound of the last interval."""
+
+    step: str
+    """Interval width, e.g. "10" or "+1YEAR" for dates."""
+
+    def parameters(self) -> dict[str, str]:
+        """Request parameters describing this interval facet."""
+        return {
+            "facette.intervalle.champ": self.field,
+            "facette.intervalle.debut": self.start,
+            "facette.intervalle.fin": self.end,
+            "facette.intervalle.pas": self.step,
+        }
+
+
+@dataclass
+class FacetResult:
+    """Parsed counts of one facet."""
+
+    name: str
+    """Facet name (the field name for field and interval facets)."""
+
+    counts: Counter[str] = field(default_factory=Counter)
+    """Number of results per value or interval."""
+
+    missing: int = 0
+    """Number of results whose field is null."""
+
+    total: int = 0
+    """Number of results with a non-null value."""
+
+    distinct: int = 0
+    """Number of distinct values."""
+
+    before: int | None = None
+    """Results below the first interval (interval facets only)."""
+
+    after: int | None = None
+    """Results above the last interval (interval facets only)."""
+
+    between: int | None = None
+    """Results within the intervals (interval facets only)."""
+
+
+def _count(value: Any) -> int:
+    """Integer from an optional API count."""
+    return 0 if value is None or isinstance(value, Unset) else int(value)
+
+
+def _optional_count(value: Any) -> int | None:
+    """Integer from an optional API count, keeping absence as None."""
+    return None if value is None or isinstance(value, Unset) else int(value)
+
+
+def _comptage_value(value: Any) -> str:
+    """
+    String key of a counted value.
+
+    The API returns scalar values, while the generated ComptageValeur model
+    only keeps mapping values in additional_properties.
+    """
+    if isinstance(value, ComptageValeur):
+        value = value.additional_properties
+    if isinstance(value, Mapping):
+        values = list(value.values())
+        return str(values[0]) if len(values) == 1 else str(dict(value))
+    return "" if value is None or isinstance(value, Unset) else str(value)
+
+
+def parse_facette(facette: Facette | Mapping[str, Any]) -> FacetResult:
+    """
+    Parse a facet, either a Facette model or its raw JSON object.
+
+    Args:
+        facette: Facette model or raw "facettes" item
+
+    Returns:
+        FacetResult with counts keyed by value
+    """
+    if isinstance(facette, Mapping):
+        data = facette
+        comptages = [
+            (comptage.get("valeur"), comptage.get("nombre"))
+            for comptage in data.get("comptages") or []
+        ]
+    else:
+        data = {
+            "nom": facette.nom,
+            "manquants": facette.manquants,
+            "total": facette.total,
+            "modalites": facette.modalites,
+            "avant": facette.avant,
+            "apres": facette.apres,
+            "entre": facette.entre,
+        }
+        comptages = [
+            (comptage.valeur, comptage.nombre) for comptage in (facette.comptages or [])
+        ]
+
+    counts: Counter[str] = Counter()
+    for value, number in comptages:
+        counts[_comptage_value(value)] += _count(number)
+
+    name = data.get("nom")
+    return FacetResult(
+        name="" if name is None or isinstance(name, Unset) else str(name),
+        counts=counts,
+        missing=_count(data.get("manquants")),
+        total=_count(data.get("total")),
+        distinct=_count(data.get("modalites")),
+        before=_optional_count(data.get("avant")),
+        after=_optional_count(data.get("apres")),
+        between=_optional_count(data.get("entre")),
+    )
+
+
+class FacetClient:
+    """Count SIRENE results by field without downloading records."""
+
+    def __init__(self, client: AuthenticatedClient, cache_ttl: float = 300.0) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if cache_ttl < 0:
+            raise ValueError("cache_ttl cannot be negative")
+        self.client = client
+        self.cache_ttl = cache_ttl
+        self._cache: dict[
+            tuple[Any, ...], tuple[float, int, dict[str, FacetResult]]
+        ] = {}
+
+    async def establishment_facets(
+        self,
+        q: str,
+        fields: Sequence[str] = (),
+        intervals: Sequence[IntervalFacet] = (),
+    ) -> dict[str, FacetResult]:
+        """
+        Count establishments matching a query by field values and intervals.
+
+        Args:
+            q: SIRENE multi-criteria query
+            fields: Field names to count by, e.g. trancheEffectifsEtablissement
+            intervals: Interval facets
+
+        Returns:
+            Facet results keyed by facet name
+
+        Raises:
+            ExtractionError: If the request fails
+        """
+        _total, facets = await self._facets("siret", q, fields, intervals)
+        return facets
+
+    async def legal_unit_facets(
+        self,
+        q: str,
+        fields: Sequence[str] = (),
+        intervals: Sequence[IntervalFacet] = (),
+    ) -> dict[str, FacetResult]:
+        """
+        Count legal units matching a query by field values and intervals.
+
+        Args:
+            q: SIRENE multi-criteria query
+            fields: Field names to count by, e.g. categorieEntreprise
+            intervals: Interval facets
+
+        Returns:
+            Facet results keyed by facet name
+
+        Raises:
+            ExtractionError: If the request fails
+        """
+        _total, facets = await self._facets("siren", q, fields, intervals)
+        return facets
+
+    async def count(self, q: str, endpoint: str = "siret") -> int:
+        """
+        Count results of a query.
+
+        Args:
+            q: SIRENE multi-criteria query
+            endpoint: "siret" for establishments or "siren" for legal units
+
+        Returns:
+            Number of matching results
+        """
+        total, _facets = await self._facets(endpoint, q, (), ())
+        return total
+
+    async def count_with_facets(
+        self,
+        q: str,
+        fields: Sequence[str],
+        endpoint: str = "siret",
+    ) -> tuple[int, dict[str, FacetResult]]:
+        """
+        Count results of a query together with field facets, in one request.
+
+        Args:
+            q: SIRENE multi-criteria query
+            fields: Field names to count by
+            endpoint: "siret" for establishments or "siren" for legal units
+
+        Returns:
+            Tuple of (total, facet results keyed by facet name)
+        """
+        return await self._facets(endpoint, q, fields, ())
+
+    def clear_cache(self) -> None:
+        """Forget every cached result."""
+        self._cache.clear()
+
+    async def _facets(
+        self,
+        endpoint: str,
+        q: str,
+        fields: Sequence[str],
+        intervals: Sequence[IntervalFacet],
+    ) -> tuple[int, dict[str, FacetResult]]:
+        """
+        Send nombre=0 facet requests, using the cache when fresh.
+
+        SIRENE takes a single interval facet per request: the first one is
+        sent with the field facets, each other one in a request of its own,
+        and their results are merged.
+        """
+        if endpoint not in ("siret", "siren"):
+            raise ValueError(f"Unknown endpoint: {endpoint}. Use 'siret' or 'siren'.")
+        key = (endpoint, q, tuple(fields), tuple(intervals))
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                return cached[1], cached[2]
+            del self._cache[key]
+
+        first = intervals[0] if intervals else None
+        responses = await asyncio.gather(
+            self._request(endpoint, q, fields, first),
+            *(self._request(endpoint, q, (), interval) for interval in intervals[1:]),
+        )
+        total = responses[0][0]
+        facets: dict[str, FacetResult] = {}
+        for _total, response_facets in responses:
+            facets.update(response_facets)
+
+        if self.cache_ttl:
+            now = time.monotonic()
+            for expired in [k for k, v in self._cache.items() if v[0] <= now]:
+                del self._cache[expired]
+            self._cache[key] = (now + self.cache_ttl, total, facets)
+        logger.debug(
+            f"Facet request for {q}: {total} results, {len(facets)} facets "
+            f"in {len(responses)} requests"
+        )
+        return total, facets
+
+    async def _request(
+        self,
+        endpoint: str,
+        q: str,
+        fields: Sequence[str],
+        interval: IntervalFacet | None,
+    ) -> tuple[int, dict[str, FacetResult]]:
+        """Send one facet request with at most one interval facet."""
+        champs = ",".join(fields) if fields else UNSET
+        body: EtablissementPostMultiCriteres | UniteLegalePostMultiCriteres
+        if endpoint == "siret":
+            body = EtablissementPostMultiCriteres(q=q, nombre=0, facette_champ=champs)
+            kwargs = find_by_post_etablissement_kwargs(body=body)
+        else:
+            body = UniteLegalePostMultiCriteres(q=q, nombre=0, facette_champ=champs)
+            kwargs = find_by_post_unite_legale_kwargs(body=body)
+        if interval is not None:
+            kwargs["data"].update(interval.parameters())
+
+        document = await _request_json(
+            self.client, kwargs, f"Facet request for {q}", f"{endpoint}/facets"
+        )
+
+        total = _count((document.get("header") or {}).get("total"))
+        facets = {
+            result.name: result
+            for result in map(parse_facette, document.get("facettes") or [])
+        }
+        return total, facets
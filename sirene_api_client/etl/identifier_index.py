@@ -0,0 +1,303 @@
+"""
+Memory-mapped sorted identifier index for offline SIREN/SIRET lookups.
+
+An index file holds the sorted fixed-width identifiers of tens of millions of
+legal units or establishments, the offsets of their records and the packed
+records themselves (a few core attributes). Opened with mmap, lookups are
+binary searches over the page cache: nothing is loaded up front, and worker
+processes opening the same file share its pages.
+"""
+
+from __future__ import annotations
+
+from array import array
+import heapq
+import itertools
+import json
+import logging
+import mmap
+from pathlib import Path
+import struct
+import sys
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+from .stock import FACILITIES, detect_stock_kind, read_stock_rows
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+logger = logging.getLogger(__name__)
+
+_INDEX_MAGIC = b"SIRENE-IDENTIFIER-INDEX 1\n"
+
+_KEY_WIDTHS = {"siren": 9, "siret": 14}
+
+# Unit separator between the fields of a packed record
+_SEPARATOR = "\x1f"
+
+# Rows sorted at once while building; bounds the Python objects held
+_SORT_CHUNK = 1 << 20
+
+FACILITY_FIELDS = (
+    "etatAdministratifEtablissement",
+    "activitePrincipaleEtablissement",
+    "etablissementSiege",
+    "codePostalEtablissement",
+    "codeCommuneEtablissement",
+)
+
+COMPANY_FIELDS = (
+    "etatAdministratifUniteLegale",
+    "activitePrincipaleUniteLegale",
+    "categorieJuridiqueUniteLegale",
+    "denominationUniteLegale",
+)
+
+
+def _sorted_entries(identifiers: array[int]) -> array[int]:
+    """
+    Row numbers in identifier order, keeping the last row of each identifier.
+
+    Runs of _SORT_CHUNK rows are sorted into typed arrays and merged, so only
+    one run at a time is held as a list of Python ints.
+    """
+    runs = [
+        array(
+            "q",
+            sorted(
+                range(start, min(start + _SORT_CHUNK, len(identifiers))),
+                key=identifiers.__getitem__,
+            ),
+        )
+        for start in range(0, len(identifiers), _SORT_CHUNK)
+    ]
+    # heapq.merge yields equal keys in run order, so the merge is stable
+    kept: array[int] = array("q")
+    for entry in heapq.merge(*runs, key=identifiers.__getitem__):
+        if kept and identifiers[kept[-1]] == identifiers[entry]:
+            kept[-1] = entry
+        else:
+            kept.append(entry)
+    return kept
+
+
+class IdentifierIndex:
+    """
+    Read-only, memory-mapped index of SIRENs or SIRETs with packed records.
+
+    File layout: a magic line, a JSON header line, the sorted identifiers as
+    fixed-width ASCII keys, count + 1 little-endian uint64 record offsets and
+    the records, each the UTF-8 fields joined by a unit separator.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Open an index file written by build().
+
+        Args:
+            path: Index file
+
+        Raises:
+            ValueError: If the file is not an identifier index
+        """
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(_INDEX_MAGIC)] != _INDEX_MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not an identifier index file: {path}")
+        header_end = self._mm.find(b"\n", len(_INDEX_MAGIC)) + 1
+        header = json.loads(self._mm[len(_INDEX_MAGIC) : header_end])
+        self.key: str = header["key"]
+        self.fields: tuple[str, ...] = tuple(header["fields"])
+        self._count: int = header["count"]
+        self._width: int = header["key_width"]
+        self._keys_offset = header_end
+        self._offsets_offset = self._keys_offset + self._count * self._width
+        self._records_offset = self._offsets_offset + 8 * (self._count + 1)
+
+    @classmethod
+    def build(
+        cls,
+        path: str | Path,
+        rows: Iterable[Mapping[str, Any]],
+        *,
+        fields: Sequence[str],
+        key: str = "siret",
+    ) -> IdentifierIndex:
+        """
+        Write an index file from rows and open it.
+
+        Rows need not be sorted. Records are spooled to a temporary file, so
+        memory use is a few dozen bytes per row. When an identifier appears more
+        than once, its last row wins.
+
+        Args:
+            path: Destination file
+            rows: Mappings holding the key column and the fields, such as
+                stock file rows or mirror exports
+            fields: Columns stored in each record
+            key: Identifier column, "siret" or "siren"
+
+        Returns:
+            The opened index
+
+        Raises:
+            ValueError: If the key is unknown or a row has an invalid identifier
+        """
+        if key not in _KEY_WIDTHS:
+            raise ValueError(f"key must be one of {sorted(_KEY_WIDTHS)}")
+        width = _KEY_WIDTHS[key]
+        identifiers: array[int] = array("q")
+        starts: array[int] = array("q")
+        lengths: array[int] = array("l")
+
+        with tempfile.TemporaryFile() as scratch:
+            position = 0
+            for row in rows:
+                identifier = str(row.get(key) or "")
+                if len(identifier) != width or not identifier.isdigit():
+                    raise ValueError(f"Invalid {key}: {identifier!r}")
+                record = _SEPARATOR.join(
+                    str(row.get(field) or "") for field in fields
+                ).encode("utf-8")
+                scratch.write(record)
+                identifiers.append(int(identifier))
+                starts.append(position)
+                lengths.append(len(record))
+                position += len(record)
+            scratch.flush()
+
+            kept = _sorted_entries(identifiers)
+
+            offsets: array[int] = array("Q", [0])
+            for entry in kept:
+                offsets.append(offsets[-1] + lengths[entry])
+            if sys.byteorder != "little":
+                offsets.byteswap()
+
+            header = {
+                "key": key,
+                "key_width": width,
+                "fields": list(fields),
+                "count": len(kept),
+            }
+            with Path(path).open("wb") as f:
+                f.write(_INDEX_MAGIC)
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(
+                    b"".join(
+                        f"{identifiers[entry]:0{width}d}".encode("ascii")
+                        for entry in kept
+                    )
+                )
+                offsets.tofile(f)
+                if position:
+                    with mmap.mmap(
+                        scratch.fileno(), 0, access=mmap.ACCESS_READ
+                    ) as records:
+                        for entry in kept:
+                            start = starts[entry]
+                            f.write(records[start : start + lengths[entry]])
+
+        logger.debug(f"Built identifier index with {len(kept)} {key}s at {path}")
+        return cls(path)
+
+    @classmethod
+    def from_stock(
+        cls,
+        path: str | Path,
+        stock_path: str | Path,
+        fields: Sequence[str] | None = None,
+    ) -> IdentifierIndex:
+        """
+        Build an index from a StockEtablissement or StockUniteLegale file.
+
+        Args:
+            path: Destination file
+            stock_path: Stock CSV file
+            fields: Columns stored in each record (defaults to FACILITY_FIELDS
+                or COMPANY_FIELDS)
+
+        Returns:
+            The opened index
+        """
+        rows = itertools.chain.from_iterable(read_stock_rows(stock_path))
+        first = next(rows, None)
+        if first is None:
+            raise ValueError(f"Stock file has no rows: {stock_path}")
+        default_fields: Sequence[str]
+        if detect_stock_kind(list(first)) == FACILITIES:
+            key, default_fields = "siret", FACILITY_FIELDS
+        else:
+            key, default_fields = "siren", COMPANY_FIELDS
+        return cls.build(
+            path,
+            itertools.chain([first], rows),
+            fields=default_fields if fields is None else fields,
+            key=key,
+        )
+
+    def close(self) -> None:
+        """Unmap the index file."""
+        self._mm.close()
+
+    def __enter__(self) -> IdentifierIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[type[IdentifierIndex], tuple[str]]:
+        # Worker processes reopen the file instead of copying its contents
+        return (IdentifierIndex, (str(self.path),))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, identifier: object) -> bool:
+        return isinstance(identifier, str) and self._position(identifier) >= 0
+
+    def get(self, identifier: str) -> dict[str, str] | None:
+        """
+        Core attributes of an identifier.
+
+        Args:
+            identifier: SIREN or SIRET, matching the index key
+
+        Returns:
+            The record fields (empty strings for missing values), or None if
+            the identifier is not indexed
+        """
+        position = self._position(identifier)
+        if position < 0:
+            return None
+        start, end = struct.unpack_from(
+            "<QQ", self._mm, self._offsets_offset + 8 * position
+        )
+        record = self._mm[self._records_offset + start : self._records_offset + end]
+        if not self.fields:
+            return {}
+        return dict(
+            zip(self.fields, record.decode("utf-8").split(_SEPARATOR), strict=True)
+        )
+
+    def _position(self, identifier: str) -> int:
+        """Rank of an identifier among the sorted keys, or -1 if absent."""
+        if len(identifier) != self._width or not identifier.isascii():
+            return -1
+        target = identifier.encode("ascii")
+        width, base = self._width, self._keys_offset
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = base + middle * width
+            if self._mm[start : start + width] < target:
+                low = middle + 1
+            else:
+                high = middle
+        start = base + low * width
+        if low < self._count and self._mm[start : start + width] == target:
+            return low
+        return -1
@@ -0,0 +1,585 @@
+"""
+Local SQLite mirror of SIRENE legal units and establishments.
+
+SQLiteMirror stores the API documents in an indexed SQLite schema, together
+with their periods and addresses, and MirroredSireneClient puts it in front of
+the generated find_by_siren, find_by_siret and find_by_post_* calls: fresh
+entries are answered locally with the same response models, stale or missing
+ones are fetched from the API and written back. The mirror also implements the
+LocalStore protocol, so a SyncEngine can keep it up to date.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+import json
+import logging
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.api.etablissement.find_by_post_etablissement import (
+    asyncio as find_by_post_etablissement,
+)
+from sirene_api_client.api.etablissement.find_by_siret import (
+    asyncio_detailed as find_by_siret,
+)
+from sirene_api_client.api.unite_legale.find_by_post_unite_legale import (
+    asyncio as find_by_post_unite_legale,
+)
+from sirene_api_client.api.unite_legale.find_by_siren import (
+    asyncio_detailed as find_by_siren,
+)
+from sirene_api_client.api_types import UNSET, Unset
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.header import Header
+from sirene_api_client.models.reponse_erreur import ReponseErreur
+from sirene_api_client.models.reponse_etablissement import ReponseEtablissement
+from sirene_api_client.models.reponse_etablissements import ReponseEtablissements
+from sirene_api_client.models.reponse_unite_legale import ReponseUniteLegale
+from sirene_api_client.models.reponse_unites_legales import ReponseUnitesLegales
+from sirene_api_client.models.unite_legale import UniteLegale
+
+from .existence import NegativeCache
+from .models import CompanyBundle, FacilityBundle
+from .sync import shared_payload_hash
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from sirene_api_client.client import AuthenticatedClient
+    from sirene_api_client.models.etablissement_post_multi_criteres import (
+        EtablissementPostMultiCriteres,
+    )
+    from sirene_api_client.models.unite_legale_post_multi_criteres import (
+        UniteLegalePostMultiCriteres,
+    )
+
+    from .existence import BloomFilter
+    from .models import ActivityClassificationBundle
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS legal_units (
+    siren TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS establishments (
+    siret TEXT PRIMARY KEY,
+    siren TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS establishments_siren ON establishments (siren);
+CREATE TABLE IF NOT EXISTS legal_unit_periods (
+    siren TEXT NOT NULL,
+    date_debut TEXT,
+    date_fin TEXT,
+    etat_administratif TEXT,
+    activite_principale TEXT,
+    categorie_juridique TEXT,
+    denomination TEXT
+);
+CREATE INDEX IF NOT EXISTS legal_unit_periods_siren ON legal_unit_periods (siren);
+CREATE TABLE IF NOT EXISTS establishment_periods (
+    siret TEXT NOT NULL,
+    date_debut TEXT,
+    date_fin TEXT,
+    etat_administratif TEXT,
+    activite_principale TEXT
+);
+CREATE INDEX IF NOT EXISTS establishment_periods_siret
+    ON establishment_periods (siret);
+CREATE INDEX IF NOT EXISTS establishment_periods_activite
+    ON establishment_periods (activite_principale);
+CREATE TABLE IF NOT EXISTS addresses (
+    siret TEXT PRIMARY KEY,
+    numero_voie TEXT,
+    type_voie TEXT,
+    libelle_voie TEXT,
+    code_postal TEXT,
+    code_commune TEXT,
+    libelle_commune TEXT
+);
+CREATE INDEX IF NOT EXISTS addresses_code_commune ON addresses (code_commune);
+CREATE INDEX IF NOT EXISTS addresses_code_postal ON addresses (code_postal);
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS searches_fetched_at ON searches (fetched_at);
+CREATE TABLE IF NOT EXISTS watermarks (
+    collection TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteMirror:
+    """Indexed SQLite store of legal unit and establishment documents."""
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+    def put_unite_legale(
+        self, payload: dict[str, Any], fetched_at: float | None = None
+    ) -> None:
+        """
+        Insert or replace a legal unit document and its periods.
+
+        Args:
+            payload: UniteLegale document (UniteLegale.to_dict())
+            fetched_at: When it was read from the API (defaults to now)
+        """
+        siren = str(payload["siren"])
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO legal_units VALUES (?, ?, ?, ?)",
+                (
+                    siren,
+                    json.dumps(payload, default=str),
+                    shared_payload_hash(payload),
+                    time.time() if fetched_at is None else fetched_at,
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM legal_unit_periods WHERE siren = ?", (siren,)
+            )
+            self._connection.executemany(
+                "INSERT INTO legal_unit_periods VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        siren,
+                        period.get("dateDebut"),
+                        period.get("dateFin"),
+                        period.get("etatAdministratifUniteLegale"),
+                        period.get("activitePrincipaleUniteLegale"),
+                        period.get("categorieJuridiqueUniteLegale"),
+                        period.get("denominationUniteLegale"),
+                    )
+                    for period in payload.get("periodesUniteLegale") or []
+                ],
+            )
+
+    def put_etablissement(
+        self, payload: dict[str, Any], fetched_at: float | None = None
+    ) -> None:
+        """
+        Insert or replace an establishment document, its periods and address.
+
+        Args:
+            payload: Etablissement document (Etablissement.to_dict())
+            fetched_at: When it was read from the API (defaults to now)
+        """
+        siret = str(payload["siret"])
+        address = payload.get("adresseEtablissement") or {}
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO establishments VALUES (?, ?, ?, ?, ?)",
+                (
+                    siret,
+                    str(payload.get("siren") or siret[:9]),
+                    json.dumps(payload, default=str),
+                    shared_payload_hash(payload),
+                    time.time() if fetched_at is None else fetched_at,
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM establishment_periods WHERE siret = ?", (siret,)
+            )
+            self._connection.executemany(
+                "INSERT INTO establishment_periods VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        siret,
+                        period.get("dateDebut"),
+                        period.get("dateFin"),
+                        period.get("etatAdministratifEtablissement"),
+                        period.get("activitePrincipaleEtablissement"),
+                    )
+                    for period in payload.get("periodesEtablissement") or []
+                ],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO addresses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    siret,
+                    address.get("numeroVoieEtablissement"),
+                    address.get("typeVoieEtablissement"),
+                    address.get("libelleVoieEtablissement"),
+                    address.get("codePostalEtablissement"),
+                    address.get("codeCommuneEtablissement"),
+                    address.get("libelleCommuneEtablissement"),
+                ),
+            )
+
+    def get_unite_legale(
+        self, siren: str, max_age: float | None = None
+    ) -> UniteLegale | None:
+        """
+        Get a stored legal unit.
+
+        Args:
+            siren: SIREN number
+            max_age: Maximum age in seconds (None accepts any age)
+
+        Returns:
+            The legal unit, or None if missing or older than max_age
+        """
+        payload = self._get("legal_units", "siren", siren, max_age)
+        return UniteLegale.from_dict(payload) if payload is not None else None
+
+    def get_etablissement(
+        self, siret: str, max_age: float | None = None
+    ) -> Etablissement | None:
+        """
+        Get a stored establishment.
+
+        Args:
+            siret: SIRET number
+            max_age: Maximum age in seconds (None accepts any age)
+
+        Returns:
+            The establishment, or None if missing or older than max_age
+        """
+        payload = self._get("establishments", "siret", siret, max_age)
+        return Etablissement.from_dict(payload) if payload is not None else None
+
+    def etablissements_of(self, siren: str) -> list[Etablissement]:
+        """Every stored establishment of a legal unit, by SIRET."""
+        rows = self._connection.execute(
+            "SELECT payload FROM establishments WHERE siren = ? ORDER BY siret",
+            (siren,),
+        ).fetchall()
+        return [Etablissement.from_dict(json.loads(row[0])) for row in rows]
+
+    def sirets_in_commune(self, code_commune: str) -> list[str]:
+        """SIRETs of the stored establishments located in a commune."""
+        rows = self._connection.execute(
+            "SELECT siret FROM addresses WHERE code_commune = ? ORDER BY siret",
+            (code_commune,),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def sirens(self) -> Iterator[str]:
+        """Every distinct SIREN of the stored legal units and establishments."""
+        cursor = self._connection.execute(
+            "SELECT siren FROM legal_units UNION SELECT siren FROM establishments"
+        )
+        for row in cursor:
+            yield row[0]
+
+    def siren_count(self) -> int:
+        """Number of distinct SIRENs returned by sirens()."""
+        row = self._connection.execute(
+            "SELECT COUNT(*) FROM "
+            "(SELECT siren FROM legal_units UNION SELECT siren FROM establishments)"
+        ).fetchone()
+        return int(row[0])
+
+    def put_search(
+        self, key: str, response: dict[str, Any], fetched_at: float | None = None
+    ) -> None:
+        """Store a multi-criteria search response under its request key."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (
+                    key,
+                    json.dumps(response, default=str),
+                    time.time() if fetched_at is None else fetched_at,
+                ),
+            )
+
+    def get_search(
+        self, key: str, max_age: float | None = None
+    ) -> dict[str, Any] | None:
+        """Get a stored search response, or None if missing or too old."""
+        return self._get("searches", "key", key, max_age, column="response")
+
+    def prune_searches(self, max_age: float) -> int:
+        """
+        Delete the search responses older than max_age.
+
+        Unlike documents, which a newer fetch of the same identifier replaces,
+        each distinct search keeps its own row, so expired ones are deleted.
+
+        Args:
+            max_age: Maximum age in seconds
+
+        Returns:
+            Number of deleted responses
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM searches WHERE fetched_at < ?", (time.time() - max_age,)
+            )
+        return cursor.rowcount
+
+    def _get(
+        self,
+        table: str,
+        key_column: str,
+        key: str,
+        max_age: float | None,
+        column: str = "payload",
+    ) -> dict[str, Any] | None:
+        """Decode a stored document if it is fresh enough."""
+        row = self._connection.execute(
+            f"SELECT {column}, fetched_at FROM {table} WHERE {key_column} = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and time.time() - row[1] > max_age:
+            return None
+        document: dict[str, Any] = json.loads(row[0])
+        return document
+
+    # LocalStore protocol, so that a SyncEngine can maintain the mirror
+
+    def payload_hash(self, entity_type: str, external_id: str) -> str | None:
+        if entity_type == "legal_unit":
+            query = "SELECT payload_hash FROM legal_units WHERE siren = ?"
+        else:
+            query = "SELECT payload_hash FROM establishments WHERE siret = ?"
+        row = self._connection.execute(query, (external_id,)).fetchone()
+        return row[0] if row else None
+
+    def upsert(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        # Activity classifications are derived data, not mirrored documents
+        if isinstance(bundle, CompanyBundle) and bundle.registry_record is not None:
+            self.put_unite_legale(bundle.registry_record.payload)
+        elif isinstance(bundle, FacilityBundle):
+            self.put_etablissement(bundle.registry_record.payload)
+
+    def watermark(self, collection: str) -> datetime | None:
+        row = self._connection.execute(
+            "SELECT value FROM watermarks WHERE collection = ?", (collection,)
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_watermark(self, collection: str, value: datetime) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?)",
+                (collection, value.isoformat()),
+            )
+
+
+class MirroredSireneClient:
+    """Read-through SQLiteMirror in front of the generated lookup and search calls."""
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        mirror: SQLiteMirror,
+        *,
+        legal_unit_ttl: float | None = 86400.0,
+        establishment_ttl: float | None = 86400.0,
+        search_ttl: float | None = 3600.0,
+        not_found_ttl: float | None = 3600.0,
+        known_sirens: BloomFilter | None = None,
+    ) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if mirror is None:
+            raise TypeError("mirror cannot be None")
+        self.client = client
+        self.mirror = mirror
+        self.legal_unit_ttl = legal_unit_ttl
+        self.establishment_ttl = establishment_ttl
+        self.search_ttl = search_ttl
+        # Identifiers the API answered 404 for, answered locally for not_found_ttl
+        self.not_found = NegativeCache(not_found_ttl)
+        self.known_sirens = known_sirens
+        self.hits = 0
+        self.misses = 0
+
+    async def find_by_siren(
+        self,
+        siren: str,
+        *,
+        date: Unset | str = UNSET,
+        champs: Unset | str = UNSET,
+        masquer_valeurs_nulles: Unset | bool = UNSET,
+    ) -> Any:
+        """
+        Drop-in for find_by_siren.asyncio, answered from the mirror when fresh.
+
+        Calls with date, champs or masquerValeursNulles change the document
+        and always go to the API. SIRENs recently reported missing, or absent
+        from known_sirens, get a 404 ReponseErreur without any request.
+        """
+        plain = isinstance(date, Unset) and isinstance(champs, Unset)
+        if plain and isinstance(masquer_valeurs_nulles, Unset):
+            if self._known_missing(siren, siren):
+                return _not_found("siren", siren)
+            unite_legale = self.mirror.get_unite_legale(siren, self.legal_unit_ttl)
+            if unite_legale is not None:
+                self.hits += 1
+                return ReponseUniteLegale(
+                    header=Header(statut=200, message="OK"), unite_legale=unite_legale
+                )
+            self.misses += 1
+
+        detailed = await find_by_siren(
+            siren,
+            client=self.client,
+            date=date,
+            champs=champs,
+            masquer_valeurs_nulles=masquer_valeurs_nulles,
+        )
+        response = detailed.parsed
+        if plain and detailed.status_code == 404:
+            self.not_found.add(siren)
+        elif (
+            plain
+            and isinstance(response, ReponseUniteLegale)
+            and isinstance(response.unite_legale, UniteLegale)
+        ):
+            self.mirror.put_unite_legale(response.unite_legale.to_dict())
+        return response
+
+    async def find_by_siret(
+        self,
+        siret: str,
+        *,
+        date: Unset | str = UNSET,
+        champs: Unset | str = UNSET,
+        masquer_valeurs_nulles: Unset | str = UNSET,
+    ) -> Any:
+        """
+        Drop-in for find_by_siret.asyncio, answered from the mirror when fresh.
+
+        Calls with date, champs or masquerValeursNulles change the document
+        and always go to the API. SIRETs recently reported missing, or whose
+        SIREN is absent from known_sirens, get a 404 ReponseErreur without any
+        request.
+        """
+        plain = isinstance(date, Unset) and isinstance(champs, Unset)
+        if plain and isinstance(masquer_valeurs_nulles, Unset):
+            if self._known_missing(siret, siret[:9]):
+                return _not_found("siret", siret)
+            etablissement = self.mirror.get_etablissement(siret, self.establishment_ttl)
+            if etablissement is not None:
+                self.hits += 1
+                return ReponseEtablissement(
+                    header=Header(statut=200, message="OK"), etablissement=etablissement
+                )
+            self.misses += 1
+
+        detailed = await find_by_siret(
+            siret,
+            client=self.client,
+            date=date,
+            champs=champs,
+            masquer_valeurs_nulles=masquer_valeurs_nulles,
+        )
+        response = detailed.parsed
+        if plain and detailed.status_code == 404:
+            self.not_found.add(siret)
+        elif (
+            plain
+            and isinstance(response, ReponseEtablissement)
+            and isinstance(response.etablissement, Etablissement)
+        ):
+            self.mirror.put_etablissement(response.etablissement.to_dict())
+        return response
+
+    def _put_search(self, key: str, document: dict[str, Any]) -> None:
+        """Store a search response and delete those older than search_ttl."""
+        if self.search_ttl is not None:
+            self.mirror.prune_searches(self.search_ttl)
+        self.mirror.put_search(key, document)
+
+    def _known_missing(self, identifier: str, siren: str) -> bool:
+        """Whether an identifier is known not to exist without asking the API."""
+        if identifier in self.not_found or (
+            self.known_sirens is not None and siren not in self.known_sirens
+        ):
+            self.hits += 1
+            return True
+        return False
+
+    async def find_by_post_etablissement(
+        self, body: EtablissementPostMultiCriteres
+    ) -> Any:
+        """
+        Drop-in for find_by_post_etablissement.asyncio.
+
+        Responses are cached by request body for search_ttl, expired ones
+        being deleted when a new one is stored, and every returned
+        establishment is written to the mirror.
+        """
+        key = "siret:" + json.dumps(body.to_dict(), sort_keys=True, default=str)
+        cached = self.mirror.get_search(key, self.search_ttl)
+        if cached is not None:
+            self.hits += 1
+            return ReponseEtablissements.from_dict(cached)
+        self.misses += 1
+
+        response = await find_by_post_etablissement(client=self.client, body=body)
+        if isinstance(response, ReponseEtablissements):
+            document = response.to_dict()
+            self._put_search(key, document)
+            if _full_documents(body):
+                for etablissement in document.get("etablissements") or []:
+                    self.mirror.put_etablissement(etablissement)
+        return response
+
+    async def find_by_post_unite_legale(
+        self, body: UniteLegalePostMultiCriteres
+    ) -> Any:
+        """
+        Drop-in for find_by_post_unite_legale.asyncio.
+
+        Responses are cached by request body for search_ttl, expired ones
+        being deleted when a new one is stored, and every returned legal
+        unit is written to the mirror.
+        """
+        key = "siren:" + json.dumps(body.to_dict(), sort_keys=True, default=str)
+        cached = self.mirror.get_search(key, self.search_ttl)
+        if cached is not None:
+            self.hits += 1
+            return ReponseUnitesLegales.from_dict(cached)
+        self.misses += 1
+
+        response = await find_by_post_unite_legale(client=self.client, body=body)
+        if isinstance(response, ReponseUnitesLegales):
+            document = response.to_dict()
+            self._put_search(key, document)
+            if _full_documents(body):
+                for unite_legale in document.get("unitesLegales") or []:
+                    self.mirror.put_unite_legale(unite_legale)
+        return response
+
+
+def _not_found(kind: str, identifier: str) -> ReponseErreur:
+    """The error response SIRENE returns for an unknown identifier."""
+    return ReponseErreur(
+        header=Header(
+            statut=404, message=f"Aucun élément trouvé pour le {kind} {identifier}"
+        )
+    )
+
+
+def _full_documents(
+    body: EtablissementPostMultiCriteres | UniteLegalePostMultiCriteres,
+) -> bool:
+    """Whether a search returns complete current documents (no champs or date)."""
+    return not (body.champs or body.date or body.masquer_valeurs_nulles)
@@ -8,13 +8,18 @@ and provide type-safe, validated data for Django ingestion.
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import TYPE_CHECKING, Any
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Self
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
     from pathlib import Path
 
+    from .temporal import PeriodIndex
+
 
 class CompanyIdentifierData(BaseModel):
     """Company identifier data (SIREN, VAT, etc.)."""
@@ -55,9 +60,16 @@ class ActivityClassificationData(BaseModel):
 
 
 class AddressData(BaseModel):
-    """Address data with WGS84 coordinates and explicit facility link."""
+    """
+    Address data with WGS84 coordinates and explicit facility link.
+
+    An interned address (see FacilityAddressLinkData) is shared by facilities
+    and belongs to none of them: its facility_siret and start are None.
+    """
 
-    facility_siret: str = Field(..., description="SIRET of associated facility")
+    facility_siret: str | None = Field(
+        ..., description="SIRET of associated facility, None when interned"
+    )
     country: str = Field(..., description="ISO 3166-1 alpha-2 country code")
     administrative_area: str | None = Field(None, description="State, province, region")
     locality: str | None = Field(None, description="City or municipality")
@@ -69,8 +81,13 @@ class AddressData(BaseModel):
     geocode_precision: str = Field(
         default="approximate", description="Geocoding precision"
     )
-    start: date = Field(..., description="Address validity start date")
+    start: date | None = Field(
+        ..., description="Address validity start date, None when interned"
+    )
     end: date | None = Field(None, description="Address validity end date")
+    address_key: str | None = Field(
+        None, description="Canonical key shared by facilities at the same address"
+    )
 
     @field_validator("longitude", "latitude")
     @classmethod
@@ -92,6 +109,15 @@ class AddressData(BaseModel):
         return self
 
 
+class FacilityAddressLinkData(BaseModel):
+    """Link between a facility and an interned address."""
+
+    facility_siret: str = Field(..., description="SIRET of the facility")
+    address_key: str = Field(..., description="Canonical key of the address")
+    start: date | None = Field(..., description="Link validity start date")
+    end: date | None = Field(None, description="Link validity end date")
+
+
 class CompanyLegalUnitPeriodData(BaseModel):
     """Time-framed company legal unit data."""
 
@@ -127,6 +153,7 @@ class FacilityEstablishmentPeriodData(BaseModel):
     )
     is_hq: bool = Field(default=False, description="Whether this is headquarters")
     opening_date: date | None = Field(None, description="Establishment opening date")
+    facility_siret: str | None = Field(None, description="SIRET of the facility")
 
 
 class FacilityOwnershipData(BaseModel):
@@ -192,6 +219,70 @@ class FacilityData(BaseModel):
     period_count: int | None = Field(None, description="Number of temporal periods")
 
 
+class CompanyBundle(BaseModel):
+    """Company-level data emitted first by the streaming ETL."""
+
+    company: CompanyData = Field(..., description="Main company data")
+    legal_unit_periods: list[CompanyLegalUnitPeriodData] = Field(default_factory=list)
+    registry_record: ExternalRegistryRecordData | None = Field(
+        None, description="Registry record for the legal unit"
+    )
+
+
+def hash_payload(payload: dict[str, Any]) -> str:
+    """
+    SHA-256 of a registry payload, as stored in ExternalRegistryRecordData.
+
+    Keys are sorted so equal payloads hash equally whatever their key order.
+    """
+    payload_str = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(payload_str.encode()).hexdigest()
+
+
+def company_siren(company: CompanyData) -> str:
+    """SIREN of a company, from its identifiers."""
+    for identifier in company.identifiers:
+        if identifier.scheme == "siren":
+            return identifier.value
+    return ""
+
+
+def facility_siret(facility: FacilityData) -> str:
+    """SIRET of a facility, from its identifiers or its SIREN and NIC."""
+    for identifier in facility.identifiers:
+        if identifier.scheme == "siret":
+            return identifier.value
+    return f"{facility.parent_siren}{facility.nic or ''}"
+
+
+class FacilityBundle(BaseModel):
+    """Everything derived from a single facility, emitted by the streaming ETL."""
+
+    facility: FacilityData = Field(..., description="Facility data")
+    establishment_periods: list[FacilityEstablishmentPeriodData] = Field(
+        default_factory=list
+    )
+    address: AddressData | None = Field(None, description="Facility address")
+    address_link: FacilityAddressLinkData | None = Field(
+        None, description="Link to the interned address, with intern_addresses"
+    )
+    ownership: FacilityOwnershipData = Field(
+        ..., description="Company-facility ownership relationship"
+    )
+    registry_record: ExternalRegistryRecordData = Field(
+        ..., description="Registry record for the establishment"
+    )
+
+
+class ActivityClassificationBundle(BaseModel):
+    """Closing data emitted last by the streaming ETL."""
+
+    activity_classifications: list[ActivityClassificationData] = Field(
+        default_factory=list
+    )
+    extraction_metadata: dict[str, Any] = Field(default_factory=dict)
+
+
 class SIRENExtractResult(BaseModel):
     """Complete SIREN extraction result."""
 
@@ -202,6 +293,7 @@ class SIRENExtractResult(BaseModel):
         default_factory=list
     )
     addresses: list[AddressData] = Field(default_factory=list)
+    address_links: list[FacilityAddressLinkData] = Field(default_factory=list)
     activity_classifications: list[ActivityClassificationData] = Field(
         default_factory=list
     )
@@ -209,6 +301,115 @@ class SIRENExtractResult(BaseModel):
     registry_records: list[ExternalRegistryRecordData] = Field(default_factory=list)
     extraction_metadata: dict[str, Any] = Field(default_factory=dict)
 
+    # Lazily built indexes by name, with the lists and lengths they were built from
+    _indexes: dict[str, tuple[tuple[list[Any], ...], tuple[int, ...], Any]] = (
+        PrivateAttr(default_factory=dict)
+    )
+
+    def _index[T](
+        self, name: str, sources: tuple[list[Any], ...], build: Callable[[], T]
+    ) -> T:
+        """
+        Build an index on first use and reuse it afterwards.
+
+        The index is rebuilt only if one of its source lists was replaced or
+        resized, e.g. by model_copy(update=...) or append().
+        """
+        lengths = tuple(len(source) for source in sources)
+        cached = self._indexes.get(name)
+        if (
+            cached is not None
+            and cached[1] == lengths
+            and all(a is b for a, b in zip(cached[0], sources, strict=True))
+        ):
+            index: T = cached[2]
+            return index
+        index = build()
+        self._indexes[name] = (sources, lengths, index)
+        return index
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = None, deep: bool = False
+    ) -> Self:
+        """Copy the result; the copy builds its own indexes."""
+        copy = super().model_copy(update=update, deep=deep)
+        copy._indexes = {}
+        return copy
+
+    @property
+    def facilities_by_siret(self) -> dict[str, FacilityData]:
+        """Facilities by SIRET."""
+        return self._index(
+            "facilities",
+            (self.facilities,),
+            lambda: {facility_siret(f): f for f in self.facilities},
+        )
+
+    @property
+    def addresses_by_siret(self) -> dict[str, AddressData]:
+        """Facility addresses by SIRET, resolving interned address links."""
+
+        def build() -> dict[str, AddressData]:
+            by_siret = {
+                address.facility_siret: address
+                for address in self.addresses
+                if address.facility_siret is not None
+            }
+            if self.address_links:
+                by_key = {
+                    address.address_key: address
+                    for address in self.addresses
+                    if address.address_key is not None
+                }
+                for link in self.address_links:
+                    if link.address_key in by_key:
+                        by_siret[link.facility_siret] = by_key[link.address_key]
+            return by_siret
+
+        return self._index("addresses", (self.addresses, self.address_links), build)
+
+    @property
+    def periods_by_siret(self) -> dict[str, list[FacilityEstablishmentPeriodData]]:
+        """Establishment periods by SIRET, in result order."""
+
+        def build() -> dict[str, list[FacilityEstablishmentPeriodData]]:
+            by_siret: dict[str, list[FacilityEstablishmentPeriodData]] = {}
+            for period in self.establishment_periods:
+                if period.facility_siret is not None:
+                    by_siret.setdefault(period.facility_siret, []).append(period)
+            return by_siret
+
+        return self._index("periods", (self.establishment_periods,), build)
+
+    @property
+    def ownerships_by_siret(self) -> dict[str, FacilityOwnershipData]:
+        """Facility ownerships by SIRET."""
+        return self._index(
+            "ownerships",
+            (self.facility_ownerships,),
+            lambda: {o.facility_siret: o for o in self.facility_ownerships},
+        )
+
+    @property
+    def headquarters(self) -> FacilityData | None:
+        """Headquarters facility, None if it is not part of the result."""
+        return self._index(
+            "headquarters",
+            (self.facilities,),
+            lambda: next((f for f in self.facilities if f.is_headquarters), None),
+        )
+
+    @property
+    def period_index(self) -> PeriodIndex:
+        """As-of index over the legal unit and establishment periods."""
+        from .temporal import PeriodIndex
+
+        return self._index(
+            "period_index",
+            (self.legal_unit_periods, self.establishment_periods),
+            lambda: PeriodIndex.from_result(self),
+        )
+
     def export_to_json(self, output_path: Path) -> None:
         """
         Export the extraction result to a JSON file.
@@ -225,6 +426,27 @@ class SIRENExtractResult(BaseModel):
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False, default=str)
 
+    def export_to_ndjson(
+        self, output_path: Path, compression: str | None = None
+    ) -> int:
+        """
+        Export the extraction result as one NDJSON record per entity.
+
+        Unlike export_to_json(), records are serialized one at a time.
+
+        Args:
+            output_path: Path to the output file
+            compression: "gzip", "zstd" or None; by default taken from the
+                file suffix (.gz or .zst)
+
+        Returns:
+            Number of records written
+        """
+        from .export import NDJSONWriter
+
+        with NDJSONWriter(output_path, compression=compression) as writer:
+            return writer.write_result(self)
+
     def generate_summary(self, output_path: Path) -> None:
         """
         Generate a human-readable summary of the extraction result.
@@ -0,0 +1,555 @@
+"""
+Process-wide NAF nomenclature registry for the SIREN ETL service.
+
+SIRENE only returns activity codes (e.g. "62.01Z") with the name of their
+nomenclature. NAFRegistry resolves them offline: it derives the
+section/division/group/class hierarchy of NAF rev1, NAF rev2 and NAFA codes
+from their structure, and holds a bundled index of the labels of every NAF
+rev2 code and of the NAF rev1 sections and divisions. The labels of finer NAF
+rev1 levels and of NAFA codes are loaded from the INSEE nomenclature files;
+those codes stay unlabelled until then. It also keeps one shared
+ActivityClassificationData per code, so transformers of a process stop
+re-creating the same objects.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+import csv
+from dataclasses import dataclass
+from datetime import date
+import logging
+from pathlib import Path
+import re
+import threading
+from typing import TYPE_CHECKING
+
+from .models import ActivityClassificationData
+from .naf_labels import NAF_REV2_LABELS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+NAF_REV1 = "naf_rev1"
+NAF_REV2 = "naf_rev2"
+NAFA = "nafa"
+
+SECTION = "section"
+DIVISION = "division"
+GROUP = "group"
+CLASS = "class"
+SUBCLASS = "subclass"
+LEVELS = (SECTION, DIVISION, GROUP, CLASS, SUBCLASS)
+
+# Nomenclatures sharing the NAF rev1 structure (NAF 1993 was revised into it)
+_REV1_SCHEMES = frozenset({NAF_REV1, "naf1993"})
+
+# Start dates of the nomenclatures, used for ActivityClassificationData.start
+_SCHEME_START = {
+    "naf1993": date(1993, 1, 1),
+    NAF_REV1: date(2003, 1, 1),
+    NAF_REV2: date(2008, 1, 1),
+    NAFA: date(2008, 1, 1),
+}
+
+# "62", "62.0", "62.01", "62.01Z" (rev2), "74.1A" (rev1), "10.71BA" (NAFA)
+_CODE_PATTERN = re.compile(r"^(\d{2})(?:\.?(\d)(\d)?([A-Z]{1,2})?)?$")
+
+# First division of each NAF rev2 section, with the section label
+_NAF_REV2_SECTIONS = (
+    ("A", 1, "Agriculture, sylviculture et pêche"),
+    ("B", 5, "Industries extractives"),
+    ("C", 10, "Industrie manufacturière"),
+    (
+        "D",
+        35,
+        "Production et distribution d'électricité, de gaz, de vapeur et d'air "
+        "conditionné",
+    ),
+    (
+        "E",
+        36,
+        "Production et distribution d'eau ; assainissement, gestion des déchets "
+        "et dépollution",
+    ),
+    ("F", 41, "Construction"),
+    ("G", 45, "Commerce ; réparation d'automobiles et de motocycles"),
+    ("H", 49, "Transports et entreposage"),
+    ("I", 55, "Hébergement et restauration"),
+    ("J", 58, "Information et communication"),
+    ("K", 64, "Activités financières et d'assurance"),
+    ("L", 68, "Activités immobilières"),
+    ("M", 69, "Activités spécialisées, scientifiques et techniques"),
+    ("N", 77, "Activités de services administratifs et de soutien"),
+    ("O", 84, "Administration publique"),
+    ("P", 85, "Enseignement"),
+    ("Q", 86, "Santé humaine et action sociale"),
+    ("R", 90, "Arts, spectacles et activités récréatives"),
+    ("S", 94, "Autres activités de services"),
+    (
+        "T",
+        97,
+        "Activités des ménages en tant qu'employeurs ; activités indifférenciées "
+        "des ménages en tant que producteurs de biens et services pour usage "
+        "propre",
+    ),
+    ("U", 99, "Activités extra-territoriales"),
+)
+
+# First division of each NAF rev1 section, with the section label
+_NAF_REV1_SECTIONS = (
+    ("A", 1, "Agriculture, chasse, sylviculture"),
+    ("B", 5, "Pêche, aquaculture"),
+    ("C", 10, "Industries extractives"),
+    ("D", 15, "Industrie manufacturière"),
+    ("E", 40, "Production et distribution d'électricité, de gaz et d'eau"),
+    ("F", 45, "Construction"),
+    ("G", 50, "Commerce ; réparations automobile et d'articles domestiques"),
+    ("H", 55, "Hôtels et restaurants"),
+    ("I", 60, "Transports et communications"),
+    ("J", 65, "Activités financières"),
+    ("K", 70, "Immobilier, location et services aux entreprises"),
+    ("L", 75, "Administration publique"),
+    ("M", 80, "Éducation"),
+    ("N", 85, "Santé et action sociale"),
+    ("O", 90, "Services collectifs, sociaux et personnels"),
+    ("P", 95, "Activités des ménages"),
+    ("Q", 99, "Activités extra-territoriales"),
+)
+
+_NAF_REV2_DIVISIONS = {
+    "01": "Culture et production animale, chasse et services annexes",
+    "02": "Sylviculture et exploitation forestière",
+    "03": "Pêche et aquaculture",
+    "05": "Extraction de houille et de lignite",
+    "06": "Extraction d'hydrocarbures",
+    "07": "Extraction de minerais métalliques",
+    "08": "Autres industries extractives",
+    "09": "Services de soutien aux industries extractives",
+    "10": "Industries alimentaires",
+    "11": "Fabrication de boissons",
+    "12": "Fabrication de produits à base de tabac",
+    "13": "Fabrication de textiles",
+    "14": "Industrie de l'habillement",
+    "15": "Industrie du cuir et de la chaussure",
+    "16": "Travail du bois et fabrication d'articles en bois et en liège, à "
+    "l'exception des meubles ; fabrication d'articles en vannerie et sparterie",
+    "17": "Industrie du papier et du carton",
+    "18": "Imprimerie et reproduction d'enregistrements",
+    "19": "Cokéfaction et raffinage",
+    "20": "Industrie chimique",
+    "21": "Industrie pharmaceutique",
+    "22": "Fabrication de produits en caoutchouc et en plastique",
+    "23": "Fabrication d'autres produits minéraux non métalliques",
+    "24": "Métallurgie",
+    "25": "Fabrication de produits métalliques, à l'exception des machines et "
+    "des équipements",
+    "26": "Fabrication de produits informatiques, électroniques et optiques",
+    "27": "Fabrication d'équipements électriques",
+    "28": "Fabrication de machines et équipements n.c.a.",
+    "29": "Industrie automobile",
+    "30": "Fabrication d'autres matériels de transport",
+    "31": "Fabrication de meubles",
+    "32": "Autres industries manufacturières",
+    "33": "Réparation et installation de machines et d'équipements",
+    "35": "Production et distribution d'électricité, de gaz, de vapeur et d'air "
+    "conditionné",
+    "36": "Captage, traitement et distribution d'eau",
+    "37": "Collecte et traitement des eaux usées",
+    "38": "Collecte, traitement et élimination des déchets ; récupération",
+    "39": "Dépollution et autres services de gestion des déchets",
+    "41": "Construction de bâtiments",
+    "42": "Génie civil",
+    "43": "Travaux de construction spécialisés",
+    "45": "Commerce et réparation d'automobiles et de motocycles",
+    "46": "Commerce de gros, à l'exception des automobiles et des motocycles",
+    "47": "Commerce de détail, à l'exception des automobiles et des motocycles",
+    "49": "Transports terrestres et transport par conduites",
+    "50": "Transports par eau",
+    "51": "Transports aériens",
+    "52": "Entreposage et services auxiliaires des transports",
+    "53": "Activités de poste et de courrier",
+    "55": "Hébergement",
+    "56": "Restauration",
+    "58": "Édition",
+    "59": "Production de films cinématographiques, de vidéo et de programmes "
+    "de télévision ; enregistrement sonore et édition musicale",
+    "60": "Programmation et diffusion",
+    "61": "Télécommunications",
+    "62": "Programmation, conseil et autres activités informatiques",
+    "63": "Services d'information",
+    "64": "Activités des services financiers, hors assurance et caisses de retraite",
+    "65": "Assurance",
+    "66": "Activités auxiliaires de services financiers et d'assurance",
+    "68": "Activités immobilières",
+    "69": "Activités juridiques et comptables",
+    "70": "Activités des sièges sociaux ; conseil de gestion",
+    "71": "Activités d'architecture et d'ingénierie ; activités de contrôle et "
+    "analyses techniques",
+    "72": "Recherche-développement scientifique",
+    "73": "Publicité et études de marché",
+    "74": "Autres activités spécialisées, scientifiques et techniques",
+    "75": "Activités vétérinaires",
+    "77": "Activités de location et location-bail",
+    "78": "Activités liées à l'emploi",
+    "79": "Activités des agences de voyage, voyagistes, services de réservation "
+    "et activités connexes",
+    "80": "Enquêtes et sécurité",
+    "81": "Services relatifs aux bâtiments et aménagement paysager",
+    "82": "Activités administratives et autres activités de soutien aux entreprises",
+    "84": "Administration publique et défense ; sécurité sociale obligatoire",
+    "85": "Enseignement",
+    "86": "Activités pour la santé humaine",
+    "87": "Hébergement médico-social et social",
+    "88": "Action sociale sans hébergement",
+    "90": "Activités créatives, artistiques et de spectacle",
+    "91": "Bibliothèques, archives, musées et autres activités culturelles",
+    "92": "Organisation de jeux de hasard et d'argent",
+    "93": "Activités sportives, récréatives et de loisirs",
+    "94": "Activités des organisations associatives",
+    "95": "Réparation d'ordinateurs et de biens personnels et domestiques",
+    "96": "Autres services personnels",
+    "97": "Activités des ménages en tant qu'employeurs de personnel domestique",
+    "98": "Activités indifférenciées des ménages en tant que producteurs de "
+    "biens et services pour usage propre",
+    "99": "Activités des organisations et organismes extraterritoriaux",
+}
+
+_NAF_REV1_DIVISIONS = {
+    "01": "Agriculture, chasse, services annexes",
+    "02": "Sylviculture, exploitation forestière, services annexes",
+    "05": "Pêche, aquaculture, services annexes",
+    "10": "Extraction de houille, de lignite et de tourbe",
+    "11": "Extraction d'hydrocarbures ; services annexes",
+    "12": "Extraction de minerais d'uranium",
+    "13": "Extraction de minerais métalliques",
+    "14": "Autres industries extractives",
+    "15": "Industries alimentaires",
+    "16": "Industrie du tabac",
+    "17": "Industrie textile",
+    "18": "Industrie de l'habillement et des fourrures",
+    "19": "Industrie du cuir et de la chaussure",
+    "20": "Travail du bois et fabrication d'articles en bois",
+    "21": "Industrie du papier et du carton",
+    "22": "Édition, imprimerie, reproduction",
+    "23": "Cokéfaction, raffinage, industries nucléaires",
+    "24": "Industrie chimique",
+    "25": "Industrie du caoutchouc et des plastiques",
+    "26": "Fabrication d'autres produits minéraux non métalliques",
+    "27": "Métallurgie",
+    "28": "Travail des métaux",
+    "29": "Fabrication de machines et équipements",
+    "30": "Fabrication de machines de bureau et de matériel informatique",
+    "31": "Fabrication de machines et appareils électriques",
+    "32": "Fabrication d'équipements de radio, télévision et communication",
+    "33": "Fabrication d'instruments médicaux, de précision, d'optique et d'horlogerie",
+    "34": "Industrie automobile",
+    "35": "Fabrication d'autres matériels de transport",
+    "36": "Fabrication de meubles ; industries diverses",
+    "37": "Récupération",
+    "40": "Production et distribution d'électricité, de gaz et de chaleur",
+    "41": "Captage, traitement et distribution d'eau",
+    "45": "Construction",
+    "50": "Commerce et réparation automobile",
+    "51": "Commerce de gros et intermédiaires du commerce",
+    "52": "Commerce de détail et réparation d'articles domestiques",
+    "55": "Hôtels et restaurants",
+    "60": "Transports terrestres",
+    "61": "Transports par eau",
+    "62": "Transports aériens",
+    "63": "Services auxiliaires des transports",
+    "64": "Postes et télécommunications",
+    "65": "Intermédiation financière",
+    "66": "Assurance",
+    "67": "Auxiliaires financiers et d'assurance",
+    "70": "Activités immobilières",
+    "71": "Location sans opérateur",
+    "72": "Activités informatiques",
+    "73": "Recherche et développement",
+    "74": "Services fournis principalement aux entreprises",
+    "75": "Administration publique",
+    "80": "Éducation",
+    "85": "Santé et action sociale",
+    "90": "Assainissement, voirie et gestion des déchets",
+    "91": "Activités associatives",
+    "92": "Activités récréatives, culturelles et sportives",
+    "93": "Services personnels",
+    "95": "Activités des ménages en tant qu'employeurs de personnel domestique",
+    "96": "Activités des ménages en tant que producteurs de biens pour usage propre",
+    "97": "Activités des ménages en tant que producteurs de services pour usage propre",
+    "99": "Activités extra-territoriales",
+}
+
+
+def normalize_scheme(scheme: str) -> str:
+    """Normalize a SIRENE nomenclature name, e.g. "NAFRev2" to "naf_rev2"."""
+    scheme = scheme.lower().replace(" ", "_")
+    if "_rev" in scheme:
+        return scheme
+    return scheme.replace("rev", "_rev")
+
+
+def normalize_code(code: str) -> str:
+    """Normalize an activity code, e.g. "6201z" to "62.01Z"."""
+    code = code.strip().upper()
+    if len(code) > 2 and "." not in code and code[:2].isdigit():
+        return f"{code[:2]}.{code[2:]}"
+    return code
+
+
+@dataclass(frozen=True)
+class NomenclatureEntry:
+    """One level of the hierarchy of an activity code."""
+
+    level: str
+    code: str
+    label: str | None
+
+
+class NAFRegistry:
+    """
+    Thread-safe index of NAF codes, labels and hierarchy.
+
+    Use get_naf_registry() for the process-wide instance preloaded with the
+    bundled index; other instances start empty.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._labels: dict[tuple[str, str], str] = {}
+        self._classifications: dict[str, ActivityClassificationData] = {}
+        self._section_bounds: dict[str, list[tuple[int, str]]] = {}
+
+    def load_bundled(self) -> None:
+        """
+        Load the bundled labels.
+
+        They cover every NAF rev2 code, and the sections and divisions of NAF
+        rev1.
+        """
+        with self._lock:
+            for scheme, sections, divisions in (
+                (NAF_REV2, _NAF_REV2_SECTIONS, _NAF_REV2_DIVISIONS),
+                (NAF_REV1, _NAF_REV1_SECTIONS, _NAF_REV1_DIVISIONS),
+            ):
+                self._section_bounds[scheme] = [
+                    (first_division, letter) for letter, first_division, _ in sections
+                ]
+                for letter, _, label in sections:
+                    self._labels[(scheme, letter)] = label
+                for division, label in divisions.items():
+                    self._labels[(scheme, division)] = label
+            for code, label in NAF_REV2_LABELS.items():
+                self._labels[(NAF_REV2, code)] = label
+            self._classifications.clear()
+
+    def add_label(self, code: str, label: str, scheme: str = NAF_REV2) -> None:
+        """Register the label of a code of any level."""
+        with self._lock:
+            self._labels[(self._index_scheme(scheme), normalize_code(code))] = label
+            self._classifications.clear()
+
+    def load_nomenclature(self, path: str | Path, scheme: str = NAF_REV2) -> int:
+        """
+        Load labels from an INSEE nomenclature file.
+
+        The file is a CSV export of an INSEE list (e.g. the NAF rev2 sub-class
+        list, or the NAFA list) with the code in the first column and the
+        label in the second; the delimiter is detected. Rows whose first cell
+        is not a code, such as headers, are skipped. Shared classifications
+        created before are dropped, so that later lookups get the new labels.
+
+        Args:
+            path: CSV file to read
+            scheme: Nomenclature of the codes
+
+        Returns:
+            Number of labels loaded
+        """
+        text = Path(path).read_text(encoding="utf-8-sig")
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=";,\t")
+        labels: dict[tuple[str, str], str] = {}
+        index_scheme = self._index_scheme(scheme)
+        for row in csv.reader(text.splitlines(), dialect):
+            if len(row) < 2:
+                continue
+            code = normalize_code(row[0])
+            if not (code.isalpha() and len(code) == 1) and not _CODE_PATTERN.match(
+                code
+            ):
+                continue
+            labels[(index_scheme, code)] = row[1].strip()
+        with self._lock:
+            self._labels.update(labels)
+            self._classifications.clear()
+        logger.info(f"Loaded {len(labels)} {scheme} labels from {path}")
+        return len(labels)
+
+    def hierarchy(self, code: str, scheme: str = NAF_REV2) -> list[NomenclatureEntry]:
+        """
+        Resolve the hierarchy of an activity code, from section down to it.
+
+        NAF rev2 codes have the levels section, division ("62"), group
+        ("62.0"), class ("62.01") and sub-class ("62.01Z"). NAF rev1 codes
+        ("74.1A") have no class level. NAFA codes ("10.71BA") extend a NAF
+        rev2 sub-class, whose hierarchy they share.
+
+        Args:
+            code: Activity code, with or without the dot
+            scheme: Nomenclature, raw ("NAFRev2") or normalized ("naf_rev2")
+
+        Returns:
+            Entries from the broadest level to the code itself, empty if the
+            code is not a NAF code
+        """
+        scheme = normalize_scheme(scheme)
+        code = normalize_code(code)
+        match = _CODE_PATTERN.match(code)
+        if match is None:
+            return []
+        division, group_digit, class_digit, suffix = match.groups()
+        index_scheme = self._index_scheme(scheme)
+
+        levels: list[tuple[str, str]] = []
+        section = self._section(index_scheme, int(division))
+        if section is not None:
+            levels.append((SECTION, section))
+        levels.append((DIVISION, division))
+        if group_digit is not None:
+            levels.append((GROUP, f"{division}.{group_digit}"))
+        if class_digit is not None:
+            levels.append((CLASS, f"{division}.{group_digit}{class_digit}"))
+        if suffix is not None:
+            levels.append((SUBCLASS, code[: 6 if class_digit else 5]))
+        if scheme == NAFA and suffix is not None and len(suffix) == 2:
+            levels.append((NAFA, code))
+
+        labels = self._labels
+        return [
+            NomenclatureEntry(level, level_code, labels.get((index_scheme, level_code)))
+            for level, level_code in levels
+        ]
+
+    def rollup(self, code: str, level: str, scheme: str = NAF_REV2) -> str | None:
+        """
+        Roll an activity code up to one of its ancestors.
+
+        Args:
+            code: Activity code
+            level: Target level, one of LEVELS
+            scheme: Nomenclature of the code
+
+        Returns:
+            Ancestor code at that level, None if the code is not that deep
+
+        Raises:
+            ValueError: If level is unknown
+        """
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+        for entry in self.hierarchy(code, scheme):
+            if entry.level == level:
+                return entry.code
+        return None
+
+    def rollup_counts(
+        self, codes: Iterable[str], level: str, scheme: str = NAF_REV2
+    ) -> Counter[str]:
+        """
+        Count activity codes per ancestor, e.g. establishments per division.
+
+        Codes without an ancestor at that level are not counted.
+        """
+        counts: Counter[str] = Counter()
+        cache: dict[str, str | None] = {}
+        for code in codes:
+            if code not in cache:
+                cache[code] = self.rollup(code, level, scheme)
+            ancestor = cache[code]
+            if ancestor is not None:
+                counts[ancestor] += 1
+        return counts
+
+    def label(self, code: str, scheme: str = NAF_REV2) -> str | None:
+        """
+        Label of an activity code of any level.
+
+        Ancestor labels are not used: with the bundled index alone, NAF rev1
+        groups and sub-classes and NAFA codes are unlabelled. Use hierarchy()
+        for the labels of the ancestors.
+
+        Returns:
+            Label, None if the code is not labelled
+        """
+        return self._labels.get((self._index_scheme(scheme), normalize_code(code)))
+
+    def classification(
+        self, code: str, scheme: str, default_label: str | None = None
+    ) -> ActivityClassificationData:
+        """
+        Shared ActivityClassificationData of an activity code.
+
+        The object is created once per scheme/code pair and returned to every
+        caller afterwards, until new labels are registered.
+
+        Args:
+            code: Activity code, as returned by SIRENE
+            scheme: Nomenclature, raw ("NAFRev2") or normalized
+            default_label: Label used when the registry has none
+
+        Returns:
+            Shared ActivityClassificationData
+        """
+        normalized_scheme = normalize_scheme(scheme)
+        cache_key = f"{normalized_scheme}:{code}"
+        classification = self._classifications.get(cache_key)
+        if classification is None:
+            label = self.label(code, normalized_scheme) or default_label
+            with self._lock:
+                classification = self._classifications.get(cache_key)
+                if classification is None:
+                    classification = ActivityClassificationData(
+                        scheme=normalized_scheme,
+                        code=code,
+                        label=label or f"{scheme} {code}",
+                        start=_SCHEME_START.get(normalized_scheme, date(2008, 1, 1)),
+                        end=None,
+                    )
+                    self._classifications[cache_key] = classification
+        return classification
+
+    def _index_scheme(self, scheme: str) -> str:
+        """Scheme whose labels and sections a nomenclature uses."""
+        scheme = normalize_scheme(scheme)
+        if scheme in _REV1_SCHEMES:
+            return NAF_REV1
+        if scheme == NAFA:
+            return NAF_REV2
+        return scheme
+
+    def _section(self, index_scheme: str, division: int) -> str | None:
+        """Section letter of a division."""
+        section = None
+        for first_division, letter in self._section_bounds.get(index_scheme, ()):
+            if division < first_division:
+                break
+            section = letter
+        return section
+
+
+_registry: NAFRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_naf_registry() -> NAFRegistry:
+    """Process-wide NAFRegistry, preloaded with the bundled index."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = NAFRegistry()
+                registry.load_bundled()
+                _registry = registry
+    return _registry
@@ -0,0 +1,114 @@
+"""
+Process-pool transformation for the SIREN ETL service.
+
+Transformation is pure CPU work (model construction, coordinate conversion and
+payload hashing) and would otherwise run on the event-loop thread. This module
+ships raw facility pages to worker processes and merges their activity
+classification caches back into a single transformer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.models.etablissement import Etablissement
+
+from .transformer import SIRENTransformer
+
+if TYPE_CHECKING:
+    from .config import ETLConfig
+    from .models import ActivityClassificationData, FacilityBundle
+
+logger = logging.getLogger(__name__)
+
+
+def transform_facility_page(
+    page: bytes | dict[str, Any], config: ETLConfig
+) -> tuple[list[FacilityBundle], list[ActivityClassificationData]]:
+    """
+    Transform one raw /siret result page.
+
+    This is the worker-process entry point: it only takes picklable arguments
+    and returns the facility bundles together with the activity classifications
+    created while transforming them.
+
+    Args:
+        page: ReponseEtablissements document, as raw JSON bytes or decoded dict
+        config: ETL configuration
+
+    Returns:
+        Tuple of (facility_bundles, activity_classifications)
+    """
+    document = json.loads(page) if isinstance(page, bytes) else page
+    transformer = SIRENTransformer(config)
+    bundles = [
+        transformer.transform_facility_bundle(
+            Etablissement.from_dict(facility),
+            facility if config.raw_registry_payloads else None,
+        )
+        for facility in document.get("etablissements") or []
+    ]
+    return bundles, transformer.activity_classifications()
+
+
+class ProcessPoolTransformer:
+    """Offload per-page facility transformation to a process pool."""
+
+    def __init__(self, config: ETLConfig, max_workers: int | None = None) -> None:
+        if config is None:
+            raise TypeError("config cannot be None")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.config = config
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Main-process transformer holding the merged activity classifications
+        self.transformer = SIRENTransformer(config)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, starting it on first use."""
+        if self._executor is None:
+            logger.debug(
+                f"Starting transformation pool with {self.max_workers} workers"
+            )
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def transform_page(
+        self, page: bytes | dict[str, Any]
+    ) -> list[FacilityBundle]:
+        """
+        Transform a raw facility page in a worker process.
+
+        Activity classifications created by the worker are merged into
+        self.transformer before returning.
+
+        Args:
+            page: ReponseEtablissements document, as raw JSON bytes or decoded dict
+
+        Returns:
+            One FacilityBundle per facility of the page
+        """
+        loop = asyncio.get_running_loop()
+        bundles, classifications = await loop.run_in_executor(
+            self._get_executor(), transform_facility_page, page, self.config
+        )
+        self.transformer.merge_activity_cache(classifications)
+        return bundles
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> ProcessPoolTransformer:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
@@ -0,0 +1,416 @@
+"""
+Staged producer/consumer pipeline for the SIREN ETL service.
+
+This module runs extraction, parsing, transformation and loading as separate
+stages connected by bounded asyncio queues. A slow stage fills its input queue
+and applies backpressure to the stage before it, so HTTP fetching and database
+writes overlap instead of running one after the other.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+import inspect
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+from .config import ETLConfig
+from .exceptions import PipelineError
+from .extractor import SIRENExtractor
+from .transformer import SIRENTransformer
+from .validation import is_valid_siren
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+
+    from sirene_api_client.client import AuthenticatedClient
+
+    from .models import ActivityClassificationBundle, CompanyBundle, FacilityBundle
+    from .parallel import ProcessPoolTransformer
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a stage worker that its input is exhausted
+_DONE = object()
+
+
+@dataclass
+class StageConfig:
+    """Concurrency and buffering settings of a pipeline stage."""
+
+    concurrency: int = 1
+    """Number of workers consuming the stage input queue."""
+
+    queue_size: int = 16
+    """Maximum number of items waiting in the stage input queue."""
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if self.queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+
+
+@dataclass
+class StageMetrics:
+    """Runtime metrics of a pipeline stage."""
+
+    name: str
+    """Stage name."""
+
+    items_in: int = 0
+    """Number of items taken from the stage input queue."""
+
+    items_out: int = 0
+    """Number of items handed to the next stage."""
+
+    queue_depth: int = 0
+    """Current number of items waiting in the stage input queue."""
+
+    max_queue_depth: int = 0
+    """Highest number of items observed waiting in the stage input queue."""
+
+    busy_seconds: float = 0.0
+    """Time spent processing items, excluding time blocked on the next stage."""
+
+    blocked_seconds: float = 0.0
+    """Time spent waiting for room in the next stage input queue."""
+
+
+@dataclass
+class PipelineStage:
+    """
+    A named pipeline stage.
+
+    The stage function receives one item. A regular or async function returns a
+    single item for the next stage (returning None drops the item); an async
+    generator function may yield any number of items.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    config: StageConfig = field(default_factory=StageConfig)
+
+
+@dataclass
+class RawPayload:
+    """API document produced by the fetch stage."""
+
+    siren: str
+    kind: str
+    """Either "company" or "facilities"."""
+    payload: dict[str, Any] | bytes
+    """Decoded document, or raw JSON bytes of facility pages for a process pool."""
+
+
+@dataclass
+class ParsedPayload:
+    """API models produced by the parse stage."""
+
+    siren: str
+    kind: str
+    """Either "company" or "facilities"."""
+    entities: list[Any]
+    documents: list[dict[str, Any]] | None = None
+    """Decoded documents of the entities, kept with config.raw_registry_payloads."""
+
+
+class PipelineRunner:
+    """Run items through stages connected by bounded queues."""
+
+    def __init__(self, stages: list[PipelineStage]) -> None:
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stage names must be unique: {names}")
+        self.stages = stages
+        self.metrics = {stage.name: StageMetrics(stage.name) for stage in stages}
+
+    async def run(
+        self, source: Iterable[Any] | AsyncIterable[Any]
+    ) -> dict[str, StageMetrics]:
+        """
+        Feed every source item through the stages and wait for completion.
+
+        Items returned by the last stage are discarded: it is the sink.
+
+        Args:
+            source: Items for the first stage
+
+        Returns:
+            Metrics of every stage, keyed by stage name
+
+        Raises:
+            PipelineError: If a stage function raises; remaining work is cancelled
+        """
+        queues: list[asyncio.Queue[Any]] = [
+            asyncio.Queue(maxsize=stage.config.queue_size) for stage in self.stages
+        ]
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        tasks.extend(
+            asyncio.create_task(self._run_stage(index, queues))
+            for index in range(len(self.stages))
+        )
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return self.metrics
+
+    async def _feed(
+        self, source: Iterable[Any] | AsyncIterable[Any], queue: asyncio.Queue[Any]
+    ) -> None:
+        """Push source items into the first stage queue."""
+        first = self.stages[0]
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await self._put(queue, item, self.metrics[first.name])
+        else:
+            for item in source:
+                await self._put(queue, item, self.metrics[first.name])
+        for _ in range(first.config.concurrency):
+            await queue.put(_DONE)
+
+    async def _run_stage(self, index: int, queues: list[asyncio.Queue[Any]]) -> None:
+        """Run the workers of a stage, then signal the next stage."""
+        stage = self.stages[index]
+        await asyncio.gather(
+            *(self._worker(index, queues) for _ in range(stage.config.concurrency))
+        )
+        if index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].config.concurrency):
+                await queues[index + 1].put(_DONE)
+
+    async def _worker(self, index: int, queues: list[asyncio.Queue[Any]]) -> None:
+        """Consume a stage input queue until the end sentinel arrives."""
+        stage = self.stages[index]
+        metrics = self.metrics[stage.name]
+        inbox = queues[index]
+        is_generator = inspect.isasyncgenfunction(stage.func)
+
+        while True:
+            item = await inbox.get()
+            metrics.queue_depth = inbox.qsize()
+            if item is _DONE:
+                return
+            metrics.items_in += 1
+
+            started = time.perf_counter()
+            blocked = 0.0
+            try:
+                if is_generator:
+                    async for result in stage.func(item):
+                        blocked += await self._emit(index, queues, result)
+                else:
+                    result = stage.func(item)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    if result is not None:
+                        blocked += await self._emit(index, queues, result)
+            except PipelineError:
+                raise
+            except Exception as e:
+                logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+                raise PipelineError(
+                    f"Pipeline stage '{stage.name}' failed: {e}", stage=stage.name
+                ) from e
+            finally:
+                metrics.blocked_seconds += blocked
+                metrics.busy_seconds += time.perf_counter() - started - blocked
+
+    async def _emit(
+        self, index: int, queues: list[asyncio.Queue[Any]], item: Any
+    ) -> float:
+        """Hand an item to the next stage and return the time spent blocked."""
+        self.metrics[self.stages[index].name].items_out += 1
+        if index + 1 >= len(self.stages):
+            return 0.0
+        started = time.perf_counter()
+        await self._put(
+            queues[index + 1], item, self.metrics[self.stages[index + 1].name]
+        )
+        return time.perf_counter() - started
+
+    async def _put(
+        self, queue: asyncio.Queue[Any], item: Any, metrics: StageMetrics
+    ) -> None:
+        """Put an item in a queue and record the resulting depth."""
+        await queue.put(item)
+        metrics.queue_depth = queue.qsize()
+        metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+
+
+async def run_siren_pipeline(
+    sirens: Iterable[str] | AsyncIterable[str],
+    client: AuthenticatedClient,
+    sink: Callable[
+        [CompanyBundle | FacilityBundle | ActivityClassificationBundle], Any
+    ],
+    config: ETLConfig | None = None,
+    *,
+    fetch: StageConfig | None = None,
+    parse: StageConfig | None = None,
+    transform: StageConfig | None = None,
+    load: StageConfig | None = None,
+    process_pool: ProcessPoolTransformer | None = None,
+) -> dict[str, StageMetrics]:
+    """
+    Extract, transform and load many SIRENs through a staged pipeline.
+
+    The pipeline has four stages connected by bounded queues:
+    1. fetch: HTTP requests, yielding decoded JSON documents per page
+    2. parse: building UniteLegale/Etablissement models from the documents
+    3. transform: SIRENTransformer bundles (see extract_and_transform_siren_streaming)
+    4. load: the caller's sink, called once per bundle
+
+    The sink finally receives one ActivityClassificationBundle once every SIREN
+    has been loaded. SIRENs failing the format and check-digit validation are
+    skipped with a warning, without stopping the other SIRENs, and listed in
+    its extraction_metadata["invalid_sirens"]. With more than one parse or
+    transform worker, bundles of a
+    SIREN may reach the sink in any order, so the sink should upsert by natural
+    keys (SIREN/SIRET).
+
+    When a process_pool is given, facility pages skip the parse stage and are
+    shipped as raw documents to worker processes; the transform stage then
+    defaults to one worker per pool process.
+
+    Args:
+        sirens: SIREN numbers to process (9-digit strings)
+        client: SIRENE API client instance
+        sink: Regular or async callable receiving each bundle
+        config: Optional ETL configuration (defaults to lenient validation)
+        fetch: Fetch stage settings (defaults to 4 workers)
+        parse: Parse stage settings (defaults to 1 worker)
+        transform: Transform stage settings (defaults to 1 worker)
+        load: Load stage settings (defaults to 1 worker)
+        process_pool: Optional process pool for CPU-bound facility transformation
+
+    Returns:
+        Metrics of every stage, keyed by stage name
+
+    Raises:
+        PipelineError: If any stage fails
+
+    Example:
+        ```python
+        async def save(bundle):
+            await repository.upsert(bundle)
+
+        metrics = await run_siren_pipeline(
+            sirens, client, save, fetch=StageConfig(concurrency=8, queue_size=32)
+        )
+        print(metrics["load"].busy_seconds)
+        ```
+    """
+    if config is None:
+        config = ETLConfig()
+        logger.debug("Using default ETL configuration")
+
+    extractor = SIRENExtractor(client, config)
+    transformer = process_pool.transformer if process_pool else SIRENTransformer(config)
+    counts = {"sirens": 0, "facilities": 0}
+    invalid_sirens: list[str] = []
+
+    async def fetch_stage(siren: str) -> AsyncIterator[RawPayload]:
+        if not is_valid_siren(siren):
+            logger.warning(
+                f"Skipping invalid SIREN {siren}: must be 9 digits with a valid "
+                "check digit"
+            )
+            invalid_sirens.append(siren)
+            return
+        counts["sirens"] += 1
+        yield RawPayload(siren, "company", await extractor.fetch_company_payload(siren))
+        if process_pool is not None:
+            # Decoded by the worker processes
+            async for content in extractor.fetch_facility_page_contents(siren):
+                yield RawPayload(siren, "facilities", content)
+            return
+        async for page in extractor.fetch_facility_pages(siren):
+            yield RawPayload(siren, "facilities", page)
+
+    def parse_stage(raw: RawPayload) -> ParsedPayload | RawPayload:
+        if isinstance(raw.payload, bytes):
+            return raw
+        if raw.kind == "company":
+            documents = [raw.payload["uniteLegale"]]
+            entities: list[Any] = [UniteLegale.from_dict(documents[0])]
+        else:
+            documents = raw.payload.get("etablissements") or []
+            entities = [Etablissement.from_dict(facility) for facility in documents]
+        return ParsedPayload(
+            raw.siren,
+            raw.kind,
+            entities,
+            documents if config.raw_registry_payloads else None,
+        )
+
+    async def transform_stage(
+        parsed: ParsedPayload | RawPayload,
+    ) -> AsyncIterator[CompanyBundle | FacilityBundle]:
+        if isinstance(parsed, RawPayload):
+            # Only facility pages bypass the parse stage, and only with a pool
+            if process_pool is not None:
+                for bundle in await process_pool.transform_page(parsed.payload):
+                    counts["facilities"] += 1
+                    yield bundle
+            return
+        payloads: list[dict[str, Any] | None] = [None] * len(parsed.entities)
+        if parsed.documents is not None:
+            payloads = list(parsed.documents)
+        if parsed.kind == "company":
+            yield transformer.transform_company_bundle(parsed.entities[0], payloads[0])
+            return
+        for facility, payload in zip(parsed.entities, payloads, strict=True):
+            counts["facilities"] += 1
+            yield transformer.transform_facility_bundle(facility, payload)
+
+    runner = PipelineRunner(
+        [
+            PipelineStage("fetch", fetch_stage, fetch or StageConfig(concurrency=4)),
+            PipelineStage("parse", parse_stage, parse or StageConfig()),
+            PipelineStage(
+                "transform",
+                transform_stage,
+                transform
+                or StageConfig(
+                    concurrency=process_pool.max_workers if process_pool else 1
+                ),
+            ),
+            PipelineStage("load", sink, load or StageConfig()),
+        ]
+    )
+    metrics = await runner.run(sirens)
+
+    closing = sink(
+        transformer.closing_bundle(
+            {
+                "siren_count": counts["sirens"],
+                "extracted_at": datetime.now().isoformat(),
+                "facility_count": counts["facilities"],
+                "invalid_sirens": invalid_sirens,
+            }
+        )
+    )
+    if inspect.isawaitable(closing):
+        await closing
+
+    logger.info(
+        f"Pipeline completed: {counts['sirens']} SIRENs, "
+        f"{counts['facilities']} facilities"
+    )
+    return metrics
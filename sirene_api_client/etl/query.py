@@ -0,0 +1,514 @@
+"""
+Query builder for the SIRENE multi-criteria search.
+
+Hand-written q strings break on long OR-lists: GET requests hit the URL limit
+(HTTP 414) and huge disjunctions overload a single search. This module builds
+queries from typed terms, compiles them to SIRENE q syntax, routes each search
+to GET or POST by its size and splits oversized OR-lists into sub-queries that
+run concurrently and are merged.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+import itertools
+import logging
+import re
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+from sirene_api_client.api.etablissement.find_by_get_etablissement import (
+    _get_kwargs as find_by_get_etablissement_kwargs,
+)
+from sirene_api_client.api.etablissement.find_by_post_etablissement import (
+    _get_kwargs as find_by_post_etablissement_kwargs,
+)
+from sirene_api_client.api.unite_legale.find_by_get_unite_legale import (
+    _get_kwargs as find_by_get_unite_legale_kwargs,
+)
+from sirene_api_client.api.unite_legale.find_by_post_unite_legale import (
+    _get_kwargs as find_by_post_unite_legale_kwargs,
+)
+from sirene_api_client.api_types import UNSET
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.etablissement_post_multi_criteres import (
+    EtablissementPostMultiCriteres,
+)
+from sirene_api_client.models.unite_legale import UniteLegale
+from sirene_api_client.models.unite_legale_post_multi_criteres import (
+    UniteLegalePostMultiCriteres,
+)
+
+from .extractor import _request_json
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable
+
+    from sirene_api_client.client import AuthenticatedClient
+
+logger = logging.getLogger(__name__)
+
+# Values containing these characters must be quoted in q syntax
+_NEEDS_QUOTES = re.compile(r'[\s():"\[\]]')
+
+
+def _format_value(value: object) -> str:
+    """Format a term value, quoting it when it contains reserved characters."""
+    text = str(value)
+    if _NEEDS_QUOTES.search(text):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+class Query(ABC):
+    """Base class of query expressions; combine them with &, | and ~."""
+
+    @abstractmethod
+    def compile(self) -> str:
+        """Compile the expression to SIRENE q syntax."""
+
+    def __str__(self) -> str:
+        return self.compile()
+
+    def __and__(self, other: Query) -> Query:
+        return And((self, other))
+
+    def __or__(self, other: Query) -> Query:
+        return Or((self, other))
+
+    def __invert__(self) -> Query:
+        return Not(self)
+
+
+@dataclass(frozen=True)
+class Term(Query):
+    """Field equal to a value; a trailing '*' in the value is a prefix match."""
+
+    field: str
+    value: str
+
+    def compile(self) -> str:
+        if self.value.endswith("*") and not _NEEDS_QUOTES.search(self.value):
+            return f"{self.field}:{self.value}"
+        return f"{self.field}:{_format_value(self.value)}"
+
+
+@dataclass(frozen=True)
+class Range(Query):
+    """Field within inclusive bounds; a missing bound is open."""
+
+    field: str
+    start: str | None = None
+    end: str | None = None
+
+    def compile(self) -> str:
+        start = "*" if self.start is None else _format_value(self.start)
+        end = "*" if self.end is None else _format_value(self.end)
+        return f"{self.field}:[{start} TO {end}]"
+
+
+@dataclass(frozen=True)
+class AnyOf(Query):
+    """Field equal to any of the values."""
+
+    field: str
+    values: tuple[str, ...]
+
+    def compile(self) -> str:
+        if len(self.values) == 1:
+            return Term(self.field, self.values[0]).compile()
+        terms = " OR ".join(Term(self.field, value).compile() for value in self.values)
+        return f"({terms})"
+
+
+@dataclass(frozen=True)
+class And(Query):
+    """All sub-expressions match."""
+
+    parts: tuple[Query, ...]
+
+    def compile(self) -> str:
+        return " AND ".join(_group(part) for part in self.parts)
+
+
+@dataclass(frozen=True)
+class Or(Query):
+    """At least one sub-expression matches."""
+
+    parts: tuple[Query, ...]
+
+    def compile(self) -> str:
+        return "(" + " OR ".join(_group(part) for part in self.parts) + ")"
+
+
+@dataclass(frozen=True)
+class Not(Query):
+    """The sub-expression does not match."""
+
+    part: Query
+
+    def compile(self) -> str:
+        return f"-{_group(self.part)}"
+
+
+@dataclass(frozen=True)
+class Periode(Query):
+    """One historical period matches the sub-expression (periode(...))."""
+
+    part: Query
+
+    def compile(self) -> str:
+        return f"periode({self.part.compile()})"
+
+
+def _group(query: Query) -> str:
+    """Compile a sub-expression, parenthesising conjunctions."""
+    compiled = query.compile()
+    return (
+        f"({compiled})" if isinstance(query, And) and len(query.parts) > 1 else compiled
+    )
+
+
+def term(field: str, value: object) -> Term:
+    """Field equal to a value."""
+    return Term(field, str(value))
+
+
+def between(field: str, start: object = None, end: object = None) -> Range:
+    """Field within inclusive bounds; None leaves a bound open."""
+    return Range(
+        field,
+        None if start is None else str(start),
+        None if end is None else str(end),
+    )
+
+
+def any_of(field: str, values: Iterable[object]) -> AnyOf:
+    """Field equal to any of the values, duplicates removed."""
+    return AnyOf(field, tuple(dict.fromkeys(str(value) for value in values)))
+
+
+def periode(query: Query) -> Periode:
+    """Match the sub-expression within a single historical period."""
+    return Periode(query)
+
+
+def _needs_split(query: Query, max_values: int) -> bool:
+    """Whether a splittable OR-list of the query exceeds max_values."""
+    if isinstance(query, AnyOf):
+        return len(query.values) > max_values
+    if isinstance(query, And | Or):
+        return any(_needs_split(part, max_values) for part in query.parts)
+    if isinstance(query, Periode):
+        return _needs_split(query.part, max_values)
+    return False
+
+
+def split_query(query: Query, max_values: int) -> list[Query]:
+    """
+    Split a query into sub-queries whose OR-lists hold at most max_values.
+
+    The union of the sub-queries matches exactly what the query matches.
+    OR-lists under a negation cannot be split this way and are kept whole.
+
+    Args:
+        query: Query to split
+        max_values: Maximum number of values per OR-list
+
+    Returns:
+        Sub-queries (the query itself when no split is needed)
+    """
+    if max_values < 1:
+        raise ValueError("max_values must be at least 1")
+    if not _needs_split(query, max_values):
+        return [query]
+    if isinstance(query, AnyOf):
+        return [
+            AnyOf(query.field, query.values[i : i + max_values])
+            for i in range(0, len(query.values), max_values)
+        ]
+    if isinstance(query, Or):
+        return [
+            part for child in query.parts for part in split_query(child, max_values)
+        ]
+    if isinstance(query, And):
+        choices = [split_query(part, max_values) for part in query.parts]
+        return [And(parts) for parts in itertools.product(*choices)]
+    if isinstance(query, Periode):
+        return [Periode(part) for part in split_query(query.part, max_values)]
+    return [query]
+
+
+class QueryExecutor:
+    """Run built queries against /siret and /siren."""
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        *,
+        max_url_length: int = 2000,
+        max_or_values: int = 100,
+        max_concurrency: int = 4,
+        page_size: int = 1000,
+    ) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if max_url_length < 1:
+            raise ValueError("max_url_length must be at least 1")
+        if max_or_values < 1:
+            raise ValueError("max_or_values must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if not 1 <= page_size <= 1000:
+            raise ValueError("page_size must be between 1 and 1000")
+        self.client = client
+        self.max_url_length = max_url_length
+        self.max_or_values = max_or_values
+        self.page_size = page_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def etablissements(
+        self,
+        query: Query | str,
+        *,
+        date: str | None = None,
+        champs: str | None = None,
+    ) -> list[Etablissement]:
+        """
+        Fetch every establishment matching a query, each SIRET once.
+
+        Args:
+            query: Built query or raw q string
+            date: Optional point-in-time date (YYYY-MM-DD)
+            champs: Optional comma-separated list of fields to return
+
+        Returns:
+            Matching establishments, in sub-query order
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        documents = await self._search("siret", query, date, champs)
+        results: dict[str, Etablissement] = {}
+        for document in documents:
+            for facility in document.get("etablissements") or []:
+                siret = str(facility.get("siret"))
+                if siret not in results:
+                    results[siret] = Etablissement.from_dict(facility)
+        return list(results.values())
+
+    async def unites_legales(
+        self,
+        query: Query | str,
+        *,
+        date: str | None = None,
+        champs: str | None = None,
+    ) -> list[UniteLegale]:
+        """
+        Fetch every legal unit matching a query, each SIREN once.
+
+        Args:
+            query: Built query or raw q string
+            date: Optional point-in-time date (YYYY-MM-DD)
+            champs: Optional comma-separated list of fields to return
+
+        Returns:
+            Matching legal units, in sub-query order
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        documents = await self._search("siren", query, date, champs)
+        results: dict[str, UniteLegale] = {}
+        for document in documents:
+            for company in document.get("unitesLegales") or []:
+                siren = str(company.get("siren"))
+                if siren not in results:
+                    results[siren] = UniteLegale.from_dict(company)
+        return list(results.values())
+
+    async def etablissements_streaming(
+        self,
+        query: Query | str,
+        *,
+        date: str | None = None,
+        champs: str | None = None,
+    ) -> AsyncIterator[Etablissement]:
+        """
+        Yield every establishment matching a query, each SIRET once.
+
+        Sub-queries are fetched one after the other and only the current page
+        is held in memory, unlike etablissements().
+
+        Args:
+            query: Built query or raw q string
+            date: Optional point-in-time date (YYYY-MM-DD)
+            champs: Optional comma-separated list of fields to return
+
+        Yields:
+            Matching establishments, in sub-query order
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        seen: set[str] = set()
+        async for document in self._search_streaming("siret", query, date, champs):
+            for facility in document.get("etablissements") or []:
+                siret = str(facility.get("siret"))
+                if siret not in seen:
+                    seen.add(siret)
+                    yield Etablissement.from_dict(facility)
+
+    async def unites_legales_streaming(
+        self,
+        query: Query | str,
+        *,
+        date: str | None = None,
+        champs: str | None = None,
+    ) -> AsyncIterator[UniteLegale]:
+        """
+        Yield every legal unit matching a query, each SIREN once.
+
+        Sub-queries are fetched one after the other and only the current page
+        is held in memory, unlike unites_legales().
+
+        Args:
+            query: Built query or raw q string
+            date: Optional point-in-time date (YYYY-MM-DD)
+            champs: Optional comma-separated list of fields to return
+
+        Yields:
+            Matching legal units, in sub-query order
+
+        Raises:
+            ExtractionError: If a request fails
+        """
+        seen: set[str] = set()
+        async for document in self._search_streaming("siren", query, date, champs):
+            for company in document.get("unitesLegales") or []:
+                siren = str(company.get("siren"))
+                if siren not in seen:
+                    seen.add(siren)
+                    yield UniteLegale.from_dict(company)
+
+    def _compile(self, query: Query | str) -> list[str]:
+        """Split a query into q strings within max_or_values."""
+        if isinstance(query, str):
+            return [query]
+        queries = [sub.compile() for sub in split_query(query, self.max_or_values)]
+        if len(queries) > 1:
+            logger.debug(f"Split query into {len(queries)} sub-queries")
+        return queries
+
+    async def _search(
+        self,
+        endpoint: str,
+        query: Query | str,
+        date: str | None,
+        champs: str | None,
+    ) -> list[dict[str, Any]]:
+        """Split a query and fetch every page of every sub-query concurrently."""
+        pages = await asyncio.gather(
+            *(self._paginate(endpoint, q, date, champs) for q in self._compile(query))
+        )
+        return [document for documents in pages for document in documents]
+
+    async def _search_streaming(
+        self,
+        endpoint: str,
+        query: Query | str,
+        date: str | None,
+        champs: str | None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Split a query and yield every page of each sub-query in turn."""
+        for q in self._compile(query):
+            async for document in self._pages(endpoint, q, date, champs):
+                yield document
+
+    async def _paginate(
+        self, endpoint: str, q: str, date: str | None, champs: str | None
+    ) -> list[dict[str, Any]]:
+        """Fetch every page of a single query with cursor pagination."""
+        return [document async for document in self._pages(endpoint, q, date, champs)]
+
+    async def _pages(
+        self, endpoint: str, q: str, date: str | None, champs: str | None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield every page of a single query with cursor pagination."""
+        cursor = "*"
+        while True:
+            document = await self._request(endpoint, q, date, champs, cursor)
+            yield document
+            key = "etablissements" if endpoint == "siret" else "unitesLegales"
+            next_cursor = (document.get("header") or {}).get("curseurSuivant")
+            if not document.get(key) or not next_cursor or next_cursor == cursor:
+                return
+            cursor = next_cursor
+
+    def _get_kwargs(
+        self, endpoint: str, q: str, date: str | None, champs: str | None, cursor: str
+    ) -> dict[str, Any]:
+        """Request arguments for a GET search."""
+        if endpoint == "siret":
+            return find_by_get_etablissement_kwargs(
+                q=q,
+                date=date or UNSET,
+                champs=champs or UNSET,
+                nombre=str(self.page_size),
+                curseur=cursor,
+                tri=endpoint,
+            )
+        return find_by_get_unite_legale_kwargs(
+            q=q,
+            date=date or UNSET,
+            champs=champs or UNSET,
+            nombre=self.page_size,
+            curseur=cursor,
+            tri=endpoint,
+        )
+
+    def _post_kwargs(
+        self, endpoint: str, q: str, date: str | None, champs: str | None, cursor: str
+    ) -> dict[str, Any]:
+        """Request arguments for a POST search."""
+        criteria: dict[str, Any] = {
+            "q": q,
+            "date": date or UNSET,
+            "champs": champs or UNSET,
+            "nombre": self.page_size,
+            "curseur": cursor,
+            "tri": endpoint,
+        }
+        if endpoint == "siret":
+            return find_by_post_etablissement_kwargs(
+                body=EtablissementPostMultiCriteres(**criteria)
+            )
+        return find_by_post_unite_legale_kwargs(
+            body=UniteLegalePostMultiCriteres(**criteria)
+        )
+
+    async def _request(
+        self,
+        endpoint: str,
+        q: str,
+        date: str | None,
+        champs: str | None,
+        cursor: str,
+    ) -> dict[str, Any]:
+        """Send one search page, by GET when the URL fits and POST otherwise."""
+        kwargs = self._get_kwargs(endpoint, q, date, champs, cursor)
+        url_length = len(kwargs["url"]) + 1 + len(urlencode(kwargs["params"]))
+
+        def post_kwargs() -> dict[str, Any]:
+            return self._post_kwargs(endpoint, q, date, champs, cursor)
+
+        async with self._semaphore:
+            return await _request_json(
+                self.client,
+                kwargs if url_length <= self.max_url_length else post_kwargs(),
+                f"Search request for {q}",
+                f"{endpoint}/search",
+                fallback=post_kwargs,
+            )
@@ -0,0 +1,288 @@
+"""
+Rebuild SIRENExtractResults from stored registry records.
+
+Registry records keep the complete API document of each legal unit and
+establishment, and applications persist them (e.g. in the Django
+ExternalRegistryRecord model). After a change to the transformer's mapping,
+RegistryRehydrator groups stored records by SIREN, rebuilds the UniteLegale and
+Etablissement models with from_dict and transforms them again, across worker
+processes, without any API call. Records are read and results yielded batch by
+batch, so a whole table can be rehydrated in bounded memory.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Protocol
+
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+from .config import ETLConfig
+from .transformer import SIRENTransformer
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from .models import SIRENExtractResult
+
+logger = logging.getLogger(__name__)
+
+# Payloads of one SIREN: the legal unit and its establishments
+PayloadGroup = tuple[dict[str, Any], list[dict[str, Any]]]
+
+
+class StoredRegistryRecord(Protocol):
+    """
+    Registry record read back from storage.
+
+    ExternalRegistryRecordData satisfies it, and so does any ORM object with
+    these attributes.
+    """
+
+    entity_type: str
+    external_id: str
+    payload: dict[str, Any]
+    registry_updated_at: datetime
+
+
+# Legal unit payload (None if absent) and establishment payloads by SIRET
+RecordPayloads = tuple[dict[str, Any] | None, dict[str, dict[str, Any]]]
+
+
+@dataclass
+class _RecordGroup:
+    """Latest records of one SIREN."""
+
+    company: StoredRegistryRecord | None = None
+    facilities: dict[str, StoredRegistryRecord] = field(default_factory=dict)
+
+    def add(self, record: StoredRegistryRecord) -> None:
+        """Keep a record unless the group holds a newer one of the entity."""
+        if record.entity_type == "legal_unit":
+            if _is_newer(record, self.company):
+                self.company = record
+        elif record.entity_type == "establishment":
+            if _is_newer(record, self.facilities.get(record.external_id)):
+                self.facilities[record.external_id] = record
+        else:
+            raise ValueError(f"Unknown entity type: {record.entity_type}")
+
+    def payloads(self) -> RecordPayloads:
+        """Payloads of the kept records."""
+        return (
+            self.company.payload if self.company is not None else None,
+            {siret: record.payload for siret, record in self.facilities.items()},
+        )
+
+
+def _is_newer(record: StoredRegistryRecord, kept: StoredRegistryRecord | None) -> bool:
+    """Whether a record replaces the kept one; the later record wins ties."""
+    return kept is None or record.registry_updated_at >= kept.registry_updated_at
+
+
+def group_registry_records(
+    records: Iterable[StoredRegistryRecord],
+) -> dict[str, RecordPayloads]:
+    """
+    Group registry payloads by SIREN, in any record order.
+
+    When an entity has several records, the one with the latest
+    registry_updated_at wins (the last one on ties). Every group is held until
+    the end; use iter_registry_groups for records ordered by SIREN.
+
+    Args:
+        records: Stored legal unit and establishment records
+
+    Returns:
+        Per SIREN, in order of first appearance: the legal unit payload (None
+        if absent) and the establishment payloads by SIRET
+
+    Raises:
+        ValueError: If a record has an unknown entity type
+    """
+    groups: dict[str, _RecordGroup] = {}
+    for record in records:
+        groups.setdefault(record.external_id[:9], _RecordGroup()).add(record)
+    return {siren: group.payloads() for siren, group in groups.items()}
+
+
+def iter_registry_groups(
+    records: Iterable[StoredRegistryRecord],
+) -> Iterator[tuple[str, RecordPayloads]]:
+    """
+    Group consecutive registry payloads by SIREN, one SIREN at a time.
+
+    Records must arrive grouped by SIREN, for example ordered by external_id
+    (a SIRET starts with its SIREN). Only the payloads of the current SIREN
+    are held in memory, along with the SIRENs already yielded. Within a SIREN,
+    the record with the latest registry_updated_at wins.
+
+    Args:
+        records: Stored legal unit and establishment records, grouped by SIREN
+
+    Yields:
+        SIREN and its payloads, as in group_registry_records
+
+    Raises:
+        ValueError: If a record has an unknown entity type, or if the records
+            of a SIREN already yielded reappear
+    """
+    siren: str | None = None
+    group = _RecordGroup()
+    seen: set[str] = set()
+    for record in records:
+        record_siren = record.external_id[:9]
+        if record_siren != siren:
+            if siren is not None:
+                yield siren, group.payloads()
+            if record_siren in seen:
+                raise ValueError(
+                    f"Records are not grouped by SIREN: {record_siren} reappears "
+                    "after other SIRENs"
+                )
+            seen.add(record_siren)
+            siren, group = record_siren, _RecordGroup()
+        group.add(record)
+    if siren is not None:
+        yield siren, group.payloads()
+
+
+def rehydrate_group(group: PayloadGroup, config: ETLConfig) -> SIRENExtractResult:
+    """
+    Transform the stored payloads of one SIREN again.
+
+    Args:
+        group: Legal unit payload and establishment payloads
+        config: ETL configuration
+
+    Returns:
+        Fresh SIRENExtractResult
+
+    Raises:
+        TransformationError: If the transformation fails
+    """
+    company_payload, facility_payloads = group
+    raw_data: dict[str, Any] = {
+        "company": UniteLegale.from_dict(company_payload),
+        "facilities": [
+            Etablissement.from_dict(payload) for payload in facility_payloads
+        ],
+        "extraction_metadata": {
+            "siren": company_payload.get("siren"),
+            "rehydrated_at": datetime.now().isoformat(),
+            "facility_count": len(facility_payloads),
+        },
+    }
+    if config.raw_registry_payloads:
+        raw_data["raw_company"] = company_payload
+        raw_data["raw_facilities"] = facility_payloads
+    return SIRENTransformer(config).transform_complete(raw_data)
+
+
+def rehydrate_groups(
+    groups: list[PayloadGroup], config: ETLConfig
+) -> list[SIRENExtractResult]:
+    """
+    Transform several SIRENs again.
+
+    This is the worker-process entry point of RegistryRehydrator.
+
+    Args:
+        groups: Payload groups, one per SIREN
+        config: ETL configuration
+
+    Returns:
+        One SIRENExtractResult per group, in order
+    """
+    return [rehydrate_group(group, config) for group in groups]
+
+
+class RegistryRehydrator:
+    """Rebuild SIRENExtractResults from stored registry records in parallel."""
+
+    def __init__(
+        self,
+        config: ETLConfig | None = None,
+        *,
+        max_workers: int | None = None,
+        batch_size: int = 100,
+    ) -> None:
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.config = config if config is not None else ETLConfig()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def rehydrate(
+        self, records: Iterable[StoredRegistryRecord]
+    ) -> Iterator[tuple[str, SIRENExtractResult]]:
+        """
+        Group records by SIREN and transform each group again.
+
+        Records are consumed lazily and must arrive grouped by SIREN, e.g.
+        ordered by external_id. SIRENs are sent to max_workers processes in
+        batches of batch_size, with at most 2 * max_workers batches in flight,
+        and results are yielded as their batch finishes, in input order.
+        SIRENs without a legal unit record cannot be rebuilt and are skipped.
+
+        Args:
+            records: Stored legal unit and establishment records, grouped by
+                SIREN
+
+        Yields:
+            SIREN and its fresh SIRENExtractResult
+
+        Raises:
+            TransformationError: If a transformation fails
+            ValueError: If the records are not grouped by SIREN
+        """
+        logger.info(
+            f"Rehydrating in batches of {self.batch_size} SIRENs "
+            f"with {self.max_workers} workers"
+        )
+        batches = self._batches(records)
+        if self.max_workers == 1:
+            for sirens, batch in batches:
+                yield from zip(
+                    sirens, rehydrate_groups(batch, self.config), strict=True
+                )
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: deque[tuple[list[str], Future[list[SIRENExtractResult]]]] = deque()
+            for sirens, batch in batches:
+                if len(pending) >= 2 * self.max_workers:
+                    done_sirens, future = pending.popleft()
+                    yield from zip(done_sirens, future.result(), strict=True)
+                pending.append(
+                    (sirens, executor.submit(rehydrate_groups, batch, self.config))
+                )
+            while pending:
+                done_sirens, future = pending.popleft()
+                yield from zip(done_sirens, future.result(), strict=True)
+
+    def _batches(
+        self, records: Iterable[StoredRegistryRecord]
+    ) -> Iterator[tuple[list[str], list[PayloadGroup]]]:
+        """Cut the SIREN groups of a record stream into batches of batch_size."""
+        sirens: list[str] = []
+        groups: list[PayloadGroup] = []
+        for siren, (company, facilities) in iter_registry_groups(records):
+            if company is None:
+                logger.warning(f"No legal unit record for SIREN {siren}, skipping")
+                continue
+            sirens.append(siren)
+            groups.append((company, list(facilities.values())))
+            if len(groups) == self.batch_size:
+                yield sirens, groups
+                sirens, groups = [], []
+        if groups:
+            yield sirens, groups
@@ -0,0 +1,504 @@
+"""
+Offline ingestion of the INSEE SIRENE stock files.
+
+StockUniteLegale and StockEtablissement are flat CSV files whose columns use
+the API's camelCase names. This module maps each row to the nested document
+shape understood by UniteLegale.from_dict and Etablissement.from_dict, reads
+files in chunks with bounded memory, and transforms byte ranges of a file in
+parallel worker processes through the same SIRENTransformer as API extraction.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import csv
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+from .transformer import SIRENTransformer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Mapping
+
+    from .config import ETLConfig
+    from .models import (
+        ActivityClassificationBundle,
+        ActivityClassificationData,
+        CompanyBundle,
+        FacilityBundle,
+    )
+
+logger = logging.getLogger(__name__)
+
+COMPANY = "company"
+FACILITIES = "facilities"
+
+# CSV bytes of all the ranges in flight in a StockIngestor with the default range size
+IN_FLIGHT_BYTES = 128 * 1024 * 1024
+
+_ADDRESS_FIELDS = frozenset(
+    {
+        "identifiantAdresseEtablissement",
+        "complementAdresseEtablissement",
+        "numeroVoieEtablissement",
+        "indiceRepetitionEtablissement",
+        "dernierNumeroVoieEtablissement",
+        "indiceRepetitionDernierNumeroVoieEtablissement",
+        "typeVoieEtablissement",
+        "libelleVoieEtablissement",
+        "codePostalEtablissement",
+        "libelleCommuneEtablissement",
+        "libelleCommuneEtrangerEtablissement",
+        "distributionSpecialeEtablissement",
+        "codeCommuneEtablissement",
+        "codeCedexEtablissement",
+        "libelleCedexEtablissement",
+        "codePaysEtrangerEtablissement",
+        "libellePaysEtrangerEtablissement",
+        "coordonneeLambertAbscisseEtablissement",
+        "coordonneeLambertOrdonneeEtablissement",
+    }
+)
+
+_ADDRESS2_FIELDS = frozenset(
+    {
+        "complementAdresse2Etablissement",
+        "numeroVoie2Etablissement",
+        "indiceRepetition2Etablissement",
+        "typeVoie2Etablissement",
+        "libelleVoie2Etablissement",
+        "codePostal2Etablissement",
+        "libelleCommune2Etablissement",
+        "libelleCommuneEtranger2Etablissement",
+        "distributionSpeciale2Etablissement",
+        "codeCommune2Etablissement",
+        "codeCedex2Etablissement",
+        "libelleCedex2Etablissement",
+        "codePaysEtranger2Etablissement",
+        "libellePaysEtranger2Etablissement",
+    }
+)
+
+_FACILITY_PERIOD_FIELDS = frozenset(
+    {
+        "dateDebut",
+        "dateFin",
+        "etatAdministratifEtablissement",
+        "changementEtatAdministratifEtablissement",
+        "enseigne1Etablissement",
+        "enseigne2Etablissement",
+        "enseigne3Etablissement",
+        "changementEnseigneEtablissement",
+        "denominationUsuelleEtablissement",
+        "changementDenominationUsuelleEtablissement",
+        "activitePrincipaleEtablissement",
+        "nomenclatureActivitePrincipaleEtablissement",
+        "changementActivitePrincipaleEtablissement",
+        "caractereEmployeurEtablissement",
+        "changementCaractereEmployeurEtablissement",
+    }
+)
+
+_COMPANY_PERIOD_FIELDS = frozenset(
+    {
+        "dateDebut",
+        "dateFin",
+        "etatAdministratifUniteLegale",
+        "changementEtatAdministratifUniteLegale",
+        "nomUniteLegale",
+        "changementNomUniteLegale",
+        "nomUsageUniteLegale",
+        "changementNomUsageUniteLegale",
+        "denominationUniteLegale",
+        "changementDenominationUniteLegale",
+        "denominationUsuelle1UniteLegale",
+        "denominationUsuelle2UniteLegale",
+        "denominationUsuelle3UniteLegale",
+        "changementDenominationUsuelleUniteLegale",
+        "categorieJuridiqueUniteLegale",
+        "changementCategorieJuridiqueUniteLegale",
+        "activitePrincipaleUniteLegale",
+        "nomenclatureActivitePrincipaleUniteLegale",
+        "changementActivitePrincipaleUniteLegale",
+        "nicSiegeUniteLegale",
+        "changementNicSiegeUniteLegale",
+        "economieSocialeSolidaireUniteLegale",
+        "changementEconomieSocialeSolidaireUniteLegale",
+        "societeMissionUniteLegale",
+        "changementSocieteMissionUniteLegale",
+        "caractereEmployeurUniteLegale",
+        "changementCaractereEmployeurUniteLegale",
+    }
+)
+
+_INTEGER_FIELDS = frozenset(
+    {"nombrePeriodesEtablissement", "nombrePeriodesUniteLegale"}
+)
+
+
+def _convert(name: str, value: str) -> Any:
+    """Convert a CSV value to the JSON type the models expect."""
+    if name in _INTEGER_FIELDS:
+        return int(value)
+    if (
+        name == "etablissementSiege"
+        or name == "unitePurgeeUniteLegale"
+        or (name.startswith("changement"))
+    ):
+        return value.lower() == "true"
+    return value
+
+
+def facility_row_to_dict(row: Mapping[str, str]) -> dict[str, Any]:
+    """
+    Map a StockEtablissement row to an Etablissement document.
+
+    Empty values are dropped, as with masquerValeursNulles. Historized columns
+    become the single current period of the establishment.
+
+    Args:
+        row: CSV row keyed by column name
+
+    Returns:
+        Document accepted by Etablissement.from_dict
+    """
+    document: dict[str, Any] = {}
+    address: dict[str, Any] = {}
+    address2: dict[str, Any] = {}
+    period: dict[str, Any] = {}
+    for name, value in row.items():
+        if not value:
+            continue
+        if name in _ADDRESS_FIELDS:
+            address[name] = value
+        elif name in _ADDRESS2_FIELDS:
+            address2[name] = value
+        elif name in _FACILITY_PERIOD_FIELDS:
+            period[name] = _convert(name, value)
+        else:
+            document[name] = _convert(name, value)
+    if address:
+        document["adresseEtablissement"] = address
+    if address2:
+        document["adresse2Etablissement"] = address2
+    if period:
+        document["periodesEtablissement"] = [period]
+    return document
+
+
+def company_row_to_dict(row: Mapping[str, str]) -> dict[str, Any]:
+    """
+    Map a StockUniteLegale row to a UniteLegale document.
+
+    Empty values are dropped, as with masquerValeursNulles. Historized columns
+    become the single current period of the legal unit.
+
+    Args:
+        row: CSV row keyed by column name
+
+    Returns:
+        Document accepted by UniteLegale.from_dict
+    """
+    document: dict[str, Any] = {}
+    period: dict[str, Any] = {}
+    for name, value in row.items():
+        if not value:
+            continue
+        if name in _COMPANY_PERIOD_FIELDS:
+            period[name] = _convert(name, value)
+        else:
+            document[name] = _convert(name, value)
+    if period:
+        document["periodesUniteLegale"] = [period]
+    return document
+
+
+def detect_stock_kind(header: list[str]) -> str:
+    """
+    Tell a StockEtablissement header from a StockUniteLegale header.
+
+    Args:
+        header: CSV column names
+
+    Returns:
+        FACILITIES or COMPANY
+
+    Raises:
+        ValueError: If the header belongs to neither file
+    """
+    if "siret" in header:
+        return FACILITIES
+    if "siren" in header:
+        return COMPANY
+    raise ValueError("Not a SIRENE stock file: no siren or siret column")
+
+
+def _read_header(path: str | Path) -> tuple[list[str], int]:
+    """Column names of a stock file and the byte offset of its first row."""
+    with Path(path).open("rb") as f:
+        line = f.readline()
+    return next(csv.reader([line.decode("utf-8-sig")])), len(line)
+
+
+def split_byte_ranges(path: str | Path, range_size: int) -> list[tuple[int, int]]:
+    """
+    Split the rows of a stock file into byte ranges of about range_size bytes.
+
+    Ranges are not aligned on lines: a row belongs to the range containing
+    its first byte, which read_stock_rows enforces.
+
+    Args:
+        path: Stock CSV file
+        range_size: Target range size in bytes
+
+    Returns:
+        (start, end) byte offsets covering every row
+    """
+    if range_size < 1:
+        raise ValueError("range_size must be at least 1")
+    _header, data_start = _read_header(path)
+    size = os.path.getsize(path)
+    return [
+        (start, min(start + range_size, size))
+        for start in range(data_start, size, range_size)
+    ]
+
+
+def read_stock_rows(
+    path: str | Path,
+    start: int = 0,
+    end: int | None = None,
+    chunk_size: int = 10000,
+) -> Iterator[list[dict[str, str]]]:
+    """
+    Read the rows of a stock file starting within [start, end), in chunks.
+
+    Rows are assumed not to contain line breaks, which holds for the INSEE
+    stock files and lets ranges start on any byte.
+
+    Args:
+        path: Stock CSV file
+        start: First byte offset of the range
+        end: End byte offset of the range (defaults to end of file)
+        chunk_size: Number of rows per chunk
+
+    Yields:
+        Lists of up to chunk_size rows keyed by column name
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    header, data_start = _read_header(path)
+    with Path(path).open("rb") as f:
+        position = max(start, data_start)
+        if position > data_start:
+            # Skip the row straddling the range start: it belongs to the previous range
+            f.seek(position - 1)
+            position += len(f.readline()) - 1
+        else:
+            f.seek(position)
+
+        lines: list[str] = []
+        while end is None or position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            lines.append(line.decode("utf-8"))
+            if len(lines) >= chunk_size:
+                yield [
+                    dict(zip(header, row, strict=False)) for row in csv.reader(lines)
+                ]
+                lines = []
+        if lines:
+            yield [dict(zip(header, row, strict=False)) for row in csv.reader(lines)]
+
+
+def read_stock_documents(
+    path: str | Path, start: int = 0, end: int | None = None
+) -> Iterator[dict[str, Any]]:
+    """
+    Stream the nested documents of a stock file (raw view, no models).
+
+    Args:
+        path: Stock CSV file
+        start: First byte offset
+        end: End byte offset (defaults to end of file)
+
+    Yields:
+        One UniteLegale or Etablissement document per row
+    """
+    header, _data_start = _read_header(path)
+    to_dict = (
+        facility_row_to_dict
+        if detect_stock_kind(header) == FACILITIES
+        else company_row_to_dict
+    )
+    for rows in read_stock_rows(path, start, end):
+        for row in rows:
+            yield to_dict(row)
+
+
+def read_stock_records(
+    path: str | Path, start: int = 0, end: int | None = None
+) -> Iterator[UniteLegale | Etablissement]:
+    """
+    Stream the API models of a stock file.
+
+    Args:
+        path: Stock CSV file
+        start: First byte offset
+        end: End byte offset (defaults to end of file)
+
+    Yields:
+        One UniteLegale or Etablissement per row
+    """
+    header, _data_start = _read_header(path)
+    model = Etablissement if detect_stock_kind(header) == FACILITIES else UniteLegale
+    for document in read_stock_documents(path, start, end):
+        yield model.from_dict(document)
+
+
+def transform_stock_range(
+    path: str | Path, start: int, end: int, config: ETLConfig
+) -> tuple[list[CompanyBundle | FacilityBundle], list[ActivityClassificationData]]:
+    """
+    Transform the rows of one byte range of a stock file.
+
+    This is the worker-process entry point of StockIngestor.
+
+    Args:
+        path: Stock CSV file
+        start: First byte offset of the range
+        end: End byte offset of the range
+        config: ETL configuration
+
+    Returns:
+        Tuple of (bundles, activity_classifications)
+    """
+    transformer = SIRENTransformer(config)
+    header, _data_start = _read_header(path)
+    facilities = detect_stock_kind(header) == FACILITIES
+    bundles: list[CompanyBundle | FacilityBundle] = []
+    for document in read_stock_documents(path, start, end):
+        payload = document if config.raw_registry_payloads else None
+        if facilities:
+            bundles.append(
+                transformer.transform_facility_bundle(
+                    Etablissement.from_dict(document), payload
+                )
+            )
+        else:
+            bundles.append(
+                transformer.transform_company_bundle(
+                    UniteLegale.from_dict(document), payload
+                )
+            )
+    return bundles, transformer.activity_classifications()
+
+
+class StockIngestor:
+    """Transform a stock file in parallel across byte ranges."""
+
+    def __init__(
+        self,
+        config: ETLConfig,
+        *,
+        max_workers: int | None = None,
+        range_size: int | None = None,
+    ) -> None:
+        if config is None:
+            raise TypeError("config cannot be None")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if range_size is not None and range_size < 1:
+            raise ValueError("range_size must be at least 1")
+        self.config = config
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Split IN_FLIGHT_BYTES across the 2 * max_workers ranges in flight
+        self.range_size = range_size or max(
+            1, IN_FLIGHT_BYTES // (2 * self.max_workers)
+        )
+        # Main-process transformer holding the merged activity classifications
+        self.transformer = SIRENTransformer(config)
+
+    def ingest(
+        self,
+        path: str | Path,
+        sink: Callable[
+            [CompanyBundle | FacilityBundle | ActivityClassificationBundle], Any
+        ],
+    ) -> int:
+        """
+        Transform every row of a stock file and hand each bundle to a sink.
+
+        Ranges are transformed by max_workers processes with at most
+        2 * max_workers ranges in flight. Each worker returns the bundles of
+        a whole range at once, so the parent may hold the transformed bundles
+        of up to 2 * max_workers ranges; they take several times the CSV size
+        of a range. The default range_size keeps those ranges at
+        IN_FLIGHT_BYTES of CSV in total whatever the number of workers.
+        Bundles of different ranges may reach the sink in any order. The sink finally receives one
+        ActivityClassificationBundle.
+
+        Args:
+            path: StockUniteLegale or StockEtablissement CSV file
+            sink: Callable receiving each bundle
+
+        Returns:
+            Number of rows transformed
+        """
+        ranges = split_byte_ranges(path, self.range_size)
+        logger.info(
+            f"Ingesting {path} in {len(ranges)} ranges with {self.max_workers} workers"
+        )
+        count = 0
+
+        def deliver(
+            result: tuple[
+                list[CompanyBundle | FacilityBundle],
+                list[ActivityClassificationData],
+            ],
+        ) -> None:
+            nonlocal count
+            bundles, classifications = result
+            self.transformer.merge_activity_cache(classifications)
+            for bundle in bundles:
+                sink(bundle)
+            count += len(bundles)
+
+        if self.max_workers == 1:
+            for start, end in ranges:
+                deliver(transform_stock_range(path, start, end, self.config))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                pending: set[Future[Any]] = set()
+                for start, end in ranges:
+                    if len(pending) >= 2 * self.max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            deliver(future.result())
+                    pending.add(
+                        executor.submit(
+                            transform_stock_range, path, start, end, self.config
+                        )
+                    )
+                for future in pending:
+                    deliver(future.result())
+
+        sink(
+            self.transformer.closing_bundle(
+                {
+                    "source": str(path),
+                    "extracted_at": datetime.now().isoformat(),
+                    "row_count": count,
+                }
+            )
+        )
+        logger.info(f"Ingested {count} rows from {path}")
+        return count
@@ -0,0 +1,548 @@
+"""
+Succession graph traversal over /siret/liensSuccession.
+
+Relocations and headquarters transfers link establishments through succession
+links. This module expands the predecessors and successors of a set of SIRETs
+breadth-first, querying each BFS level with batched OR-queries run concurrently,
+and returns the in-memory graph of LienSuccession edges. SuccessionIndex then
+compiles the links into compact arrays for constant-time lineage lookups.
+"""
+
+from __future__ import annotations
+
+from array import array
+import asyncio
+from dataclasses import dataclass, field
+import json
+import logging
+from pathlib import Path
+import sys
+from typing import TYPE_CHECKING, Any
+
+from sirene_api_client.api.etablissement.find_lien_succession import (
+    _get_kwargs as find_lien_succession_kwargs,
+)
+from sirene_api_client.api_types import Unset
+from sirene_api_client.models.lien_succession import LienSuccession
+
+from .extractor import _request_json
+from .query import Query, any_of
+from .validation import validate_sirets
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import date
+
+    from sirene_api_client.client import AuthenticatedClient
+
+logger = logging.getLogger(__name__)
+
+PREDECESSOR_FIELD = "siretEtablissementPredecesseur"
+SUCCESSOR_FIELD = "siretEtablissementSuccesseur"
+
+DIRECTIONS = ("both", "successors", "predecessors")
+
+
+def _edge_key(link: LienSuccession) -> tuple[str, str, str]:
+    """Identity of a succession link: predecessor, successor and date."""
+    link_date = link.date_lien_succession
+    return (
+        str(link.siret_etablissement_predecesseur),
+        str(link.siret_etablissement_successeur),
+        "" if isinstance(link_date, Unset) else link_date.isoformat(),
+    )
+
+
+@dataclass
+class SuccessionGraph:
+    """Succession links between establishments, indexed by SIRET."""
+
+    edges: list[LienSuccession] = field(default_factory=list)
+    """Every distinct succession link."""
+
+    nodes: set[str] = field(default_factory=set)
+    """Every SIRET appearing in a link or used as a starting point."""
+
+    _successors: dict[str, list[LienSuccession]] = field(
+        default_factory=dict, repr=False
+    )
+    _predecessors: dict[str, list[LienSuccession]] = field(
+        default_factory=dict, repr=False
+    )
+    _keys: set[tuple[str, str, str]] = field(default_factory=set, repr=False)
+
+    def add_edge(self, link: LienSuccession) -> bool:
+        """
+        Add a succession link, ignoring links already in the graph.
+
+        Args:
+            link: Succession link to add
+
+        Returns:
+            True if the link was new
+        """
+        key = _edge_key(link)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        predecessor, successor, _date = key
+        self.edges.append(link)
+        self.nodes.update((predecessor, successor))
+        self._successors.setdefault(predecessor, []).append(link)
+        self._predecessors.setdefault(successor, []).append(link)
+        return True
+
+    def successors(self, siret: str) -> list[LienSuccession]:
+        """Links whose predecessor is the SIRET."""
+        return list(self._successors.get(siret, []))
+
+    def predecessors(self, siret: str) -> list[LienSuccession]:
+        """Links whose successor is the SIRET."""
+        return list(self._predecessors.get(siret, []))
+
+
+class SuccessionWalker:
+    """Breadth-first expansion of establishment successions."""
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        *,
+        max_concurrency: int = 4,
+        batch_size: int = 20,
+        page_size: int = 1000,
+        max_depth: int | None = None,
+    ) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if not 1 <= page_size <= 1000:
+            raise ValueError("page_size must be between 1 and 1000")
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth cannot be negative")
+        self.client = client
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.max_depth = max_depth
+        self.requests = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def walk(
+        self, sirets: str | Iterable[str], direction: str = "both"
+    ) -> SuccessionGraph:
+        """
+        Expand succession links from starting SIRETs, level by level.
+
+        Each level queries the unvisited SIRETs of the frontier in batches of
+        batch_size, all batches of a level running concurrently.
+
+        Args:
+            sirets: Starting SIRET or SIRETs (14-digit strings)
+            direction: "both", "successors" or "predecessors"
+
+        Returns:
+            SuccessionGraph of every link reached
+
+        Raises:
+            ValueError: If a SIRET or the direction is invalid
+            ExtractionError: If a request fails
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(
+                f"Invalid direction: {direction}. Use one of {DIRECTIONS}."
+            )
+        start = [sirets] if isinstance(sirets, str) else list(dict.fromkeys(sirets))
+        for siret, valid in zip(start, validate_sirets(start), strict=True):
+            if not valid:
+                raise ValueError(
+                    f"Invalid SIRET format: {siret}. "
+                    "Must be 14 digits with a valid check digit."
+                )
+
+        graph = SuccessionGraph(nodes=set(start))
+        visited: set[str] = set()
+        frontier = start
+        depth = 0
+
+        while frontier and (self.max_depth is None or depth < self.max_depth):
+            visited.update(frontier)
+            batches = [
+                frontier[i : i + self.batch_size]
+                for i in range(0, len(frontier), self.batch_size)
+            ]
+            levels = await asyncio.gather(
+                *(self._fetch_links(batch, direction) for batch in batches)
+            )
+
+            next_frontier: dict[str, None] = {}
+            for links in levels:
+                for link in links:
+                    if not graph.add_edge(link):
+                        continue
+                    predecessor, successor, _date = _edge_key(link)
+                    for siret in (predecessor, successor):
+                        if siret not in visited:
+                            next_frontier[siret] = None
+
+            logger.debug(
+                f"Succession level {depth}: {len(frontier)} SIRETs, "
+                f"{len(next_frontier)} new"
+            )
+            frontier = list(next_frontier)
+            depth += 1
+
+        logger.info(
+            f"Succession walk reached {len(graph.nodes)} establishments "
+            f"and {len(graph.edges)} links in {self.requests} requests"
+        )
+        return graph
+
+    def _batch_query(self, sirets: list[str], direction: str) -> Query:
+        """OR-query matching the links of a batch in the walk direction."""
+        if direction == "successors":
+            return any_of(PREDECESSOR_FIELD, sirets)
+        if direction == "predecessors":
+            return any_of(SUCCESSOR_FIELD, sirets)
+        return any_of(PREDECESSOR_FIELD, sirets) | any_of(SUCCESSOR_FIELD, sirets)
+
+    async def _fetch_links(
+        self, sirets: list[str], direction: str
+    ) -> list[LienSuccession]:
+        """Fetch every link of a batch with cursor pagination."""
+        q = self._batch_query(sirets, direction).compile()
+        links: list[LienSuccession] = []
+        cursor = "*"
+        while True:
+            document = await self._request(q, cursor)
+            entries = document.get("liensSuccession") or []
+            links.extend(LienSuccession.from_dict(entry) for entry in entries)
+            next_cursor = (document.get("header") or {}).get("curseurSuivant")
+            if not entries or not next_cursor or next_cursor == cursor:
+                return links
+            cursor = next_cursor
+
+    async def _request(self, q: str, cursor: str) -> dict[str, Any]:
+        """Send one /siret/liensSuccession page under the concurrency limit."""
+        async with self._semaphore:
+            self.requests += 1
+            return await _request_json(
+                self.client,
+                find_lien_succession_kwargs(
+                    q=q, nombre=str(self.page_size), curseur=cursor
+                ),
+                f"Succession request for {q}",
+                "etablissement/find_lien_succession",
+            )
+
+
+# Edge flag bits of SuccessionIndex
+_HEADQUARTERS_TRANSFER = 1
+_ECONOMIC_CONTINUITY = 2
+
+_INDEX_MAGIC = b"SIRENE-SUCCESSION-INDEX 1\n"
+
+
+class SuccessionIndex:
+    """
+    Array-backed, read-only succession graph with precomputed lineage answers.
+
+    SIRETs are interned and numbered; edges are stored as parallel arrays with
+    compressed adjacency offsets in both directions. The current successor of
+    every establishment and its economic-continuity component (union-find over
+    links flagged continuiteEconomique) are computed once, so those lookups are
+    O(1); ancestor and descendant traversals can be limited to links dated on
+    or before a given date.
+    """
+
+    _ARRAYS = (
+        "_edge_predecessor",
+        "_edge_successor",
+        "_edge_date",
+        "_edge_flags",
+        "_out_offsets",
+        "_out_edges",
+        "_in_offsets",
+        "_in_edges",
+        "_current",
+        "_component",
+    )
+
+    def __init__(self, links: Iterable[LienSuccession] = ()) -> None:
+        self._ids: dict[str, int] = {}
+        self._sirets: list[str] = []
+        self._edge_predecessor: array[int] = array("i")
+        self._edge_successor: array[int] = array("i")
+        self._edge_date: array[int] = array("i")
+        self._edge_flags: array[int] = array("B")
+
+        seen: set[tuple[str, str, str]] = set()
+        for link in links:
+            key = _edge_key(link)
+            if key in seen:
+                continue
+            seen.add(key)
+            link_date = link.date_lien_succession
+            flags = 0
+            if link.transfert_siege is True:
+                flags |= _HEADQUARTERS_TRANSFER
+            if link.continuite_economique is True:
+                flags |= _ECONOMIC_CONTINUITY
+            self._edge_predecessor.append(self._intern(key[0]))
+            self._edge_successor.append(self._intern(key[1]))
+            self._edge_date.append(
+                0 if isinstance(link_date, Unset) else link_date.toordinal()
+            )
+            self._edge_flags.append(flags)
+
+        self._build()
+
+    @classmethod
+    def from_graph(cls, graph: SuccessionGraph) -> SuccessionIndex:
+        """Build an index from the links of a SuccessionGraph."""
+        return cls(graph.edges)
+
+    def __len__(self) -> int:
+        return len(self._sirets)
+
+    def __contains__(self, siret: object) -> bool:
+        return siret in self._ids
+
+    @property
+    def edge_count(self) -> int:
+        """Number of distinct succession links."""
+        return len(self._edge_predecessor)
+
+    def current_successor(self, siret: str) -> str:
+        """
+        Latest establishment reached by following the most recent links.
+
+        Args:
+            siret: Establishment SIRET
+
+        Returns:
+            The final successor, or the SIRET itself when it has none
+        """
+        node = self._ids.get(siret)
+        return siret if node is None else self._sirets[self._current[node]]
+
+    def successors(self, siret: str, as_of: date | None = None) -> list[str]:
+        """Direct successors, optionally through links dated on or before as_of."""
+        return self._neighbours(siret, as_of, forward=True)
+
+    def predecessors(self, siret: str, as_of: date | None = None) -> list[str]:
+        """Direct predecessors, optionally through links dated on or before as_of."""
+        return self._neighbours(siret, as_of, forward=False)
+
+    def ancestors(self, siret: str, as_of: date | None = None) -> list[str]:
+        """Every transitive predecessor, nearest first."""
+        return self._traverse(siret, as_of, forward=False)
+
+    def descendants(self, siret: str, as_of: date | None = None) -> list[str]:
+        """Every transitive successor, nearest first."""
+        return self._traverse(siret, as_of, forward=True)
+
+    def same_continuity(self, first: str, second: str) -> bool:
+        """
+        Whether two establishments are joined by economic-continuity links.
+
+        Args:
+            first: First SIRET
+            second: Second SIRET
+
+        Returns:
+            True if both belong to the same continuity component
+        """
+        if first == second:
+            return True
+        a, b = self._ids.get(first), self._ids.get(second)
+        if a is None or b is None:
+            return False
+        return self._component[a] == self._component[b]
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the index to a binary file.
+
+        Args:
+            path: Destination file
+        """
+        header = {
+            "byteorder": sys.byteorder,
+            "nodes": len(self._sirets),
+            "arrays": [
+                [name, getattr(self, name).typecode, len(getattr(self, name))]
+                for name in self._ARRAYS
+            ],
+        }
+        with Path(path).open("wb") as f:
+            f.write(_INDEX_MAGIC)
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write("".join(self._sirets).encode("ascii"))
+            for name in self._ARRAYS:
+                getattr(self, name).tofile(f)
+        logger.debug(f"Saved succession index with {len(self)} SIRETs to {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> SuccessionIndex:
+        """
+        Read an index written by save().
+
+        Args:
+            path: Index file
+
+        Returns:
+            The loaded index
+
+        Raises:
+            ValueError: If the file is not a succession index
+        """
+        index = cls.__new__(cls)
+        with Path(path).open("rb") as f:
+            if f.readline() != _INDEX_MAGIC:
+                raise ValueError(f"Not a succession index file: {path}")
+            header = json.loads(f.readline())
+            raw = f.read(14 * header["nodes"]).decode("ascii")
+            index._sirets = [
+                sys.intern(raw[i : i + 14]) for i in range(0, len(raw), 14)
+            ]
+            index._ids = {siret: i for i, siret in enumerate(index._sirets)}
+            for name, typecode, length in header["arrays"]:
+                values: array[int] = array(typecode)
+                values.fromfile(f, length)
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+                setattr(index, name, values)
+        return index
+
+    def _intern(self, siret: str) -> int:
+        """Number of a SIRET, assigning the next one on first sight."""
+        node = self._ids.get(siret)
+        if node is None:
+            node = len(self._sirets)
+            siret = sys.intern(siret)
+            self._ids[siret] = node
+            self._sirets.append(siret)
+        return node
+
+    def _build(self) -> None:
+        """Compute adjacency offsets, current successors and components."""
+        nodes = len(self._sirets)
+        # Edges ordered by date so adjacency lists come out chronological
+        order = sorted(range(self.edge_count), key=self._edge_date.__getitem__)
+        self._out_offsets, self._out_edges = self._adjacency(
+            order, self._edge_predecessor, nodes
+        )
+        self._in_offsets, self._in_edges = self._adjacency(
+            order, self._edge_successor, nodes
+        )
+
+        # Latest link of each node, then follow chains with memoization
+        latest = array("i", [-1]) * nodes
+        for edge in order:
+            latest[self._edge_predecessor[edge]] = self._edge_successor[edge]
+        self._current = array("i", [-1]) * nodes
+        for start in range(nodes):
+            path: list[int] = []
+            on_path: set[int] = set()
+            node = start
+            while self._current[node] == -1 and latest[node] != -1:
+                if node in on_path:
+                    break
+                on_path.add(node)
+                path.append(node)
+                node = latest[node]
+            if self._current[node] != -1:
+                terminal = self._current[node]
+            elif node in on_path:
+                # Cycle: stop at the last establishment before it repeats
+                terminal = path[-1]
+            else:
+                terminal = node
+                self._current[node] = node
+            for member in path:
+                self._current[member] = terminal
+
+        # Union-find over economic-continuity links
+        parent = array("i", range(nodes))
+        size = array("i", [1]) * nodes
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for edge in range(self.edge_count):
+            if not self._edge_flags[edge] & _ECONOMIC_CONTINUITY:
+                continue
+            a = find(self._edge_predecessor[edge])
+            b = find(self._edge_successor[edge])
+            if a == b:
+                continue
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+        self._component = array("i", (find(node) for node in range(nodes)))
+
+    @staticmethod
+    def _adjacency(
+        order: list[int], endpoints: array[int], nodes: int
+    ) -> tuple[array[int], array[int]]:
+        """Compressed adjacency: edges of node n are edges[offsets[n]:offsets[n+1]]."""
+        offsets = array("i", [0]) * (nodes + 1)
+        for edge in order:
+            offsets[endpoints[edge] + 1] += 1
+        for node in range(nodes):
+            offsets[node + 1] += offsets[node]
+        edges = array("i", [0]) * len(order)
+        cursor = array("i", offsets[:-1])
+        for edge in order:
+            node = endpoints[edge]
+            edges[cursor[node]] = edge
+            cursor[node] += 1
+        return offsets, edges
+
+    def _neighbour_ids(self, node: int, limit: int | None, forward: bool) -> list[int]:
+        """Neighbours of a node through links dated on or before limit."""
+        offsets, edges, other = (
+            (self._out_offsets, self._out_edges, self._edge_successor)
+            if forward
+            else (self._in_offsets, self._in_edges, self._edge_predecessor)
+        )
+        return [
+            other[edge]
+            for edge in edges[offsets[node] : offsets[node + 1]]
+            if limit is None or self._edge_date[edge] <= limit
+        ]
+
+    def _neighbours(self, siret: str, as_of: date | None, forward: bool) -> list[str]:
+        """Direct neighbours of a SIRET as SIRET strings."""
+        node = self._ids.get(siret)
+        if node is None:
+            return []
+        limit = None if as_of is None else as_of.toordinal()
+        return [self._sirets[n] for n in self._neighbour_ids(node, limit, forward)]
+
+    def _traverse(self, siret: str, as_of: date | None, forward: bool) -> list[str]:
+        """Breadth-first transitive neighbours of a SIRET."""
+        start = self._ids.get(siret)
+        if start is None:
+            return []
+        limit = None if as_of is None else as_of.toordinal()
+        visited = {start}
+        result: list[str] = []
+        frontier = [start]
+        while frontier:
+            next_frontier: list[int] = []
+            for node in frontier:
+                for neighbour in self._neighbour_ids(node, limit, forward):
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        next_frontier.append(neighbour)
+                        result.append(self._sirets[neighbour])
+            frontier = next_frontier
+        return result
@@ -0,0 +1,395 @@
+"""
+Baseline-plus-delta synchronization of a local SIRENE mirror.
+
+A full mirror is loaded once from the monthly stock files, then kept fresh
+with API deltas: the /informations service tells up to when each collection
+has been processed, only records whose dateDernierTraitement falls after the
+local watermark are fetched, and they are merged by SIREN/SIRET, writing only
+those whose shared payload hash changed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING, Any, Protocol
+
+from sirene_api_client.api.informations.informations import (
+    _get_kwargs as informations_kwargs,
+)
+from sirene_api_client.models.dates_mise_a_jour_donnees_collection import (
+    DatesMiseAJourDonneesCollection,
+)
+from sirene_api_client.models.reponse_informations import ReponseInformations
+
+from .config import ETLConfig
+from .exceptions import ExtractionError
+from .models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+    hash_payload,
+)
+from .query import QueryExecutor
+from .stock import StockIngestor
+from .transformer import SIRENTransformer
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from sirene_api_client.client import AuthenticatedClient
+
+    from .models import ActivityClassificationData
+
+logger = logging.getLogger(__name__)
+
+LEGAL_UNITS = DatesMiseAJourDonneesCollection.UNITÉS_LÉGALES.value
+ESTABLISHMENTS = DatesMiseAJourDonneesCollection.ÉTABLISSEMENTS.value
+
+# dateDernierTraitement field of each collection
+_PROCESSING_DATE_FIELDS = {
+    LEGAL_UNITS: "dateDernierTraitementUniteLegale",
+    ESTABLISHMENTS: "dateDernierTraitementEtablissement",
+}
+
+# Period histories, of which a stock file only holds the current period
+_PERIOD_LISTS = frozenset({"periodesUniteLegale", "periodesEtablissement"})
+
+# API fields without a stock file column
+_API_ONLY_FIELDS = frozenset({"uniteLegale"})
+
+
+class LocalStore(Protocol):
+    """Storage of the mirrored bundles and of the sync watermarks."""
+
+    def payload_hash(self, entity_type: str, external_id: str) -> str | None:
+        """shared_payload_hash of a stored legal unit or establishment, if any."""
+        ...
+
+    def upsert(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        """Insert or replace the entities of a bundle."""
+        ...
+
+    def watermark(self, collection: str) -> datetime | None:
+        """Processing date up to which a collection is mirrored."""
+        ...
+
+    def set_watermark(self, collection: str, value: datetime) -> None:
+        """Record the processing date up to which a collection is mirrored."""
+        ...
+
+
+class InMemoryStore:
+    """LocalStore keeping the latest bundle of each entity in dictionaries."""
+
+    def __init__(self) -> None:
+        self.companies: dict[str, CompanyBundle] = {}
+        self.facilities: dict[str, FacilityBundle] = {}
+        self.activity_classifications: dict[str, ActivityClassificationData] = {}
+        self.watermarks: dict[str, datetime] = {}
+
+    def payload_hash(self, entity_type: str, external_id: str) -> str | None:
+        if entity_type == "legal_unit":
+            company = self.companies.get(external_id)
+            record = company.registry_record if company else None
+        else:
+            facility = self.facilities.get(external_id)
+            record = facility.registry_record if facility else None
+        return shared_payload_hash(record.payload) if record else None
+
+    def upsert(
+        self, bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle
+    ) -> None:
+        if isinstance(bundle, CompanyBundle):
+            self.companies[bundle.company.identifiers[0].value] = bundle
+        elif isinstance(bundle, FacilityBundle):
+            self.facilities[bundle.ownership.facility_siret] = bundle
+        else:
+            for classification in bundle.activity_classifications:
+                key = f"{classification.scheme}:{classification.code}"
+                self.activity_classifications[key] = classification
+
+    def watermark(self, collection: str) -> datetime | None:
+        return self.watermarks.get(collection)
+
+    def set_watermark(self, collection: str, value: datetime) -> None:
+        self.watermarks[collection] = value
+
+
+@dataclass
+class SyncStats:
+    """Counts of a baseline load or delta sync."""
+
+    inserted: int = 0
+    """Entities absent from the store."""
+
+    updated: int = 0
+    """Stored entities whose shared payload hash changed."""
+
+    unchanged: int = 0
+    """Stored entities with an identical shared payload hash, not rewritten."""
+
+
+@dataclass
+class CollectionDates:
+    """Update dates of one collection, from /informations."""
+
+    last_processing: datetime | None
+    """dateDernierTraitementMaximum: data are valid up to this date."""
+
+    last_mass_processing: datetime | None
+    """dateDernierTraitementDeMasse: date of the last bulk update."""
+
+
+class SyncEngine:
+    """Keep a LocalStore in sync with SIRENE from a stock baseline and API deltas."""
+
+    def __init__(
+        self,
+        client: AuthenticatedClient,
+        store: LocalStore,
+        config: ETLConfig | None = None,
+        *,
+        max_concurrency: int = 4,
+        max_ingest_workers: int | None = None,
+    ) -> None:
+        if client is None:
+            raise TypeError("client cannot be None")
+        if store is None:
+            raise TypeError("store cannot be None")
+        self.client = client
+        self.store = store
+        self.config = config or ETLConfig()
+        self.max_ingest_workers = max_ingest_workers
+        self.executor = QueryExecutor(client, max_concurrency=max_concurrency)
+
+    def load_baseline(
+        self, path: str | Path, as_of: datetime | None = None
+    ) -> SyncStats:
+        """
+        Load a stock file into the store and set its collection watermark.
+
+        Args:
+            path: StockUniteLegale or StockEtablissement CSV file
+            as_of: Processing date of the stock file (defaults to the latest
+                dateDernierTraitement found in the file; rows without one are
+                ignored, and no watermark is set when no row has one)
+
+        Returns:
+            Merge counts
+        """
+        stats = SyncStats()
+        collections: set[str] = set()
+        latest: dict[str, datetime] = {}
+
+        def sink(
+            bundle: CompanyBundle | FacilityBundle | ActivityClassificationBundle,
+        ) -> None:
+            if isinstance(bundle, ActivityClassificationBundle):
+                self.store.upsert(bundle)
+                return
+            collection = (
+                LEGAL_UNITS if isinstance(bundle, CompanyBundle) else ESTABLISHMENTS
+            )
+            collections.add(collection)
+            record = bundle.registry_record
+            # registry_updated_at falls back to the ingestion time when the
+            # row has no processing date, so read the date from the payload
+            processed = (
+                _processing_date(record.payload, _PROCESSING_DATE_FIELDS[collection])
+                if record is not None
+                else None
+            )
+            if processed is not None and (
+                collection not in latest or processed > latest[collection]
+            ):
+                latest[collection] = processed
+            self._merge(bundle, stats)
+
+        StockIngestor(self.config, max_workers=self.max_ingest_workers).ingest(
+            path, sink
+        )
+        for collection in collections:
+            watermark = as_of or latest.get(collection)
+            if watermark is None:
+                logger.warning(
+                    f"No dateDernierTraitement in {path}, {collection} watermark not set"
+                )
+                continue
+            self.store.set_watermark(collection, watermark)
+        logger.info(
+            f"Loaded baseline {path}: {stats.inserted} inserted, "
+            f"{stats.updated} updated, {stats.unchanged} unchanged"
+        )
+        return stats
+
+    async def collection_dates(self) -> dict[str, CollectionDates]:
+        """
+        Fetch the update dates of each collection from /informations.
+
+        Returns:
+            Dates keyed by collection name (LEGAL_UNITS, ESTABLISHMENTS, ...)
+
+        Raises:
+            ExtractionError: If the request fails
+        """
+        try:
+            response = await self.client.get_async_httpx_client().request(
+                **informations_kwargs()
+            )
+        except Exception as e:
+            raise ExtractionError(
+                f"Informations request failed: {e}", endpoint="informations"
+            ) from e
+        if response.status_code != 200:
+            raise ExtractionError(
+                f"Informations request returned HTTP {response.status_code}",
+                endpoint="informations",
+            )
+
+        informations = ReponseInformations.from_dict(response.json())
+        dates: dict[str, CollectionDates] = {}
+        for entry in informations.dates_dernieres_mises_a_jour_des_donnees or []:
+            if not isinstance(entry.collection, DatesMiseAJourDonneesCollection):
+                continue
+            dates[entry.collection.value] = CollectionDates(
+                last_processing=_datetime_or_none(
+                    entry.date_dernier_traitement_maximum
+                ),
+                last_mass_processing=_datetime_or_none(
+                    entry.date_dernier_traitement_de_masse
+                ),
+            )
+        return dates
+
+    async def sync(self) -> SyncStats:
+        """
+        Fetch and merge every legal unit and establishment processed since
+        the watermarks, then advance the watermarks.
+
+        Deltas are merged page by page as they arrive, so a large delta is
+        never held in memory at once.
+
+        Returns:
+            Merge counts
+
+        Raises:
+            ValueError: If a collection has no watermark (no baseline loaded)
+            ExtractionError: If a request fails
+        """
+        dates = await self.collection_dates()
+        stats = SyncStats()
+        transformer = SIRENTransformer(self.config)
+
+        for collection, field in _PROCESSING_DATE_FIELDS.items():
+            since = self.store.watermark(collection)
+            if since is None:
+                raise ValueError(f"No baseline loaded for {collection}")
+            collection_dates = dates.get(collection)
+            until = collection_dates.last_processing if collection_dates else None
+            if until is not None and until <= since:
+                logger.debug(f"{collection} is up to date ({since.isoformat()})")
+                continue
+            mass = collection_dates.last_mass_processing if collection_dates else None
+            if mass is not None and mass > since:
+                logger.warning(
+                    f"{collection} had a mass update on {mass.isoformat()}, "
+                    "the delta may be large"
+                )
+
+            q = f"{field}:[{_format_date(since)} TO {_format_date(until)}]"
+            if collection == LEGAL_UNITS:
+                async for company in self.executor.unites_legales_streaming(q):
+                    self._merge(transformer.transform_company_bundle(company), stats)
+            else:
+                async for facility in self.executor.etablissements_streaming(q):
+                    self._merge(transformer.transform_facility_bundle(facility), stats)
+            if until is not None:
+                self.store.set_watermark(collection, until)
+
+        self.store.upsert(
+            transformer.closing_bundle({"synced_at": datetime.now().isoformat()})
+        )
+        logger.info(
+            f"Synced deltas: {stats.inserted} inserted, {stats.updated} updated, "
+            f"{stats.unchanged} unchanged"
+        )
+        return stats
+
+    def _merge(self, bundle: CompanyBundle | FacilityBundle, stats: SyncStats) -> None:
+        """Write a bundle unless the store holds the same shared payload."""
+        record = bundle.registry_record
+        if record is None:
+            self.store.upsert(bundle)
+            stats.inserted += 1
+            return
+        stored_hash = self.store.payload_hash(record.entity_type, record.external_id)
+        if stored_hash == shared_payload_hash(record.payload):
+            stats.unchanged += 1
+            return
+        self.store.upsert(bundle)
+        if stored_hash is None:
+            stats.inserted += 1
+        else:
+            stats.updated += 1
+
+
+def shared_payload_hash(payload: dict[str, Any]) -> str:
+    """
+    Hash the part of a registry payload that stock files and the API share.
+
+    A stock row only holds the current period and omits empty values, while
+    an API document holds the whole period history, null values and, for an
+    establishment, its legal unit. Keeping the current period and dropping
+    the rest gives an unchanged entity the same hash from either source.
+
+    Args:
+        payload: UniteLegale or Etablissement document
+
+    Returns:
+        SHA-256 of the shared fields, as hash_payload
+    """
+    shared: dict[str, Any] = {}
+    for name, value in payload.items():
+        if value is None or name in _API_ONLY_FIELDS:
+            continue
+        if name in _PERIOD_LISTS and value:
+            current = next((p for p in value if p.get("dateFin") is None), value[0])
+            value = [_without_nulls(current)]
+        elif isinstance(value, dict):
+            value = _without_nulls(value)
+        shared[name] = value
+    return hash_payload(shared)
+
+
+def _without_nulls(document: dict[str, Any]) -> dict[str, Any]:
+    """A flat document without its null values."""
+    return {name: value for name, value in document.items() if value is not None}
+
+
+def _datetime_or_none(value: object) -> datetime | None:
+    """The value if it is a datetime (not UNSET)."""
+    return value if isinstance(value, datetime) else None
+
+
+def _processing_date(payload: dict[str, Any], field: str) -> datetime | None:
+    """Parsed dateDernierTraitement of a registry payload, if it has one."""
+    value = payload.get(field)
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _format_date(value: datetime | None) -> str:
+    """Format a range bound of a dateDernierTraitement query."""
+    if value is None:
+        return "*"
+    return value.replace(tzinfo=None).isoformat(timespec="seconds")
@@ -0,0 +1,178 @@
+"""
+Temporal interval index for as-of queries over SIRENE periods.
+
+Legal unit and establishment periods answer "what was the activity code or
+status of X on date D". IntervalIndex sorts the periods of one entity by start
+date, so that point queries are a bisect and range queries a bisect plus the
+matching periods. PeriodIndex builds one IntervalIndex for the legal unit and
+one per facility of a SIRENExtractResult.
+
+Period bounds are inclusive, like SIRENE's dateDebut and dateFin. A missing
+start means the period has been in effect since the beginning, and a missing
+end that it is still current.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+import logging
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from .models import (
+        CompanyLegalUnitPeriodData,
+        FacilityEstablishmentPeriodData,
+        SIRENExtractResult,
+    )
+
+logger = logging.getLogger(__name__)
+
+
+class Period(Protocol):
+    """Anything with inclusive start and end dates."""
+
+    @property
+    def start(self) -> date | None: ...
+
+    @property
+    def end(self) -> date | None: ...
+
+
+class IntervalIndex[P: Period]:
+    """
+    Periods of one entity sorted by start date.
+
+    Besides the sorted starts, the index keeps the running maximum of the end
+    dates, which is non-decreasing and can be bisected too. For periods that
+    do not overlap, as SIRENE periods of one entity, both queries take
+    O(log n) plus the number of results; overlapping periods stay correct.
+    """
+
+    def __init__(self, periods: Iterable[P]) -> None:
+        self._periods = sorted(periods, key=lambda period: period.start or date.min)
+        self._starts = [period.start or date.min for period in self._periods]
+        self._max_ends: list[date] = []
+        max_end = date.min
+        for period in self._periods:
+            max_end = max(max_end, period.end or date.max)
+            self._max_ends.append(max_end)
+
+    def __len__(self) -> int:
+        return len(self._periods)
+
+    def __iter__(self) -> Iterator[P]:
+        return iter(self._periods)
+
+    def at(self, when: date) -> P | None:
+        """
+        Period in effect on a date.
+
+        Args:
+            when: Date to look up
+
+        Returns:
+            Period covering the date, the latest-starting one if several do,
+            None if none does
+        """
+        # Periods starting on or before the date, latest first, while one of
+        # them or an earlier one still reaches the date
+        index = bisect_right(self._starts, when) - 1
+        while index >= 0 and self._max_ends[index] >= when:
+            period = self._periods[index]
+            if (period.end or date.max) >= when:
+                return period
+            index -= 1
+        return None
+
+    def between(self, start: date | None = None, end: date | None = None) -> list[P]:
+        """
+        Periods overlapping a date range.
+
+        Args:
+            start: First day of the range, unbounded if None
+            end: Last day of the range, unbounded if None
+
+        Returns:
+            Overlapping periods, by start date
+        """
+        low = bisect_left(self._max_ends, start) if start is not None else 0
+        high = (
+            bisect_right(self._starts, end) if end is not None else len(self._periods)
+        )
+        return [
+            period
+            for period in self._periods[low:high]
+            if start is None or (period.end or date.max) >= start
+        ]
+
+
+class PeriodIndex:
+    """As-of queries over the legal unit and establishment periods of a SIREN."""
+
+    def __init__(
+        self,
+        legal_unit_periods: Iterable[CompanyLegalUnitPeriodData] = (),
+        establishment_periods: Iterable[FacilityEstablishmentPeriodData] = (),
+    ) -> None:
+        self.legal_unit: IntervalIndex[CompanyLegalUnitPeriodData] = IntervalIndex(
+            legal_unit_periods
+        )
+        by_facility: dict[str, list[FacilityEstablishmentPeriodData]] = {}
+        skipped = 0
+        for period in establishment_periods:
+            if period.facility_siret is None:
+                skipped += 1
+                continue
+            by_facility.setdefault(period.facility_siret, []).append(period)
+        if skipped:
+            logger.warning(
+                f"Skipped {skipped} establishment periods without facility_siret"
+            )
+        self.establishments: dict[
+            str, IntervalIndex[FacilityEstablishmentPeriodData]
+        ] = {siret: IntervalIndex(periods) for siret, periods in by_facility.items()}
+
+    @classmethod
+    def from_result(cls, result: SIRENExtractResult) -> PeriodIndex:
+        """Index the periods of an extraction result."""
+        return cls(result.legal_unit_periods, result.establishment_periods)
+
+    def legal_unit_at(self, when: date) -> CompanyLegalUnitPeriodData | None:
+        """Legal unit period in effect on a date."""
+        return self.legal_unit.at(when)
+
+    def establishment_at(
+        self, siret: str, when: date
+    ) -> FacilityEstablishmentPeriodData | None:
+        """Period of a facility in effect on a date, None for unknown SIRETs."""
+        index = self.establishments.get(siret)
+        return index.at(when) if index is not None else None
+
+    def establishments_at(
+        self, when: date
+    ) -> dict[str, FacilityEstablishmentPeriodData]:
+        """Period in effect on a date of every facility that has one."""
+        periods = {}
+        for siret, index in self.establishments.items():
+            period = index.at(when)
+            if period is not None:
+                periods[siret] = period
+        return periods
+
+    def establishment_between(
+        self, siret: str, start: date | None = None, end: date | None = None
+    ) -> list[FacilityEstablishmentPeriodData]:
+        """Periods of a facility overlapping a date range."""
+        index = self.establishments.get(siret)
+        return index.between(start, end) if index is not None else []
+
+    def active_facilities(self, when: date) -> list[str]:
+        """SIRETs of the facilities active on a date."""
+        return [
+            siret
+            for siret, period in self.establishments_at(when).items()
+            if period.status == "active"
+        ]
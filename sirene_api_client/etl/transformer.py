@@ -7,8 +7,6 @@ This module handles transformation of raw API data to Django-ready Pydantic mode
 from __future__ import annotations
 
 from datetime import date, datetime
-import hashlib
-import json
 import logging
 from typing import TYPE_CHECKING, Any
 
@@ -18,20 +16,28 @@ from .config import ETLConfig, ValidationMode
 from .coordinators import lambert93_to_wgs84
 from .exceptions import TransformationError, ValidationError
 from .models import (
+    ActivityClassificationBundle,
     ActivityClassificationData,
     AddressData,
+    CompanyBundle,
     CompanyData,
     CompanyIdentifierData,
     CompanyLegalUnitPeriodData,
     ExternalRegistryRecordData,
+    FacilityAddressLinkData,
+    FacilityBundle,
     FacilityData,
     FacilityEstablishmentPeriodData,
     FacilityIdentifierData,
     FacilityOwnershipData,
     SIRENExtractResult,
+    hash_payload,
 )
+from .naf import get_naf_registry, normalize_scheme
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from sirene_api_client.models.adresse import Adresse
     from sirene_api_client.models.etablissement import Etablissement
     from sirene_api_client.models.periode_etablissement import PeriodeEtablissement
@@ -49,6 +55,12 @@ class SIRENTransformer:
             raise TypeError("config cannot be None")
         self.config = config
         self._activity_cache: dict[str, ActivityClassificationData] = {}
+        # Interned addresses by canonical key and converted Lambert coordinates,
+        # oldest first, bounded by config.address_cache_size
+        self._address_cache: dict[str, AddressData] = {}
+        self._coordinate_cache: dict[
+            tuple[str | float, str | float], tuple[float, float] | None
+        ] = {}
 
     def transform_complete(self, raw_data: dict[str, Any]) -> SIRENExtractResult:
         """
@@ -73,6 +85,8 @@ class SIRENTransformer:
             facilities_data = []
             establishment_periods = []
             addresses = []
+            address_links = []
+            seen_address_keys: set[str] = set()
             facility_ownerships = []
 
             for facility in facilities:
@@ -88,13 +102,17 @@ class SIRENTransformer:
                         establishment_periods.append(period_data)
 
                 # Transform addresses
-                if facility.adresse_etablissement:
-                    address_data = self.transform_address(
-                        facility.adresse_etablissement,
-                        facility,  # NEW: Pass facility for reference
-                        facility.date_creation_etablissement or date.today(),
-                    )
-                    addresses.append(address_data)
+                facility_address = self.transform_facility_address(facility)
+                if facility_address is not None:
+                    address_data, address_link = facility_address
+                    if address_link is None:
+                        addresses.append(address_data)
+                    else:
+                        # Interned: one address per key, one link per facility
+                        address_links.append(address_link)
+                        if address_link.address_key not in seen_address_keys:
+                            seen_address_keys.add(address_link.address_key)
+                            addresses.append(address_data)
 
                 # Create facility ownership relationship
                 ownership_data = self.transform_facility_ownership(facility)
@@ -116,7 +134,8 @@ class SIRENTransformer:
                 legal_unit_periods=legal_unit_periods,
                 establishment_periods=establishment_periods,
                 addresses=addresses,
-                activity_classifications=list(self._activity_cache.values()),
+                address_links=address_links,
+                activity_classifications=self.activity_classifications(),
                 facility_ownerships=facility_ownerships,
                 registry_records=registry_records,
                 extraction_metadata=raw_data.get("extraction_metadata", {})
@@ -131,6 +150,72 @@ class SIRENTransformer:
             logger.error(f"Failed to transform data: {e}")
             raise TransformationError(f"Failed to transform data: {e}") from e
 
+    def transform_company_bundle(
+        self, company: UniteLegale, payload: dict[str, Any] | None = None
+    ) -> CompanyBundle:
+        """
+        Transform a UniteLegale into the company-level bundle of the streaming ETL.
+
+        Args:
+            company: UniteLegale returned by the API
+            payload: Decoded document the UniteLegale was built from, used as the
+                registry payload instead of company.to_dict()
+
+        Returns:
+            CompanyBundle with company data, legal unit periods and registry record
+        """
+        legal_unit_periods = []
+        if company.periodes_unite_legale:
+            for legal_period in company.periodes_unite_legale:
+                legal_unit_periods.append(
+                    self.transform_legal_unit_period(legal_period)
+                )
+
+        return CompanyBundle(
+            company=self.transform_unite_legale(company),
+            legal_unit_periods=legal_unit_periods,
+            registry_record=self._create_company_registry_record(company, payload),
+        )
+
+    def transform_facility_bundle(
+        self, facility: Etablissement, payload: dict[str, Any] | None = None
+    ) -> FacilityBundle:
+        """
+        Transform a single Etablissement into a self-contained facility bundle.
+
+        Nothing is retained on the transformer apart from the activity
+        classification cache, so bundles can be discarded once consumed.
+
+        Args:
+            facility: Etablissement returned by the API
+            payload: Decoded document the Etablissement was built from, used as
+                the registry payload instead of facility.to_dict()
+
+        Returns:
+            FacilityBundle with facility, periods, address, ownership and registry record
+        """
+        establishment_periods = []
+        if facility.periodes_etablissement:
+            for period in facility.periodes_etablissement:
+                establishment_periods.append(
+                    self.transform_establishment_period(period, facility)
+                )
+
+        address = None
+        address_link = None
+        facility_address = self.transform_facility_address(facility)
+        if facility_address is not None:
+            address, address_link = facility_address
+
+        return FacilityBundle(
+            facility=self.transform_etablissement(facility),
+            establishment_periods=establishment_periods,
+            address=address,
+            address_link=address_link,
+            ownership=self.transform_facility_ownership(facility),
+            registry_record=self._create_facility_registry_record(facility, payload),
+        )
+
     def transform_unite_legale(self, ul: UniteLegale | None) -> CompanyData:
         """Transform UniteLegale to CompanyData."""
         if ul is None:
@@ -230,21 +315,24 @@ class SIRENTransformer:
         facility: Etablissement,  # Add facility parameter
         start_date: date,
     ) -> AddressData:
-        """Transform Adresse to AddressData with facility link and WGS84 coordinates."""
+        """
+        Transform Adresse to AddressData with facility link and WGS84 coordinates.
+
+        With config.intern_addresses, an address with a canonical key is shared:
+        it is created once per key with neither facility_siret nor start, and
+        returned as is to later facilities and SIRENs, which are linked to it
+        by FacilityAddressLinkData instead.
+        """
         logger.debug("Transforming address data")
 
-        # Combine street components
-        street_parts = []
-        if adresse.numero_voie_etablissement:
-            street_parts.append(str(adresse.numero_voie_etablissement))
-        if adresse.indice_repetition_etablissement:
-            street_parts.append(str(adresse.indice_repetition_etablissement))
-        if adresse.type_voie_etablissement:
-            street_parts.append(str(adresse.type_voie_etablissement))
-        if adresse.libelle_voie_etablissement:
-            street_parts.append(str(adresse.libelle_voie_etablissement))
+        address_key = self.address_key(adresse)
+        interned_key = address_key if self.config.intern_addresses else None
+        if interned_key is not None:
+            interned = self._address_cache.get(interned_key)
+            if interned is not None:
+                return interned
 
-        street_address = " ".join(street_parts) if street_parts else None
+        street_address = self._street_address(adresse)
 
         # Convert coordinates
         longitude, latitude = None, None
@@ -252,7 +340,7 @@ class SIRENTransformer:
             adresse.coordonnee_lambert_abscisse_etablissement
             and adresse.coordonnee_lambert_ordonnee_etablissement
         ):
-            coords = lambert93_to_wgs84(
+            coords = self._convert_coordinates(
                 adresse.coordonnee_lambert_abscisse_etablissement,
                 adresse.coordonnee_lambert_ordonnee_etablissement,
             )
@@ -269,8 +357,8 @@ class SIRENTransformer:
                 if coords:
                     longitude, latitude = coords
 
-        return AddressData(
-            facility_siret=str(facility.siret),  # NEW: Explicit facility link
+        address = AddressData(
+            facility_siret=None if interned_key else str(facility.siret),
             country=str(adresse.code_pays_etranger_etablissement)
             if adresse.code_pays_etranger_etablissement is not UNSET
             and adresse.code_pays_etranger_etablissement is not None
@@ -283,8 +371,100 @@ class SIRENTransformer:
             latitude=latitude,
             provider="sirene",
             geocode_precision=self.config.coordinate_precision,
-            start=start_date,
+            start=None if interned_key else start_date,
             end=None,  # Not available in SIREN data
+            address_key=address_key,
+        )
+        if interned_key is not None:
+            self._remember(self._address_cache, interned_key, address)
+        return address
+
+    def address_key(self, adresse: Adresse) -> str | None:
+        """
+        Canonical key of an address, shared by establishments at that address.
+
+        The BAN address identifier is used when SIRENE provides it; otherwise the
+        key is built from the normalized street, postcode, commune and country.
+
+        Returns:
+            Canonical key, None if the address has neither street nor postcode
+        """
+        identifier = self._unwrap_unset(adresse.identifiant_adresse_etablissement)
+        if identifier:
+            return f"ban:{identifier}"
+        street = self._street_address(adresse)
+        postal_code = self._unwrap_unset(adresse.code_postal_etablissement)
+        if not street and not postal_code:
+            return None
+        commune = self._unwrap_unset(
+            adresse.code_commune_etablissement
+        ) or self._unwrap_unset(adresse.libelle_commune_etablissement)
+        country = self._unwrap_unset(adresse.code_pays_etranger_etablissement)
+        parts = (street, postal_code, commune, country or "FR")
+        return "addr:" + "|".join(
+            " ".join(str(part).casefold().split()) if part else "" for part in parts
+        )
+
+    def _street_address(self, adresse: Adresse) -> str | None:
+        """Combine street components of an address."""
+        street_parts = []
+        if adresse.numero_voie_etablissement:
+            street_parts.append(str(adresse.numero_voie_etablissement))
+        if adresse.indice_repetition_etablissement:
+            street_parts.append(str(adresse.indice_repetition_etablissement))
+        if adresse.type_voie_etablissement:
+            street_parts.append(str(adresse.type_voie_etablissement))
+        if adresse.libelle_voie_etablissement:
+            street_parts.append(str(adresse.libelle_voie_etablissement))
+
+        return " ".join(street_parts) if street_parts else None
+
+    def _convert_coordinates(
+        self, x: str | float, y: str | float
+    ) -> tuple[float, float] | None:
+        """Convert Lambert 93 coordinates, reusing earlier conversions."""
+        key = (x, y)
+        if key in self._coordinate_cache:
+            return self._coordinate_cache[key]
+        coords = lambert93_to_wgs84(x, y)
+        self._remember(self._coordinate_cache, key, coords)
+        return coords
+
+    def _remember(self, cache: dict[Any, Any], key: Any, value: Any) -> None:
+        """Add to a bounded cache, evicting the oldest entry when full."""
+        if self.config.address_cache_size == 0:
+            return
+        if len(cache) >= self.config.address_cache_size:
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+    def transform_facility_address(
+        self, facility: Etablissement
+    ) -> tuple[AddressData, FacilityAddressLinkData | None] | None:
+        """
+        Transform the address of a facility and link the facility to it.
+
+        Args:
+            facility: Etablissement returned by the API
+
+        Returns:
+            (address, link) pair, where link is None unless the address is
+            interned (see transform_address), or None without an address
+        """
+        if not facility.adresse_etablissement:
+            return None
+        address = self.transform_address(
+            facility.adresse_etablissement,
+            facility,
+            facility.date_creation_etablissement or date.today(),
+        )
+        if not self.config.intern_addresses or address.address_key is None:
+            return address, None
+        return address, FacilityAddressLinkData(
+            facility_siret=str(facility.siret),
+            address_key=address.address_key,
+            start=self._unwrap_unset(facility.date_creation_etablissement),
+            end=None,
         )
 
     def transform_legal_unit_period(
@@ -370,6 +550,7 @@ class SIRENTransformer:
             activity_scheme=activity_scheme,
             is_hq=facility.etablissement_siege or False,
             opening_date=self._unwrap_unset(facility.date_creation_etablissement),
+            facility_siret=str(facility.siret) if facility.siret else None,
         )
 
     def transform_facility_ownership(
@@ -505,22 +686,75 @@ class SIRENTransformer:
     def transform_activity_code(
         self, code: str, scheme: str, label: str | None = None
     ) -> ActivityClassificationData:
-        """Transform activity code to ActivityClassificationData."""
+        """
+        Transform activity code to ActivityClassificationData.
+
+        Without an explicit label, the shared object of the process-wide NAF
+        registry is used, labelled from the nomenclature index.
+        """
         # Normalize scheme to lowercase with underscores
-        normalized_scheme = scheme.lower().replace("rev", "_rev").replace(" ", "_")
+        normalized_scheme = normalize_scheme(scheme)
         cache_key = f"{normalized_scheme}:{code}"
 
         if cache_key not in self._activity_cache:
-            self._activity_cache[cache_key] = ActivityClassificationData(
-                scheme=normalized_scheme,
-                code=code,
-                label=label or f"{scheme} {code}",  # Use provided label or default
-                start=date(2008, 1, 1),  # NAF Rev.2 start date
-                end=None,
-            )
+            if label is None:
+                self._activity_cache[cache_key] = get_naf_registry().classification(
+                    code, scheme
+                )
+            else:
+                self._activity_cache[cache_key] = ActivityClassificationData(
+                    scheme=normalized_scheme,
+                    code=code,
+                    label=label,
+                    start=date(2008, 1, 1),  # NAF Rev.2 start date
+                    end=None,
+                )
 
         return self._activity_cache[cache_key]
 
+    def activity_classifications(self) -> list[ActivityClassificationData]:
+        """Activity classifications created so far, one per scheme and code."""
+        return list(self._activity_cache.values())
+
+    def closing_bundle(
+        self, extraction_metadata: dict[str, Any]
+    ) -> ActivityClassificationBundle:
+        """
+        Bundle ending a streaming run, with the classifications created so far.
+
+        Args:
+            extraction_metadata: Metadata of the run
+
+        Returns:
+            ActivityClassificationBundle
+        """
+        return ActivityClassificationBundle(
+            activity_classifications=self.activity_classifications(),
+            extraction_metadata=extraction_metadata,
+        )
+
+    def merge_activity_cache(
+        self, classifications: Iterable[ActivityClassificationData]
+    ) -> int:
+        """
+        Merge activity classifications created by another transformer.
+
+        Entries already cached are kept, so every code keeps a single object.
+
+        Args:
+            classifications: activity_classifications() of another transformer
+
+        Returns:
+            Number of newly added classifications
+        """
+        added = 0
+        for classification in classifications:
+            cache_key = f"{classification.scheme}:{classification.code}"
+            if cache_key not in self._activity_cache:
+                self._activity_cache[cache_key] = classification
+                added += 1
+        return added
+
     def _get_or_create_activity_classification(
         self, code: str, scheme: str
     ) -> ActivityClassificationData:
@@ -531,48 +765,60 @@ class SIRENTransformer:
         self, raw_data: dict[str, Any]
     ) -> list[ExternalRegistryRecordData]:
         """Create registry records for audit trail."""
-        records = []
-
-        # Company record
-        company = raw_data["company"]
-        company_payload = company.to_dict() if hasattr(company, "to_dict") else {}
-        records.append(
-            ExternalRegistryRecordData(
-                entity_type="legal_unit",
-                external_id=str(company.siren),
-                payload=company_payload,
-                payload_hash=self._create_payload_hash(company_payload),
-                registry_updated_at=self._parse_datetime(
-                    company.date_dernier_traitement_unite_legale
-                )
-                or datetime.now(),
-                ingested_at=datetime.now(),
+        # Decoded documents kept by the extractor with raw_registry_payloads
+        facility_payloads = raw_data.get("raw_facilities") or [None] * len(
+            raw_data["facilities"]
+        )
+        records = [
+            self._create_company_registry_record(
+                raw_data["company"], raw_data.get("raw_company")
             )
+        ]
+        for facility, payload in zip(
+            raw_data["facilities"], facility_payloads, strict=True
+        ):
+            records.append(self._create_facility_registry_record(facility, payload))
+        return records
+
+    def _create_company_registry_record(
+        self, company: UniteLegale, payload: dict[str, Any] | None = None
+    ) -> ExternalRegistryRecordData:
+        """Create the registry record of a legal unit."""
+        if payload is not None:
+            company_payload = payload
+        else:
+            company_payload = company.to_dict() if hasattr(company, "to_dict") else {}
+        return ExternalRegistryRecordData(
+            entity_type="legal_unit",
+            external_id=str(company.siren),
+            payload=company_payload,
+            payload_hash=hash_payload(company_payload),
+            registry_updated_at=self._parse_datetime(
+                company.date_dernier_traitement_unite_legale
+            )
+            or datetime.now(),
+            ingested_at=datetime.now(),
         )
 
-        # Facility records
-        for facility in raw_data["facilities"]:
+    def _create_facility_registry_record(
+        self, facility: Etablissement, payload: dict[str, Any] | None = None
+    ) -> ExternalRegistryRecordData:
+        """Create the registry record of an establishment."""
+        if payload is not None:
+            facility_payload = payload
+        else:
             facility_payload = (
                 facility.to_dict() if hasattr(facility, "to_dict") else {}
             )
-            records.append(
-                ExternalRegistryRecordData(
-                    entity_type="establishment",
-                    external_id=str(facility.siret),
-                    payload=facility_payload,
-                    payload_hash=self._create_payload_hash(facility_payload),
-                    registry_updated_at=facility.date_dernier_traitement_etablissement
-                    or datetime.now(),
-                    ingested_at=datetime.now(),
-                )
-            )
-
-        return records
-
-    def _create_payload_hash(self, payload: dict[str, Any]) -> str:
-        """Create SHA-256 hash of payload."""
-        payload_str = json.dumps(payload, sort_keys=True, default=str)
-        return hashlib.sha256(payload_str.encode()).hexdigest()
+        return ExternalRegistryRecordData(
+            entity_type="establishment",
+            external_id=str(facility.siret),
+            payload=facility_payload,
+            payload_hash=hash_payload(facility_payload),
+            registry_updated_at=facility.date_dernier_traitement_etablissement
+            or datetime.now(),
+            ingested_at=datetime.now(),
+        )
 
     def map_unite_legale_status(self, api_status: str | Any) -> str:
         """Map API status to Django status."""
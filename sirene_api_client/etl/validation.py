@@ -0,0 +1,223 @@
+"""
+Local SIREN and SIRET checksum validation.
+
+SIRENs and SIRETs carry a Luhn check digit, so most typos can be rejected
+before they cost an API call. The one exception is La Poste (SIREN
+356000000), whose establishments are too numerous for the NIC to keep a Luhn
+key: their SIRETs are valid when the sum of their digits is a multiple of 5.
+
+The batch functions validate NumPy arrays or plain lists. With NumPy
+installed they run vectorized over fixed-width digit matrices, which checks
+millions of identifiers per second; without it they fall back to a Python
+loop.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, overload
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from numpy.typing import NDArray
+
+SIREN_LENGTH = 9
+SIRET_LENGTH = 14
+
+LA_POSTE_SIREN = "356000000"
+
+# Luhn value of a doubled digit: 2d, minus 9 when it has two digits
+_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def _luhn_sum(digits: str) -> int:
+    """Luhn sum of a digit string, doubling every second digit from the right."""
+    parity = len(digits) % 2
+    return sum(
+        _DOUBLED[int(digit)] if i % 2 == parity else int(digit)
+        for i, digit in enumerate(digits)
+    )
+
+
+def _is_digits(value: object, length: int) -> bool:
+    return (
+        isinstance(value, str)
+        and len(value) == length
+        and value.isascii()
+        and value.isdigit()
+    )
+
+
+def is_valid_siren(siren: object) -> bool:
+    """
+    Check a SIREN's format and Luhn check digit.
+
+    Args:
+        siren: Candidate SIREN
+
+    Returns:
+        True if siren is a 9-digit string with a valid check digit
+    """
+    return _is_digits(siren, SIREN_LENGTH) and _luhn_sum(str(siren)) % 10 == 0
+
+
+def is_valid_siret(siret: object) -> bool:
+    """
+    Check a SIRET's format and check digit, including the La Poste exception.
+
+    Args:
+        siret: Candidate SIRET
+
+    Returns:
+        True if siret is a 14-digit string whose SIREN part is valid and whose
+        Luhn sum is a multiple of 10 (or, for La Poste, whose digit sum is a
+        multiple of 5)
+    """
+    if not _is_digits(siret, SIRET_LENGTH):
+        return False
+    siret = str(siret)
+    if not is_valid_siren(siret[:SIREN_LENGTH]):
+        return False
+    if _luhn_sum(siret) % 10 == 0:
+        return True
+    return (
+        siret.startswith(LA_POSTE_SIREN) and sum(int(digit) for digit in siret) % 5 == 0
+    )
+
+
+def _digit_matrix(values: Any, length: int) -> tuple[Any, Any]:
+    """
+    Digits of fixed-width identifiers as a (count, length) uint8 matrix.
+
+    Returns the matrix and a mask of the rows that hold exactly length ASCII
+    digits; the digits of other rows are meaningless.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind != "S":
+        # One character more than needed, so longer strings are detectable
+        array = array.astype(f"U{length + 1}")
+    else:
+        array = array.astype(f"S{length + 1}")
+    array = np.ascontiguousarray(array.reshape(-1))
+    code_type = np.uint8 if array.dtype.kind == "S" else np.uint32
+    codes: Any = array.view(code_type).reshape(len(array), length + 1)
+    digits = codes[:, :length] - code_type(ord("0"))
+    well_formed = (digits <= 9).all(axis=1) & (codes[:, length] == 0)
+    return digits.astype(np.uint8) % 10, well_formed
+
+
+def _luhn_mask(digits: Any) -> Any:
+    """Rows of a digit matrix whose Luhn sum is a multiple of 10."""
+    length = digits.shape[1]
+    doubled = np.arange(length) % 2 == length % 2
+    table = np.array(_DOUBLED, dtype=np.uint8)
+    weighted = np.where(doubled, table[digits], digits)
+    return weighted.sum(axis=1, dtype=np.uint32) % 10 == 0
+
+
+def siren_mask(sirens: Any) -> NDArray[np.bool_]:
+    """
+    Vectorized SIREN validation.
+
+    Args:
+        sirens: Array-like of SIRENs (str, bytes or object array, or a list)
+
+    Returns:
+        Boolean array, True where is_valid_siren() would be
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    if np is None:  # pragma: no cover - NumPy is optional
+        raise ImportError("siren_mask requires NumPy")
+    digits, well_formed = _digit_matrix(sirens, SIREN_LENGTH)
+    mask: NDArray[np.bool_] = well_formed & _luhn_mask(digits)
+    return mask
+
+
+def siret_mask(sirets: Any) -> NDArray[np.bool_]:
+    """
+    Vectorized SIRET validation, including the La Poste exception.
+
+    Args:
+        sirets: Array-like of SIRETs (str, bytes or object array, or a list)
+
+    Returns:
+        Boolean array, True where is_valid_siret() would be
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    if np is None:  # pragma: no cover - NumPy is optional
+        raise ImportError("siret_mask requires NumPy")
+    digits, well_formed = _digit_matrix(sirets, SIRET_LENGTH)
+    la_poste = (
+        digits[:, :SIREN_LENGTH]
+        == np.array([int(d) for d in LA_POSTE_SIREN], dtype=np.uint8)
+    ).all(axis=1)
+    checksum = _luhn_mask(digits) | (
+        la_poste & (digits.sum(axis=1, dtype=np.uint32) % 5 == 0)
+    )
+    mask: NDArray[np.bool_] = (
+        well_formed & _luhn_mask(digits[:, :SIREN_LENGTH]) & checksum
+    )
+    return mask
+
+
+@overload
+def validate_sirens(sirens: NDArray[Any]) -> NDArray[np.bool_]: ...  # type: ignore[overload-overlap]
+
+
+@overload
+def validate_sirens(sirens: Iterable[object]) -> list[bool]: ...
+
+
+def validate_sirens(sirens: Any) -> Any:
+    """
+    Validate many SIRENs at once.
+
+    Args:
+        sirens: NumPy array or iterable of candidate SIRENs
+
+    Returns:
+        Boolean array for array input, otherwise a list of booleans in input
+        order
+    """
+    if np is not None and isinstance(sirens, np.ndarray):
+        return siren_mask(sirens)
+    values = list(sirens)
+    if np is None or not all(isinstance(value, str) for value in values):
+        return [is_valid_siren(value) for value in values]
+    return siren_mask(values).tolist() if values else []
+
+
+@overload
+def validate_sirets(sirets: NDArray[Any]) -> NDArray[np.bool_]: ...  # type: ignore[overload-overlap]
+
+
+@overload
+def validate_sirets(sirets: Iterable[object]) -> list[bool]: ...
+
+
+def validate_sirets(sirets: Any) -> Any:
+    """
+    Validate many SIRETs at once.
+
+    Args:
+        sirets: NumPy array or iterable of candidate SIRETs
+
+    Returns:
+        Boolean array for array input, otherwise a list of booleans in input
+        order
+    """
+    if np is not None and isinstance(sirets, np.ndarray):
+        return siret_mask(sirets)
+    values = list(sirets)
+    if np is None or not all(isinstance(value, str) for value in values):
+        return [is_valid_siret(value) for value in values]
+    return siret_mask(values).tolist() if values else []
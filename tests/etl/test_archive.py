@@ -0,0 +1,234 @@
+"""
+Unit tests for the ETL raw payload archive module.
+
+Tests cover:
+- Content-addressed deduplication and fetch history
+- Chunked, compressed segment files
+- Lookups by hash, SIREN and SIRET, with point-in-time reads
+- Persistence across reopening
+- Offline re-transformation of archived payloads
+"""
+
+import gzip
+import importlib.util
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sirene_api_client.etl.archive import PayloadArchive
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+)
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _unite_legale(name: str = "ACME") -> dict[str, Any]:
+    return {
+        "siren": "123456782",
+        "periodesUniteLegale": [
+            {
+                "dateDebut": "2019-01-01",
+                "etatAdministratifUniteLegale": "A",
+                "denominationUniteLegale": name,
+                "activitePrincipaleUniteLegale": "62.01Z",
+                "nomenclatureActivitePrincipaleUniteLegale": "NAFRev2",
+            }
+        ],
+    }
+
+
+def _etablissement(siret: str = "12345678200010") -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.02A",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+            }
+        ],
+    }
+
+
+class TestPayloadArchive:
+    """Test storing and reading archived payloads."""
+
+    def test_deduplication(self, tmp_path: Path) -> None:
+        """Test identical payloads are stored once but every fetch is recorded."""
+        with PayloadArchive(tmp_path) as archive:
+            first = archive.add(
+                "legal_unit", "123456782", _unite_legale(), fetched_at=1
+            )
+            second = archive.add(
+                "legal_unit", "123456782", _unite_legale(), fetched_at=2
+            )
+            archive.add("legal_unit", "123456782", _unite_legale("NEW"), fetched_at=3)
+
+            assert first == second
+            assert len(archive) == 2
+            assert [entry.fetched_at for entry in archive.history("123456782")] == [
+                1,
+                2,
+                3,
+            ]
+
+    def test_lookups(self, tmp_path: Path) -> None:
+        """Test payloads are found by hash, SIREN, SIRET and point in time."""
+        with PayloadArchive(tmp_path) as archive:
+            old = archive.add(
+                "legal_unit", "123456782", _unite_legale("OLD"), fetched_at=10
+            )
+            archive.add("legal_unit", "123456782", _unite_legale("NEW"), fetched_at=20)
+            archive.add(
+                "establishment", "12345678200010", _etablissement(), fetched_at=15
+            )
+
+            latest = archive.latest("123456782")
+            earlier = archive.latest("123456782", as_of=12)
+            assert latest is not None
+            assert earlier is not None
+            assert latest["periodesUniteLegale"][0]["denominationUniteLegale"] == "NEW"
+            assert earlier["periodesUniteLegale"][0]["denominationUniteLegale"] == "OLD"
+            assert archive.get(old) == _unite_legale("OLD")
+            assert archive.latest("12345678200010") == _etablissement()
+            assert len(archive.history("123456782")) == 3
+            assert len(archive.history("12345678200010")) == 1
+            assert archive.history("123456782", since=12, until=18)[0].external_id == (
+                "12345678200010"
+            )
+            assert archive.latest("552100554") is None
+            assert archive.get("0" * 64) is None
+
+    def test_chunks_and_segments(self, tmp_path: Path) -> None:
+        """Test chunks roll over into new segments that are valid gzip streams."""
+        with PayloadArchive(tmp_path, chunk_size=1000, segment_size=2000) as archive:
+            for i in range(60):
+                siret = f"123456782{i:05d}"
+                archive.add("establishment", siret, _etablissement(siret))
+
+        segments = sorted(tmp_path.glob("segment-*.jsonl.gz"))
+        lines = [
+            json.loads(line)
+            for segment in segments
+            for line in gzip.decompress(segment.read_bytes()).splitlines()
+        ]
+        assert len(segments) > 1
+        assert len(lines) == 60
+
+    def test_persistence(self, tmp_path: Path) -> None:
+        """Test a reopened archive reads and extends what was written."""
+        with PayloadArchive(tmp_path) as archive:
+            for i in range(5):
+                archive.add(
+                    "establishment",
+                    f"123456782{i:05d}",
+                    _etablissement(f"123456782{i:05d}"),
+                )
+
+        with PayloadArchive(tmp_path) as archive:
+            archive.add("legal_unit", "123456782", _unite_legale())
+            assert len(archive) == 6
+            assert archive.latest("12345678200003") == _etablissement("12345678200003")
+
+        assert len(list(tmp_path.glob("segment-*"))) == 1
+
+    def test_bundles(self, tmp_path: Path) -> None:
+        """Test registry records of bundles are archived under their hash."""
+        transformer = SIRENTransformer(ETLConfig())
+        bundle = transformer.transform_company_bundle(
+            UniteLegale.from_dict(_unite_legale())
+        )
+
+        with PayloadArchive(tmp_path) as archive:
+            archive.add_bundle(bundle)
+            archive.add_bundle(ActivityClassificationBundle())
+
+            assert bundle.registry_record is not None
+            assert bundle.registry_record.payload_hash in archive
+            assert archive.get(bundle.registry_record.payload_hash) == (
+                bundle.registry_record.payload
+            )
+            assert len(archive) == 1
+
+    @pytest.mark.skipif(
+        importlib.util.find_spec("zstandard") is None,
+        reason="zstandard is not installed",
+    )
+    def test_zstd(self, tmp_path: Path) -> None:
+        """Test zstd-compressed archives."""
+        with PayloadArchive(tmp_path, compression="zstd") as archive:
+            digest = archive.add("legal_unit", "123456782", _unite_legale())
+            archive.flush()
+            assert archive.get(digest) == _unite_legale()
+
+        assert list(tmp_path.glob("segment-*.jsonl.zst"))
+
+    def test_invalid_arguments(self, tmp_path: Path) -> None:
+        """Test constructor and entity type validation."""
+        with pytest.raises(ValueError, match="compression must be one of"):
+            PayloadArchive(tmp_path, compression="lz4")
+        with pytest.raises(ValueError, match="chunk_size must be at least 1"):
+            PayloadArchive(tmp_path, chunk_size=0)
+        with (
+            PayloadArchive(tmp_path) as archive,
+            pytest.raises(ValueError, match="Unknown entity type"),
+        ):
+            archive.add("company", "123456782", {})
+
+
+class TestRetransform:
+    """Test offline replay through the transformer."""
+
+    def test_retransform_latest_payloads(self, tmp_path: Path) -> None:
+        """Test the latest payload of each entity is transformed again."""
+        with PayloadArchive(tmp_path, chunk_size=200) as archive:
+            archive.add("legal_unit", "123456782", _unite_legale("OLD"), fetched_at=1)
+            archive.add("legal_unit", "123456782", _unite_legale("NEW"), fetched_at=2)
+            for i in range(1, 4):
+                siret = f"123456782{i:05d}"
+                archive.add("establishment", siret, _etablissement(siret), fetched_at=1)
+
+            received: list[Any] = []
+            count = archive.retransform(received.append)
+            earlier: list[Any] = []
+            archive.retransform(earlier.append, as_of=1)
+
+        companies = [item for item in received if isinstance(item, CompanyBundle)]
+        facilities = [item for item in received if isinstance(item, FacilityBundle)]
+        assert count == 4
+        assert companies[0].company.name == "NEW"
+        assert sorted(bundle.registry_record.external_id for bundle in facilities) == [
+            "12345678200001",
+            "12345678200002",
+            "12345678200003",
+        ]
+        assert isinstance(received[-1], ActivityClassificationBundle)
+        assert {c.code for c in received[-1].activity_classifications} >= {"62.02A"}
+        assert earlier[0].company.name == "OLD"
+
+    def test_retransform_matches_live_transformation(self, tmp_path: Path) -> None:
+        """Test replayed bundles equal those of the original transformation."""
+        transformer = SIRENTransformer(ETLConfig())
+        live = transformer.transform_facility_bundle(
+            Etablissement.from_dict(_etablissement())
+        )
+        with PayloadArchive(tmp_path) as archive:
+            archive.add_bundle(live)
+            received: list[Any] = []
+            archive.retransform(received.append)
+
+        assert received[0].facility.name == live.facility.name
+        assert received[0].establishment_periods == live.establishment_periods
+        assert received[0].registry_record.payload_hash == (
+            live.registry_record.payload_hash
+        )
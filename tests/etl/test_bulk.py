@@ -0,0 +1,286 @@
+"""
+Unit tests for the ETL bulk load module.
+
+Tests cover:
+- COPY-ready CSV files with natural keys and NULL handling
+- Interned addresses written once per facility with the link's dates, from
+  results and bundles
+- Staging, COPY and merge SQL
+- Loading the files through psycopg 2 and 3 style cursors
+"""
+
+import csv
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sirene_api_client.etl.bulk import (
+    STAGING_TABLES,
+    BulkLoadWriter,
+    company_uuid,
+    copy_sql,
+    facility_uuid,
+    load_bulk_files,
+    merge_sql,
+    staging_columns,
+    staging_sql,
+)
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import SIRENExtractResult
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+UNITE_LEGALE = {
+    "siren": "123456782",
+    "periodesUniteLegale": [
+        {
+            "dateDebut": "2019-01-01",
+            "etatAdministratifUniteLegale": "A",
+            "denominationUniteLegale": "ACME",
+            "activitePrincipaleUniteLegale": "62.01Z",
+            "nomenclatureActivitePrincipaleUniteLegale": "NAFRev2",
+        }
+    ],
+}
+
+
+def _etablissement(siret: str) -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "dateCreationEtablissement": CREATION_DATES[siret],
+        "adresseEtablissement": {
+            "numeroVoieEtablissement": "1",
+            "libelleVoieEtablissement": "RUE DE LA PAIX",
+            "codePostalEtablissement": "75002",
+            "libelleCommuneEtablissement": "PARIS",
+        },
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.02A",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+            }
+        ],
+    }
+
+
+SIRETS = ("12345678200010", "12345678200028")
+CREATION_DATES = dict(zip(SIRETS, ("2015-03-01", "2021-06-15"), strict=True))
+
+
+def _result(config: ETLConfig | None = None) -> SIRENExtractResult:
+    return SIRENTransformer(config or ETLConfig()).transform_complete(
+        {
+            "company": UniteLegale.from_dict(UNITE_LEGALE),
+            "facilities": [
+                Etablissement.from_dict(_etablissement(siret)) for siret in SIRETS
+            ],
+        }
+    )
+
+
+def _rows(directory: Path, table: str) -> list[dict[str, str]]:
+    with (directory / f"{table}.csv").open(encoding="utf-8", newline="") as file:
+        return list(csv.DictReader(file))
+
+
+class TestBulkLoadWriter:
+    """Test writing COPY-ready CSV files."""
+
+    def test_files_and_natural_keys(self, tmp_path: Path) -> None:
+        """Test every table gets a file whose rows carry natural keys."""
+        with BulkLoadWriter(tmp_path) as writer:
+            writer.write_result(_result())
+
+        assert {path.name for path in tmp_path.iterdir()} == {
+            *(f"{table}.csv" for table in STAGING_TABLES),
+            "load.sql",
+        }
+        [company] = _rows(tmp_path, "company")
+        assert company == {
+            "siren": "123456782",
+            "uuid": str(company_uuid("123456782")),
+            "name": "ACME",
+        }
+        facilities = _rows(tmp_path, "facility")
+        assert [row["uuid"] for row in facilities] == [
+            str(facility_uuid(siret)) for siret in SIRETS
+        ]
+        periods = _rows(tmp_path, "establishment_period")
+        assert [row["siret"] for row in periods] == list(SIRETS)
+        assert periods[0]["activity_scheme"] == "NAFRev2"
+        assert periods[0]["classification_scheme"] == "naf_rev2"
+        ownerships = _rows(tmp_path, "facility_ownership")
+        assert ownerships[0]["company_uuid"] == company["uuid"]
+        records = _rows(tmp_path, "registry_record")
+        assert records[0]["company_uuid"] == company["uuid"]
+        assert records[1]["facility_uuid"] == str(facility_uuid(SIRETS[0]))
+        assert records[1]["company_uuid"] == ""
+        assert writer.rows_written["facility"] == 2
+
+    def test_nulls_are_unquoted(self, tmp_path: Path) -> None:
+        """Test NULLs are empty unquoted fields, other values are quoted."""
+        with BulkLoadWriter(tmp_path) as writer:
+            writer.write_result(_result())
+
+        lines = (tmp_path / "legal_unit_period.csv").read_text().splitlines()
+        assert lines[1].startswith('"123456782",')
+        # Open-ended period: the end date is NULL
+        assert ',"2019-01-01",,"ACME",' in lines[1]
+
+    def test_classifications_written_once(self, tmp_path: Path) -> None:
+        """Test activity classifications are deduplicated across results."""
+        with BulkLoadWriter(tmp_path) as writer:
+            writer.write_result(_result())
+            writer.write_result(_result())
+
+        codes = [row["code"] for row in _rows(tmp_path, "activity_classification")]
+        assert sorted(codes) == ["62.01Z", "62.02A"]
+        assert len(_rows(tmp_path, "company")) == 2
+
+    def test_interned_addresses(self, tmp_path: Path) -> None:
+        """Test a shared address is written for each facility linking to it."""
+        config = ETLConfig(intern_addresses=True)
+        result = _result(config)
+        assert len(result.addresses) == 1
+
+        with BulkLoadWriter(tmp_path / "result") as writer:
+            writer.write_result(result)
+        transformer = SIRENTransformer(config)
+        with BulkLoadWriter(tmp_path / "bundles") as writer:
+            for siret in SIRETS:
+                writer(
+                    transformer.transform_facility_bundle(
+                        Etablissement.from_dict(_etablissement(siret))
+                    )
+                )
+
+        for directory in ("result", "bundles"):
+            addresses = _rows(tmp_path / directory, "address")
+            assert [row["siret"] for row in addresses] == list(SIRETS)
+            assert {row["postal_code"] for row in addresses} == {"75002"}
+            # Each facility's row has the dates of its own link
+            assert [row["start"] for row in addresses] == [
+                CREATION_DATES[siret] for siret in SIRETS
+            ]
+
+    def test_links_without_address(self, tmp_path: Path) -> None:
+        """Test address links whose address is missing are rejected."""
+        config = ETLConfig(intern_addresses=True)
+        result = _result(config)
+        bundle = SIRENTransformer(config).transform_facility_bundle(
+            Etablissement.from_dict(_etablissement(SIRETS[0]))
+        )
+
+        with BulkLoadWriter(tmp_path) as writer:
+            with pytest.raises(ValueError, match=r"linked to facility \d+ is missing"):
+                writer.write_result(result.model_copy(update={"addresses": []}))
+            with pytest.raises(ValueError, match=r"linked to facility \d+ is missing"):
+                writer.write_bundle(bundle.model_copy(update={"address": None}))
+
+    def test_errors(self, tmp_path: Path) -> None:
+        """Test unsupported bundles and rows without owner are rejected."""
+        with BulkLoadWriter(tmp_path) as writer:
+            with pytest.raises(TypeError, match="Unsupported bundle type"):
+                writer.write_bundle(object())  # type: ignore[arg-type]
+            with pytest.raises(ValueError, match="need the SIREN or SIRET"):
+                writer.write_row("company", _result().company)
+
+
+class TestSQL:
+    """Test the staging and merge statements."""
+
+    def test_staging_and_copy(self) -> None:
+        """Test staging tables match the CSV columns."""
+        statements = staging_sql()
+        assert len(statements) == 2 * len(STAGING_TABLES)
+        assert statements[1].startswith(
+            'CREATE TEMPORARY TABLE sirene_staging_company (row_id bigserial, "siren"'
+        )
+        assert [name for name, _ in staging_columns("address")][:2] == [
+            "siret",
+            "facility_uuid",
+        ]
+        assert copy_sql("facility") == (
+            'COPY sirene_staging_facility ("siret", "uuid", "name")'
+            " FROM STDIN WITH (FORMAT csv, HEADER true)"
+        )
+
+    def test_merge(self) -> None:
+        """Test upserts use unique constraints where the models have them."""
+        statements = merge_sql()
+
+        assert statements[0].startswith("INSERT INTO company_external_registry_source")
+        company = next(s for s in statements if "INTO company_company " in s)
+        assert "ON CONFLICT (uuid) DO UPDATE" in company
+        assert "ORDER BY s.uuid, s.row_id DESC" in company
+        ownership = next(s for s in statements if "company_facility_ownership" in s)
+        assert (
+            "ON CONFLICT (company_id, facility_id, start, role) WHERE NOT is_removed"
+            in ownership
+        )
+        # No unique constraint on periods: update matches, insert the rest
+        periods = [s for s in statements if "company_legal_unit_period" in s]
+        assert periods[0].startswith("UPDATE company_legal_unit_period AS t")
+        assert "WHERE NOT EXISTS" in periods[1]
+        assert sum("company_address" in s for s in statements) == 2
+
+
+class _Copy:
+    def __init__(self, sink: list[bytes]) -> None:
+        self.sink = sink
+
+    def __enter__(self) -> "_Copy":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def write(self, data: bytes) -> None:
+        self.sink.append(data)
+
+
+class _Psycopg3Cursor:
+    def __init__(self) -> None:
+        self.executed: list[str] = []
+        self.copied: dict[str, list[bytes]] = {}
+
+    def execute(self, statement: str) -> None:
+        self.executed.append(statement)
+
+    def copy(self, statement: str) -> _Copy:
+        return _Copy(self.copied.setdefault(statement, []))
+
+
+class _Psycopg2Cursor(_Psycopg3Cursor):
+    def copy_expert(self, statement: str, file: Any) -> None:
+        self.copied[statement] = [file.read()]
+
+
+class TestLoadBulkFiles:
+    """Test loading the files through a cursor."""
+
+    @pytest.mark.parametrize("cursor_class", [_Psycopg2Cursor, _Psycopg3Cursor])
+    def test_load(self, tmp_path: Path, cursor_class: type[_Psycopg3Cursor]) -> None:
+        """Test staging, COPY and merge statements are run in order."""
+        with BulkLoadWriter(tmp_path) as writer:
+            writer.write_result(_result())
+        cursor = cursor_class()
+
+        copied = load_bulk_files(cursor, tmp_path)
+
+        assert cursor.executed == staging_sql() + merge_sql()
+        assert list(cursor.copied) == [copy_sql(table) for table in STAGING_TABLES]
+        data = b"".join(cursor.copied[copy_sql("company")])
+        assert b"ACME" in data
+        assert copied["company"] == len(data)
+
+    def test_missing_file(self, tmp_path: Path) -> None:
+        """Test a missing table file is reported."""
+        with pytest.raises(FileNotFoundError, match="No company file"):
+            load_bulk_files(_Psycopg3Cursor(), tmp_path)
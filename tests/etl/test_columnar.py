@@ -0,0 +1,166 @@
+"""
+Unit tests for the ETL columnar (Arrow/Parquet) export module.
+
+Tests cover:
+- Typed, dictionary-encoded tables built from results
+- Appending batches across SIRENs to Arrow IPC and Parquet files
+- Writing streaming bundles and reading the dataset back
+- Invalid arguments
+"""
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    SIRENExtractResult,
+)
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+pa = pytest.importorskip("pyarrow")
+
+from sirene_api_client.etl.columnar import (  # noqa: E402
+    TABLES,
+    ColumnarWriter,
+    load_dataset,
+    read_table,
+    to_tables,
+)
+
+
+def _facility(siret: str, code: str = "62.02A") -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "adresseEtablissement": {
+            "libelleVoieEtablissement": f"RUE {siret[-2:]}",
+            "codePostalEtablissement": "75015",
+            "coordonneeLambertAbscisseEtablissement": "648000",
+            "coordonneeLambertOrdonneeEtablissement": "6860000",
+        },
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": code,
+            }
+        ],
+    }
+
+
+def _result(siren: str, facilities: int = 2) -> SIRENExtractResult:
+    return SIRENTransformer(ETLConfig()).transform_complete(
+        {
+            "company": UniteLegale.from_dict(
+                {
+                    "siren": siren,
+                    "periodesUniteLegale": [
+                        {
+                            "dateDebut": "2019-01-01",
+                            "activitePrincipaleUniteLegale": "62.01Z",
+                        }
+                    ],
+                }
+            ),
+            "facilities": [
+                Etablissement.from_dict(_facility(f"{siren}{i:05d}"))
+                for i in range(facilities)
+            ],
+        }
+    )
+
+
+class TestToTables:
+    """Test in-memory Arrow tables."""
+
+    def test_typed_columns(self) -> None:
+        """Test codes are dictionary-encoded and coordinates float64."""
+        tables = to_tables([_result("123456782"), _result("552100554", 1)])
+
+        addresses = tables["addresses"]
+        periods = tables["establishment_periods"]
+        assert set(tables) == set(TABLES)
+        assert tables["facilities"].column("siret").to_pylist() == [
+            "12345678200000",
+            "12345678200001",
+            "55210055400000",
+        ]
+        assert addresses.schema.field("longitude").type == pa.float64()
+        assert pa.types.is_dictionary(addresses.schema.field("postal_code").type)
+        assert pa.types.is_dictionary(periods.schema.field("activity_code").type)
+        assert periods.column("activity_code").to_pylist() == ["62.02A"] * 3
+        assert periods.schema.field("start").type == pa.date32()
+        assert tables["legal_unit_periods"].column("siren").to_pylist() == [
+            "123456782",
+            "552100554",
+        ]
+
+
+class TestColumnarWriter:
+    """Test appending batches to table files."""
+
+    @pytest.mark.parametrize("file_format", ["arrow", "parquet"])
+    def test_append_across_sirens(self, tmp_path: Path, file_format: str) -> None:
+        """Test batches with growing dictionaries are appended and read back."""
+        codes = ["62.01Z", "47.11F", "62.01Z", "10.71C"]
+        with ColumnarWriter(tmp_path, file_format=file_format, batch_size=2) as writer:
+            for i, code in enumerate(codes):
+                siren = ["123456782", "552100554", "356000000", "000000000"][i]
+                result = _result(siren, 1)
+                result.establishment_periods[0] = result.establishment_periods[
+                    0
+                ].model_copy(update={"activity_code": code})
+                writer.write_result(result)
+
+        periods = read_table(tmp_path, "establishment_periods")
+        assert periods.column("activity_code").to_pylist() == codes
+        assert writer.rows_written["facilities"] == 4
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            f"{table}.{file_format}" for table in TABLES
+        )
+
+    def test_bundles_and_dataset(self, tmp_path: Path) -> None:
+        """Test streamed bundles land in the same tables."""
+        transformer = SIRENTransformer(ETLConfig(intern_addresses=True))
+        with ColumnarWriter(tmp_path) as writer:
+            writer(
+                transformer.transform_company_bundle(
+                    UniteLegale.from_dict({"siren": "123456782"})
+                )
+            )
+            for siret in ("12345678200010", "12345678200028"):
+                writer(
+                    transformer.transform_facility_bundle(
+                        Etablissement.from_dict(_facility(siret))
+                    )
+                )
+            writer(ActivityClassificationBundle())
+            writer(_result("552100554", 1))
+
+        dataset = load_dataset(tmp_path)
+        assert dataset["facilities"].num_rows == 3
+        assert dataset["address_links"].num_rows == 2
+        assert dataset["facility_ownerships"].column("company_siren").to_pylist() == [
+            "123456782",
+            "123456782",
+            "552100554",
+        ]
+        longitudes = dataset["addresses"].column("longitude").to_pylist()
+        assert all(2 < longitude < 3 for longitude in longitudes)
+
+    def test_errors(self, tmp_path: Path) -> None:
+        """Test argument validation and missing tables."""
+        with pytest.raises(ValueError, match="file_format must be one of"):
+            ColumnarWriter(tmp_path, file_format="csv")
+        with pytest.raises(ValueError, match="batch_size must be at least 1"):
+            ColumnarWriter(tmp_path, batch_size=0)
+        with pytest.raises(TypeError, match="Unsupported bundle type"):
+            ColumnarWriter(tmp_path).write_bundle(object())  # type: ignore[arg-type]
+        with pytest.raises(FileNotFoundError, match="No facilities table"):
+            read_table(tmp_path / "missing", "facilities")
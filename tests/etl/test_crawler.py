@@ -0,0 +1,239 @@
+"""
+Unit tests for the ETL facet-partitioned crawler.
+
+Tests cover:
+- Partition dimension clauses and department grouping
+- Recursive query splitting from facet counts
+- Residual partitions for missing facet values
+- Concurrent cursor crawl with SIRET deduplication
+- Error handling
+"""
+
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.crawler import (
+    COMMUNE,
+    DEPARTMENT,
+    NAF_CODE,
+    FacetPartitionCrawler,
+    Partition,
+)
+from sirene_api_client.etl.exceptions import ExtractionError
+from sirene_api_client.models.etablissement import Etablissement
+
+# Synthetic universe: (siret, commune, NAF code)
+UNIVERSE = [
+    ("12345678200011", "75056", "62.01Z"),
+    ("12345678200029", "75056", "62.02A"),
+    ("12345678200037", "75101", "62.01Z"),
+    ("55210055400013", "69123", "62.01Z"),
+    ("55210055400021", "97101", "70.10Z"),
+    ("55210055400039", None, "62.01Z"),
+]
+
+
+def _matches(q: str, row: tuple[str, str | None, str]) -> bool:
+    """Evaluate the small subset of query syntax the crawler produces."""
+    _siret, commune, naf = row
+    for clause in q.replace("(", "").replace(")", "").split(" AND "):
+        if clause == "etatAdministratifEtablissement:A":
+            continue
+        negated = clause.startswith("-")
+        name, value = clause.lstrip("-").split(":", 1)
+        actual = commune if name == "codeCommuneEtablissement" else naf
+        if negated:
+            if actual is not None:
+                return False
+        elif actual is None:
+            return False
+        elif value.endswith("*"):
+            if not actual.startswith(value[:-1]):
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+class FakeSirene:
+    """MockTransport handler serving facets and cursor pages over UNIVERSE."""
+
+    def __init__(self, page_size_cap: int = 2, duplicate: bool = False) -> None:
+        self.page_size_cap = page_size_cap
+        self.duplicate = duplicate
+        self.bodies: list[dict[str, str]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        self.bodies.append(body)
+        rows = [row for row in UNIVERSE if _matches(body["q"], row)]
+        if not rows:
+            return httpx.Response(404, json={"header": {"statut": 404}})
+        header: dict[str, Any] = {"statut": 200, "total": len(rows)}
+
+        if body["nombre"] == "0":
+            facettes = []
+            if "facette.champ" in body:
+                index = 1 if body["facette.champ"] == "codeCommuneEtablissement" else 2
+                counts: dict[str, int] = {}
+                for row in rows:
+                    if row[index] is not None:
+                        counts[row[index]] = counts.get(row[index], 0) + 1
+                facettes.append(
+                    {
+                        "nom": body["facette.champ"],
+                        "manquants": sum(1 for row in rows if row[index] is None),
+                        "comptages": [
+                            {"valeur": value, "nombre": count}
+                            for value, count in counts.items()
+                        ],
+                    }
+                )
+            return httpx.Response(200, json={"header": header, "facettes": facettes})
+
+        start = 0 if body["curseur"] == "*" else int(body["curseur"])
+        size = min(int(body["nombre"]), self.page_size_cap)
+        page = rows[start : start + size]
+        if self.duplicate:
+            page = [*page, UNIVERSE[0]]
+        header["curseur"] = body["curseur"]
+        header["curseurSuivant"] = str(min(start + size, len(rows)))
+        return httpx.Response(
+            200,
+            json={
+                "header": header,
+                "etablissements": [
+                    {"siren": siret[:9], "nic": siret[9:], "siret": siret}
+                    for siret, _commune, _naf in page
+                ],
+            },
+        )
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+class TestPartitionDimension:
+    """Test partition dimensions."""
+
+    def test_department_grouping(self) -> None:
+        """Test department codes derived from commune codes."""
+        assert DEPARTMENT.group("75056") == "75"
+        assert DEPARTMENT.group("2A004") == "2A"
+        assert DEPARTMENT.group("97101") == "971"
+        assert DEPARTMENT.clause("75") == "codeCommuneEtablissement:75*"
+
+    def test_exact_clauses(self) -> None:
+        """Test clauses of exact-value dimensions."""
+        assert COMMUNE.clause("75056") == "codeCommuneEtablissement:75056"
+        assert NAF_CODE.clause("62.01Z") == "activitePrincipaleEtablissement:62.01Z"
+
+
+class TestFacetPartitionCrawler:
+    """Test FacetPartitionCrawler."""
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError):
+            FacetPartitionCrawler(None)  # type: ignore[arg-type]
+        client = _client(FakeSirene())
+        with pytest.raises(ValueError, match="max_partition_size"):
+            FacetPartitionCrawler(client, max_partition_size=0)
+        with pytest.raises(ValueError, match="max_concurrency"):
+            FacetPartitionCrawler(client, max_concurrency=0)
+        with pytest.raises(ValueError, match="page_size"):
+            FacetPartitionCrawler(client, page_size=5000)
+
+    @pytest.mark.asyncio
+    async def test_small_query_is_single_partition(self) -> None:
+        """Test that a query within the partition size is not split."""
+        crawler = FacetPartitionCrawler(_client(FakeSirene()), max_partition_size=10)
+
+        partitions = await crawler.plan("etatAdministratifEtablissement:A")
+
+        assert partitions == [Partition("etatAdministratifEtablissement:A", 6)]
+        assert crawler.stats.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_plan_splits_recursively(self) -> None:
+        """Test splitting by department, then commune, with a residual partition."""
+        crawler = FacetPartitionCrawler(_client(FakeSirene()), max_partition_size=2)
+
+        partitions = await crawler.plan("etatAdministratifEtablissement:A")
+
+        assert all(p.count <= 2 for p in partitions)
+        assert sum(p.count for p in partitions) == len(UNIVERSE)
+        queries = [p.q for p in partitions]
+        assert (
+            "(etatAdministratifEtablissement:A) AND codeCommuneEtablissement:69*"
+            in (queries)
+        )
+        assert any("-codeCommuneEtablissement:*" in q for q in queries)
+        # Paris (3 establishments) is split further by commune
+        assert any(q.endswith("codeCommuneEtablissement:75101") for q in queries)
+
+    @pytest.mark.asyncio
+    async def test_crawl_streams_every_establishment(self) -> None:
+        """Test that the crawl yields each establishment of the universe once."""
+        fake = FakeSirene()
+        crawler = FacetPartitionCrawler(
+            _client(fake), max_partition_size=2, max_concurrency=3
+        )
+
+        results = [
+            facility
+            async for facility in crawler.crawl("etatAdministratifEtablissement:A")
+        ]
+
+        assert all(isinstance(facility, Etablissement) for facility in results)
+        assert sorted(f.siret for f in results) == sorted(row[0] for row in UNIVERSE)
+        assert crawler.stats.establishments == len(UNIVERSE)
+        assert any(body.get("curseur") == "*" for body in fake.bodies)
+        assert all(
+            body.get("tri") == "siret" for body in fake.bodies if "curseur" in body
+        )
+
+    @pytest.mark.asyncio
+    async def test_crawl_deduplicates_by_siret(self) -> None:
+        """Test that establishments returned by several partitions are yielded once."""
+        crawler = FacetPartitionCrawler(
+            _client(FakeSirene(duplicate=True)), max_partition_size=2
+        )
+
+        results = [f async for f in crawler.crawl("etatAdministratifEtablissement:A")]
+
+        assert len(results) == len(UNIVERSE)
+        assert crawler.stats.duplicates > 0
+
+    @pytest.mark.asyncio
+    async def test_crawl_no_match(self) -> None:
+        """Test that a query without results yields nothing."""
+        crawler = FacetPartitionCrawler(_client(FakeSirene()))
+
+        results = [
+            f async for f in crawler.crawl("activitePrincipaleEtablissement:01.11Z")
+        ]
+
+        assert results == []
+
+    @pytest.mark.asyncio
+    async def test_http_error_raises_extraction_error(self) -> None:
+        """Test that a server error surfaces as ExtractionError."""
+        crawler = FacetPartitionCrawler(
+            _client(lambda _request: httpx.Response(500, json={}))
+        )
+
+        with pytest.raises(ExtractionError, match="HTTP 500"):
+            [f async for f in crawler.crawl("etatAdministratifEtablissement:A")]
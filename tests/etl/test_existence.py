@@ -0,0 +1,222 @@
+"""
+Unit tests for the ETL nonexistent-identifier short-circuit module.
+
+Tests cover:
+- Negative cache TTL, eviction and disabling
+- Bloom filter membership, false-positive rate and persistence
+- Building Bloom filters from stock files and the mirror
+- Short-circuited lookups in the mirrored client and the batch resolver
+"""
+
+import csv
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import extract_and_transform_sirens
+from sirene_api_client.etl.existence import BloomFilter, NegativeCache
+from sirene_api_client.etl.mirror import MirroredSireneClient, SQLiteMirror
+from sirene_api_client.models.reponse_erreur import ReponseErreur
+from sirene_api_client.models.reponse_unite_legale import ReponseUniteLegale
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+class RecordingSirene:
+    """Answer 200 for 123456782 and 404 for everything else."""
+
+    def __init__(self) -> None:
+        self.paths: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        if request.url.path.endswith("/siren/123456782"):
+            return httpx.Response(
+                200,
+                json={"header": {"statut": 200}, "uniteLegale": {"siren": "123456782"}},
+            )
+        return httpx.Response(
+            404, json={"header": {"statut": 404, "message": "Aucun élément trouvé"}}
+        )
+
+
+class TestNegativeCache:
+    """Test the negative-result cache."""
+
+    def test_ttl(self) -> None:
+        """Test entries expire after the TTL."""
+        cache = NegativeCache(ttl=60)
+        with patch("sirene_api_client.etl.existence.time.monotonic", return_value=0.0):
+            cache.add("000000000")
+        with patch("sirene_api_client.etl.existence.time.monotonic", return_value=30.0):
+            assert "000000000" in cache
+        with patch("sirene_api_client.etl.existence.time.monotonic", return_value=61.0):
+            assert "000000000" not in cache
+        assert len(cache) == 0
+
+    def test_eviction_and_disabling(self) -> None:
+        """Test the oldest entries are evicted and a zero TTL stores nothing."""
+        cache = NegativeCache(max_entries=2)
+        for siren in ("000000001", "000000002", "000000003"):
+            cache.add(siren)
+        disabled = NegativeCache(ttl=0)
+        disabled.add("000000001")
+
+        assert "000000001" not in cache
+        assert "000000003" in cache
+        assert len(disabled) == 0
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(ValueError, match="ttl cannot be negative"):
+            NegativeCache(ttl=-1)
+        with pytest.raises(ValueError, match="max_entries must be at least 1"):
+            NegativeCache(max_entries=0)
+
+
+class TestBloomFilter:
+    """Test the Bloom filter."""
+
+    def test_no_false_negatives_and_low_false_positives(self) -> None:
+        """Test every added SIREN is present and few others are."""
+        added = [f"{i:09d}" for i in range(0, 20000, 2)]
+        bloom = BloomFilter.from_identifiers(added, capacity=10000, error_rate=0.01)
+
+        assert all(siren in bloom for siren in added)
+        false_positives = sum(f"{i:09d}" in bloom for i in range(1, 20000, 2))
+        assert false_positives < 300
+        assert bloom.count == 10000
+
+    def test_save_and_load(self, tmp_path: Path) -> None:
+        """Test a saved filter answers the same."""
+        bloom = BloomFilter.from_identifiers(["123456782", "552100554"], capacity=100)
+        bloom.save(tmp_path / "sirens.bloom")
+
+        loaded = BloomFilter.load(tmp_path / "sirens.bloom")
+
+        assert "123456782" in loaded
+        assert (loaded.size, loaded.hash_count, loaded.count) == (
+            bloom.size,
+            bloom.hash_count,
+            2,
+        )
+
+    def test_load_rejects_other_files(self, tmp_path: Path) -> None:
+        """Test non-filter files are rejected."""
+        path = tmp_path / "bogus.bloom"
+        path.write_bytes(b"bogus\n")
+
+        with pytest.raises(ValueError, match="Not a Bloom filter file"):
+            BloomFilter.load(path)
+
+    def test_from_stock(self, tmp_path: Path) -> None:
+        """Test stock files contribute their SIRENs."""
+        stock = tmp_path / "StockEtablissement.csv"
+        with stock.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["siren", "siret"])
+            writer.writerow(["123456782", "12345678200010"])
+            writer.writerow(["552100554", "55210055400013"])
+
+        bloom = BloomFilter.from_stock(stock)
+
+        assert "123456782" in bloom
+        assert "552100554" in bloom
+
+    def test_from_mirror(self) -> None:
+        """Test mirrored legal units and establishments contribute their SIRENs."""
+        mirror = SQLiteMirror()
+        mirror.put_unite_legale({"siren": "123456782"})
+        mirror.put_etablissement({"siren": "552100554", "siret": "55210055400013"})
+
+        bloom = BloomFilter.from_mirror(mirror)
+
+        assert mirror.siren_count() == 2
+        assert "123456782" in bloom
+        assert "552100554" in bloom
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(ValueError, match="capacity must be at least 1"):
+            BloomFilter(0)
+        with pytest.raises(ValueError, match="error_rate must be between 0 and 1"):
+            BloomFilter(10, error_rate=1.5)
+
+
+class TestShortCircuit:
+    """Test lookups skipped for nonexistent identifiers."""
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_cached(self) -> None:
+        """Test a 404 is answered locally on the next lookup."""
+        fake = RecordingSirene()
+        client = MirroredSireneClient(_client(fake), SQLiteMirror())
+
+        first = await client.find_by_siren("000000000")
+        second = await client.find_by_siren("000000000")
+        missing_siret = await client.find_by_siret("00000000000000")
+        again = await client.find_by_siret("00000000000000")
+
+        assert len(fake.paths) == 2
+        assert isinstance(first, ReponseErreur)
+        assert isinstance(second, ReponseErreur)
+        assert second.header.statut == 404
+        assert isinstance(missing_siret, ReponseErreur)
+        assert isinstance(again, ReponseErreur)
+
+    @pytest.mark.asyncio
+    async def test_bloom_filter_skips_unknown_sirens(self) -> None:
+        """Test identifiers absent from known_sirens are never requested."""
+        fake = RecordingSirene()
+        client = MirroredSireneClient(
+            _client(fake),
+            SQLiteMirror(),
+            known_sirens=BloomFilter.from_identifiers(["123456782"], capacity=10),
+        )
+
+        missing = await client.find_by_siren("552100554")
+        missing_siret = await client.find_by_siret("55210055400013")
+        found = await client.find_by_siren("123456782")
+
+        assert fake.paths == ["/api-sirene/3.11/siren/123456782"]
+        assert isinstance(missing, ReponseErreur)
+        assert isinstance(missing_siret, ReponseErreur)
+        assert isinstance(found, ReponseUniteLegale)
+
+    @pytest.mark.asyncio
+    async def test_batch_skips_unknown_sirens(self) -> None:
+        """Test the batch resolver leaves out SIRENs absent from known_sirens."""
+        with (
+            patch(
+                "sirene_api_client.etl.extractor.find_by_siren",
+                return_value=MagicMock(
+                    unite_legale=UniteLegale.from_dict({"siren": "123456782"})
+                ),
+            ) as mock_siren,
+            patch(
+                "sirene_api_client.etl.extractor.find_by_post_etablissement",
+                return_value=MagicMock(etablissements=[]),
+            ),
+        ):
+            results = await extract_and_transform_sirens(
+                ["123456782", "552100554"],
+                MagicMock(spec=AuthenticatedClient),
+                known_sirens=BloomFilter.from_identifiers(["123456782"], capacity=10),
+            )
+
+        assert list(results) == ["123456782"]
+        assert mock_siren.call_count == 1
@@ -0,0 +1,174 @@
+"""
+Unit tests for the ETL streaming NDJSON export module.
+
+Tests cover:
+- Typed records per entity, with lazy reading back into models
+- Round trips of complete results through plain, gzip and zstd files
+- Writing to binary streams and serving as a bundle sink
+- Invalid compressions and malformed exports
+"""
+
+import gzip
+import importlib.util
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.export import NDJSONWriter, read_records, read_results
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    FacilityData,
+    SIRENExtractResult,
+)
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _result(siren: str = "123456782", facilities: int = 2) -> SIRENExtractResult:
+    return SIRENTransformer(ETLConfig(intern_addresses=True)).transform_complete(
+        {
+            "company": UniteLegale.from_dict(
+                {
+                    "siren": siren,
+                    "periodesUniteLegale": [
+                        {
+                            "dateDebut": "2019-01-01",
+                            "denominationUniteLegale": "ACME",
+                            "activitePrincipaleUniteLegale": "62.01Z",
+                        }
+                    ],
+                }
+            ),
+            "facilities": [
+                Etablissement.from_dict(
+                    {
+                        "siren": siren,
+                        "nic": f"{i:05d}",
+                        "siret": f"{siren}{i:05d}",
+                        "adresseEtablissement": {
+                            "libelleVoieEtablissement": "RUE DU COMMERCE",
+                            "codePostalEtablissement": "75015",
+                        },
+                        "periodesEtablissement": [
+                            {
+                                "dateDebut": "2020-01-01",
+                                "activitePrincipaleEtablissement": "62.02A",
+                            }
+                        ],
+                    }
+                )
+                for i in range(facilities)
+            ],
+            "extraction_metadata": {"siren": siren, "facility_count": facilities},
+        }
+    )
+
+
+class TestNDJSONExport:
+    """Test writing and reading NDJSON exports."""
+
+    def test_records(self, tmp_path: Path) -> None:
+        """Test one typed record per line, company first."""
+        path = tmp_path / "result.ndjson"
+        result = _result()
+
+        count = result.export_to_ndjson(path)
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        kinds = [line["kind"] for line in lines]
+        assert count == len(lines)
+        assert kinds[0] == "company"
+        assert kinds.count("facility") == 2
+        assert kinds.count("address") == 1
+        assert kinds.count("address_link") == 2
+        assert kinds[-1] == "extraction_metadata"
+        records = list(read_records(path))
+        assert isinstance(records[2][1], FacilityData)
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "results.ndjson",
+            "results.ndjson.gz",
+            pytest.param(
+                "results.ndjson.zst",
+                marks=pytest.mark.skipif(
+                    importlib.util.find_spec("zstandard") is None,
+                    reason="zstandard is not installed",
+                ),
+            ),
+        ],
+    )
+    def test_round_trip(self, tmp_path: Path, name: str) -> None:
+        """Test results are rebuilt equal to those written."""
+        path = tmp_path / name
+        results = [_result("123456782"), _result("552100554", 3)]
+
+        with NDJSONWriter(path) as writer:
+            for result in results:
+                writer.write_result(result)
+
+        read = list(read_results(path))
+        assert [r.model_dump() for r in read] == [r.model_dump() for r in results]
+        assert read[1].addresses_by_siret["55210055400002"].postal_code == "75015"
+
+    def test_gzip_detection(self, tmp_path: Path) -> None:
+        """Test the suffix selects gzip and reading detects it from the content."""
+        path = tmp_path / "export.gz"
+        _result().export_to_ndjson(path)
+        renamed = path.rename(tmp_path / "export.ndjson")
+
+        assert gzip.decompress(renamed.read_bytes()).startswith(b'{"kind":"company"')
+        assert len(list(read_results(renamed))) == 1
+
+    def test_stream_destination_and_bundle_sink(self) -> None:
+        """Test writing bundles to an open binary stream, left open."""
+        transformer = SIRENTransformer(ETLConfig())
+        buffer = io.BytesIO()
+        bundles: list[Any] = [
+            transformer.transform_company_bundle(
+                UniteLegale.from_dict({"siren": "123456782"})
+            ),
+            transformer.transform_facility_bundle(
+                Etablissement.from_dict({"siret": "12345678200010"})
+            ),
+            ActivityClassificationBundle(extraction_metadata={"sirens": 1}),
+        ]
+
+        with NDJSONWriter(buffer, compression="gzip") as writer:
+            for bundle in bundles:
+                writer(bundle)
+
+        assert not buffer.closed
+        buffer.seek(0)
+        kinds = [kind for kind, _ in read_records(buffer, compression="gzip")]
+        assert kinds == [
+            "company",
+            "registry_record",
+            "facility",
+            "facility_ownership",
+            "registry_record",
+            "extraction_metadata",
+        ]
+
+    def test_errors(self, tmp_path: Path) -> None:
+        """Test invalid compressions and malformed exports."""
+        with pytest.raises(ValueError, match="compression must be one of"):
+            NDJSONWriter(io.BytesIO(), compression="lz4")
+        with pytest.raises(TypeError, match="Unsupported bundle type"):
+            NDJSONWriter(io.BytesIO()).write_bundle(object())  # type: ignore[arg-type]
+
+        unknown = tmp_path / "unknown.ndjson"
+        unknown.write_text('{"kind":"person","data":{}}\n')
+        with pytest.raises(ValueError, match="Unknown record kind"):
+            list(read_records(unknown))
+
+        orphan = tmp_path / "orphan.ndjson"
+        orphan.write_text('{"kind":"extraction_metadata","data":{}}\n')
+        with pytest.raises(ValueError, match="before any company record"):
+            list(read_results(orphan))
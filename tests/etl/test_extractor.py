@@ -7,16 +7,25 @@ Tests cover:
 - Error handling for API failures
 - Data validation and processing
 - Edge cases and boundary conditions
+- Point-in-time extraction and the shared snapshot cache
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
 from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import extract_and_transform_sirens
 from sirene_api_client.etl.config import ETLConfig, ValidationMode
-from sirene_api_client.etl.exceptions import ExtractionError
-from sirene_api_client.etl.extractor import SIRENExtractor
+from sirene_api_client.etl.exceptions import ExtractionError, NotFoundError
+from sirene_api_client.etl.existence import NegativeCache
+from sirene_api_client.etl.extractor import SIRENExtractor, SnapshotCache
+from sirene_api_client.models.header import Header
+from sirene_api_client.models.reponse_erreur import ReponseErreur
+from sirene_api_client.models.unite_legale import UniteLegale
 
 
 class TestSIRENExtractor:
@@ -727,3 +736,339 @@ class TestStreamingExtraction:
 
             # Should have made 5 API calls (plus one extra call when it gets None)
             assert mock_api_patch.call_count == 6
+
+
+class TestSnapshotCache:
+    """Test SnapshotCache."""
+
+    def test_invalid_size(self) -> None:
+        """Test that a cache must hold at least one entry."""
+        with pytest.raises(ValueError, match="max_entries"):
+            SnapshotCache(max_entries=0)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_fetch(self) -> None:
+        """Test that concurrent lookups of a key trigger a single fetch."""
+        cache = SnapshotCache()
+        calls = 0
+
+        async def fetch() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "payload"
+
+        results = await asyncio.gather(
+            *(
+                cache.get_or_fetch(("company", "123456782", "2020-01-01"), fetch)
+                for _ in range(5)
+            )
+        )
+        again = await cache.get_or_fetch(("company", "123456782", "2020-01-01"), fetch)
+
+        assert results == ["payload"] * 5
+        assert again == "payload"
+        assert calls == 1
+        assert cache.misses == 1
+        assert cache.hits == 5
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self) -> None:
+        """Test that a failed fetch is retried on the next lookup."""
+        cache = SnapshotCache()
+
+        async def fail() -> str:
+            raise RuntimeError("API down")
+
+        async def succeed() -> str:
+            return "payload"
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch(("k",), fail)
+
+        assert await cache.get_or_fetch(("k",), succeed) == "payload"
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_eviction(self) -> None:
+        """Test that the oldest entry is evicted beyond max_entries."""
+        cache = SnapshotCache(max_entries=2)
+
+        for key in ("a", "b", "c"):
+            await cache.get_or_fetch((key,), lambda key=key: asyncio.sleep(0, key))
+
+        assert len(cache) == 2
+        assert ("a",) not in cache._entries
+
+
+class TestAsOfExtraction:
+    """Test point-in-time extraction with ETLConfig.as_of."""
+
+    @pytest.fixture
+    def config(self) -> ETLConfig:
+        """Create an ETL configuration extracting as of 2020-01-01."""
+        return ETLConfig(as_of=date(2020, 1, 1))
+
+    @pytest.mark.asyncio
+    async def test_date_passed_to_company_lookup(self, config: ETLConfig) -> None:
+        """Test that the date parameter reaches find_by_siren."""
+        extractor = SIRENExtractor(MagicMock(spec=AuthenticatedClient), config)
+        mock_response = MagicMock()
+
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_siren", return_value=mock_response
+        ) as mock_api_call:
+            await extractor._extract_company("123456782")
+
+        assert mock_api_call.call_args[1]["date"] == "2020-01-01"
+
+    @pytest.mark.asyncio
+    async def test_date_passed_to_facility_search(self, config: ETLConfig) -> None:
+        """Test that the date parameter is set on the multi-criteria body."""
+        extractor = SIRENExtractor(MagicMock(spec=AuthenticatedClient), config)
+        mock_response = MagicMock()
+        mock_response.etablissements = []
+
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_post_etablissement",
+            return_value=mock_response,
+        ) as mock_api_call:
+            await extractor._extract_facilities("123456782")
+
+        assert mock_api_call.call_args[1]["body"].date == "2020-01-01"
+
+    @pytest.mark.asyncio
+    async def test_no_date_without_as_of(self) -> None:
+        """Test that full-history extraction sends no date and skips the cache."""
+        extractor = SIRENExtractor(MagicMock(spec=AuthenticatedClient), ETLConfig())
+
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_siren", return_value=MagicMock()
+        ) as mock_api_call:
+            await extractor._extract_company("123456782")
+            await extractor._extract_company("123456782")
+
+        assert "date" not in mock_api_call.call_args[1]
+        assert mock_api_call.call_count == 2
+        assert len(extractor.snapshot_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_shared_cache_across_extractors(self, config: ETLConfig) -> None:
+        """Test that extractors sharing a cache fetch a snapshot once."""
+        cache = SnapshotCache()
+        client = MagicMock(spec=AuthenticatedClient)
+        first = SIRENExtractor(client, config, cache)
+        second = SIRENExtractor(client, config, cache)
+
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_siren", return_value=MagicMock()
+        ) as mock_api_call:
+            await first._extract_company("123456782")
+            await second._extract_company("123456782")
+
+        assert mock_api_call.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_company_lookup_is_retried(self, config: ETLConfig) -> None:
+        """Test that an error response is not cached as the snapshot."""
+        extractor = SIRENExtractor(MagicMock(spec=AuthenticatedClient), config)
+        company = UniteLegale.from_dict({"siren": "123456782"})
+
+        # The generated client returns None for a 429
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_siren",
+            side_effect=[None, MagicMock(unite_legale=company)],
+        ) as mock_api_call:
+            with pytest.raises(ExtractionError, match="No company data"):
+                await extractor._extract_company("123456782")
+            assert await extractor._extract_company("123456782") is company
+            assert await extractor._extract_company("123456782") is company
+
+        assert mock_api_call.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_company_payload_is_retried(self, config: ETLConfig) -> None:
+        """Test that a 429 followed by a 200 returns the payload."""
+        client = MagicMock(spec=AuthenticatedClient)
+        request = AsyncMock(
+            side_effect=[
+                httpx.Response(429),
+                httpx.Response(200, json={"uniteLegale": {"siren": "123456782"}}),
+            ]
+        )
+        client.get_async_httpx_client.return_value.request = request
+        extractor = SIRENExtractor(client, config)
+
+        with pytest.raises(ExtractionError, match="failed with status 429"):
+            await extractor.fetch_company_payload("123456782")
+        payload = await extractor.fetch_company_payload("123456782")
+        await extractor.fetch_company_payload("123456782")
+
+        assert payload["uniteLegale"]["siren"] == "123456782"
+        assert request.call_count == 2
+        assert len(extractor.snapshot_cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_metadata_records_as_of(self, config: ETLConfig) -> None:
+        """Test that the extraction metadata records the snapshot date."""
+        extractor = SIRENExtractor(MagicMock(spec=AuthenticatedClient), config)
+
+        with (
+            patch.object(extractor, "_extract_company", return_value=MagicMock()),
+            patch.object(extractor, "_extract_facilities", return_value=[]),
+        ):
+            result = await extractor.extract_siren_complete("123456782")
+
+        assert result["extraction_metadata"]["as_of"] == "2020-01-01"
+
+    @pytest.mark.asyncio
+    async def test_batch_deduplicates_and_shares_cache(self, config: ETLConfig) -> None:
+        """Test that the batch API extracts each SIREN once as of the date."""
+        cache = SnapshotCache()
+
+        def company_response(siren: str, **_kwargs: object) -> MagicMock:
+            return MagicMock(
+                unite_legale=UniteLegale.from_dict(
+                    {
+                        "siren": siren,
+                        "periodesUniteLegale": [
+                            {
+                                "dateDebut": "2019-01-01",
+                                "denominationUniteLegale": f"Company {siren}",
+                            }
+                        ],
+                    }
+                )
+            )
+
+        with (
+            patch(
+                "sirene_api_client.etl.extractor.find_by_siren",
+                side_effect=company_response,
+            ) as mock_siren,
+            patch(
+                "sirene_api_client.etl.extractor.find_by_post_etablissement",
+                return_value=MagicMock(etablissements=[]),
+            ),
+        ):
+            results = await extract_and_transform_sirens(
+                ["123456782", "552100554", "123456782"],
+                MagicMock(spec=AuthenticatedClient),
+                config,
+                snapshot_cache=cache,
+            )
+            await extract_and_transform_sirens(
+                ["552100554"],
+                MagicMock(spec=AuthenticatedClient),
+                config,
+                snapshot_cache=cache,
+            )
+
+        assert list(results) == ["123456782", "552100554"]
+        assert results["552100554"].company.name == "Company 552100554"
+        assert mock_siren.call_count == 2
+        assert {call[1]["date"] for call in mock_siren.call_args_list} == {"2020-01-01"}
+
+    @pytest.mark.asyncio
+    async def test_batch_rejects_invalid_siren(self) -> None:
+        """Test that the batch API validates every SIREN before extracting."""
+        with pytest.raises(ValueError, match="Invalid SIREN format"):
+            await extract_and_transform_sirens(
+                ["123456782", "12"], MagicMock(spec=AuthenticatedClient)
+            )
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_cancels_pending_extractions(self) -> None:
+        """Test that a failing SIREN cancels the extractions still running."""
+        cancelled: list[str] = []
+
+        async def extract(siren: str) -> object:
+            if siren == "123456782":
+                raise ExtractionError("boom", siren=siren)
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(siren)
+                raise
+            return None
+
+        with (
+            patch.object(SIRENExtractor, "extract_siren_complete", side_effect=extract),
+            pytest.raises(ExtractionError, match="boom"),
+        ):
+            await extract_and_transform_sirens(
+                ["552100554", "123456782"], MagicMock(spec=AuthenticatedClient)
+            )
+
+        assert cancelled == ["552100554"]
+
+
+class TestNotFound:
+    """Test handling of SIRENs the API reports missing."""
+
+    @staticmethod
+    def _company_response(siren: str, **_kwargs: object) -> object:
+        if siren == "552100554":
+            return ReponseErreur(header=Header(statut=404, message="Aucun élément"))
+        return MagicMock(
+            unite_legale=UniteLegale.from_dict(
+                {
+                    "siren": siren,
+                    "periodesUniteLegale": [
+                        {"dateDebut": "2019-01-01", "denominationUniteLegale": "Acme"}
+                    ],
+                }
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_negative_cache_skips_the_api(self) -> None:
+        """Test that a SIREN reported missing is not requested again."""
+        negative_cache = NegativeCache()
+        extractor = SIRENExtractor(
+            MagicMock(spec=AuthenticatedClient),
+            ETLConfig(),
+            negative_cache=negative_cache,
+        )
+
+        with patch(
+            "sirene_api_client.etl.extractor.find_by_siren",
+            side_effect=self._company_response,
+        ) as mock_siren:
+            for _ in range(2):
+                with pytest.raises(NotFoundError, match="552100554"):
+                    await extractor.extract_siren_complete("552100554")
+
+        assert mock_siren.call_count == 1
+        assert "552100554" in negative_cache
+
+    @pytest.mark.asyncio
+    async def test_batch_leaves_missing_sirens_out(self) -> None:
+        """Test that a 404 drops its SIREN instead of failing the batch."""
+        negative_cache = NegativeCache()
+
+        with (
+            patch(
+                "sirene_api_client.etl.extractor.find_by_siren",
+                side_effect=self._company_response,
+            ) as mock_siren,
+            patch(
+                "sirene_api_client.etl.extractor.find_by_post_etablissement",
+                return_value=MagicMock(etablissements=[]),
+            ),
+        ):
+            results = await extract_and_transform_sirens(
+                ["552100554", "123456782"],
+                MagicMock(spec=AuthenticatedClient),
+                negative_cache=negative_cache,
+            )
+            await extract_and_transform_sirens(
+                ["552100554"],
+                MagicMock(spec=AuthenticatedClient),
+                negative_cache=negative_cache,
+            )
+
+        assert list(results) == ["123456782"]
+        assert [call[1]["siren"] for call in mock_siren.call_args_list] == [
+            "552100554",
+            "123456782",
+        ]
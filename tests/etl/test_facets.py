@@ -0,0 +1,293 @@
+"""
+Unit tests for the ETL facet aggregation module.
+
+Tests cover:
+- Parsing Facette models and raw facet JSON into FacetResult
+- Field and interval facet requests with nombre=0, one request per interval
+- Establishment and legal unit endpoints
+- Result caching with expiry and eviction of expired results
+- Error handling
+"""
+
+from types import SimpleNamespace
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import facets as facets_module
+from sirene_api_client.etl.exceptions import ExtractionError
+from sirene_api_client.etl.facets import (
+    FacetClient,
+    FacetResult,
+    IntervalFacet,
+    parse_facette,
+)
+from sirene_api_client.models.facette import Facette
+
+FACET_DOCUMENT = {
+    "header": {"statut": 200, "total": 120, "nombre": 0},
+    "facettes": [
+        {
+            "nom": "trancheEffectifsEtablissement",
+            "manquants": 20,
+            "total": 100,
+            "modalites": 2,
+            "comptages": [
+                {"valeur": "00", "nombre": 70},
+                {"valeur": "11", "nombre": 30},
+            ],
+        },
+        {
+            "nom": "dateCreationEtablissement",
+            "avant": 5,
+            "apres": 0,
+            "entre": 115,
+            "comptages": [
+                {"valeur": "2000-01-01", "nombre": 40},
+                {"valeur": "2010-01-01", "nombre": 75},
+            ],
+        },
+    ],
+}
+
+
+class RecordingHandler:
+    """MockTransport handler recording form bodies."""
+
+    def __init__(self, status: int = 200, document: Any = None) -> None:
+        self.status = status
+        self.document = FACET_DOCUMENT if document is None else document
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(self.status, json=self.document)
+
+    def body(self, index: int = -1) -> dict[str, str]:
+        content = self.requests[index].content.decode()
+        return {k: v[0] for k, v in parse_qs(content).items()}
+
+
+def _interval_handler(request: httpx.Request) -> httpx.Response:
+    """MockTransport handler answering with the requested interval facet."""
+    body = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+    facettes = []
+    if "facette.intervalle.champ" in body:
+        facettes.append(
+            {
+                "nom": body["facette.intervalle.champ"],
+                "comptages": [
+                    {"valeur": body["facette.intervalle.debut"], "nombre": 1}
+                ],
+            }
+        )
+    return httpx.Response(
+        200, json={"header": {"statut": 200, "total": 120}, "facettes": facettes}
+    )
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+class TestParseFacette:
+    """Test parse_facette."""
+
+    def test_parse_raw_field_facet(self) -> None:
+        """Test parsing a raw field facet."""
+        result = parse_facette(FACET_DOCUMENT["facettes"][0])
+
+        assert result.name == "trancheEffectifsEtablissement"
+        assert result.counts == {"00": 70, "11": 30}
+        assert result.counts.most_common(1) == [("00", 70)]
+        assert result.missing == 20
+        assert result.total == 100
+        assert result.distinct == 2
+        assert result.before is None
+
+    def test_parse_raw_interval_facet(self) -> None:
+        """Test parsing interval bounds."""
+        result = parse_facette(FACET_DOCUMENT["facettes"][1])
+
+        assert result.before == 5
+        assert result.after == 0
+        assert result.between == 115
+
+    def test_parse_facette_model(self) -> None:
+        """Test parsing a generated Facette model."""
+        facette = Facette.from_dict(
+            {
+                "nom": "categorieEntreprise",
+                "manquants": 1,
+                "comptages": [{"valeur": {"valeur": "PME"}, "nombre": 4}],
+            }
+        )
+
+        result = parse_facette(facette)
+
+        assert result.name == "categorieEntreprise"
+        assert result.counts == {"PME": 4}
+        assert result.missing == 1
+        assert result.between is None
+
+
+class TestFacetClient:
+    """Test FacetClient."""
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError):
+            FacetClient(None)  # type: ignore[arg-type]
+        with pytest.raises(ValueError, match="cache_ttl"):
+            FacetClient(_client(RecordingHandler()), cache_ttl=-1)
+
+    @pytest.mark.asyncio
+    async def test_establishment_facets(self) -> None:
+        """Test a multi-field, interval facet request on /siret."""
+        handler = RecordingHandler()
+        facets = FacetClient(_client(handler))
+
+        results = await facets.establishment_facets(
+            "codeCommuneEtablissement:75056",
+            ["trancheEffectifsEtablissement", "activitePrincipaleEtablissement"],
+            intervals=[
+                IntervalFacet(
+                    "dateCreationEtablissement", "2000-01-01", "2020-01-01", "+10YEARS"
+                )
+            ],
+        )
+
+        assert isinstance(results["trancheEffectifsEtablissement"], FacetResult)
+        assert results["dateCreationEtablissement"].counts["2010-01-01"] == 75
+        request = handler.requests[0]
+        assert request.url.path.endswith("/siret")
+        body = handler.body()
+        assert body["nombre"] == "0"
+        assert body["facette.champ"] == (
+            "trancheEffectifsEtablissement,activitePrincipaleEtablissement"
+        )
+        assert body["facette.intervalle.champ"] == "dateCreationEtablissement"
+        assert body["facette.intervalle.pas"] == "+10YEARS"
+
+    @pytest.mark.asyncio
+    async def test_one_request_per_interval(self) -> None:
+        """Test that several interval facets are all requested and merged."""
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return _interval_handler(request)
+
+        results = await FacetClient(_client(handler)).establishment_facets(
+            "q:1",
+            intervals=[
+                IntervalFacet(
+                    "dateCreationEtablissement", "2000-01-01", "2020-01-01", "+10YEARS"
+                ),
+                IntervalFacet("trancheEffectifsEtablissement", "0", "100", "10"),
+            ],
+        )
+
+        assert len(requests) == 2
+        assert results["dateCreationEtablissement"].counts == {"2000-01-01": 1}
+        assert results["trancheEffectifsEtablissement"].counts == {"0": 1}
+
+    @pytest.mark.asyncio
+    async def test_legal_unit_facets(self) -> None:
+        """Test that legal unit facets use /siren."""
+        handler = RecordingHandler()
+        facets = FacetClient(_client(handler))
+
+        await facets.legal_unit_facets("etatAdministratifUniteLegale:A", ["a"])
+
+        assert handler.requests[0].url.path.endswith("/siren")
+
+    @pytest.mark.asyncio
+    async def test_count_without_facets(self) -> None:
+        """Test that count sends no facet field."""
+        handler = RecordingHandler()
+
+        total = await FacetClient(_client(handler)).count("siren:123456782")
+
+        assert total == 120
+        assert "facette.champ" not in handler.body()
+
+    @pytest.mark.asyncio
+    async def test_results_are_cached(self) -> None:
+        """Test that identical requests are served from the cache."""
+        handler = RecordingHandler()
+        facets = FacetClient(_client(handler))
+
+        await facets.establishment_facets("q:1", ["a"])
+        await facets.establishment_facets("q:1", ["a"])
+        await facets.establishment_facets("q:2", ["a"])
+        assert len(handler.requests) == 2
+
+        facets.clear_cache()
+        await facets.establishment_facets("q:1", ["a"])
+        assert len(handler.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_expired_results_are_evicted(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that expired results are refetched and dropped from the cache."""
+        now = [0.0]
+        monkeypatch.setattr(
+            facets_module, "time", SimpleNamespace(monotonic=lambda: now[0])
+        )
+        handler = RecordingHandler()
+        facets = FacetClient(_client(handler), cache_ttl=10)
+
+        await facets.count("q:1")
+        await facets.count("q:2")
+        now[0] = 20.0
+        await facets.count("q:1")
+
+        assert len(handler.requests) == 3
+        assert list(facets._cache) == [("siret", "q:1", (), ())]
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_cache(self) -> None:
+        """Test that a zero TTL always hits the API."""
+        handler = RecordingHandler()
+        facets = FacetClient(_client(handler), cache_ttl=0)
+
+        await facets.count("q:1")
+        await facets.count("q:1")
+
+        assert len(handler.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_empty(self) -> None:
+        """Test that a 404 means no results."""
+        facets = FacetClient(_client(RecordingHandler(404, {"header": {}})))
+
+        total, results = await facets.count_with_facets("q:1", ["a"])
+
+        assert total == 0
+        assert results == {}
+
+    @pytest.mark.asyncio
+    async def test_server_error(self) -> None:
+        """Test that server errors raise ExtractionError."""
+        facets = FacetClient(_client(RecordingHandler(500, {})))
+
+        with pytest.raises(ExtractionError, match="HTTP 500"):
+            await facets.count("q:1")
+
+    @pytest.mark.asyncio
+    async def test_unknown_endpoint(self) -> None:
+        """Test that an unknown endpoint is rejected."""
+        with pytest.raises(ValueError, match="Unknown endpoint"):
+            await FacetClient(_client(RecordingHandler())).count("q:1", "foo")
@@ -0,0 +1,151 @@
+"""
+Unit tests for the ETL memory-mapped identifier index module.
+
+Tests cover:
+- Building from unsorted rows, with duplicate identifiers
+- Binary-search lookups and membership
+- Building from stock files
+- Validation, reopening and pickling
+"""
+
+import csv
+from pathlib import Path
+import pickle
+import random
+
+import pytest
+
+from sirene_api_client.etl.identifier_index import (
+    COMPANY_FIELDS,
+    IdentifierIndex,
+)
+
+
+def _rows(count: int) -> list[dict[str, str]]:
+    rows = [
+        {
+            "siret": f"{100000000 + i:09d}{i % 7:05d}",
+            "etatAdministratifEtablissement": "A" if i % 3 else "F",
+            "activitePrincipaleEtablissement": f"{i % 90:02d}.11Z",
+        }
+        for i in range(count)
+    ]
+    random.Random(4).shuffle(rows)
+    return rows
+
+
+FIELDS = ("etatAdministratifEtablissement", "activitePrincipaleEtablissement")
+
+
+class TestIdentifierIndex:
+    """Test building and querying the index."""
+
+    def test_lookup(self, tmp_path: Path) -> None:
+        """Test every indexed SIRET is found with its record."""
+        rows = _rows(500)
+        index = IdentifierIndex.build(tmp_path / "siret.idx", rows, fields=FIELDS)
+
+        assert len(index) == 500
+        for row in rows:
+            assert index.get(row["siret"]) == {field: row[field] for field in FIELDS}
+
+    def test_missing_identifiers(self, tmp_path: Path) -> None:
+        """Test absent, out-of-range and malformed identifiers are not found."""
+        index = IdentifierIndex.build(tmp_path / "siret.idx", _rows(10), fields=FIELDS)
+
+        assert index.get("00000000000000") is None
+        assert index.get("99999999999999") is None
+        assert index.get("123") is None
+        assert "10000000000000" in index
+        assert "10000000000001" not in index
+        assert 10000000000000 not in index
+
+    def test_duplicates_keep_last_row(self, tmp_path: Path) -> None:
+        """Test the last row of a repeated identifier wins."""
+        index = IdentifierIndex.build(
+            tmp_path / "siret.idx",
+            [
+                {"siret": "12345678200010", "etatAdministratifEtablissement": "A"},
+                {"siret": "12345678200028", "etatAdministratifEtablissement": "A"},
+                {"siret": "12345678200010", "etatAdministratifEtablissement": "F"},
+            ],
+            fields=["etatAdministratifEtablissement"],
+        )
+
+        assert len(index) == 2
+        assert index.get("12345678200010") == {"etatAdministratifEtablissement": "F"}
+
+    def test_sort_runs_are_merged(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that rows sorted in several runs merge with the last row winning."""
+        monkeypatch.setattr("sirene_api_client.etl.identifier_index._SORT_CHUNK", 7)
+        rows = _rows(50)
+        rows += [{**row, "etatAdministratifEtablissement": "X"} for row in rows[::5]]
+
+        index = IdentifierIndex.build(tmp_path / "siret.idx", rows, fields=FIELDS)
+
+        latest = {row["siret"]: row for row in rows}
+        assert len(index) == 50
+        for siret, row in latest.items():
+            assert index.get(siret) == {field: row[field] for field in FIELDS}
+
+    def test_empty_values_and_unicode(self, tmp_path: Path) -> None:
+        """Test missing fields become empty strings and text round-trips."""
+        index = IdentifierIndex.build(
+            tmp_path / "siren.idx",
+            [{"siren": "123456782", "denominationUniteLegale": "Société Générale"}],
+            fields=COMPANY_FIELDS,
+            key="siren",
+        )
+
+        record = index.get("123456782")
+        assert record is not None
+        assert record["denominationUniteLegale"] == "Société Générale"
+        assert record["etatAdministratifUniteLegale"] == ""
+
+    def test_empty_index(self, tmp_path: Path) -> None:
+        """Test an index without rows answers every lookup with None."""
+        index = IdentifierIndex.build(tmp_path / "empty.idx", [], fields=FIELDS)
+
+        assert len(index) == 0
+        assert index.get("12345678200010") is None
+
+    def test_from_stock(self, tmp_path: Path) -> None:
+        """Test stock files are indexed on SIRET with the default fields."""
+        stock = tmp_path / "StockEtablissement.csv"
+        with stock.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["siren", "siret", "etatAdministratifEtablissement"])
+            writer.writerow(["123456782", "12345678200010", "A"])
+
+        index = IdentifierIndex.from_stock(tmp_path / "stock.idx", stock)
+
+        assert index.key == "siret"
+        record = index.get("12345678200010")
+        assert record is not None
+        assert record["etatAdministratifEtablissement"] == "A"
+        assert record["codeCommuneEtablissement"] == ""
+
+    def test_reopen_and_pickle(self, tmp_path: Path) -> None:
+        """Test the file can be reopened and pickles by path for worker processes."""
+        path = tmp_path / "siret.idx"
+        IdentifierIndex.build(path, _rows(20), fields=FIELDS).close()
+
+        with IdentifierIndex(path) as index:
+            copy = pickle.loads(pickle.dumps(index))
+
+        assert len(copy) == 20
+        assert copy.fields == FIELDS
+        assert len(pickle.dumps(copy)) < 200
+
+    def test_invalid_input(self, tmp_path: Path) -> None:
+        """Test bad identifiers, keys and files are rejected."""
+        with pytest.raises(ValueError, match="Invalid siret"):
+            IdentifierIndex.build(tmp_path / "x.idx", [{"siret": "123"}], fields=[])
+        with pytest.raises(ValueError, match="key must be one of"):
+            IdentifierIndex.build(tmp_path / "x.idx", [], fields=[], key="nic")
+        bogus = tmp_path / "bogus.idx"
+        bogus.write_bytes(b"not an index\n")
+        with pytest.raises(ValueError, match="Not an identifier index file"):
+            IdentifierIndex(bogus)
@@ -1025,7 +1025,7 @@ class TestCompanyOnlyExtraction:
         with pytest.raises(ValueError, match=r".*") as exc_info:
             await extract_company_only("invalid", mock_client, config)
 
-        assert "Invalid SIREN format: invalid. Must be 9 digits." in str(exc_info.value)
+        assert "Invalid SIREN format: invalid. Must be 9 digits" in str(exc_info.value)
 
     @pytest.mark.asyncio
     async def test_extract_company_only_facility_count_accuracy(
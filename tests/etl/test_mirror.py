@@ -0,0 +1,307 @@
+"""
+Unit tests for the ETL SQLite mirror module.
+
+Tests cover:
+- Document storage, periods and address indexes
+- Freshness (max age) rules
+- Read-through lookups returning the generated response models
+- Search response caching, write-through and pruning
+- LocalStore protocol
+"""
+
+from datetime import datetime
+import json
+from pathlib import Path
+import time
+from typing import Any
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.mirror import MirroredSireneClient, SQLiteMirror
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.etablissement_post_multi_criteres import (
+    EtablissementPostMultiCriteres,
+)
+from sirene_api_client.models.reponse_etablissement import ReponseEtablissement
+from sirene_api_client.models.reponse_etablissements import ReponseEtablissements
+from sirene_api_client.models.reponse_unite_legale import ReponseUniteLegale
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+def _unite_legale(siren: str = "123456782") -> dict[str, Any]:
+    return {
+        "siren": siren,
+        "dateCreationUniteLegale": "2010-05-01",
+        "periodesUniteLegale": [
+            {
+                "dateDebut": "2019-01-01",
+                "etatAdministratifUniteLegale": "A",
+                "denominationUniteLegale": "ACME",
+                "categorieJuridiqueUniteLegale": "5710",
+                "activitePrincipaleUniteLegale": "62.01Z",
+            }
+        ],
+    }
+
+
+def _etablissement(siret: str = "12345678200010") -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "adresseEtablissement": {
+            "codePostalEtablissement": "75001",
+            "codeCommuneEtablissement": "75101",
+        },
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.01Z",
+            }
+        ],
+    }
+
+
+class CountingSirene:
+    """Serve lookups and searches, counting the requests."""
+
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        if path.endswith("/siret"):
+            return httpx.Response(
+                200,
+                json={
+                    "header": {"statut": 200, "total": 2},
+                    "etablissements": [
+                        _etablissement("12345678200010"),
+                        _etablissement("12345678200028"),
+                    ],
+                },
+            )
+        if "/siret/" in path:
+            return httpx.Response(
+                200,
+                json={"header": {"statut": 200}, "etablissement": _etablissement()},
+            )
+        if "/siren/" in path:
+            return httpx.Response(
+                200,
+                json={"header": {"statut": 200}, "uniteLegale": _unite_legale()},
+            )
+        return httpx.Response(404, json={})
+
+
+class TestSQLiteMirror:
+    """Test storage and indexed lookups."""
+
+    def test_roundtrip(self) -> None:
+        """Test stored documents come back as the same models."""
+        mirror = SQLiteMirror()
+        mirror.put_unite_legale(_unite_legale())
+        mirror.put_etablissement(_etablissement())
+
+        unite_legale = mirror.get_unite_legale("123456782")
+        etablissement = mirror.get_etablissement("12345678200010")
+
+        assert isinstance(unite_legale, UniteLegale)
+        assert (
+            unite_legale.to_dict() == UniteLegale.from_dict(_unite_legale()).to_dict()
+        )
+        assert isinstance(etablissement, Etablissement)
+        assert etablissement.siret == "12345678200010"
+        assert mirror.get_unite_legale("999999999") is None
+
+    def test_max_age(self) -> None:
+        """Test documents older than max_age are treated as missing."""
+        mirror = SQLiteMirror()
+        mirror.put_unite_legale(_unite_legale(), fetched_at=time.time() - 120)
+
+        assert mirror.get_unite_legale("123456782", max_age=60) is None
+        assert mirror.get_unite_legale("123456782", max_age=300) is not None
+        assert mirror.get_unite_legale("123456782") is not None
+
+    def test_indexes(self) -> None:
+        """Test establishments are found by SIREN and commune."""
+        mirror = SQLiteMirror()
+        mirror.put_etablissement(_etablissement("12345678200028"))
+        mirror.put_etablissement(_etablissement("12345678200010"))
+        mirror.put_etablissement(_etablissement("98765432100018"))
+
+        assert [e.siret for e in mirror.etablissements_of("123456782")] == [
+            "12345678200010",
+            "12345678200028",
+        ]
+        assert len(mirror.sirets_in_commune("75101")) == 3
+
+    def test_replace_rewrites_periods(self) -> None:
+        """Test replacing a document replaces its period rows."""
+        mirror = SQLiteMirror()
+        mirror.put_unite_legale(_unite_legale())
+        mirror.put_unite_legale(_unite_legale())
+
+        count = mirror._connection.execute(
+            "SELECT COUNT(*) FROM legal_unit_periods"
+        ).fetchone()[0]
+
+        assert count == 1
+
+    def test_persistence(self, tmp_path: Path) -> None:
+        """Test a file-backed mirror survives reopening."""
+        path = tmp_path / "mirror.sqlite3"
+        mirror = SQLiteMirror(path)
+        mirror.put_etablissement(_etablissement())
+        mirror.set_watermark("Établissements", datetime(2024, 3, 1, 10))
+        mirror.close()
+
+        reopened = SQLiteMirror(path)
+
+        assert reopened.get_etablissement("12345678200010") is not None
+        assert reopened.watermark("Établissements") == datetime(2024, 3, 1, 10)
+
+    def test_local_store_protocol(self) -> None:
+        """Test bundles are stored from their registry payloads."""
+        mirror = SQLiteMirror()
+        bundle = SIRENTransformer(ETLConfig()).transform_facility_bundle(
+            Etablissement.from_dict(_etablissement())
+        )
+
+        mirror.upsert(bundle)
+
+        assert mirror.payload_hash("establishment", "12345678200010") == (
+            bundle.registry_record.payload_hash
+        )
+        assert mirror.payload_hash("legal_unit", "123456782") is None
+
+
+class TestMirroredSireneClient:
+    """Test the read-through client."""
+
+    @pytest.mark.asyncio
+    async def test_find_by_siren_read_through(self) -> None:
+        """Test the first lookup hits the API and the second the mirror."""
+        fake = CountingSirene()
+        client = MirroredSireneClient(_client(fake), SQLiteMirror())
+
+        first = await client.find_by_siren("123456782")
+        second = await client.find_by_siren("123456782")
+
+        assert len(fake.requests) == 1
+        assert isinstance(second, ReponseUniteLegale)
+        assert second.unite_legale.to_dict() == first.unite_legale.to_dict()
+        assert (client.hits, client.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_find_by_siret_read_through(self) -> None:
+        """Test establishment lookups are mirrored."""
+        fake = CountingSirene()
+        client = MirroredSireneClient(_client(fake), SQLiteMirror())
+
+        await client.find_by_siret("12345678200010")
+        response = await client.find_by_siret("12345678200010")
+
+        assert len(fake.requests) == 1
+        assert isinstance(response, ReponseEtablissement)
+        assert response.etablissement.siret == "12345678200010"
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_refetched(self) -> None:
+        """Test entries older than the TTL are fetched again."""
+        fake = CountingSirene()
+        mirror = SQLiteMirror()
+        mirror.put_unite_legale(_unite_legale(), fetched_at=time.time() - 7200)
+        client = MirroredSireneClient(_client(fake), mirror, legal_unit_ttl=3600)
+
+        await client.find_by_siren("123456782")
+
+        assert len(fake.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_date_bypasses_mirror(self) -> None:
+        """Test point-in-time lookups always go to the API and are not stored."""
+        fake = CountingSirene()
+        mirror = SQLiteMirror()
+        client = MirroredSireneClient(_client(fake), mirror)
+
+        await client.find_by_siren("123456782", date="2020-01-01")
+        await client.find_by_siren("123456782", date="2020-01-01")
+
+        assert len(fake.requests) == 2
+        assert mirror.get_unite_legale("123456782") is None
+
+    @pytest.mark.asyncio
+    async def test_search_cache_and_write_through(self) -> None:
+        """Test search responses are cached and their establishments mirrored."""
+        fake = CountingSirene()
+        mirror = SQLiteMirror()
+        client = MirroredSireneClient(_client(fake), mirror)
+        body = EtablissementPostMultiCriteres(q="codeCommuneEtablissement:75101")
+
+        await client.find_by_post_etablissement(body)
+        cached = await client.find_by_post_etablissement(body)
+        lookup = await client.find_by_siret("12345678200028")
+
+        assert len(fake.requests) == 1
+        assert isinstance(cached, ReponseEtablissements)
+        assert len(cached.etablissements) == 2
+        assert lookup.etablissement.siret == "12345678200028"
+
+    @pytest.mark.asyncio
+    async def test_expired_searches_are_pruned(self) -> None:
+        """Test storing a search deletes the responses older than search_ttl."""
+        mirror = SQLiteMirror()
+        mirror.put_search("old", {}, fetched_at=time.time() - 7200)
+        mirror.put_search("recent", {}, fetched_at=time.time() - 60)
+        client = MirroredSireneClient(_client(CountingSirene()), mirror)
+
+        await client.find_by_post_etablissement(
+            EtablissementPostMultiCriteres(q="codeCommuneEtablissement:75101")
+        )
+
+        keys = {
+            row[0] for row in mirror._connection.execute("SELECT key FROM searches")
+        }
+        assert "old" not in keys
+        assert "recent" in keys
+        assert len(keys) == 2
+        assert mirror.prune_searches(0) == 2
+
+    @pytest.mark.asyncio
+    async def test_partial_search_is_not_written_through(self) -> None:
+        """Test searches restricted with champs do not overwrite full documents."""
+        mirror = SQLiteMirror()
+        client = MirroredSireneClient(_client(CountingSirene()), mirror)
+
+        await client.find_by_post_etablissement(
+            EtablissementPostMultiCriteres(q="siren:123456782", champs="siret")
+        )
+
+        assert mirror.get_etablissement("12345678200010") is None
+        stored = mirror._connection.execute("SELECT response FROM searches").fetchone()
+        assert json.loads(stored[0])["header"]["total"] == 2
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError, match="client cannot be None"):
+            MirroredSireneClient(None, SQLiteMirror())  # type: ignore[arg-type]
+        with pytest.raises(TypeError, match="mirror cannot be None"):
+            MirroredSireneClient(_client(CountingSirene()), None)  # type: ignore[arg-type]
@@ -13,6 +13,7 @@ from datetime import date, datetime
 
 import pytest
 
+from sirene_api_client.etl.config import ETLConfig
 from sirene_api_client.etl.models import (
     ActivityClassificationData,
     AddressData,
@@ -23,6 +24,7 @@ from sirene_api_client.etl.models import (
     FacilityIdentifierData,
     FacilityOwnershipData,
     SIRENExtractResult,
+    hash_payload,
 )
 
 
@@ -572,3 +574,89 @@ class TestModelRelationships:
 
         assert activity.code == "6201Z"
         assert activity.scheme == "NAFRev2"
+
+
+class TestSIRENExtractResultIndexes:
+    """Test SIRET-keyed indexes of extraction results."""
+
+    @pytest.fixture
+    def result(self) -> SIRENExtractResult:
+        """Result with two facilities, the first one at an interned address."""
+        from sirene_api_client.etl.transformer import SIRENTransformer
+        from sirene_api_client.models.etablissement import Etablissement
+        from sirene_api_client.models.unite_legale import UniteLegale
+
+        address = {
+            "numeroVoieEtablissement": "2",
+            "libelleVoieEtablissement": "RUE DU COMMERCE",
+            "codePostalEtablissement": "75015",
+        }
+        return SIRENTransformer(ETLConfig(intern_addresses=True)).transform_complete(
+            {
+                "company": UniteLegale.from_dict({"siren": "123456782"}),
+                "facilities": [
+                    Etablissement.from_dict(
+                        {
+                            "siret": siret,
+                            "siren": siret[:9],
+                            "nic": siret[9:],
+                            "etablissementSiege": siret.endswith("10"),
+                            "adresseEtablissement": address,
+                            "periodesEtablissement": [
+                                {"dateDebut": "2020-01-01"},
+                                {"dateDebut": "2010-01-01", "dateFin": "2019-12-31"},
+                            ],
+                        }
+                    )
+                    for siret in ("12345678200010", "12345678200028")
+                ],
+            }
+        )
+
+    def test_indexes(self, result: SIRENExtractResult) -> None:
+        """Test facilities, addresses, periods and ownerships by SIRET."""
+        sirets = ["12345678200010", "12345678200028"]
+
+        assert list(result.facilities_by_siret) == sirets
+        assert len(result.addresses) == 1
+        assert list(result.addresses_by_siret) == sirets
+        assert result.addresses_by_siret[sirets[1]] is result.addresses[0]
+        assert [len(periods) for periods in result.periods_by_siret.values()] == [2, 2]
+        assert result.ownerships_by_siret[sirets[1]].company_siren == "123456782"
+        assert result.headquarters is result.facilities_by_siret[sirets[0]]
+        assert result.period_index.establishment_at(sirets[0], date(2015, 1, 1))
+
+    def test_indexes_are_cached(self, result: SIRENExtractResult) -> None:
+        """Test indexes are built once, and again only when their list changes."""
+        index = result.facilities_by_siret
+
+        assert result.facilities_by_siret is index
+
+        result.facilities.append(
+            result.facilities[0].model_copy(update={"nic": "00036", "identifiers": []})
+        )
+        assert "12345678200036" in result.facilities_by_siret
+
+        copy = result.model_copy(update={"facilities": result.facilities[:1]})
+        assert list(copy.facilities_by_siret) == ["12345678200010"]
+        assert copy.headquarters is not None
+        assert "facilities_by_siret" not in copy.model_dump()
+        assert copy._indexes is not result._indexes
+
+
+class TestHashPayload:
+    """Test the shared registry payload hash."""
+
+    def test_key_order_does_not_matter(self) -> None:
+        """Test that equal payloads hash equally whatever their key order."""
+        first = hash_payload({"siren": "123456782", "nested": {"a": 1, "b": 2}})
+        second = hash_payload({"nested": {"b": 2, "a": 1}, "siren": "123456782"})
+
+        assert first == second
+        assert len(first) == 64
+
+    def test_different_payloads_differ(self) -> None:
+        """Test that a changed value changes the hash."""
+        assert hash_payload({"siren": "123456782"}) != hash_payload(
+            {"siren": "552100554"}
+        )
@@ -0,0 +1,173 @@
+"""
+Unit tests for the ETL NAF nomenclature registry module.
+
+Tests cover:
+- Hierarchy of NAF rev1, NAF rev2 and NAFA codes
+- Bundled labels of every NAF rev2 code, without ancestor fallback
+- Rollup of codes to a level
+- Loading INSEE nomenclature files
+- Shared classifications across transformers and threads
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.naf import NAFRegistry, get_naf_registry
+from sirene_api_client.etl.transformer import SIRENTransformer
+
+
+@pytest.fixture
+def registry() -> NAFRegistry:
+    """Registry with the bundled index."""
+    registry = NAFRegistry()
+    registry.load_bundled()
+    return registry
+
+
+class TestHierarchy:
+    """Test resolving the hierarchy of codes."""
+
+    def test_naf_rev2(self, registry: NAFRegistry) -> None:
+        """Test the five levels of a NAF rev2 sub-class."""
+        entries = registry.hierarchy("62.01Z", "NAFRev2")
+
+        assert [(entry.level, entry.code) for entry in entries] == [
+            ("section", "J"),
+            ("division", "62"),
+            ("group", "62.0"),
+            ("class", "62.01"),
+            ("subclass", "62.01Z"),
+        ]
+        assert entries[0].label == "Information et communication"
+        assert entries[1].label == (
+            "Programmation, conseil et autres activités informatiques"
+        )
+        assert entries[4].label == "Programmation informatique"
+
+    def test_naf_rev1_and_nafa(self, registry: NAFRegistry) -> None:
+        """Test rev1 codes have no class level and NAFA codes extend rev2."""
+        rev1 = registry.hierarchy("741G", "NAFRev1")
+        nafa = registry.hierarchy("10.71BA", "NAFA")
+
+        assert [entry.code for entry in rev1] == ["K", "74", "74.1", "74.1G"]
+        assert rev1[0].label == "Immobilier, location et services aux entreprises"
+        assert rev1[1].label == "Services fournis principalement aux entreprises"
+        assert rev1[2].label is None
+        assert [entry.code for entry in nafa] == [
+            "C",
+            "10",
+            "10.7",
+            "10.71",
+            "10.71B",
+            "10.71BA",
+        ]
+
+    def test_sections_boundaries(self, registry: NAFRegistry) -> None:
+        """Test divisions map to their section at the range boundaries."""
+        assert registry.rollup("03.11Z", "section") == "A"
+        assert registry.rollup("05.10Z", "section") == "B"
+        assert registry.rollup("33.20A", "section") == "C"
+        assert registry.rollup("99.00Z", "section") == "U"
+        assert registry.rollup("99.0Z", "section", "NAF1993") == "Q"
+
+    def test_unknown_codes(self, registry: NAFRegistry) -> None:
+        """Test codes outside NAF resolve to nothing."""
+        assert registry.hierarchy("ABC", "NAFRev2") == []
+        assert registry.label("ABC") is None
+        assert registry.rollup("ABC", "division") is None
+
+
+class TestLabelsAndRollup:
+    """Test labels, nomenclature files and rollup."""
+
+    def test_bundled_labels(self, registry: NAFRegistry) -> None:
+        """Test NAF rev2 sub-classes get their own label, others none."""
+        assert registry.label("62.01Z") == "Programmation informatique"
+        assert registry.label("4711F") == "Hypermarchés"
+        assert registry.label("10.71C", "NAFA") == (
+            "Boulangerie et boulangerie-pâtisserie"
+        )
+        assert registry.label("74", "NAFRev1") == (
+            "Services fournis principalement aux entreprises"
+        )
+        # Not bundled, and not labelled with an ancestor's label
+        assert registry.label("74.1G", "NAFRev1") is None
+        assert registry.label("10.71BA", "NAFA") is None
+        registry.add_label("10.71BA", "Fabrication de pain", "NAFA")
+        assert registry.label("1071BA", "NAFA") == "Fabrication de pain"
+
+    def test_load_nomenclature(self, registry: NAFRegistry, tmp_path: Path) -> None:
+        """Test labels are read from an INSEE CSV export."""
+        path = tmp_path / "naf.csv"
+        path.write_text(
+            "Code;Intitulé\n74.1G;Conseil pour les affaires et le management\n"
+            "741J;Administration d'entreprises\n",
+            encoding="utf-8",
+        )
+
+        before = registry.classification("74.1G", "NAFRev1")
+        assert before.label == "NAFRev1 74.1G"
+
+        assert registry.load_nomenclature(path, "NAFRev1") == 2
+        assert registry.classification("74.1G", "NAFRev1").label == (
+            "Conseil pour les affaires et le management"
+        )
+        assert registry.label("741G", "NAF1993") == (
+            "Conseil pour les affaires et le management"
+        )
+        assert registry.label("74.1J", "NAFRev1") == "Administration d'entreprises"
+
+    def test_rollup(self, registry: NAFRegistry) -> None:
+        """Test rolling codes up and counting them per ancestor."""
+        codes = ["62.01Z", "62.02A", "6311Z", "47.11F", "XYZ"]
+
+        assert registry.rollup("62.01Z", "group") == "62.0"
+        assert registry.rollup("62", "class") is None
+        assert registry.rollup_counts(codes, "division") == {
+            "62": 2,
+            "63": 1,
+            "47": 1,
+        }
+        assert registry.rollup_counts(codes, "section") == {"J": 3, "G": 1}
+        with pytest.raises(ValueError, match="level must be one of"):
+            registry.rollup("62.01Z", "sector")
+
+
+class TestSharedClassifications:
+    """Test a single classification object per code."""
+
+    def test_shared_across_transformers(self) -> None:
+        """Test transformers of a process share classification objects."""
+        first = SIRENTransformer(ETLConfig()).transform_activity_code(
+            "62.01Z", "NAFRev2"
+        )
+        second = SIRENTransformer(ETLConfig()).transform_activity_code(
+            "62.01Z", "NAFRev2"
+        )
+
+        assert first is second
+        assert first is get_naf_registry().classification("62.01Z", "naf_rev2")
+        assert first.label == "Programmation informatique"
+
+    def test_thread_safety(self, registry: NAFRegistry) -> None:
+        """Test concurrent lookups create a single object."""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda _: registry.classification("10.71C", "NAFRev2"), range(200)
+                )
+            )
+
+        assert all(result is results[0] for result in results)
+
+    def test_default_label(self) -> None:
+        """Test codes without any label keep the default label."""
+        registry = NAFRegistry()
+
+        classification = registry.classification("62.01Z", "NAFRev2")
+
+        assert classification.label == "NAFRev2 62.01Z"
+        assert classification.scheme == "naf_rev2"
@@ -0,0 +1,178 @@
+"""
+Unit tests for the ETL process-pool transformation module.
+
+Tests cover:
+- Worker entry point on raw JSON bytes and decoded pages
+- Activity classification cache merging
+- Offloading pages to a real process pool
+- Process-pool integration with the staged pipeline
+"""
+
+import json
+from typing import Any
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import FacilityBundle
+from sirene_api_client.etl.parallel import (
+    ProcessPoolTransformer,
+    transform_facility_page,
+)
+from sirene_api_client.etl.pipeline import run_siren_pipeline
+from sirene_api_client.etl.transformer import SIRENTransformer
+
+
+def _page(siren: str, codes: list[str]) -> dict[str, Any]:
+    return {
+        "header": {"statut": 200, "total": len(codes)},
+        "etablissements": [
+            {
+                "siren": siren,
+                "nic": f"{i:05d}",
+                "siret": f"{siren}{i:05d}",
+                "periodesEtablissement": [
+                    {
+                        "dateDebut": "2020-01-01",
+                        "etatAdministratifEtablissement": "A",
+                        "activitePrincipaleEtablissement": code,
+                        "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+                    }
+                ],
+            }
+            for i, code in enumerate(codes)
+        ],
+    }
+
+
+class TestTransformFacilityPage:
+    """Test the worker entry point."""
+
+    def test_transform_decoded_page(self) -> None:
+        """Test transformation of a decoded page."""
+        bundles, classifications = transform_facility_page(
+            _page("123456782", ["62.01Z", "62.02A"]), ETLConfig()
+        )
+
+        assert [b.facility.identifiers[0].value for b in bundles] == [
+            "12345678200000",
+            "12345678200001",
+        ]
+        assert {c.code for c in classifications} == {"62.01Z", "62.02A"}
+
+    def test_transform_raw_bytes(self) -> None:
+        """Test that raw JSON bytes are decoded in the worker."""
+        raw = json.dumps(_page("123456782", ["62.01Z"])).encode()
+
+        bundles, _classifications = transform_facility_page(raw, ETLConfig())
+
+        assert len(bundles) == 1
+        assert isinstance(bundles[0], FacilityBundle)
+
+    def test_transform_empty_page(self) -> None:
+        """Test that a page without establishments yields nothing."""
+        bundles, classifications = transform_facility_page({"header": {}}, ETLConfig())
+
+        assert bundles == []
+        assert classifications == []
+
+
+class TestMergeActivityCache:
+    """Test SIRENTransformer.merge_activity_cache."""
+
+    def test_merge_keeps_existing_objects(self) -> None:
+        """Test that merging keeps one object per code."""
+        main = SIRENTransformer(ETLConfig())
+        existing = main.transform_activity_code("62.01Z", "NAFRev2")
+        other = SIRENTransformer(ETLConfig())
+        other.transform_activity_code("62.01Z", "NAFRev2")
+        other.transform_activity_code("62.02A", "NAFRev2")
+
+        added = main.merge_activity_cache(other.activity_classifications())
+
+        assert added == 1
+        assert main._activity_cache["naf_rev2:62.01Z"] is existing
+        assert "naf_rev2:62.02A" in main._activity_cache
+
+    def test_closing_bundle(self) -> None:
+        """Test the closing bundle carries every classification and the metadata."""
+        transformer = SIRENTransformer(ETLConfig())
+        transformer.transform_activity_code("62.01Z", "NAFRev2")
+        transformer.transform_activity_code("62.02A", "NAFRev2")
+
+        bundle = transformer.closing_bundle({"siren_count": 1})
+
+        assert [c.code for c in bundle.activity_classifications] == [
+            "62.01Z",
+            "62.02A",
+        ]
+        assert bundle.extraction_metadata == {"siren_count": 1}
+
+
+class TestProcessPoolTransformer:
+    """Test ProcessPoolTransformer."""
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError):
+            ProcessPoolTransformer(None)
+        with pytest.raises(ValueError, match="max_workers"):
+            ProcessPoolTransformer(ETLConfig(), max_workers=0)
+
+    @pytest.mark.asyncio
+    async def test_transform_page_in_pool(self) -> None:
+        """Test that pages are transformed in worker processes and caches merged."""
+        with ProcessPoolTransformer(ETLConfig(), max_workers=2) as pool:
+            first = await pool.transform_page(_page("123456782", ["62.01Z"]))
+            second = await pool.transform_page(
+                json.dumps(_page("552100554", ["62.01Z", "70.10Z"])).encode()
+            )
+
+        assert len(first) == 1
+        assert len(second) == 2
+        assert set(pool.transformer._activity_cache) == {
+            "naf_rev2:62.01Z",
+            "naf_rev2:70.10Z",
+        }
+        assert pool._executor is None
+
+    @pytest.mark.asyncio
+    async def test_pipeline_with_process_pool(self) -> None:
+        """Test that the pipeline ships facility pages to the pool."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/siret"):
+                return httpx.Response(200, json=_page("123456782", ["62.01Z"] * 3))
+            return httpx.Response(200, json={"uniteLegale": {"siren": "123456782"}})
+
+        client = AuthenticatedClient(token="test-token")
+        client.set_async_httpx_client(
+            httpx.AsyncClient(
+                base_url="https://api.insee.fr/api-sirene/3.11",
+                transport=httpx.MockTransport(handler),
+            )
+        )
+        received: list[Any] = []
+        shipped: list[Any] = []
+
+        with ProcessPoolTransformer(ETLConfig(), max_workers=2) as pool:
+            transform_page = pool.transform_page
+
+            async def record(page: bytes | dict[str, Any]) -> list[FacilityBundle]:
+                shipped.append(page)
+                return await transform_page(page)
+
+            pool.transform_page = record  # type: ignore[method-assign]
+            metrics = await run_siren_pipeline(
+                ["123456782"], client, received.append, process_pool=pool
+            )
+
+        facilities = [item for item in received if isinstance(item, FacilityBundle)]
+        assert len(facilities) == 3
+        # Pages reach the workers undecoded
+        assert [type(page) for page in shipped] == [bytes]
+        assert metrics["transform"].items_in == 2
+        codes = [c.code for c in received[-1].activity_classifications]
+        assert codes == ["62.01Z"]
@@ -0,0 +1,454 @@
+"""
+Unit tests for the ETL pipeline module.
+
+Tests cover:
+- Stage configuration validation
+- Item flow, fan-out and filtering through stages
+- Backpressure through bounded queues
+- Error propagation and cancellation
+- The SIREN pipeline against a mocked HTTP transport
+"""
+
+import asyncio
+import contextlib
+import json
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import (
+    extract_and_transform_siren_streaming,
+    extract_and_transform_siren_with_progress,
+)
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.exceptions import ExtractionError, PipelineError
+from sirene_api_client.etl.extractor import SIRENExtractor, _page_counts
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+)
+from sirene_api_client.etl.pipeline import (
+    PipelineRunner,
+    PipelineStage,
+    StageConfig,
+    run_siren_pipeline,
+)
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _company_document(siren: str) -> dict[str, Any]:
+    return {
+        "header": {"statut": 200, "message": "OK"},
+        "uniteLegale": {
+            "siren": siren,
+            "periodesUniteLegale": [
+                {
+                    "dateDebut": "2020-01-01",
+                    "etatAdministratifUniteLegale": "A",
+                    "denominationUniteLegale": f"Company {siren}",
+                    "activitePrincipaleUniteLegale": "62.01Z",
+                    "nomenclatureActivitePrincipaleUniteLegale": "NAFRev2",
+                }
+            ],
+        },
+    }
+
+
+def _facilities_document(siren: str, count: int) -> dict[str, Any]:
+    return {
+        "header": {"statut": 200, "message": "OK", "total": count},
+        "etablissements": [
+            {
+                "siren": siren,
+                "nic": f"{i:05d}",
+                "siret": f"{siren}{i:05d}",
+                "dateCreationEtablissement": "2020-01-01",
+                "periodesEtablissement": [
+                    {
+                        "dateDebut": "2020-01-01",
+                        "etatAdministratifEtablissement": "A",
+                        "activitePrincipaleEtablissement": "62.02A",
+                        "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+                    }
+                ],
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _mock_client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+class TestStageConfig:
+    """Test StageConfig validation."""
+
+    def test_defaults(self) -> None:
+        """Test default stage configuration."""
+        config = StageConfig()
+
+        assert config.concurrency == 1
+        assert config.queue_size == 16
+
+    @pytest.mark.parametrize(("concurrency", "queue_size"), [(0, 1), (1, 0), (-1, 5)])
+    def test_invalid_values(self, concurrency: int, queue_size: int) -> None:
+        """Test that non-positive settings are rejected."""
+        with pytest.raises(ValueError, match="must be at least 1"):
+            StageConfig(concurrency=concurrency, queue_size=queue_size)
+
+
+class TestPipelineRunner:
+    """Test the generic PipelineRunner."""
+
+    def test_requires_stages(self) -> None:
+        """Test that an empty pipeline is rejected."""
+        with pytest.raises(ValueError, match="at least one stage"):
+            PipelineRunner([])
+
+    def test_requires_unique_names(self) -> None:
+        """Test that duplicate stage names are rejected."""
+        with pytest.raises(ValueError, match="unique"):
+            PipelineRunner([PipelineStage("a", str), PipelineStage("a", str)])
+
+    @pytest.mark.asyncio
+    async def test_items_flow_through_stages(self) -> None:
+        """Test sync, async and generator stages chained together."""
+        received: list[int] = []
+
+        async def double(item: int) -> int:
+            return item * 2
+
+        async def fan_out(item: int) -> Any:
+            for _ in range(2):
+                yield item
+
+        def drop_large(item: int) -> int | None:
+            return item if item < 8 else None
+
+        runner = PipelineRunner(
+            [
+                PipelineStage("double", double),
+                PipelineStage("fan_out", fan_out),
+                PipelineStage("filter", drop_large),
+                PipelineStage("sink", received.append),
+            ]
+        )
+        metrics = await runner.run(range(5))
+
+        assert sorted(received) == [0, 0, 2, 2, 4, 4, 6, 6]
+        assert metrics["double"].items_in == 5
+        assert metrics["fan_out"].items_out == 10
+        assert metrics["filter"].items_out == 8
+        assert metrics["sink"].items_in == 8
+
+    @pytest.mark.asyncio
+    async def test_async_source(self) -> None:
+        """Test that an async iterable can feed the pipeline."""
+        received: list[int] = []
+
+        async def source() -> Any:
+            for i in range(3):
+                yield i
+
+        await PipelineRunner([PipelineStage("sink", received.append)]).run(source())
+
+        assert received == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_backpressure_bounds_queue_depth(self) -> None:
+        """Test that a slow sink never lets its queue exceed the configured size."""
+        received: list[int] = []
+
+        async def slow_sink(item: int) -> None:
+            await asyncio.sleep(0.001)
+            received.append(item)
+
+        runner = PipelineRunner(
+            [
+                PipelineStage("produce", lambda item: item),
+                PipelineStage("sink", slow_sink, StageConfig(queue_size=3)),
+            ]
+        )
+        metrics = await runner.run(range(50))
+
+        assert len(received) == 50
+        assert metrics["sink"].max_queue_depth <= 3
+        assert metrics["produce"].blocked_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_workers_overlap(self) -> None:
+        """Test that stage concurrency lets slow items overlap."""
+        in_flight = 0
+        peak = 0
+
+        async def slow(item: int) -> int:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return item
+
+        runner = PipelineRunner(
+            [
+                PipelineStage("slow", slow, StageConfig(concurrency=4)),
+                PipelineStage("sink", lambda _item: None),
+            ]
+        )
+        await runner.run(range(8))
+
+        assert peak == 4
+
+    @pytest.mark.asyncio
+    async def test_stage_error_raises_pipeline_error(self) -> None:
+        """Test that a failing stage cancels the run and names the stage."""
+
+        def boom(item: int) -> int:
+            if item == 3:
+                raise RuntimeError("bad item")
+            return item
+
+        runner = PipelineRunner(
+            [
+                PipelineStage("boom", boom),
+                PipelineStage("sink", lambda _item: None, StageConfig(queue_size=1)),
+            ]
+        )
+
+        with pytest.raises(PipelineError) as exc_info:
+            await runner.run(range(100))
+
+        assert exc_info.value.stage == "boom"
+        assert "bad item" in str(exc_info.value)
+
+
+class TestRawFetch:
+    """Test raw JSON fetching on SIRENExtractor."""
+
+    @pytest.mark.asyncio
+    async def test_fetch_facility_pages_paginates(self) -> None:
+        """Test that raw pages follow debut-based pagination."""
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            document = _facilities_document("123456782", 1000)
+            document["header"]["total"] = 1500
+            if b"debut=1000" in request.content:
+                document["etablissements"] = document["etablissements"][:500]
+            return httpx.Response(200, json=document)
+
+        extractor = SIRENExtractor(_mock_client(handler), ETLConfig())
+        pages = [page async for page in extractor.fetch_facility_pages("123456782")]
+
+        assert len(pages) == 2
+        assert len(requests) == 2
+        assert len(pages[1]["etablissements"]) == 500
+
+    @pytest.mark.asyncio
+    async def test_fetch_facility_page_contents(self) -> None:
+        """Test that undecoded pages paginate from the header's page size."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            document = _facilities_document("123456782", 1000)
+            document["header"].update(total=1001, nombre=1000)
+            if b"debut=1000" in request.content:
+                document["header"]["nombre"] = 1
+                document["etablissements"] = document["etablissements"][:1]
+            return httpx.Response(200, json=document)
+
+        extractor = SIRENExtractor(_mock_client(handler), ETLConfig())
+        pages = [
+            page async for page in extractor.fetch_facility_page_contents("123456782")
+        ]
+
+        assert len(pages) == 2
+        assert all(isinstance(page, bytes) for page in pages)
+        assert _page_counts(pages[1]) == (1, 1001)
+
+    def test_page_counts_without_header_size(self) -> None:
+        """Test pages without "nombre" in their header are decoded in full."""
+        content = json.dumps(_facilities_document("123456782", 3)).encode()
+
+        assert _page_counts(content) == (3, 3)
+
+    @pytest.mark.asyncio
+    async def test_fetch_facility_pages_not_found(self) -> None:
+        """Test that a 404 search ends the stream without error."""
+        extractor = SIRENExtractor(
+            _mock_client(lambda _request: httpx.Response(404, json={})), ETLConfig()
+        )
+
+        pages = [page async for page in extractor.fetch_facility_pages("123456782")]
+
+        assert pages == []
+
+    @pytest.mark.asyncio
+    async def test_fetch_company_payload_not_found(self) -> None:
+        """Test that a missing legal unit raises ExtractionError."""
+        extractor = SIRENExtractor(
+            _mock_client(lambda _request: httpx.Response(404, json={})), ETLConfig()
+        )
+
+        with pytest.raises(ExtractionError) as exc_info:
+            await extractor.fetch_company_payload("123456782")
+
+        assert exc_info.value.siren == "123456782"
+
+
+class TestSIRENPipeline:
+    """Test run_siren_pipeline end to end with a mocked transport."""
+
+    @staticmethod
+    def _handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/siret"):
+            siren = request.content.decode().split("siren%3A")[1][:9]
+            return httpx.Response(200, json=_facilities_document(siren, 3))
+        siren = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json=_company_document(siren))
+
+    @pytest.mark.asyncio
+    async def test_pipeline_loads_every_bundle(self) -> None:
+        """Test that every company and facility bundle reaches the sink."""
+        received: list[Any] = []
+
+        async def sink(bundle: Any) -> None:
+            received.append(bundle)
+
+        metrics = await run_siren_pipeline(
+            ["123456782", "552100554"],
+            _mock_client(self._handler),
+            sink,
+            fetch=StageConfig(concurrency=2, queue_size=2),
+        )
+
+        companies = [item for item in received if isinstance(item, CompanyBundle)]
+        facilities = [item for item in received if isinstance(item, FacilityBundle)]
+        assert len(companies) == 2
+        assert len(facilities) == 6
+        assert isinstance(received[-1], ActivityClassificationBundle)
+        assert received[-1].extraction_metadata["facility_count"] == 6
+        assert received[-1].extraction_metadata["siren_count"] == 2
+        assert metrics["fetch"].items_in == 2
+        assert metrics["load"].items_in == 8
+
+    @pytest.mark.asyncio
+    async def test_pipeline_skips_invalid_siren(self) -> None:
+        """Test that an invalid SIREN is recorded without stopping the others."""
+        received: list[Any] = []
+
+        await run_siren_pipeline(
+            ["123456782", "12", "552100555", "552100554"],
+            _mock_client(self._handler),
+            received.append,
+            fetch=StageConfig(concurrency=1),
+        )
+
+        companies = [item for item in received if isinstance(item, CompanyBundle)]
+        assert len(companies) == 2
+        metadata = received[-1].extraction_metadata
+        assert metadata["siren_count"] == 2
+        assert metadata["invalid_sirens"] == ["12", "552100555"]
+
+
+def _no_model_serialization() -> contextlib.ExitStack:
+    """Fail if a registry payload is rebuilt with to_dict() instead of kept."""
+    stack = contextlib.ExitStack()
+    for model in (Etablissement, UniteLegale):
+        stack.enter_context(
+            patch.object(model, "to_dict", side_effect=AssertionError("to_dict"))
+        )
+    return stack
+
+
+class TestRawRegistryPayloads:
+    """Test decoded documents flowing to registry records."""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_passes_documents(self) -> None:
+        """Test pipeline registry payloads are the decoded API documents."""
+        received: list[Any] = []
+
+        async def sink(bundle: Any) -> None:
+            received.append(bundle)
+
+        await run_siren_pipeline(
+            ["123456782"],
+            _mock_client(TestSIRENPipeline._handler),
+            sink,
+            ETLConfig(raw_registry_payloads=True),
+        )
+
+        facilities = [item for item in received if isinstance(item, FacilityBundle)]
+        companies = [item for item in received if isinstance(item, CompanyBundle)]
+        assert (
+            companies[0].registry_record.payload
+            == (_company_document("123456782")["uniteLegale"])
+        )
+        assert [bundle.registry_record.payload for bundle in facilities] == (
+            _facilities_document("123456782", 3)["etablissements"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_extractor_keeps_documents(self) -> None:
+        """Test extract_siren_complete keeps the documents behind its models."""
+        extractor = SIRENExtractor(
+            _mock_client(TestSIRENPipeline._handler),
+            ETLConfig(raw_registry_payloads=True),
+        )
+
+        raw_data = await extractor.extract_siren_complete("123456782")
+
+        assert raw_data["company"].siren == "123456782"
+        assert len(raw_data["facilities"]) == 3
+        assert raw_data["raw_company"] == _company_document("123456782")["uniteLegale"]
+        assert raw_data["raw_facilities"][2]["siret"] == "12345678200002"
+
+    @pytest.mark.asyncio
+    async def test_streaming_passes_documents(self) -> None:
+        """Test streamed registry payloads are the decoded API documents."""
+        with _no_model_serialization():
+            items = [
+                item
+                async for item in extract_and_transform_siren_streaming(
+                    "123456782",
+                    _mock_client(TestSIRENPipeline._handler),
+                    ETLConfig(raw_registry_payloads=True),
+                )
+            ]
+
+        assert (
+            items[0].registry_record.payload
+            == (_company_document("123456782")["uniteLegale"])
+        )
+        assert [item.registry_record.payload for item in items[1:-1]] == (
+            _facilities_document("123456782", 3)["etablissements"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_progress_passes_documents(self) -> None:
+        """Test progress-tracked registry payloads are the decoded API documents."""
+        with _no_model_serialization():
+            result = await extract_and_transform_siren_with_progress(
+                "123456782",
+                _mock_client(TestSIRENPipeline._handler),
+                ETLConfig(raw_registry_payloads=True),
+            )
+
+        assert [record.payload for record in result.registry_records] == [
+            _company_document("123456782")["uniteLegale"],
+            *_facilities_document("123456782", 3)["etablissements"],
+        ]
@@ -0,0 +1,292 @@
+"""
+Unit tests for the ETL query builder module.
+
+Tests cover:
+- Compilation of terms, ranges, OR-lists, periode() and negation
+- Splitting of oversized OR-lists into equivalent sub-queries
+- GET/POST routing by URL length and 414 fallback
+- Concurrent sub-query execution with deduplicated results
+"""
+
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.exceptions import ExtractionError
+from sirene_api_client.etl.query import (
+    AnyOf,
+    Query,
+    QueryExecutor,
+    any_of,
+    between,
+    periode,
+    split_query,
+    term,
+)
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+def _params(request: httpx.Request) -> dict[str, str]:
+    if request.method == "GET":
+        return dict(request.url.params)
+    return {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+
+
+class TestQueryCompilation:
+    """Test compilation to SIRENE q syntax."""
+
+    def test_term(self) -> None:
+        """Test field terms, quoting and prefix matches."""
+        assert term("siren", 123456782).compile() == "siren:123456782"
+        assert term("denominationUniteLegale", "ACME SA").compile() == (
+            'denominationUniteLegale:"ACME SA"'
+        )
+        assert term("codePostalEtablissement", "75*").compile() == (
+            "codePostalEtablissement:75*"
+        )
+
+    def test_range(self) -> None:
+        """Test closed and open ranges."""
+        assert between(
+            "dateCreationEtablissement", "2020-01-01", "2020-12-31"
+        ).compile() == ("dateCreationEtablissement:[2020-01-01 TO 2020-12-31]")
+        assert between("trancheEffectifsEtablissement", "10").compile() == (
+            "trancheEffectifsEtablissement:[10 TO *]"
+        )
+
+    def test_any_of(self) -> None:
+        """Test OR-lists and deduplication of values."""
+        assert any_of("siren", ["1", "2", "1"]).compile() == "(siren:1 OR siren:2)"
+        assert any_of("siren", ["1"]).compile() == "siren:1"
+
+    def test_combinators(self) -> None:
+        """Test AND, OR, negation and periode()."""
+        query = periode(
+            term("activitePrincipaleEtablissement", "62.01Z")
+            & ~term("etatAdministratifEtablissement", "F")
+        ) | term("siren", "123456782")
+
+        assert query.compile() == (
+            "(periode(activitePrincipaleEtablissement:62.01Z"
+            " AND -etatAdministratifEtablissement:F) OR siren:123456782)"
+        )
+
+    def test_nested_and_is_grouped(self) -> None:
+        """Test that a conjunction inside a disjunction is parenthesised."""
+        query = (term("a", "1") & term("b", "2")) | term("c", "3")
+
+        assert str(query) == "((a:1 AND b:2) OR c:3)"
+
+    def test_query_is_abstract(self) -> None:
+        """Test that the Query base class cannot be instantiated."""
+        with pytest.raises(TypeError):
+            Query()  # type: ignore[abstract]
+
+
+class TestSplitQuery:
+    """Test split_query."""
+
+    def test_no_split_needed(self) -> None:
+        """Test that a small query is kept whole."""
+        query = any_of("siren", ["1", "2"]) | term("a", "b")
+
+        assert split_query(query, 10) == [query]
+
+    def test_split_or_list_within_and(self) -> None:
+        """Test that chunks keep the other conjuncts."""
+        query = any_of("siret", [str(i) for i in range(5)]) & term("etat", "A")
+
+        parts = split_query(query, 2)
+
+        assert [p.compile() for p in parts] == [
+            "(siret:0 OR siret:1) AND etat:A",
+            "(siret:2 OR siret:3) AND etat:A",
+            "siret:4 AND etat:A",
+        ]
+
+    def test_split_inside_periode(self) -> None:
+        """Test that OR-lists inside periode() are split."""
+        parts = split_query(periode(any_of("naf", ["1", "2", "3"])), 2)
+
+        assert len(parts) == 2
+        assert all(p.compile().startswith("periode(") for p in parts)
+
+    def test_negated_list_is_kept(self) -> None:
+        """Test that OR-lists under a negation are not split."""
+        query = ~AnyOf("siren", ("1", "2", "3"))
+
+        assert split_query(query, 1) == [query]
+
+    def test_invalid_max_values(self) -> None:
+        """Test that max_values must be positive."""
+        with pytest.raises(ValueError, match="max_values"):
+            split_query(term("a", "b"), 0)
+
+
+class TestQueryExecutor:
+    """Test QueryExecutor routing and merging."""
+
+    @staticmethod
+    def _handler(requests: list[httpx.Request], status: int = 200) -> Any:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            params = _params(request)
+            if request.method == "GET" and status != 200:
+                return httpx.Response(status)
+            sirets = [
+                clause.split(":")[1] for clause in params["q"].strip("()").split(" OR ")
+            ]
+            # Every page also returns a shared establishment
+            sirets.append("99999999900001")
+            return httpx.Response(
+                200,
+                json={
+                    "header": {
+                        "curseur": params["curseur"],
+                        "curseurSuivant": params["curseur"],
+                    },
+                    "etablissements": [
+                        {"siret": siret, "siren": siret[:9]} for siret in sirets
+                    ],
+                },
+            )
+
+        return handler
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError):
+            QueryExecutor(None)  # type: ignore[arg-type]
+        with pytest.raises(ValueError, match="max_or_values"):
+            QueryExecutor(_client(self._handler([])), max_or_values=0)
+
+    @pytest.mark.asyncio
+    async def test_short_query_uses_get(self) -> None:
+        """Test that a query fitting in the URL is sent as GET."""
+        requests: list[httpx.Request] = []
+        executor = QueryExecutor(_client(self._handler(requests)))
+
+        results = await executor.etablissements(term("siret", "12345678200011"))
+
+        assert [r.method for r in requests] == ["GET"]
+        assert _params(requests[0])["curseur"] == "*"
+        assert [f.siret for f in results] == ["12345678200011", "99999999900001"]
+
+    @pytest.mark.asyncio
+    async def test_long_query_uses_post(self) -> None:
+        """Test that a query too long for a URL is sent as POST."""
+        requests: list[httpx.Request] = []
+        executor = QueryExecutor(_client(self._handler(requests)), max_url_length=100)
+
+        await executor.etablissements(any_of("siret", [f"{i:014d}" for i in range(10)]))
+
+        assert [r.method for r in requests] == ["POST"]
+
+    @pytest.mark.asyncio
+    async def test_414_falls_back_to_post(self) -> None:
+        """Test that a 414 on GET is retried as POST."""
+        requests: list[httpx.Request] = []
+        executor = QueryExecutor(_client(self._handler(requests, status=414)))
+
+        results = await executor.etablissements(term("siret", "12345678200011"))
+
+        assert [r.method for r in requests] == ["GET", "POST"]
+        assert len(results) == 2
+
+    @pytest.mark.asyncio
+    async def test_oversized_list_is_split_and_merged(self) -> None:
+        """Test that sub-queries run separately and results are deduplicated."""
+        requests: list[httpx.Request] = []
+        executor = QueryExecutor(_client(self._handler(requests)), max_or_values=3)
+        sirets = [f"{i:014d}" for i in range(7)]
+
+        results = await executor.etablissements(any_of("siret", sirets))
+
+        assert len(requests) == 3
+        assert sorted(f.siret for f in results) == sorted([*sirets, "99999999900001"])
+
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(self) -> None:
+        """Test that pages are followed until the cursor stops moving."""
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            cursor = _params(request)["curseur"]
+            next_cursor = {"*": "A", "A": "B", "B": "B"}[cursor]
+            return httpx.Response(
+                200,
+                json={
+                    "header": {"curseurSuivant": next_cursor},
+                    "unitesLegales": [{"siren": f"00000000{len(requests)}"}],
+                },
+            )
+
+        results = await QueryExecutor(_client(handler)).unites_legales("siren:*")
+
+        assert len(requests) == 3
+        assert [c.siren for c in results] == ["000000001", "000000002", "000000003"]
+
+    @pytest.mark.asyncio
+    async def test_streaming_fetches_pages_lazily(self) -> None:
+        """Test that streamed results arrive before later pages are requested."""
+        requests: list[httpx.Request] = []
+        executor = QueryExecutor(_client(self._handler(requests)), max_or_values=3)
+        sirets = [f"{i:014d}" for i in range(7)]
+
+        stream = executor.etablissements_streaming(any_of("siret", sirets))
+        first = await anext(stream)
+        requested_before_rest = len(requests)
+        rest = [facility.siret async for facility in stream]
+
+        assert first.siret == sirets[0]
+        assert requested_before_rest == 1
+        assert len(requests) == 3
+        assert rest.count("99999999900001") == 1
+        assert sorted([first.siret, *rest]) == sorted([*sirets, "99999999900001"])
+
+    @pytest.mark.asyncio
+    async def test_streaming_legal_units(self) -> None:
+        """Test that legal units are streamed across cursor pages."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            cursor = _params(request)["curseur"]
+            return httpx.Response(
+                200,
+                json={
+                    "header": {"curseurSuivant": {"*": "A", "A": "A"}[cursor]},
+                    "unitesLegales": [{"siren": "000000001"}, {"siren": "000000002"}],
+                },
+            )
+
+        stream = QueryExecutor(_client(handler)).unites_legales_streaming("siren:*")
+
+        assert [c.siren async for c in stream] == ["000000001", "000000002"]
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_empty(self) -> None:
+        """Test that a 404 means no results."""
+        executor = QueryExecutor(_client(lambda _request: httpx.Response(404, json={})))
+
+        assert await executor.unites_legales(term("siren", "000000000")) == []
+
+    @pytest.mark.asyncio
+    async def test_server_error(self) -> None:
+        """Test that server errors raise ExtractionError."""
+        executor = QueryExecutor(_client(lambda _request: httpx.Response(500, json={})))
+
+        with pytest.raises(ExtractionError, match="HTTP 500"):
+            await executor.etablissements("siren:123456782")
@@ -0,0 +1,225 @@
+"""
+Unit tests for the ETL registry record rehydration module.
+
+Tests cover:
+- Grouping stored records by SIREN, latest record winning
+- Lazy grouping and rehydration of record streams
+- Rejecting record streams not grouped by SIREN
+- Rebuilding results equal to the original transformation
+- Serial and process-pool rehydration
+- SIRENs without a legal unit record and invalid input
+"""
+
+from collections.abc import Iterator
+from datetime import timedelta
+from typing import Any
+
+import pytest
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import ExternalRegistryRecordData
+from sirene_api_client.etl.rehydrate import (
+    RegistryRehydrator,
+    group_registry_records,
+    iter_registry_groups,
+)
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _unite_legale(siren: str, name: str = "ACME") -> dict[str, Any]:
+    return {
+        "siren": siren,
+        "periodesUniteLegale": [
+            {
+                "dateDebut": "2019-01-01",
+                "etatAdministratifUniteLegale": "A",
+                "denominationUniteLegale": name,
+                "activitePrincipaleUniteLegale": "62.01Z",
+                "nomenclatureActivitePrincipaleUniteLegale": "NAFRev2",
+            }
+        ],
+    }
+
+
+def _etablissement(siret: str) -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.02A",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+            }
+        ],
+    }
+
+
+def _records(siren: str, facilities: int = 2) -> list[ExternalRegistryRecordData]:
+    """Registry records of a live transformation."""
+    result = SIRENTransformer(ETLConfig()).transform_complete(
+        {
+            "company": UniteLegale.from_dict(_unite_legale(siren)),
+            "facilities": [
+                Etablissement.from_dict(_etablissement(f"{siren}{i:05d}"))
+                for i in range(facilities)
+            ],
+        }
+    )
+    return result.registry_records
+
+
+class TestGrouping:
+    """Test grouping stored records by SIREN."""
+
+    def test_groups_and_latest_record(self) -> None:
+        """Test records are grouped by SIREN and the latest update wins."""
+        records = _records("123456782") + _records("552100554", 1)
+        newer = records[0].model_copy(
+            update={
+                "payload": _unite_legale("123456782", "NEW"),
+                "registry_updated_at": records[0].registry_updated_at
+                + timedelta(days=1),
+            }
+        )
+        older = records[0].model_copy(
+            update={
+                "payload": _unite_legale("123456782", "OLD"),
+                "registry_updated_at": records[0].registry_updated_at
+                - timedelta(days=1),
+            }
+        )
+
+        groups = group_registry_records([newer, *records, older])
+
+        assert list(groups) == ["123456782", "552100554"]
+        company, facilities = groups["123456782"]
+        assert company is not None
+        assert company["periodesUniteLegale"][0]["denominationUniteLegale"] == "NEW"
+        assert list(facilities) == ["12345678200000", "12345678200001"]
+
+    def test_iter_groups_is_lazy(self) -> None:
+        """Test a SIREN is yielded as soon as a record of the next one arrives."""
+        consumed: list[str] = []
+
+        def stream() -> Iterator[ExternalRegistryRecordData]:
+            for record in _records("123456782") + _records("552100554", 1):
+                consumed.append(record.external_id)
+                yield record
+
+        groups = iter_registry_groups(stream())
+        siren, (company, facilities) = next(groups)
+
+        assert siren == "123456782"
+        assert company is not None
+        assert len(facilities) == 2
+        assert consumed[-1] == "552100554"
+        assert [siren for siren, _payloads in groups] == ["552100554"]
+
+    def test_unknown_entity_type(self) -> None:
+        """Test records of other entity types are rejected."""
+        record = _records("123456782")[0].model_copy(update={"entity_type": "person"})
+
+        with pytest.raises(ValueError, match="Unknown entity type"):
+            group_registry_records([record])
+
+    def test_ungrouped_records_are_rejected(self) -> None:
+        """Test a SIREN reappearing after another one is an error."""
+        first = _records("123456782")
+        records = [*first[:2], *_records("552100554", 1), *first[2:]]
+
+        groups = iter_registry_groups(records)
+
+        assert next(groups)[0] == "123456782"
+        with pytest.raises(ValueError, match="not grouped by SIREN: 123456782"):
+            list(groups)
+
+
+class TestRegistryRehydrator:
+    """Test rebuilding results from stored records."""
+
+    def test_rehydrate_matches_live_transformation(self) -> None:
+        """Test rebuilt results carry the same data and payload hashes."""
+        records = _records("123456782")
+
+        results = dict(RegistryRehydrator(max_workers=1).rehydrate(records))
+
+        result = results["123456782"]
+        assert result.company.name == "ACME"
+        assert len(result.facilities) == 2
+        assert len(result.establishment_periods) == 2
+        assert [record.payload_hash for record in result.registry_records] == [
+            record.payload_hash for record in records
+        ]
+        assert result.extraction_metadata["facility_count"] == 2
+
+    def test_process_pool(self) -> None:
+        """Test SIRENs are rebuilt across worker processes, in input order."""
+        sirens = ["552100554", "123456782", "356000000"]
+        records = [record for siren in sirens for record in _records(siren, 1)]
+
+        results = dict(
+            RegistryRehydrator(max_workers=2, batch_size=1).rehydrate(records)
+        )
+
+        assert list(results) == sirens
+        assert all(len(result.facilities) == 1 for result in results.values())
+
+    def test_missing_legal_unit_is_skipped(self) -> None:
+        """Test SIRENs with only establishment records are left out."""
+        records = _records("123456782") + _records("552100554")[1:]
+
+        results = dict(RegistryRehydrator(max_workers=1).rehydrate(records))
+
+        assert list(results) == ["123456782"]
+
+    def test_raw_registry_payloads(self) -> None:
+        """Test stored payloads are reused as is with raw_registry_payloads."""
+        records = _records("123456782")
+
+        results = dict(
+            RegistryRehydrator(
+                ETLConfig(raw_registry_payloads=True), max_workers=1
+            ).rehydrate(records)
+        )
+
+        assert [record.payload for record in results["123456782"].registry_records] == [
+            record.payload for record in records
+        ]
+
+    def test_results_stream_per_batch(self) -> None:
+        """Test a batch is yielded before later records are read."""
+        consumed: list[str] = []
+        sirens = ["552100554", "123456782", "356000000"]
+
+        def stream() -> Iterator[ExternalRegistryRecordData]:
+            for siren in sirens:
+                for record in _records(siren, 1):
+                    consumed.append(record.external_id)
+                    yield record
+
+        results = RegistryRehydrator(max_workers=1, batch_size=1).rehydrate(stream())
+        siren, result = next(results)
+
+        assert siren == "552100554"
+        assert result.company.name == "ACME"
+        assert "356000000" not in consumed
+        assert [siren for siren, _result in results] == sirens[1:]
+
+    def test_ungrouped_records_are_rejected(self) -> None:
+        """Test rehydration stops when a SIREN reappears."""
+        records = _records("123456782", 1) + _records("552100554", 1)
+
+        with pytest.raises(ValueError, match="not grouped by SIREN: 123456782"):
+            list(RegistryRehydrator(max_workers=1).rehydrate(records + records[:1]))
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(ValueError, match="max_workers must be at least 1"):
+            RegistryRehydrator(max_workers=0)
+        with pytest.raises(ValueError, match="batch_size must be at least 1"):
+            RegistryRehydrator(batch_size=0)
@@ -0,0 +1,316 @@
+"""
+Unit tests for the ETL stock-file ingestion module.
+
+Tests cover:
+- Mapping flat stock rows to nested API documents
+- Chunked reading and byte-range splitting
+- Model and raw-document streaming
+- Serial and process-pool ingestion through the transformer
+"""
+
+import csv
+from pathlib import Path
+
+import pytest
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+)
+from sirene_api_client.etl.stock import (
+    COMPANY,
+    FACILITIES,
+    IN_FLIGHT_BYTES,
+    StockIngestor,
+    company_row_to_dict,
+    detect_stock_kind,
+    facility_row_to_dict,
+    read_stock_documents,
+    read_stock_records,
+    read_stock_rows,
+    split_byte_ranges,
+)
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+FACILITY_HEADER = [
+    "siren",
+    "nic",
+    "siret",
+    "dateCreationEtablissement",
+    "etablissementSiege",
+    "nombrePeriodesEtablissement",
+    "codePostalEtablissement",
+    "libelleCommuneEtablissement",
+    "codeCommuneEtablissement",
+    "coordonneeLambertAbscisseEtablissement",
+    "coordonneeLambertOrdonneeEtablissement",
+    "codePostal2Etablissement",
+    "dateDebut",
+    "etatAdministratifEtablissement",
+    "activitePrincipaleEtablissement",
+    "nomenclatureActivitePrincipaleEtablissement",
+    "changementEtatAdministratifEtablissement",
+]
+
+COMPANY_HEADER = [
+    "siren",
+    "dateCreationUniteLegale",
+    "unitePurgeeUniteLegale",
+    "nombrePeriodesUniteLegale",
+    "categorieEntreprise",
+    "dateDebut",
+    "etatAdministratifUniteLegale",
+    "denominationUniteLegale",
+    "categorieJuridiqueUniteLegale",
+    "activitePrincipaleUniteLegale",
+    "nomenclatureActivitePrincipaleUniteLegale",
+]
+
+
+def _facility_row(i: int, code: str = "62.01Z") -> list[str]:
+    siren = f"{100000000 + i}"
+    return [
+        siren,
+        "00012",
+        f"{siren}00012",
+        "2015-03-01",
+        "true",
+        "2",
+        "75001",
+        "PARIS 1",
+        "75101",
+        "651234.5",
+        "6862345.2",
+        "",
+        "2020-01-01",
+        "A",
+        code,
+        "NAFRev2",
+        "false",
+    ]
+
+
+def _write(path: Path, header: list[str], rows: list[list[str]]) -> Path:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def facility_file(tmp_path: Path) -> Path:
+    return _write(
+        tmp_path / "StockEtablissement.csv",
+        FACILITY_HEADER,
+        [_facility_row(i, "62.01Z" if i % 2 else "47.11B") for i in range(50)],
+    )
+
+
+@pytest.fixture
+def company_file(tmp_path: Path) -> Path:
+    return _write(
+        tmp_path / "StockUniteLegale.csv",
+        COMPANY_HEADER,
+        [
+            [
+                "123456782",
+                "2010-05-01",
+                "",
+                "3",
+                "PME",
+                "2019-01-01",
+                "A",
+                "ACME, SARL",
+                "5710",
+                "62.01Z",
+                "NAFRev2",
+            ]
+        ],
+    )
+
+
+class TestRowMapping:
+    """Test flat-row to nested-document mapping."""
+
+    def test_facility_row_is_nested(self) -> None:
+        """Test address, secondary address and period columns are grouped."""
+        row = dict(zip(FACILITY_HEADER, _facility_row(1), strict=True))
+        row["codePostal2Etablissement"] = "75002"
+
+        document = facility_row_to_dict(row)
+
+        assert document["siret"] == "10000000100012"
+        assert document["etablissementSiege"] is True
+        assert document["nombrePeriodesEtablissement"] == 2
+        assert document["adresseEtablissement"]["codePostalEtablissement"] == "75001"
+        assert document["adresse2Etablissement"] == {
+            "codePostal2Etablissement": "75002"
+        }
+        assert document["periodesEtablissement"] == [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.01Z",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+                "changementEtatAdministratifEtablissement": False,
+            }
+        ]
+
+    def test_empty_values_are_dropped(self) -> None:
+        """Test empty columns do not produce keys or empty groups."""
+        document = facility_row_to_dict(
+            {"siren": "123456782", "codeCedexEtablissement": ""}
+        )
+
+        assert document == {"siren": "123456782"}
+
+    def test_company_row_is_nested(self) -> None:
+        """Test legal-unit period columns become the current period."""
+        row = dict(
+            zip(
+                COMPANY_HEADER,
+                [
+                    "123456782",
+                    "2010-05-01",
+                    "false",
+                    "3",
+                    "PME",
+                    "2019-01-01",
+                    "A",
+                    "ACME",
+                    "5710",
+                    "62.01Z",
+                    "NAFRev2",
+                ],
+                strict=True,
+            )
+        )
+
+        document = company_row_to_dict(row)
+
+        assert document["unitePurgeeUniteLegale"] is False
+        assert document["nombrePeriodesUniteLegale"] == 3
+        assert document["categorieEntreprise"] == "PME"
+        assert document["periodesUniteLegale"][0]["denominationUniteLegale"] == "ACME"
+
+    def test_detect_stock_kind(self) -> None:
+        """Test stock kind detection from the header."""
+        assert detect_stock_kind(FACILITY_HEADER) == FACILITIES
+        assert detect_stock_kind(COMPANY_HEADER) == COMPANY
+        with pytest.raises(ValueError, match="Not a SIRENE stock file"):
+            detect_stock_kind(["foo"])
+
+
+class TestReading:
+    """Test chunked and ranged reading."""
+
+    def test_chunks(self, facility_file: Path) -> None:
+        """Test rows are yielded in chunks of chunk_size."""
+        chunks = list(read_stock_rows(facility_file, chunk_size=20))
+
+        assert [len(chunk) for chunk in chunks] == [20, 20, 10]
+        assert chunks[0][0]["siren"] == "100000000"
+
+    def test_ranges_cover_every_row_once(self, facility_file: Path) -> None:
+        """Test unaligned byte ranges partition the rows exactly."""
+        sirets = [
+            row["siret"]
+            for start, end in split_byte_ranges(facility_file, 97)
+            for chunk in read_stock_rows(facility_file, start, end)
+            for row in chunk
+        ]
+
+        assert sirets == [f"{100000000 + i}00012" for i in range(50)]
+
+    def test_quoted_values(self, company_file: Path) -> None:
+        """Test quoted values containing commas are parsed."""
+        [document] = read_stock_documents(company_file)
+
+        assert (
+            document["periodesUniteLegale"][0]["denominationUniteLegale"]
+            == "ACME, SARL"
+        )
+        assert "unitePurgeeUniteLegale" not in document
+
+    def test_records_are_models(self, facility_file: Path, company_file: Path) -> None:
+        """Test records are parsed into the API models."""
+        facility = next(read_stock_records(facility_file))
+        [company] = read_stock_records(company_file)
+
+        assert isinstance(facility, Etablissement)
+        assert facility.adresse_etablissement.code_commune_etablissement == "75101"
+        assert isinstance(company, UniteLegale)
+        assert company.siren == "123456782"
+
+    def test_invalid_sizes(self, facility_file: Path) -> None:
+        """Test range and chunk sizes are validated."""
+        with pytest.raises(ValueError, match="range_size must be at least 1"):
+            split_byte_ranges(facility_file, 0)
+        with pytest.raises(ValueError, match="chunk_size must be at least 1"):
+            next(read_stock_rows(facility_file, chunk_size=0))
+
+
+class TestStockIngestor:
+    """Test ingestion through the transformer."""
+
+    def test_serial_ingestion(self, facility_file: Path) -> None:
+        """Test every row is transformed and classifications come last."""
+        received: list[object] = []
+
+        count = StockIngestor(ETLConfig(), max_workers=1, range_size=300).ingest(
+            facility_file, received.append
+        )
+
+        assert count == 50
+        assert all(isinstance(b, FacilityBundle) for b in received[:-1])
+        assert isinstance(received[-1], ActivityClassificationBundle)
+        assert {c.code for c in received[-1].activity_classifications} == {
+            "62.01Z",
+            "47.11B",
+        }
+        assert received[0].address.latitude is not None
+
+    def test_process_pool_ingestion(self, facility_file: Path) -> None:
+        """Test ranges transformed in worker processes are all delivered."""
+        received: list[object] = []
+
+        count = StockIngestor(ETLConfig(), max_workers=2, range_size=500).ingest(
+            facility_file, received.append
+        )
+
+        assert count == 50
+        sirets = sorted(
+            b.facility.identifiers[0].value
+            for b in received
+            if isinstance(b, FacilityBundle)
+        )
+        assert sirets == [f"{100000000 + i}00012" for i in range(50)]
+        assert received[-1].extraction_metadata["row_count"] == 50
+
+    def test_company_ingestion(self, company_file: Path) -> None:
+        """Test legal-unit stock files produce company bundles."""
+        received: list[object] = []
+
+        StockIngestor(ETLConfig(), max_workers=1).ingest(company_file, received.append)
+
+        assert isinstance(received[0], CompanyBundle)
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError, match="config cannot be None"):
+            StockIngestor(None)  # type: ignore[arg-type]
+        with pytest.raises(ValueError, match="max_workers must be at least 1"):
+            StockIngestor(ETLConfig(), max_workers=0)
+        with pytest.raises(ValueError, match="range_size must be at least 1"):
+            StockIngestor(ETLConfig(), range_size=0)
+
+    def test_default_range_size_caps_in_flight_bytes(self) -> None:
+        """Test the default ranges in flight hold IN_FLIGHT_BYTES whatever the workers."""
+        for workers in (1, 8, 64):
+            ingestor = StockIngestor(ETLConfig(), max_workers=workers)
+            assert 2 * workers * ingestor.range_size == IN_FLIGHT_BYTES
+        assert StockIngestor(ETLConfig(), range_size=300).range_size == 300
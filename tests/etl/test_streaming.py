@@ -0,0 +1,221 @@
+"""
+Unit tests for the streaming ETL entry point.
+
+Tests cover:
+- Per-facility bundle transformation
+- Company bundle transformation
+- Ordering of the streamed items
+- Page-by-page consumption of the extractor
+"""
+
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import extract_and_transform_siren_streaming
+from sirene_api_client.etl.config import ETLConfig, ValidationMode
+from sirene_api_client.etl.models import (
+    ActivityClassificationBundle,
+    CompanyBundle,
+    FacilityBundle,
+)
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _company_payload() -> dict[str, Any]:
+    return {
+        "siren": "123456782",
+        "dateCreationUniteLegale": "2020-01-01",
+        "dateDernierTraitementUniteLegale": "2024-01-01T10:00:00",
+        "periodesUniteLegale": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifUniteLegale": "A",
+                "denominationUniteLegale": "Test Company",
+                "categorieJuridiqueUniteLegale": "5710",
+                "activitePrincipaleUniteLegale": "62.01Z",
+                "nomenclatureActivitePrincipaleUniteLegale": "NAFRev2",
+            }
+        ],
+    }
+
+
+def _facility_payload(nic: str, *, siege: bool = False) -> dict[str, Any]:
+    return {
+        "siren": "123456782",
+        "nic": nic,
+        "siret": f"123456782{nic}",
+        "dateCreationEtablissement": "2020-01-01",
+        "dateDernierTraitementEtablissement": "2024-01-01T10:00:00",
+        "etablissementSiege": siege,
+        "adresseEtablissement": {
+            "numeroVoieEtablissement": "1",
+            "typeVoieEtablissement": "RUE",
+            "libelleVoieEtablissement": "DE LA PAIX",
+            "codePostalEtablissement": "75002",
+            "libelleCommuneEtablissement": "PARIS",
+        },
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2020-01-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.02A",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+                "enseigne1Etablissement": f"Site {nic}",
+            }
+        ],
+    }
+
+
+class TestBundleTransformation:
+    """Test per-entity bundle transformation."""
+
+    @pytest.fixture
+    def transformer(self) -> SIRENTransformer:
+        """Create SIRENTransformer instance."""
+        return SIRENTransformer(ETLConfig(validation_mode=ValidationMode.LENIENT))
+
+    def test_transform_facility_bundle(self, transformer: SIRENTransformer) -> None:
+        """Test that a facility bundle carries every facility-level entity."""
+        facility = Etablissement.from_dict(_facility_payload("00001", siege=True))
+
+        bundle = transformer.transform_facility_bundle(facility)
+
+        assert bundle.facility.name == "Site 00001"
+        assert bundle.facility.is_headquarters is True
+        assert len(bundle.establishment_periods) == 1
+        assert bundle.address is not None
+        assert bundle.address.facility_siret == "12345678200001"
+        assert bundle.ownership.role == "owner"
+        assert bundle.registry_record.entity_type == "establishment"
+        assert bundle.registry_record.external_id == "12345678200001"
+
+    def test_transform_facility_bundle_without_address(
+        self, transformer: SIRENTransformer
+    ) -> None:
+        """Test that a missing address yields a bundle without address."""
+        payload = _facility_payload("00002")
+        del payload["adresseEtablissement"]
+        facility = Etablissement.from_dict(payload)
+
+        bundle = transformer.transform_facility_bundle(facility)
+
+        assert bundle.address is None
+        assert bundle.ownership.role == "operator"
+
+    def test_transform_company_bundle(self, transformer: SIRENTransformer) -> None:
+        """Test that the company bundle carries legal unit periods and record."""
+        company = UniteLegale.from_dict(_company_payload())
+
+        bundle = transformer.transform_company_bundle(company)
+
+        assert bundle.company.name == "Test Company"
+        assert len(bundle.legal_unit_periods) == 1
+        assert bundle.registry_record is not None
+        assert bundle.registry_record.entity_type == "legal_unit"
+
+    def test_registry_records_match_bundle_records(
+        self, transformer: SIRENTransformer
+    ) -> None:
+        """Test that bundles and batch transformation hash payloads identically."""
+        company = UniteLegale.from_dict(_company_payload())
+        facility = Etablissement.from_dict(_facility_payload("00001"))
+
+        records = transformer._create_registry_records(
+            {"company": company, "facilities": [facility]}
+        )
+        bundle = transformer.transform_facility_bundle(facility)
+
+        assert records[1].payload_hash == bundle.registry_record.payload_hash
+
+
+class TestStreamingETL:
+    """Test extract_and_transform_siren_streaming."""
+
+    @pytest.fixture
+    def mock_client(self) -> AuthenticatedClient:
+        """Create a mock SIRENE API client."""
+        return MagicMock(spec=AuthenticatedClient)
+
+    @pytest.mark.asyncio
+    async def test_streaming_order(self, mock_client: AuthenticatedClient) -> None:
+        """Test that company data comes first and classifications last."""
+        facilities = [
+            Etablissement.from_dict(_facility_payload(f"{i:05d}")) for i in range(3)
+        ]
+
+        with (
+            patch(
+                "sirene_api_client.etl.extractor.find_by_siren",
+                return_value=MagicMock(
+                    unite_legale=UniteLegale.from_dict(_company_payload())
+                ),
+            ),
+            patch(
+                "sirene_api_client.etl.extractor.find_by_post_etablissement",
+                return_value=MagicMock(
+                    etablissements=facilities, header=MagicMock(total=3)
+                ),
+            ),
+        ):
+            items = [
+                item
+                async for item in extract_and_transform_siren_streaming(
+                    "123456782", mock_client
+                )
+            ]
+
+        assert isinstance(items[0], CompanyBundle)
+        assert all(isinstance(item, FacilityBundle) for item in items[1:-1])
+        assert isinstance(items[-1], ActivityClassificationBundle)
+        assert len(items) == 5
+        assert items[-1].extraction_metadata["facility_count"] == 3
+        codes = {ac.code for ac in items[-1].activity_classifications}
+        assert codes == {"62.01Z", "62.02A"}
+
+    @pytest.mark.asyncio
+    async def test_streaming_yields_before_next_page(
+        self, mock_client: AuthenticatedClient
+    ) -> None:
+        """Test that facility bundles are yielded before later pages are fetched."""
+        extractor_pages_fetched = []
+
+        async def fake_pages(_self: Any, _siren: str) -> Any:
+            for page in range(2):
+                extractor_pages_fetched.append(page)
+                yield (
+                    [Etablissement.from_dict(_facility_payload(f"{page:05d}"))],
+                    2,
+                )
+
+        with (
+            patch(
+                "sirene_api_client.etl.extractor.find_by_siren",
+                return_value=MagicMock(
+                    unite_legale=UniteLegale.from_dict(_company_payload())
+                ),
+            ),
+            patch(
+                "sirene_api_client.etl.extractor.SIRENExtractor.extract_facilities_streaming",
+                fake_pages,
+            ),
+        ):
+            stream = extract_and_transform_siren_streaming("123456782", mock_client)
+            await anext(stream)  # company bundle
+            first_facility = await anext(stream)
+
+            assert isinstance(first_facility, FacilityBundle)
+            assert extractor_pages_fetched == [0]
+            await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_streaming_invalid_siren(
+        self, mock_client: AuthenticatedClient
+    ) -> None:
+        """Test that invalid SIREN format raises before any API call."""
+        with pytest.raises(ValueError, match="Invalid SIREN format"):
+            await anext(extract_and_transform_siren_streaming("123", mock_client))
@@ -0,0 +1,286 @@
+"""
+Unit tests for the ETL succession graph module.
+
+Tests cover:
+- SuccessionGraph edge deduplication and adjacency
+- Breadth-first expansion in both directions with batched OR-queries
+- Depth limits and direction filtering
+- Argument validation and error handling
+- SuccessionIndex lineage lookups, continuity components and persistence
+"""
+
+from datetime import date
+from pathlib import Path
+import re
+from typing import Any
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.exceptions import ExtractionError
+from sirene_api_client.etl.succession import (
+    SuccessionGraph,
+    SuccessionIndex,
+    SuccessionWalker,
+)
+from sirene_api_client.models.lien_succession import LienSuccession
+
+A, B, C, D, E = (
+    "12345678200010",
+    "12345678200028",
+    "12345678200036",
+    "12345678200044",
+    "12345678200051",
+)
+
+# A -> B -> C -> D, and E -> C
+LINKS = [
+    (A, B, "2015-01-01"),
+    (B, C, "2018-06-01"),
+    (C, D, "2021-03-15"),
+    (E, C, "2019-01-01"),
+]
+
+
+def _link(predecessor: str, successor: str, link_date: str) -> dict[str, Any]:
+    return {
+        "siretEtablissementPredecesseur": predecessor,
+        "siretEtablissementSuccesseur": successor,
+        "dateLienSuccession": link_date,
+        "transfertSiege": False,
+        "continuiteEconomique": True,
+    }
+
+
+class FakeSuccessionApi:
+    """MockTransport handler answering OR-queries over LINKS."""
+
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        q = request.url.params["q"]
+        self.queries.append(q)
+        matches = [
+            _link(*link)
+            for link in LINKS
+            if f"siretEtablissementPredecesseur:{link[0]}" in q
+            or f"siretEtablissementSuccesseur:{link[1]}" in q
+        ]
+        if not matches:
+            return httpx.Response(404, json={"header": {"statut": 404}})
+        return httpx.Response(
+            200, json={"header": {"curseurSuivant": "*"}, "liensSuccession": matches}
+        )
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+class TestSuccessionGraph:
+    """Test SuccessionGraph."""
+
+    def test_add_edge_deduplicates(self) -> None:
+        """Test that the same link is stored once."""
+        graph = SuccessionGraph()
+
+        assert graph.add_edge(LienSuccession.from_dict(_link(A, B, "2015-01-01")))
+        assert not graph.add_edge(LienSuccession.from_dict(_link(A, B, "2015-01-01")))
+        assert graph.add_edge(LienSuccession.from_dict(_link(A, B, "2016-01-01")))
+
+        assert len(graph.edges) == 2
+        assert graph.nodes == {A, B}
+        assert len(graph.successors(A)) == 2
+        assert graph.predecessors(A) == []
+
+
+class TestSuccessionWalker:
+    """Test SuccessionWalker."""
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError):
+            SuccessionWalker(None)  # type: ignore[arg-type]
+        with pytest.raises(ValueError, match="batch_size"):
+            SuccessionWalker(_client(FakeSuccessionApi()), batch_size=0)
+        with pytest.raises(ValueError, match="max_depth"):
+            SuccessionWalker(_client(FakeSuccessionApi()), max_depth=-1)
+
+    @pytest.mark.asyncio
+    async def test_invalid_siret_and_direction(self) -> None:
+        """Test walk argument validation."""
+        walker = SuccessionWalker(_client(FakeSuccessionApi()))
+
+        with pytest.raises(ValueError, match="Invalid SIRET"):
+            await walker.walk("123")
+        with pytest.raises(ValueError, match="Invalid direction"):
+            await walker.walk(A, direction="sideways")
+
+    @pytest.mark.asyncio
+    async def test_walk_full_lineage(self) -> None:
+        """Test that both directions reach the whole connected lineage."""
+        api = FakeSuccessionApi()
+        walker = SuccessionWalker(_client(api))
+
+        graph = await walker.walk(B)
+
+        assert graph.nodes == {A, B, C, D, E}
+        assert len(graph.edges) == 4
+        assert {
+            link.siret_etablissement_successeur for link in graph.successors(B)
+        } == {C}
+        # Level 0: B; level 1: A, C (one batch); level 2: D, E (one batch)
+        assert walker.requests == 3
+        assert re.search(r"siretEtablissementSuccesseur:" + B, api.queries[0])
+
+    @pytest.mark.asyncio
+    async def test_walk_batches_frontier(self) -> None:
+        """Test that a level is split into batches of batch_size."""
+        api = FakeSuccessionApi()
+        walker = SuccessionWalker(_client(api), batch_size=1)
+
+        graph = await walker.walk([A, E])
+
+        assert graph.nodes == {A, B, C, D, E}
+        assert all(q.count(" OR ") == 1 for q in api.queries)
+
+    @pytest.mark.asyncio
+    async def test_walk_successors_only(self) -> None:
+        """Test that the successors direction only follows forward links."""
+        graph = await SuccessionWalker(_client(FakeSuccessionApi())).walk(
+            C, direction="successors"
+        )
+
+        assert graph.nodes == {C, D}
+
+    @pytest.mark.asyncio
+    async def test_walk_respects_max_depth(self) -> None:
+        """Test that expansion stops after max_depth levels."""
+        walker = SuccessionWalker(_client(FakeSuccessionApi()), max_depth=1)
+
+        graph = await walker.walk(A)
+
+        assert graph.nodes == {A, B}
+        assert walker.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_walk_without_links(self) -> None:
+        """Test that a SIRET without links yields a single-node graph."""
+        graph = await SuccessionWalker(_client(FakeSuccessionApi())).walk(
+            "55210055400013"
+        )
+
+        assert graph.nodes == {"55210055400013"}
+        assert graph.edges == []
+
+    @pytest.mark.asyncio
+    async def test_server_error(self) -> None:
+        """Test that server errors raise ExtractionError."""
+        walker = SuccessionWalker(_client(lambda _request: httpx.Response(500)))
+
+        with pytest.raises(ExtractionError, match="HTTP 500"):
+            await walker.walk(A)
+
+
+class TestSuccessionIndex:
+    """Test SuccessionIndex."""
+
+    @pytest.fixture
+    def index(self) -> SuccessionIndex:
+        """Build an index over LINKS, with C -> D lacking economic continuity."""
+        links = [LienSuccession.from_dict(_link(*link)) for link in LINKS]
+        links[2].continuite_economique = False
+        return SuccessionIndex(links)
+
+    def test_sizes(self, index: SuccessionIndex) -> None:
+        """Test node and edge counts."""
+        assert len(index) == 5
+        assert index.edge_count == 4
+        assert A in index
+        assert "00000000000000" not in index
+
+    def test_current_successor(self, index: SuccessionIndex) -> None:
+        """Test following the latest links to the final establishment."""
+        assert index.current_successor(A) == D
+        assert index.current_successor(E) == D
+        assert index.current_successor(D) == D
+        assert index.current_successor("00000000000000") == "00000000000000"
+
+    def test_current_successor_follows_latest_link(self) -> None:
+        """Test that the most recent link wins when a SIRET has several."""
+        index = SuccessionIndex(
+            [
+                LienSuccession.from_dict(_link(A, C, "2022-01-01")),
+                LienSuccession.from_dict(_link(A, B, "2010-01-01")),
+            ]
+        )
+
+        assert index.current_successor(A) == C
+        assert index.successors(A) == [B, C]
+
+    def test_cycle_terminates(self) -> None:
+        """Test that a cycle of links does not loop forever."""
+        index = SuccessionIndex(
+            [
+                LienSuccession.from_dict(_link(A, B, "2010-01-01")),
+                LienSuccession.from_dict(_link(B, A, "2012-01-01")),
+            ]
+        )
+
+        assert index.current_successor(A) in {A, B}
+
+    def test_ancestors_and_descendants(self, index: SuccessionIndex) -> None:
+        """Test transitive traversal, nearest first."""
+        assert index.ancestors(D) == [C, B, E, A]
+        assert index.descendants(A) == [B, C, D]
+        assert index.ancestors("00000000000000") == []
+
+    def test_date_aware_traversal(self, index: SuccessionIndex) -> None:
+        """Test that links after as_of are ignored."""
+        assert index.descendants(A, as_of=date(2018, 12, 31)) == [B, C]
+        assert index.predecessors(C, as_of=date(2018, 12, 31)) == [B]
+        assert index.predecessors(C) == [B, E]
+
+    def test_same_continuity(self, index: SuccessionIndex) -> None:
+        """Test economic-continuity components."""
+        assert index.same_continuity(A, E)
+        assert not index.same_continuity(A, D)
+        assert index.same_continuity(D, D)
+        assert not index.same_continuity(A, "00000000000000")
+
+    def test_from_graph(self) -> None:
+        """Test building an index from a SuccessionGraph."""
+        graph = SuccessionGraph()
+        graph.add_edge(LienSuccession.from_dict(_link(A, B, "2015-01-01")))
+
+        assert SuccessionIndex.from_graph(graph).current_successor(A) == B
+
+    def test_save_and_load(self, index: SuccessionIndex, tmp_path: Path) -> None:
+        """Test that a saved index answers identically after loading."""
+        path = tmp_path / "succession.idx"
+        index.save(path)
+
+        loaded = SuccessionIndex.load(path)
+
+        assert len(loaded) == 5
+        assert loaded.current_successor(A) == D
+        assert loaded.ancestors(D) == [C, B, E, A]
+        assert loaded.descendants(A, as_of=date(2018, 12, 31)) == [B, C]
+        assert not loaded.same_continuity(A, D)
+
+    def test_load_rejects_other_files(self, tmp_path: Path) -> None:
+        """Test that loading a foreign file raises ValueError."""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not an index\n")
+
+        with pytest.raises(ValueError, match="Not a succession index"):
+            SuccessionIndex.load(path)
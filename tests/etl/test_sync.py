@@ -0,0 +1,335 @@
+"""
+Unit tests for the ETL baseline-plus-delta synchronization module.
+
+Tests cover:
+- Stock baseline loading and watermarks
+- /informations update dates
+- Delta window queries on dateDernierTraitement
+- Payload-hash merging by SIREN/SIRET
+- Comparing stock rows and API documents on their shared fields
+"""
+
+import csv
+from datetime import datetime
+import logging
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl.exceptions import ExtractionError
+from sirene_api_client.etl.sync import (
+    ESTABLISHMENTS,
+    LEGAL_UNITS,
+    InMemoryStore,
+    SyncEngine,
+    shared_payload_hash,
+)
+
+HEADER = [
+    "siren",
+    "nic",
+    "siret",
+    "dateDernierTraitementEtablissement",
+    "dateDebut",
+    "etatAdministratifEtablissement",
+    "activitePrincipaleEtablissement",
+    "nomenclatureActivitePrincipaleEtablissement",
+]
+
+
+def _client(handler: Any) -> AuthenticatedClient:
+    client = AuthenticatedClient(token="test-token")
+    client.set_async_httpx_client(
+        httpx.AsyncClient(
+            base_url="https://api.insee.fr/api-sirene/3.11",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+    return client
+
+
+def _facility(siret: str, code: str) -> dict[str, Any]:
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "dateDernierTraitementEtablissement": "2024-03-04T08:00:00",
+        "periodesEtablissement": [
+            {
+                "dateDebut": "2024-03-01",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": code,
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+            }
+        ],
+    }
+
+
+class FakeSirene:
+    """Serve /informations and delta searches, recording the queries."""
+
+    def __init__(
+        self,
+        facilities: list[dict[str, Any]],
+        last_processing: str = "2024-03-05T12:00:00",
+        mass_processing: str = "2024-01-01T00:00:00",
+    ) -> None:
+        self.facilities = facilities
+        self.last_processing = last_processing
+        self.mass_processing = mass_processing
+        self.queries: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/informations"):
+            return httpx.Response(
+                200,
+                json={
+                    "datesDernieresMisesAJourDesDonnees": [
+                        {
+                            "collection": collection,
+                            "dateDernierTraitementMaximum": self.last_processing,
+                            "dateDernierTraitementDeMasse": self.mass_processing,
+                        }
+                        for collection in (LEGAL_UNITS, ESTABLISHMENTS)
+                    ]
+                },
+            )
+        self.queries.append(request.url.params["q"])
+        if request.url.path.endswith("/siren"):
+            return httpx.Response(404, json={})
+        return httpx.Response(
+            200,
+            json={
+                "header": {"curseur": "*", "curseurSuivant": "*"},
+                "etablissements": self.facilities,
+            },
+        )
+
+
+@pytest.fixture
+def stock_file(tmp_path: Path) -> Path:
+    path = tmp_path / "StockEtablissement.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        for i, processed in enumerate(
+            ["2024-02-27T10:00:00", "2024-03-01T10:00:00", "2024-02-28T09:30:00"]
+        ):
+            writer.writerow(
+                [
+                    f"12345678{i}",
+                    "00010",
+                    f"12345678{i}00010",
+                    processed,
+                    "2020-01-01",
+                    "A",
+                    "62.01Z",
+                    "NAFRev2",
+                ]
+            )
+    return path
+
+
+def _baseline(stock_file: Path, handler: Any) -> tuple[SyncEngine, InMemoryStore]:
+    store = InMemoryStore()
+    engine = SyncEngine(_client(handler), store, max_ingest_workers=1)
+    engine.load_baseline(stock_file)
+    store.set_watermark(LEGAL_UNITS, datetime(2024, 3, 1, 10))
+    return engine, store
+
+
+class TestLoadBaseline:
+    """Test stock baseline loading."""
+
+    def test_load_baseline(self, stock_file: Path) -> None:
+        """Test every row is inserted and the watermark is the latest processing date."""
+        store = InMemoryStore()
+
+        stats = SyncEngine(
+            _client(FakeSirene([])), store, max_ingest_workers=1
+        ).load_baseline(stock_file)
+
+        assert stats.inserted == 3
+        assert len(store.facilities) == 3
+        assert store.watermark(ESTABLISHMENTS) == datetime(2024, 3, 1, 10)
+        assert "naf_rev2:62.01Z" in store.activity_classifications
+
+    def test_watermark_ignores_rows_without_processing_date(
+        self, stock_file: Path
+    ) -> None:
+        """Test that rows without dateDernierTraitement do not move the watermark."""
+        with stock_file.open("a", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerow(
+                ["123456789", "00010", "12345678900010", "", "2020-01-01", "A"]
+            )
+        store = InMemoryStore()
+
+        stats = SyncEngine(
+            _client(FakeSirene([])), store, max_ingest_workers=1
+        ).load_baseline(stock_file)
+
+        assert stats.inserted == 4
+        assert store.watermark(ESTABLISHMENTS) == datetime(2024, 3, 1, 10)
+
+    def test_reload_is_unchanged(self, stock_file: Path) -> None:
+        """Test reloading the same stock rewrites nothing."""
+        store = InMemoryStore()
+        engine = SyncEngine(_client(FakeSirene([])), store, max_ingest_workers=1)
+        engine.load_baseline(stock_file)
+
+        stats = engine.load_baseline(stock_file, as_of=datetime(2024, 3, 2))
+
+        assert (stats.inserted, stats.updated, stats.unchanged) == (0, 0, 3)
+        assert store.watermark(ESTABLISHMENTS) == datetime(2024, 3, 2)
+
+
+class TestSync:
+    """Test delta synchronization."""
+
+    @pytest.mark.asyncio
+    async def test_collection_dates(self) -> None:
+        """Test /informations dates are parsed per collection."""
+        engine = SyncEngine(_client(FakeSirene([])), InMemoryStore())
+
+        dates = await engine.collection_dates()
+
+        assert dates[ESTABLISHMENTS].last_processing == datetime(2024, 3, 5, 12)
+        assert dates[LEGAL_UNITS].last_mass_processing == datetime(2024, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_sync_window_and_merge(self, stock_file: Path) -> None:
+        """Test only the delta window is queried and records are merged by SIRET."""
+        fake = FakeSirene(
+            [
+                _facility("12345678100010", "47.11B"),
+                _facility("98765432100018", "62.01Z"),
+            ]
+        )
+        engine, store = _baseline(stock_file, fake)
+
+        stats = await engine.sync()
+
+        assert fake.queries == [
+            "dateDernierTraitementUniteLegale:[2024-03-01T10:00:00 TO 2024-03-05T12:00:00]",
+            "dateDernierTraitementEtablissement:[2024-03-01T10:00:00 TO 2024-03-05T12:00:00]",
+        ]
+        assert (stats.inserted, stats.updated, stats.unchanged) == (1, 1, 0)
+        assert len(store.facilities) == 4
+        assert (
+            store.facilities["12345678100010"].establishment_periods[0].activity_code
+            == "47.11B"
+        )
+        assert store.watermark(ESTABLISHMENTS) == datetime(2024, 3, 5, 12)
+        assert "naf_rev2:47.11B" in store.activity_classifications
+
+    @pytest.mark.asyncio
+    async def test_resync_is_unchanged(self, stock_file: Path) -> None:
+        """Test records already merged with the same payload are not rewritten."""
+        fake = FakeSirene([_facility("98765432100018", "62.01Z")])
+        engine, store = _baseline(stock_file, fake)
+        await engine.sync()
+        store.set_watermark(ESTABLISHMENTS, datetime(2024, 3, 1, 10))
+
+        stats = await engine.sync()
+
+        assert (stats.inserted, stats.updated, stats.unchanged) == (0, 0, 1)
+
+    @pytest.mark.asyncio
+    async def test_first_delta_matches_stock_rows(self, stock_file: Path) -> None:
+        """Test an API document with history equals its stock row."""
+        document = _facility("12345678100010", "62.01Z")
+        document["dateDernierTraitementEtablissement"] = "2024-03-01T10:00:00"
+        document["uniteLegale"] = {"denominationUniteLegale": "ACME"}
+        document["trancheEffectifsEtablissement"] = None
+        document["periodesEtablissement"] = [
+            {
+                "dateDebut": "2020-01-01",
+                "dateFin": None,
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "62.01Z",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+                "enseigne1Etablissement": None,
+            },
+            {
+                "dateDebut": "2015-06-01",
+                "dateFin": "2019-12-31",
+                "etatAdministratifEtablissement": "A",
+                "activitePrincipaleEtablissement": "47.11B",
+                "nomenclatureActivitePrincipaleEtablissement": "NAFRev2",
+            },
+        ]
+        engine, store = _baseline(stock_file, FakeSirene([document]))
+
+        stats = await engine.sync()
+
+        assert (stats.inserted, stats.updated, stats.unchanged) == (0, 0, 1)
+        # The stored stock bundle is kept
+        assert len(store.facilities["12345678100010"].establishment_periods) == 1
+
+    def test_shared_payload_hash(self) -> None:
+        """Test only the current period and non-null fields are hashed."""
+        document = _facility("12345678100010", "62.01Z")
+        history = {
+            **document,
+            "uniteLegale": {"siren": "123456781"},
+            "periodesEtablissement": [
+                *document["periodesEtablissement"],
+                {"dateDebut": "2020-01-01", "dateFin": "2024-02-29"},
+            ],
+        }
+        changed = _facility("12345678100010", "47.11B")
+
+        assert shared_payload_hash(history) == shared_payload_hash(document)
+        assert shared_payload_hash(changed) != shared_payload_hash(document)
+
+    @pytest.mark.asyncio
+    async def test_up_to_date_is_skipped(self, stock_file: Path) -> None:
+        """Test no search is sent when nothing was processed since the watermark."""
+        fake = FakeSirene([], last_processing="2024-03-01T10:00:00")
+        engine, _store = _baseline(stock_file, fake)
+
+        stats = await engine.sync()
+
+        assert fake.queries == []
+        assert stats.inserted == 0
+
+    @pytest.mark.asyncio
+    async def test_mass_update_warning(
+        self, stock_file: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test a mass update inside the window is reported."""
+        fake = FakeSirene([], mass_processing="2024-03-03T00:00:00")
+        engine, _store = _baseline(stock_file, fake)
+
+        with caplog.at_level(logging.WARNING):
+            await engine.sync()
+
+        assert "mass update" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_sync_requires_baseline(self) -> None:
+        """Test syncing an empty store is refused."""
+        engine = SyncEngine(_client(FakeSirene([])), InMemoryStore())
+
+        with pytest.raises(ValueError, match="No baseline loaded"):
+            await engine.sync()
+
+    @pytest.mark.asyncio
+    async def test_informations_error(self) -> None:
+        """Test /informations failures raise ExtractionError."""
+        engine = SyncEngine(
+            _client(lambda _request: httpx.Response(503, json={})), InMemoryStore()
+        )
+
+        with pytest.raises(ExtractionError, match="HTTP 503"):
+            await engine.collection_dates()
+
+    def test_invalid_arguments(self) -> None:
+        """Test constructor validation."""
+        with pytest.raises(TypeError, match="client cannot be None"):
+            SyncEngine(None, InMemoryStore())  # type: ignore[arg-type]
+        with pytest.raises(TypeError, match="store cannot be None"):
+            SyncEngine(_client(FakeSirene([])), None)  # type: ignore[arg-type]
@@ -0,0 +1,209 @@
+"""
+Unit tests for the ETL temporal interval index module.
+
+Tests cover:
+- Point and range queries over contiguous periods with open bounds
+- Overlapping periods
+- Agreement with a linear scan
+- As-of queries over the periods of an extraction result
+"""
+
+from datetime import date, timedelta
+import random
+
+from sirene_api_client.etl.config import ETLConfig
+from sirene_api_client.etl.models import (
+    CompanyLegalUnitPeriodData,
+    FacilityEstablishmentPeriodData,
+)
+from sirene_api_client.etl.temporal import IntervalIndex, PeriodIndex
+from sirene_api_client.etl.transformer import SIRENTransformer
+from sirene_api_client.models.etablissement import Etablissement
+from sirene_api_client.models.unite_legale import UniteLegale
+
+
+def _period(
+    start: date | None,
+    end: date | None,
+    code: str = "62.01Z",
+    status: str = "active",
+    siret: str | None = "12345678200010",
+) -> FacilityEstablishmentPeriodData:
+    return FacilityEstablishmentPeriodData(
+        start=start,
+        end=end,
+        status=status,
+        activity_code=code,
+        facility_siret=siret,
+    )
+
+
+def _covers(period: FacilityEstablishmentPeriodData, when: date) -> bool:
+    return (period.start or date.min) <= when <= (period.end or date.max)
+
+
+class TestIntervalIndex:
+    """Test point and range queries on one entity."""
+
+    def test_contiguous_periods(self) -> None:
+        """Test lookups over SIRENE-like periods, inclusive and open-ended."""
+        periods = [
+            _period(date(2020, 1, 1), None, "62.02A", "closed"),
+            _period(None, date(2009, 12, 31), "72.2Z"),
+            _period(date(2010, 1, 1), date(2019, 12, 31), "62.01Z"),
+        ]
+        index = IntervalIndex(periods)
+
+        assert [period.activity_code for period in index] == [
+            "72.2Z",
+            "62.01Z",
+            "62.02A",
+        ]
+        assert index.at(date(1990, 5, 1)) is periods[1]
+        assert index.at(date(2019, 12, 31)) is periods[2]
+        assert index.at(date(2020, 1, 1)) is periods[0]
+        assert [p.activity_code for p in index.between(date(2015, 1, 1))] == [
+            "62.01Z",
+            "62.02A",
+        ]
+        assert index.between(date(2009, 12, 31), date(2010, 1, 1)) == periods[1:3]
+        assert len(index.between()) == 3
+
+    def test_gaps_and_empty_index(self) -> None:
+        """Test dates outside every period."""
+        index = IntervalIndex(
+            [
+                _period(date(2010, 1, 1), date(2010, 12, 31)),
+                _period(date(2012, 1, 1), date(2012, 12, 31)),
+            ]
+        )
+
+        assert index.at(date(2011, 6, 1)) is None
+        assert index.at(date(2009, 1, 1)) is None
+        assert index.at(date(2013, 1, 1)) is None
+        assert index.between(date(2011, 1, 1), date(2011, 12, 31)) == []
+        assert IntervalIndex([]).at(date(2020, 1, 1)) is None
+
+    def test_overlapping_periods(self) -> None:
+        """Test a long period is found behind later, shorter ones."""
+        long = _period(date(2000, 1, 1), None, "A")
+        short = _period(date(2005, 1, 1), date(2005, 12, 31), "B")
+        index = IntervalIndex([long, short])
+
+        assert index.at(date(2005, 6, 1)) is short
+        assert index.at(date(2010, 1, 1)) is long
+        assert index.between(date(2010, 1, 1), date(2011, 1, 1)) == [long]
+
+    def test_matches_linear_scan(self) -> None:
+        """Test random periods and dates against a linear scan."""
+        rng = random.Random(3)
+        periods = []
+        for _ in range(300):
+            start = date(2000, 1, 1) + timedelta(days=rng.randrange(8000))
+            end = start + timedelta(days=rng.randrange(400))
+            periods.append(_period(start, end if rng.random() > 0.05 else None))
+        index = IntervalIndex(periods)
+
+        for _ in range(300):
+            when = date(2000, 1, 1) + timedelta(days=rng.randrange(9000))
+            found = index.at(when)
+            covering = [period for period in periods if _covers(period, when)]
+            assert (found is None) == (not covering)
+            assert found is None or _covers(found, when)
+
+            until = when + timedelta(days=rng.randrange(200))
+            expected = [
+                period
+                for period in periods
+                if (period.start or date.min) <= until
+                and (period.end or date.max) >= when
+            ]
+            assert sorted(map(id, index.between(when, until))) == sorted(
+                map(id, expected)
+            )
+
+
+class TestPeriodIndex:
+    """Test as-of queries over extraction results."""
+
+    def test_from_result(self) -> None:
+        """Test legal unit and facility lookups on a transformed result."""
+        result = SIRENTransformer(ETLConfig()).transform_complete(
+            {
+                "company": UniteLegale.from_dict(
+                    {
+                        "siren": "123456782",
+                        "periodesUniteLegale": [
+                            {
+                                "dateDebut": "2015-01-01",
+                                "etatAdministratifUniteLegale": "A",
+                                "activitePrincipaleUniteLegale": "62.02A",
+                            },
+                            {
+                                "dateDebut": "2008-01-01",
+                                "dateFin": "2014-12-31",
+                                "etatAdministratifUniteLegale": "A",
+                                "activitePrincipaleUniteLegale": "62.01Z",
+                            },
+                        ],
+                    }
+                ),
+                "facilities": [
+                    Etablissement.from_dict(
+                        {
+                            "siret": siret,
+                            "periodesEtablissement": [
+                                {
+                                    "dateDebut": "2018-01-01",
+                                    "etatAdministratifEtablissement": state,
+                                },
+                                {
+                                    "dateDebut": "2010-01-01",
+                                    "dateFin": "2017-12-31",
+                                    "etatAdministratifEtablissement": "A",
+                                },
+                            ],
+                        }
+                    )
+                    for siret, state in (
+                        ("12345678200010", "A"),
+                        ("12345678200028", "F"),
+                    )
+                ],
+            }
+        )
+        index = PeriodIndex.from_result(result)
+
+        legal_unit = index.legal_unit_at(date(2010, 6, 1))
+        assert legal_unit is not None
+        assert legal_unit.activity_code == "62.01Z"
+        assert index.legal_unit_at(date(2000, 1, 1)) is None
+        assert index.active_facilities(date(2012, 1, 1)) == [
+            "12345678200010",
+            "12345678200028",
+        ]
+        assert index.active_facilities(date(2020, 1, 1)) == ["12345678200010"]
+        closed = index.establishment_at("12345678200028", date(2020, 1, 1))
+        assert closed is not None
+        assert closed.status == "closed"
+        assert len(index.establishment_between("12345678200010", date(2017, 6, 1))) == 2
+        assert index.establishment_at("55210055400013", date(2020, 1, 1)) is None
+        assert index.establishment_between("55210055400013") == []
+
+    def test_periods_without_siret_are_skipped(self) -> None:
+        """Test periods not linked to a facility are left out."""
+        index = PeriodIndex(
+            [
+                CompanyLegalUnitPeriodData(
+                    start=date(2020, 1, 1),
+                    legal_name="ACME",
+                    legal_form_code="5710",
+                    activity_code="62.01Z",
+                    status="active",
+                )
+            ],
+            [_period(date(2020, 1, 1), None, siret=None)],
+        )
+
+        assert index.establishments == {}
+        assert index.legal_unit_at(date(2021, 1, 1)) is not None
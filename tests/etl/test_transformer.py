@@ -10,6 +10,7 @@ Tests cover:
 """
 
 from datetime import date, datetime
+from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -27,6 +28,7 @@ from sirene_api_client.etl.models import (
     FacilityIdentifierData,
     FacilityOwnershipData,
     SIRENExtractResult,
+    hash_payload,
 )
 from sirene_api_client.etl.transformer import SIRENTransformer
 
@@ -351,9 +353,8 @@ class TestSIRENTransformer:
 
         assert result.code == "6201Z"
         assert result.scheme == "naf_rev2"
-        assert (
-            result.label == "NAFRev2 6201Z"
-        )  # Should get default label when None is passed
+        # Official sub-class label from the bundled NAF rev2 index
+        assert result.label == "Programmation informatique"
 
     def test_map_unite_legale_status(self, transformer: SIRENTransformer) -> None:
         """Test UniteLegale status mapping."""
@@ -1057,3 +1058,244 @@ class TestSIRENTransformer:
 
         # Should fall back to "Unknown Facility" when company name is UNSET
         assert result.name == "Unknown Facility"
+
+
+FACILITY_DOCUMENT = {
+    "siren": "123456782",
+    "nic": "00010",
+    "siret": "12345678200010",
+    "dateDernierTraitementEtablissement": "2024-03-01T10:00:00.000",
+    "periodesEtablissement": [
+        {"dateDebut": "2020-01-01", "etatAdministratifEtablissement": "A"}
+    ],
+}
+
+
+class TestRegistryPayloads:
+    """Test registry payloads built from decoded documents."""
+
+    def test_document_is_used_as_payload(self) -> None:
+        """Test a passed document becomes the payload and hash input as is."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        transformer = SIRENTransformer(ETLConfig(raw_registry_payloads=True))
+        facility = Etablissement.from_dict(FACILITY_DOCUMENT)
+
+        with patch.object(Etablissement, "to_dict") as to_dict:
+            record = transformer.transform_facility_bundle(
+                facility, FACILITY_DOCUMENT
+            ).registry_record
+
+        to_dict.assert_not_called()
+        assert record.payload == FACILITY_DOCUMENT
+        assert record.payload_hash == hash_payload(FACILITY_DOCUMENT)
+
+    def test_transform_complete_uses_kept_documents(self) -> None:
+        """Test transform_complete picks up the extractor's raw documents."""
+        from sirene_api_client.models.etablissement import Etablissement
+        from sirene_api_client.models.unite_legale import UniteLegale
+
+        company_document = {"siren": "123456782"}
+        result = SIRENTransformer(ETLConfig()).transform_complete(
+            {
+                "company": UniteLegale.from_dict(company_document),
+                "facilities": [Etablissement.from_dict(FACILITY_DOCUMENT)],
+                "raw_company": company_document,
+                "raw_facilities": [FACILITY_DOCUMENT],
+            }
+        )
+
+        assert [record.payload for record in result.registry_records] == [
+            company_document,
+            FACILITY_DOCUMENT,
+        ]
+
+    def test_default_round_trips_models(self) -> None:
+        """Test the model's to_dict() is used when no document is passed."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        facility = Etablissement.from_dict(FACILITY_DOCUMENT)
+
+        record = (
+            SIRENTransformer(ETLConfig())
+            .transform_facility_bundle(facility)
+            .registry_record
+        )
+
+        assert record.payload == facility.to_dict()
+
+
+def _mall_facility(siret: str, street: str = "RUE DU COMMERCE") -> dict[str, Any]:
+    """Establishment document at a shared shopping-centre address."""
+    return {
+        "siren": siret[:9],
+        "nic": siret[9:],
+        "siret": siret,
+        "dateCreationEtablissement": "2015-03-01",
+        "adresseEtablissement": {
+            "numeroVoieEtablissement": "2",
+            "typeVoieEtablissement": "RUE",
+            "libelleVoieEtablissement": street,
+            "codePostalEtablissement": "75015",
+            "libelleCommuneEtablissement": "PARIS",
+            "codeCommuneEtablissement": "75115",
+            "coordonneeLambertAbscisseEtablissement": "648000",
+            "coordonneeLambertOrdonneeEtablissement": "6860000",
+        },
+    }
+
+
+class TestAddressInterning:
+    """Test interning addresses shared by several establishments."""
+
+    def _transform(self, config: ETLConfig, documents: list[dict[str, Any]]) -> Any:
+        from sirene_api_client.models.etablissement import Etablissement
+        from sirene_api_client.models.unite_legale import UniteLegale
+
+        return SIRENTransformer(config).transform_complete(
+            {
+                "company": UniteLegale.from_dict({"siren": "123456782"}),
+                "facilities": [Etablissement.from_dict(doc) for doc in documents],
+            }
+        )
+
+    def test_canonical_key(self) -> None:
+        """Test keys ignore case and spacing, and prefer the BAN identifier."""
+        from sirene_api_client.models.adresse import Adresse
+
+        transformer = SIRENTransformer(ETLConfig())
+        first = Adresse.from_dict(
+            _mall_facility("12345678200010")["adresseEtablissement"]
+        )
+        second = Adresse.from_dict(
+            {
+                **_mall_facility("12345678200028")["adresseEtablissement"],
+                "libelleVoieEtablissement": "rue du  Commerce",
+            }
+        )
+        with_ban = Adresse.from_dict(
+            {"identifiantAdresseEtablissement": "75115_2270_00002"}
+        )
+
+        assert transformer.address_key(first) == transformer.address_key(second)
+        assert transformer.address_key(with_ban) == "ban:75115_2270_00002"
+        assert transformer.address_key(Adresse.from_dict({})) is None
+
+    def test_interned_addresses_and_links(self) -> None:
+        """Test one address per canonical key and one link per facility."""
+        documents = [
+            _mall_facility("12345678200010"),
+            _mall_facility("12345678200028"),
+            _mall_facility("12345678200036", "AVENUE DE LA GARE"),
+        ]
+
+        with patch(
+            "sirene_api_client.etl.transformer.lambert93_to_wgs84",
+            return_value=(2.29, 48.84),
+        ) as convert:
+            result = self._transform(ETLConfig(intern_addresses=True), documents)
+
+        assert len(result.addresses) == 2
+        assert [link.facility_siret for link in result.address_links] == [
+            "12345678200010",
+            "12345678200028",
+            "12345678200036",
+        ]
+        assert result.address_links[0].address_key == (
+            result.address_links[1].address_key
+        )
+        assert {address.address_key for address in result.addresses} == {
+            link.address_key for link in result.address_links
+        }
+        # Shared Lambert coordinates are converted once
+        convert.assert_called_once_with("648000", "6860000")
+
+    def test_default_keeps_one_address_per_facility(self) -> None:
+        """Test addresses stay per facility without intern_addresses."""
+        result = self._transform(
+            ETLConfig(),
+            [_mall_facility("12345678200010"), _mall_facility("12345678200028")],
+        )
+
+        assert [address.facility_siret for address in result.addresses] == [
+            "12345678200010",
+            "12345678200028",
+        ]
+        assert result.addresses[0].address_key == result.addresses[1].address_key
+        assert result.address_links == []
+
+    def test_bundles_share_interned_address(self) -> None:
+        """Test streamed bundles reuse the interned address across calls."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        transformer = SIRENTransformer(ETLConfig(intern_addresses=True))
+        first, second = (
+            transformer.transform_facility_bundle(Etablissement.from_dict(doc))
+            for doc in (
+                _mall_facility("12345678200010"),
+                _mall_facility("55210055400013"),
+            )
+        )
+
+        assert second.address is first.address
+        assert second.address_link is not None
+        assert second.address_link.facility_siret == "55210055400013"
+
+    def test_interned_address_has_no_owner(self) -> None:
+        """Test facilities and dates are only carried by the links."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        transformer = SIRENTransformer(ETLConfig(intern_addresses=True))
+        undated = _mall_facility("55210055400013")
+        del undated["dateCreationEtablissement"]
+        first, second = (
+            transformer.transform_facility_bundle(Etablissement.from_dict(doc))
+            for doc in (_mall_facility("12345678200010"), undated)
+        )
+
+        assert first.address is not None
+        assert first.address.facility_siret is None
+        assert first.address.start is None
+        assert first.address_link is not None
+        assert first.address_link.start == date(2015, 3, 1)
+        assert second.address_link is not None
+        assert second.address_link.start is None
+
+    def test_transform_facility_address(self) -> None:
+        """Test the (address, link) pair with and without interning."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        facility = Etablissement.from_dict(_mall_facility("12345678200010"))
+
+        address, link = SIRENTransformer(ETLConfig()).transform_facility_address(
+            facility
+        )
+        assert address.facility_siret == "12345678200010"
+        assert link is None
+
+        interning = SIRENTransformer(ETLConfig(intern_addresses=True))
+        address, link = interning.transform_facility_address(facility)
+        assert link is not None
+        assert link.address_key == address.address_key
+        assert (
+            interning.transform_facility_address(
+                Etablissement.from_dict({"siret": "12345678200028"})
+            )
+            is None
+        )
+
+    def test_cache_is_bounded(self) -> None:
+        """Test the address cache evicts its oldest entries."""
+        from sirene_api_client.models.etablissement import Etablissement
+
+        transformer = SIRENTransformer(
+            ETLConfig(intern_addresses=True, address_cache_size=2)
+        )
+        for i, street in enumerate(("A", "B", "C")):
+            transformer.transform_facility_bundle(
+                Etablissement.from_dict(_mall_facility(f"1234567820001{i}", street))
+            )
+
+        assert len(transformer._address_cache) == 2
+        with pytest.raises(ValueError, match="address_cache_size must be non-negative"):
+            ETLConfig(address_cache_size=-1)
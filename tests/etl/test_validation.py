@@ -0,0 +1,115 @@
+"""
+Unit tests for the ETL SIREN/SIRET checksum validation module.
+
+Tests cover:
+- Luhn validation of single SIRENs and SIRETs, including La Poste
+- Vectorized masks agreeing with the scalar checks
+- Batch validation of lists and arrays
+- Rejection of bad identifiers before any request
+"""
+
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from sirene_api_client.client import AuthenticatedClient
+from sirene_api_client.etl import extract_and_transform_sirens
+from sirene_api_client.etl.validation import (
+    is_valid_siren,
+    is_valid_siret,
+    siren_mask,
+    siret_mask,
+    validate_sirens,
+    validate_sirets,
+)
+
+# "123456782" in Arabic-Indic digits, which str.isdigit() accepts
+ARABIC_INDIC_SIREN = "\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0662"
+
+
+def _candidates() -> list[str]:
+    rng = random.Random(7)
+    values = ["".join(rng.choices("0123456789", k=14)) for _ in range(3000)]
+    values += [value[:9] for value in values[:1000]]
+    values += [f"356000000{i:05d}" for i in range(500)]
+    return [*values, "", "12345678a", "1234567820", ARABIC_INDIC_SIREN, " 12345678"]
+
+
+class TestScalarValidation:
+    """Test single-identifier checks."""
+
+    def test_siren(self) -> None:
+        """Test the Luhn check digit and format of SIRENs."""
+        assert is_valid_siren("123456782")
+        assert is_valid_siren("552100554")
+        assert not is_valid_siren("123456789")
+        assert not is_valid_siren("12345678")
+        assert not is_valid_siren("12345678a")
+        assert not is_valid_siren(ARABIC_INDIC_SIREN)
+        assert not is_valid_siren(123456782)
+        assert not is_valid_siren(None)
+
+    def test_siret(self) -> None:
+        """Test SIRETs need valid SIREN and SIRET check digits."""
+        assert is_valid_siret("12345678200010")
+        assert is_valid_siret("55210055400013")
+        assert not is_valid_siret("12345678200011")
+        # Valid Luhn sum over 14 digits, but the SIREN part is invalid
+        assert not is_valid_siret("12345678900007")
+        assert not is_valid_siret("1234567820001")
+
+    def test_la_poste(self) -> None:
+        """Test La Poste SIRETs are valid when their digit sum is a multiple of 5."""
+        assert is_valid_siret("35600000049837")
+        assert is_valid_siret("35600000000048")
+        assert not is_valid_siret("35600000049838")
+        # The exception does not apply to other SIRENs
+        assert not is_valid_siret("12345678200007")
+
+
+class TestBatchValidation:
+    """Test vectorized and batch validation."""
+
+    def test_masks_agree_with_scalar_checks(self) -> None:
+        """Test str, bytes and object arrays give the scalar results."""
+        np = pytest.importorskip("numpy")
+        values = _candidates()
+        expected_sirens = [is_valid_siren(value) for value in values]
+        expected_sirets = [is_valid_siret(value) for value in values]
+
+        for array in (
+            np.array(values),
+            np.array(values, dtype=object),
+            np.array([value.encode() for value in values]),
+        ):
+            assert siren_mask(array).tolist() == expected_sirens
+            assert siret_mask(array).tolist() == expected_sirets
+        assert any(expected_sirens)
+        assert any(expected_sirets)
+
+    def test_validate_lists(self) -> None:
+        """Test lists and iterables give lists."""
+        sirens = ["123456782", "123456789", "552100554"]
+
+        assert validate_sirens(sirens) == [True, False, True]
+        assert validate_sirets(iter(["12345678200010", None])) == [True, False]
+        assert validate_sirens([]) == []
+
+    def test_validate_arrays(self) -> None:
+        """Test arrays give boolean arrays."""
+        np = pytest.importorskip("numpy")
+
+        mask = validate_sirens(np.array(["123456782", "123456789", "552100554"]))
+        assert mask.dtype == np.bool_
+        assert mask.tolist() == [True, False, True]
+
+    @pytest.mark.asyncio
+    async def test_batch_rejects_bad_sirens_before_requests(self) -> None:
+        """Test the batch ETL fails on a bad check digit without calling the API."""
+        client = MagicMock(spec=AuthenticatedClient)
+
+        with pytest.raises(ValueError, match="Invalid SIREN format: 123456789"):
+            await extract_and_transform_sirens(["123456782", "123456789"], client)
+
+        client.get_async_httpx_client.assert_not_called()